@@ -0,0 +1,204 @@
+# Copyright 2015 Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""
+Cache of clients for other OpenStack services (Nova, Cinder, Neutron).
+
+Building a client means parsing the service catalog and, for admin
+clients, requesting a Keystone token. Clients are therefore kept and
+reused for the credentials they were built with. Cache keys are tuples of
+(service, user, project, token, endpoint), so a client built for one
+token is never handed out to a request carrying another one, and an
+expired user token simply stops being looked up.
+
+A client is reused until client_cache_ttl expires or, when it is known,
+until its token expires, whichever comes first. The API classes using the
+cache are decorated with drop_on_unauthorized, so that a client whose
+calls are rejected as unauthorized is dropped and the next lookup builds
+a new one.
+"""
+
+import calendar
+import collections
+import datetime
+import functools
+import inspect
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_log import log
+from oslo_utils import excutils
+from oslo_utils import timeutils
+import six
+
+client_cache_opts = [
+    cfg.IntOpt('client_cache_ttl',
+               default=300,
+               help='Number of seconds a Nova, Cinder or Neutron client '
+                    'is reused before it is built again. Should be lower '
+                    'than the Keystone token lifetime. Set to 0 to disable '
+                    'client caching.'),
+    cfg.IntOpt('client_cache_size',
+               default=128,
+               help='Maximum number of Nova, Cinder and Neutron clients '
+                    'kept in the client cache.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(client_cache_opts)
+
+LOG = log.getLogger(__name__)
+
+
+class ClientCache(object):
+    """LRU cache of service clients with time based expiry."""
+
+    def __init__(self):
+        self._clients = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, factory, expires_at=None):
+        """Returns cached client for key, building it with factory if needed.
+
+        :param key: hashable tuple identifying credentials and endpoint.
+        :param factory: callable without arguments returning a new client.
+        :param expires_at: callable returning the time, in seconds since the
+                           epoch, the token of a client expires at, or None
+                           if it is not known. The client is not reused past
+                           that time.
+        """
+        ttl = CONF.client_cache_ttl
+        if ttl <= 0:
+            return factory()
+
+        now = time.time()
+        with self._lock:
+            entry = self._clients.pop(key, None)
+            if entry is not None and self._is_valid(entry, now):
+                # Re-insert to mark the entry as most recently used.
+                self._clients[key] = entry
+                return entry[0]
+
+        client = factory()
+        LOG.debug("Caching %s client for %s seconds.", key[0], ttl)
+        with self._lock:
+            self._clients[key] = (client, now + ttl, expires_at)
+            while len(self._clients) > max(CONF.client_cache_size, 1):
+                self._clients.popitem(last=False)
+        return client
+
+    @staticmethod
+    def _is_valid(entry, now):
+        client, deadline, expires_at = entry
+        if deadline <= now:
+            return False
+        token_expiry = expires_at(client) if expires_at else None
+        return token_expiry is None or token_expiry > now
+
+    def invalidate(self, key, client=None):
+        """Drops client for key, if any, so the next get builds a new one.
+
+        :param client: if given, the entry is only dropped if it still
+                       holds this client.
+        """
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and (client is None or entry[0] is client):
+                del self._clients[key]
+
+    def clear(self):
+        with self._lock:
+            self._clients.clear()
+
+    def __len__(self):
+        return len(self._clients)
+
+
+def token_expiry(http_client):
+    """Returns when the token of a Keystone authenticated client expires.
+
+    :param http_client: HTTP client of a Nova, Cinder or Neutron client.
+    :returns: seconds since the epoch, or None if the client has no token
+              or its expiry is not known.
+    """
+    try:
+        auth_ref = getattr(http_client, 'auth_ref', None)
+        if auth_ref is not None:
+            expires = auth_ref.expires
+        else:
+            catalog = http_client.service_catalog.catalog
+            expires = catalog['access']['token']['expires']
+    except (AttributeError, KeyError, TypeError):
+        return None
+
+    if isinstance(expires, six.string_types):
+        try:
+            expires = timeutils.parse_isotime(expires)
+        except ValueError:
+            return None
+    if not isinstance(expires, datetime.datetime):
+        return None
+    return calendar.timegm(timeutils.normalize_time(expires).timetuple())
+
+
+_CACHE = ClientCache()
+
+
+def get(key, factory, expires_at=None):
+    return _CACHE.get(key, factory, expires_at=expires_at)
+
+
+def invalidate(key, client=None):
+    _CACHE.invalidate(key, client)
+
+
+def drop_on_unauthorized(is_unauthorized, get_key):
+    """Class decorator dropping the cached clients whose calls are rejected.
+
+    Each public method of the decorated API class is wrapped so that, when
+    it fails because its client was not authorized, the client it used is
+    dropped from the cache and the next call builds a new one.
+
+    :param is_unauthorized: called with the exception a method failed
+                            with, it tells whether the client was
+                            rejected with a 401.
+    :param get_key: called with the arguments of the failed method, it
+                    returns the cache key of the client the method used.
+    """
+    def wrap(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                return method(*args, **kwargs)
+            except Exception as e:
+                with excutils.save_and_reraise_exception():
+                    if is_unauthorized(e):
+                        key = get_key(*args, **kwargs)
+                        LOG.debug("Dropping unauthorized %s client.",
+                                  key[0])
+                        invalidate(key)
+        return wrapper
+
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if inspect.isfunction(method) and not name.startswith('_'):
+                setattr(cls, name, wrap(method))
+        return cls
+    return decorate
+
+
+def clear():
+    _CACHE.clear()
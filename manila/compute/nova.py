@@ -16,6 +16,7 @@
 Handles all requests to Nova.
 """
 
+import functools
 import sys
 
 from novaclient import exceptions as nova_exception
@@ -27,6 +28,7 @@ from novaclient.v2 import servers as nova_servers
 from oslo_config import cfg
 from oslo_log import log
 
+from manila.common import client_cache
 from manila.db import base
 from manila import exception
 from manila.i18n import _
@@ -69,14 +71,45 @@ CONF.register_opts(nova_opts)
 LOG = log.getLogger(__name__)
 
 
-def novaclient(context):
-    if context.is_admin and context.project_id is None:
-        c = nova_client.Client(CONF.nova_admin_username,
-                               CONF.nova_admin_password,
-                               CONF.nova_admin_tenant_name,
-                               CONF.nova_admin_auth_url)
-        c.authenticate()
-        return c
+def _admin_novaclient():
+    c = nova_client.Client(CONF.nova_admin_username,
+                           CONF.nova_admin_password,
+                           CONF.nova_admin_tenant_name,
+                           CONF.nova_admin_auth_url,
+                           connection_pool=True)
+    c.authenticate()
+    return c
+
+
+def _novaclient(context, url):
+    LOG.debug('Novaclient connection created using URL: %s', url)
+
+    extensions = [assisted_volume_snapshots]
+
+    c = nova_client.Client(context.user_id,
+                           context.auth_token,
+                           context.project_id,
+                           auth_url=url,
+                           insecure=CONF.nova_api_insecure,
+                           cacert=CONF.nova_ca_certificates_file,
+                           extensions=extensions,
+                           connection_pool=True)
+    # noauth extracts user_id:project_id from auth_token
+    c.client.auth_token = context.auth_token or '%s:%s' % (context.user_id,
+                                                           context.project_id)
+    c.client.management_url = url
+    return c
+
+
+def _is_admin(context):
+    return context.is_admin and context.project_id is None
+
+
+def _client_key(context):
+    """Returns the client cache key of the novaclient for context."""
+    if _is_admin(context):
+        return ('nova', CONF.nova_admin_username, CONF.nova_admin_tenant_name,
+                None, CONF.nova_admin_auth_url)
     compat_catalog = {
         'access': {'serviceCatalog': context.service_catalog or []}
     }
@@ -99,22 +132,27 @@ def novaclient(context):
                      service_name=service_name,
                      endpoint_type=endpoint_type)
 
-    LOG.debug('Novaclient connection created using URL: %s', url)
+    return ('nova', context.user_id, context.project_id,
+            context.auth_token, url)
 
-    extensions = [assisted_volume_snapshots]
 
-    c = nova_client.Client(context.user_id,
-                           context.auth_token,
-                           context.project_id,
-                           auth_url=url,
-                           insecure=CONF.nova_api_insecure,
-                           cacert=CONF.nova_ca_certificates_file,
-                           extensions=extensions)
-    # noauth extracts user_id:project_id from auth_token
-    c.client.auth_token = context.auth_token or '%s:%s' % (context.user_id,
-                                                           context.project_id)
-    c.client.management_url = url
-    return c
+def _is_unauthorized(error):
+    return isinstance(error, nova_exception.Unauthorized)
+
+
+def _drop_client_key(api, context, *args, **kwargs):
+    return _client_key(context)
+
+
+def novaclient(context):
+    key = _client_key(context)
+    if _is_admin(context):
+        factory = _admin_novaclient
+    else:
+        factory = functools.partial(_novaclient, context, key[-1])
+    return client_cache.get(
+        key, factory,
+        expires_at=lambda c: client_cache.token_expiry(c.client))
 
 
 def _untranslate_server_summary_view(server):
@@ -163,6 +201,7 @@ def translate_server_exception(method):
     return wrapper
 
 
+@client_cache.drop_on_unauthorized(_is_unauthorized, _drop_client_key)
 class API(base.Base):
     """API for interacting with novaclient."""
 
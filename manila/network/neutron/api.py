@@ -19,6 +19,7 @@ from neutronclient.v2_0 import client as clientv20
 from oslo_config import cfg
 from oslo_log import log
 
+from manila.common import client_cache
 from manila import context
 from manila.db import base
 from manila import exception
@@ -78,6 +79,18 @@ CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
+def _is_unauthorized(error):
+    if isinstance(error, exception.NetworkException):
+        return error.kwargs.get('code') == 401
+    return isinstance(error, neutron_client_exc.Unauthorized)
+
+
+def _drop_client_key(api, *args, **kwargs):
+    # All the API methods use the admin client.
+    return api._client_key()
+
+
+@client_cache.drop_on_unauthorized(_is_unauthorized, _drop_client_key)
 class API(base.Base):
     """API for interacting with the neutron 2.x API.
 
@@ -91,9 +104,26 @@ class API(base.Base):
         self.configuration = getattr(CONF, self.config_group_name, CONF)
         self.last_neutron_extension_sync = None
         self.extensions = {}
-        self.client = self.get_client(context.get_admin_context())
+
+    @property
+    def client(self):
+        """The admin client, taken from the client cache."""
+        return self._get_client()
+
+    def _client_key(self, token=None):
+        if token:
+            return ('neutron', None, None, token,
+                    self.configuration.neutron_url)
+        return ('neutron', self.configuration.neutron_admin_username,
+                self.configuration.neutron_admin_project_name, None,
+                self.configuration.neutron_url)
 
     def _get_client(self, token=None):
+        return client_cache.get(
+            self._client_key(token), lambda: self._create_client(token),
+            expires_at=lambda c: client_cache.token_expiry(c.httpclient))
+
+    def _create_client(self, token=None):
         params = {
             'endpoint_url': self.configuration.neutron_url,
             'timeout': self.configuration.neutron_url_timeout,
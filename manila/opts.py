@@ -26,6 +26,7 @@ import oslo_policy.opts
 
 import manila.api.common
 import manila.api.middleware.auth
+import manila.common.client_cache
 import manila.common.config
 import manila.compute
 import manila.compute.nova
@@ -76,6 +77,7 @@ _global_opt_lists = [
     # Keep list alphabetically sorted
     manila.api.common.api_common_opts,
     [manila.api.middleware.auth.use_forwarded_for_opt],
+    manila.common.client_cache.client_cache_opts,
     manila.common.config.core_opts,
     manila.common.config.debug_opts,
     manila.common.config.global_opts,
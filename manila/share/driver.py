@@ -108,6 +108,17 @@ ganesha_opts = [
                default='/etc/manila/ganesha-export-templ.d',
                help='Path to directory containing Ganesha export '
                     'block templates. (Ganesha module only.)'),
+    cfg.BoolOpt('ganesha_batch_exports',
+                default=False,
+                help='Keep Ganesha exports and export ids in memory and '
+                     'apply export changes in batches, instead of '
+                     'updating export files and the export database for '
+                     'each change. (Ganesha module only.)'),
+    cfg.FloatOpt('ganesha_export_flush_interval',
+                 default=0.5,
+                 help='Number of seconds export changes are collected '
+                      'before being applied together, if '
+                      'ganesha_batch_exports is set. (Ganesha module only.)'),
 ]
 
 CONF = cfg.CONF
@@ -285,6 +296,25 @@ class ShareDriver(object):
         """Deny access to the share."""
         raise NotImplementedError()
 
+    def update_access(self, context, share, access_rules, add_rules=None,
+                      delete_rules=None, share_server=None):
+        """Update access rules of the share at once.
+
+        When add_rules and delete_rules are both None, the access of the
+        share on the backend must be made to match access_rules exactly:
+        missing rules are allowed and rules that are not in access_rules
+        are removed, e.g. to re-sync the share after a restart. Otherwise
+        only the delete_rules are removed and the add_rules allowed, and
+        access_rules, which are all the rules of the share including the
+        added ones, may be ignored.
+
+        :param access_rules: All access rules of the share.
+        :param add_rules: Rules to allow, or None.
+        :param delete_rules: Rules to remove, or None.
+        :param share_server: Share server model or None.
+        """
+        raise NotImplementedError()
+
     def check_for_setup_error(self):
         """Check for setup error."""
 
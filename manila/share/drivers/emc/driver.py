@@ -54,6 +54,10 @@ EMC_NAS_OPTS = [
     cfg.StrOpt('emc_nas_pool_name',
                default=None,
                help='EMC pool name.'),
+    cfg.IntOpt('emc_nas_topology_cache_ttl',
+               default=300,
+               help='Number of seconds lookups of Data Movers and VDMs '
+                    'by name are cached. Set to 0 to disable caching.'),
 ]
 
 CONF = cfg.CONF
@@ -23,7 +23,7 @@ from oslo_log import log
 import six
 
 from manila import exception
-from manila.i18n import _, _LW
+from manila.i18n import _, _LI, _LW
 from manila.share.drivers.emc.plugins import base
 from manila.share.drivers.emc.plugins.isilon import isilon_api
 
@@ -33,7 +33,15 @@ VERSION = "0.1.0"
 ISILON_OPTS = [
     cfg.StrOpt('isilon_share_root_dir', default='/ifs/manila-shares',
                help='The path on Isilon where the manila shares will be '
-                    'created.')]
+                    'created.'),
+    cfg.IntOpt('isilon_clone_workers',
+               default=isilon_api.DEFAULT_CLONE_WORKERS,
+               help='Number of files and directories cloned in parallel '
+                    'when creating a share from a snapshot.'),
+    cfg.IntOpt('isilon_clone_retries',
+               default=isilon_api.DEFAULT_CLONE_RETRIES,
+               help='Number of times cloning a file or listing a directory '
+                    'is retried when creating a share from a snapshot.')]
 CONF.register_opts(ISILON_OPTS)
 
 LOG = log.getLogger(__name__)
@@ -87,7 +95,17 @@ class IsilonStorageConnection(base.StorageConnection):
 
         # Clone snapshot to new location
         fq_target_dir = self._get_container_path(share)
-        self._isilon_api.clone_snapshot(snapshot['name'], fq_target_dir)
+
+        def _log_progress(progress):
+            LOG.info(_LI('Creating share %(share)s from snapshot '
+                         '%(snapshot)s: %(directories)d directories listed, '
+                         '%(files_cloned)d of %(files_found)d files '
+                         'cloned.'),
+                     dict(progress, share=share['name'],
+                          snapshot=snapshot['name']))
+
+        self._isilon_api.clone_snapshot(snapshot['name'], fq_target_dir,
+                                        progress_callback=_log_progress)
 
         return location
 
@@ -292,6 +310,8 @@ class IsilonStorageConnection(base.StorageConnection):
 
     def connect(self, emc_share_driver, context):
         """Connect to an Isilon cluster."""
+        # The Isilon options of a backend are read from its own section.
+        emc_share_driver.configuration.append_config_values(ISILON_OPTS)
         self._server = emc_share_driver.configuration.safe_get(
             "emc_nas_server")
         self._port = (
@@ -309,7 +329,11 @@ class IsilonStorageConnection(base.StorageConnection):
         self._verify_ssl_cert = False
         self._isilon_api = self._isilon_api_class(self._server_url, auth=(
             self._username, self._password),
-            verify_ssl_cert=self._verify_ssl_cert)
+            verify_ssl_cert=self._verify_ssl_cert,
+            clone_workers=emc_share_driver.configuration.safe_get(
+                "isilon_clone_workers"),
+            clone_retries=emc_share_driver.configuration.safe_get(
+                "isilon_clone_retries"))
         if not self._isilon_api.is_path_existent(self._root_dir):
             self._isilon_api.create_directory(self._root_dir, recursive=True)
 
@@ -13,21 +13,44 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import random
+import time
+
+from eventlet import greenpool
+from eventlet import greenthread
+from eventlet import queue
 from oslo_log import log
 from oslo_serialization import jsonutils
-import requests
 import six
+from six.moves.urllib import parse as urlparse
+
+from manila import exception
+from manila.i18n import _
+from manila.i18n import _LE
+from manila.share.drivers import rest_transport
 
 LOG = log.getLogger(__name__)
 
+DEFAULT_CLONE_WORKERS = 16
+DEFAULT_CLONE_RETRIES = 3
+CLONE_PAGE_SIZE = 1000
+CLONE_PROGRESS_INTERVAL = 10
+# Seconds the first retry of a failed clone item waits at most; each
+# further retry waits twice longer at most.
+CLONE_RETRY_BACKOFF = 1
+
 
 class IsilonApi(object):
 
-    def __init__(self, api_url, auth, verify_ssl_cert=True):
+    def __init__(self, api_url, auth, verify_ssl_cert=True,
+                 clone_workers=DEFAULT_CLONE_WORKERS,
+                 clone_retries=DEFAULT_CLONE_RETRIES):
         self.host_url = api_url
-        self.session = requests.session()
-        self.session.auth = auth
         self.verify_ssl_cert = verify_ssl_cert
+        self.clone_workers = clone_workers
+        self.clone_retries = clone_retries
+        self._transport = rest_transport.RestTransport(
+            auth=auth, verify=verify_ssl_cert, pool_size=clone_workers)
 
     def create_directory(self, container_path, recursive=False):
         """Create a directory."""
@@ -39,7 +62,15 @@ class IsilonApi(object):
                          headers=headers)
         return r.status_code == 200
 
-    def clone_snapshot(self, snapshot_name, fq_target_dir):
+    def clone_snapshot(self, snapshot_name, fq_target_dir,
+                       progress_callback=None):
+        """Clones the content of a snapshot into a directory.
+
+        The snapshot tree is cloned by clone_workers parallel workers,
+        see _TreeCloner. progress_callback, if given, is called with the
+        progress of the clone every CLONE_PROGRESS_INTERVAL seconds and
+        once the clone is done.
+        """
         self.create_directory(fq_target_dir)
         snapshot = self.get_snapshot(snapshot_name)
         snapshot_path = snapshot['path']
@@ -47,27 +78,9 @@ class IsilonApi(object):
         relative_snapshot_path = snapshot_path[4:]
         fq_snapshot_path = ('/ifs/.snapshot/' + snapshot_name +
                             relative_snapshot_path)
-        self._clone_directory_contents(fq_snapshot_path, fq_target_dir,
-                                       snapshot_name, relative_snapshot_path)
-
-    def _clone_directory_contents(self, fq_source_dir, fq_target_dir,
-                                  snapshot_name, relative_path):
-        dir_listing = self.get_directory_listing(fq_source_dir)
-        for item in dir_listing['children']:
-            name = item['name']
-            source_item_path = fq_source_dir + '/' + name
-            new_relative_path = relative_path + '/' + name
-            dest_item_path = fq_target_dir + '/' + name
-            if item['type'] == 'container':
-                # create the container name in the target dir & clone dir
-                self.create_directory(dest_item_path)
-                self._clone_directory_contents(source_item_path,
-                                               dest_item_path,
-                                               snapshot_name,
-                                               new_relative_path)
-            elif item['type'] == 'object':
-                self.clone_file_from_snapshot('/ifs' + new_relative_path,
-                                              dest_item_path, snapshot_name)
+        cloner = _TreeCloner(self, snapshot_name, self.clone_workers,
+                             self.clone_retries, progress_callback)
+        cloner.clone(fq_snapshot_path, fq_target_dir, relative_snapshot_path)
 
     def clone_file_from_snapshot(self, fq_file_path, fq_dest_path,
                                  snapshot_name):
@@ -75,10 +88,23 @@ class IsilonApi(object):
         snapshot_suffix = '&snapshot=' + snapshot_name
         url = (self.host_url + '/namespace' + fq_dest_path + '?clone=true' +
                snapshot_suffix)
-        self.request('PUT', url, headers=headers)
+        r = self.request('PUT', url, headers=headers)
+        r.raise_for_status()
 
-    def get_directory_listing(self, fq_dir_path):
-        url = self.host_url + '/namespace' + fq_dir_path + '?detail=default'
+    def get_directory_listing(self, fq_dir_path, limit=None, resume=None):
+        """Lists a directory.
+
+        At most limit children are returned if limit is given, along with
+        a 'resume' token if the directory has more; the listing goes on
+        when the token is passed back as resume.
+        """
+        url = self.host_url + '/namespace' + fq_dir_path
+        if resume:
+            url += '?resume=' + urlparse.quote(resume, safe='')
+        else:
+            url += '?detail=default'
+            if limit:
+                url += '&limit=' + six.text_type(limit)
         r = self.request('GET', url)
 
         r.raise_for_status()
@@ -115,9 +141,8 @@ class IsilonApi(object):
             r.raise_for_status()
 
     def lookup_nfs_export(self, share_path):
-        response = self.session.get(
-            self.host_url + '/platform/1/protocols/nfs/exports',
-            verify=self.verify_ssl_cert)
+        response = self.request(
+            'GET', self.host_url + '/platform/1/protocols/nfs/exports')
         nfs_exports_json = response.json()
         for export in nfs_exports_json['exports']:
             for path in export['paths']:
@@ -136,7 +161,8 @@ class IsilonApi(object):
             return None
 
     def lookup_smb_share(self, share_name):
-        response = self.session.get(
+        response = self.request(
+            'GET',
             self.host_url + '/platform/1/protocols/smb/shares/' + share_name)
         if response.status_code == 200:
             return response.json()['shares'][0]
@@ -192,7 +218,8 @@ class IsilonApi(object):
         r.raise_for_status()
 
     def delete_nfs_share(self, share_number):
-        response = self.session.delete(
+        response = self.request(
+            'DELETE',
             self.host_url + '/platform/1/protocols/nfs/exports' + '/' +
             six.text_type(share_number))
         return response.status_code == 204
@@ -211,6 +238,134 @@ class IsilonApi(object):
     def request(self, method, url, headers=None, data=None):
         if data is not None:
             data = jsonutils.dumps(data)
-        r = self.session.request(method, url, headers=headers, data=data,
-                                 verify=self.verify_ssl_cert)
-        return r
+        return self._transport.request(method, url, headers=headers,
+                                       data=data)
+
+
+class _TreeCloner(object):
+    """Clones a snapshot directory tree with a pool of workers.
+
+    Directory pages and files to clone are put in a work queue shared by
+    the workers. Working on a directory page creates the target
+    directory on the first page, lists CLONE_PAGE_SIZE children and
+    queues them, and queues the next page if any. A failed item is
+    queued again up to retries times; the clone fails once every item
+    is done if any of them failed for good. The worker of a failed item
+    waits for an exponential backoff with jitter before queueing it
+    again, so that a busy cluster is not hammered.
+    """
+
+    def __init__(self, api, snapshot_name, workers, retries,
+                 progress_callback=None):
+        self.api = api
+        self.snapshot_name = snapshot_name
+        self.workers = workers
+        self.retries = retries
+        self.progress_callback = progress_callback
+        self.progress = {'directories': 0, 'files_found': 0,
+                         'files_cloned': 0, 'retries': 0}
+        self._failed = []
+        self._queue = queue.Queue()
+        self._last_report = time.time()
+
+    def clone(self, fq_source_dir, fq_target_dir, relative_path):
+        self._queue.put((self._clone_directory_page,
+                         (fq_source_dir, fq_target_dir, relative_path, None),
+                         0))
+        pool = greenpool.GreenPool(self.workers)
+        for __ in six.moves.range(self.workers):
+            pool.spawn_n(self._work)
+        self._queue.join()
+        for __ in six.moves.range(self.workers):
+            self._queue.put(None)
+        pool.waitall()
+
+        self._report_progress(force=True)
+        if self._failed:
+            msg = (_('Failed to clone %(failed)d items of snapshot '
+                     '%(snapshot)s, e.g. %(path)s.') %
+                   {'failed': len(self._failed),
+                    'snapshot': self.snapshot_name,
+                    'path': self._failed[0]})
+            raise exception.ShareBackendException(msg=msg)
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self._run(*item)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, func, args, attempt):
+        try:
+            func(*args)
+        except Exception as e:
+            if attempt < self.retries:
+                LOG.debug('Cloning %(path)s failed, retrying: %(err)s',
+                          {'path': args[0], 'err': e})
+                self.progress['retries'] += 1
+                greenthread.sleep(self._get_backoff(attempt))
+                self._queue.put((func, args, attempt + 1))
+            else:
+                LOG.error(_LE('Failed to clone %(path)s: %(err)s'),
+                          {'path': args[0], 'err': e})
+                self._failed.append(args[0])
+        self._report_progress()
+
+    @staticmethod
+    def _get_backoff(attempt):
+        """Returns a random delay of up to 2^attempt backoffs in seconds."""
+        return random.uniform(0, min(rest_transport.MAX_BACKOFF,
+                                     CLONE_RETRY_BACKOFF * 2 ** attempt))
+
+    def _clone_directory_page(self, fq_source_dir, fq_target_dir,
+                              relative_path, resume):
+        if resume is None:
+            self.api.create_directory(fq_target_dir)
+        listing = self.api.get_directory_listing(
+            fq_source_dir, limit=CLONE_PAGE_SIZE, resume=resume)
+
+        for item in listing['children']:
+            name = item['name']
+            if item['type'] == 'container':
+                self._queue.put((self._clone_directory_page,
+                                 (fq_source_dir + '/' + name,
+                                  fq_target_dir + '/' + name,
+                                  relative_path + '/' + name, None),
+                                 0))
+            elif item['type'] == 'object':
+                self.progress['files_found'] += 1
+                self._queue.put((self._clone_file,
+                                 ('/ifs' + relative_path + '/' + name,
+                                  fq_target_dir + '/' + name),
+                                 0))
+        if listing.get('resume'):
+            self._queue.put((self._clone_directory_page,
+                             (fq_source_dir, fq_target_dir, relative_path,
+                              listing['resume']),
+                             0))
+        else:
+            self.progress['directories'] += 1
+
+    def _clone_file(self, fq_file_path, fq_dest_path):
+        self.api.clone_file_from_snapshot(fq_file_path, fq_dest_path,
+                                          self.snapshot_name)
+        self.progress['files_cloned'] += 1
+
+    def _report_progress(self, force=False):
+        if not self.progress_callback:
+            return
+        now = time.time()
+        if not force and now - self._last_report < CLONE_PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        try:
+            self.progress_callback(dict(self.progress))
+        except Exception:
+            # A failing callback must not kill the worker reporting, as
+            # the clone would wait forever for the items left to it.
+            LOG.exception(_LE('Failed to report the progress of cloning '
+                              'snapshot %s.'), self.snapshot_name)
@@ -34,6 +34,12 @@ VERSION = "1.0.0"
 
 LOG = log.getLogger(__name__)
 
+# Kinds of topology cache entries, by the query looking them up.
+TOPOLOGY_QUERIES = {
+    'get_mover_ref_by_name': 'mover_ref',
+    'get_vdm_by_name': 'vdm',
+}
+
 
 @vnx_utils.decorate_all_methods(vnx_utils.log_enter_exit,
                                 debug_only=True)
@@ -47,6 +53,7 @@ class VNXStorageConnection(driver.StorageConnection):
         self._pool_name = None
         self._pool = None
         self._filesystems = {}
+        self._topology = None
         self.driver_handles_share_servers = True
 
     def create_share(self, emc_share_driver, context, share,
@@ -469,10 +476,16 @@ class VNXStorageConnection(driver.StorageConnection):
 
         self._XMLAPI_helper = helper.XMLAPIHelper(configuration)
         self._NASCmd_helper = helper.NASCommandHelper(configuration)
+        self._topology = vnx_utils.TopologyCache(
+            configuration.emc_nas_topology_cache_ttl)
 
         # To verify the input from manila configuration
-        self._get_mover_ref_by_name(self._mover_name)
-        self._pool = self._get_available_pool_by_name(self._pool_name)
+        mover_result, pool_result = self._query_topology(
+            ('get_mover_ref_by_name', self._mover_name),
+            ('list_storage_pool',))
+        self._get_mover_ref_by_name(self._mover_name, result=mover_result)
+        self._pool = self._get_available_pool_by_name(self._pool_name,
+                                                      result=pool_result)
 
     def update_share_stats(self, stats_dict):
         """Communicate with EMCNASClient to get the stats."""
@@ -485,6 +498,10 @@ class VNXStorageConnection(driver.StorageConnection):
         stats_dict['free_capacity_gb'] = (
             int(pool['total_size']) - int(pool['used_size']))
 
+        LOG.debug("Topology cache: %(hits)d hits, %(misses)d misses.",
+                  {'hits': self._topology.hits,
+                   'misses': self._topology.misses})
+
     def get_network_allocations_number(self, emc_share_driver):
         """Returns number of network allocations for creating VIFs."""
         return constants.IP_ALLOCATIONS
@@ -510,12 +527,22 @@ class VNXStorageConnection(driver.StorageConnection):
 
         try:
             # Refresh DataMover/VDM by the configuration
-            moverRef = self._get_mover_ref_by_name(self._mover_name)
-            if not self._vdm_exist(vdm_name):
+            mover_result, vdm_result = self._query_topology(
+                ('get_mover_ref_by_name', self._mover_name),
+                ('get_vdm_by_name', vdm_name))
+            moverRef = self._get_mover_ref_by_name(self._mover_name,
+                                                   result=mover_result)
+            if self._vdm_exist(vdm_name, result=vdm_result):
+                mover_by_id_result = None
+            else:
                 LOG.debug('Share server %s not found, creating.', vdm_name)
                 self._create_vdm(vdm_name, moverRef)
+                vdm_result, mover_by_id_result = (
+                    self._query_topology(
+                        ('get_vdm_by_name', vdm_name),
+                        ('get_mover_by_id', moverRef['id'])))
 
-            status, vdmRef = self._XMLAPI_helper.get_vdm_by_name(vdm_name)
+            status, vdmRef = vdm_result
             if constants.STATUS_OK != status:
                 message = (_('Could not get share server by name %(name)s. '
                              'Reason: %(err)s.')
@@ -527,7 +554,8 @@ class VNXStorageConnection(driver.StorageConnection):
             netmask = utils.cidr_to_netmask(network_info['cidr'])
 
             allocated_interfaces = []
-            device_port = self._get_device_port(moverRef)
+            device_port = self._get_device_port(moverRef,
+                                                result=mover_by_id_result)
 
             for net_info in network_info['network_allocations']:
                 ip = net_info['ip_address']
@@ -548,6 +576,7 @@ class VNXStorageConnection(driver.StorageConnection):
                     LOG.error(message)
                     raise exception.EMCVnxXMLAPIError(err=message)
                 allocated_interfaces.append(interface)
+                self._topology.invalidate('vdm', vdm_name)
 
             if active_directory:
                 self._configure_active_directory(
@@ -566,6 +595,7 @@ class VNXStorageConnection(driver.StorageConnection):
         except Exception as ex:
             with excutils.save_and_reraise_exception():
                 LOG.error(_LE('Could not setup server. Reason: %s.'), ex)
+                self._topology.invalidate('vdm', vdm_name)
                 server_details = self._construct_backend_details(
                     vdm_name, vdmRef, interface_info)
                 self.teardown_server(None, server_details, sec_services)
@@ -584,8 +614,9 @@ class VNXStorageConnection(driver.StorageConnection):
         }
 
     @vnx_utils.log_enter_exit
-    def _vdm_exist(self, name, id=None):
-        status, vdmRef = self._XMLAPI_helper.get_vdm_by_name(name)
+    def _vdm_exist(self, name, id=None, result=None):
+        status, vdmRef = result or self._query_topology(
+            ('get_vdm_by_name', name))[0]
         if constants.STATUS_OK != status:
             return False
 
@@ -598,15 +629,17 @@ class VNXStorageConnection(driver.StorageConnection):
         """Create a new VDM as a share sever."""
 
         status, out = self._XMLAPI_helper.create_vdm(vdm_name, moverRef['id'])
+        self._topology.invalidate('vdm', vdm_name)
         if constants.STATUS_OK != status:
             message = _('Could not create VDM %s.') % vdm_name
             LOG.error(message)
             raise exception.EMCVnxXMLAPIError(err=message)
 
-    def _get_device_port(self, moverRef):
+    def _get_device_port(self, moverRef, result=None):
         """Get a proper network device to create interface."""
 
-        status, mover = self._XMLAPI_helper.get_mover_by_id(moverRef['id'])
+        status, mover = (result or
+                         self._XMLAPI_helper.get_mover_by_id(moverRef['id']))
         if constants.STATUS_OK != status:
             message = (_("Could not get physical device port "
                          "on mover (id:%s).")
@@ -676,11 +709,15 @@ class VNXStorageConnection(driver.StorageConnection):
         cifs_if = server_details.get('cifs_if')
         nfs_if = server_details.get('nfs_if')
 
-        status, vdmRef = self._XMLAPI_helper.get_vdm_by_name(vdm_name)
+        status, vdmRef = self._query_topology(
+            ('get_vdm_by_name', vdm_name))[0]
         if constants.STATUS_OK != status or vdmRef['id'] != vdm_id:
             LOG.debug('Share server %s not found.', vdm_name)
             return
 
+        # Whatever happens below, the VDM and its interfaces are changed.
+        self._topology.invalidate('vdm', vdm_name)
+
         self._disable_nfs_service(vdm_name)
 
         if security_services:
@@ -732,9 +769,9 @@ class VNXStorageConnection(driver.StorageConnection):
             self._NASCmd_helper.disable_nfs_service(vdm_name, if_name)
 
     @vnx_utils.log_enter_exit
-    def _get_available_pool_by_name(self, name):
+    def _get_available_pool_by_name(self, name, result=None):
 
-        status, out = self._XMLAPI_helper.list_storage_pool()
+        status, out = result or self._XMLAPI_helper.list_storage_pool()
         if constants.STATUS_OK != status:
             LOG.error(_LE("Could not get storage pool list."))
 
@@ -751,8 +788,35 @@ class VNXStorageConnection(driver.StorageConnection):
 
         return self._pool
 
-    def _get_mover_ref_by_name(self, name):
-        status, mover = self._XMLAPI_helper.get_mover_ref_by_name(name)
+    def _query_topology(self, *queries):
+        """Runs queries like XMLAPIHelper.query_batch, using the cache.
+
+        Queries for topology cached by name are answered from the cache
+        when possible; the others are sent in a single request packet.
+        """
+        results = [None] * len(queries)
+        missed = []
+        for i, query in enumerate(queries):
+            kind = TOPOLOGY_QUERIES.get(query[0])
+            if kind is not None:
+                results[i] = self._topology.lookup((kind,) + query[1:])
+            if results[i] is None:
+                missed.append(i)
+
+        if missed:
+            fetched = self._XMLAPI_helper.query_batch(
+                *[queries[i] for i in missed])
+            for i, result in zip(missed, fetched):
+                kind = TOPOLOGY_QUERIES.get(queries[i][0])
+                if kind is not None:
+                    self._topology.store((kind,) + queries[i][1:], result)
+                results[i] = result
+
+        return results
+
+    def _get_mover_ref_by_name(self, name, result=None):
+        status, mover = result or self._query_topology(
+            ('get_mover_ref_by_name', name))[0]
         if constants.STATUS_ERROR == status:
             message = _("Could not find Data Mover by name: %s.") % name
             LOG.error(message)
@@ -761,7 +825,7 @@ class VNXStorageConnection(driver.StorageConnection):
         return mover
 
     def _get_vdm_by_name(self, name, allow_absence=False):
-        status, vdm = self._XMLAPI_helper.get_vdm_by_name(name)
+        status, vdm = self._query_topology(('get_vdm_by_name', name))[0]
         if constants.STATUS_OK != status:
             if allow_absence and constants.STATUS_NOT_FOUND == status:
                 return None
@@ -12,17 +12,18 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
-import cookielib
 import random
 import re
+import sys
+import threading
 
 from eventlet import greenthread
 from lxml import builder
 from lxml import etree as ET
 from oslo_log import log
+import requests
+from requests import adapters
 import six
-from six.moves.urllib import error as url_error  # pylint: disable=E0611
-from six.moves.urllib import request as url_request  # pylint: disable=E0611
 
 import manila.exception
 from manila.i18n import _
@@ -32,12 +33,26 @@ from manila.i18n import _LW
 from manila.share.drivers.emc.plugins.vnx import constants
 from manila.share.drivers.emc.plugins.vnx import utils as vnx_utils
 from manila.share.drivers.emc.plugins.vnx import xml_api_parser as parser
+from manila.share.drivers import rest_transport
 from manila import utils
 
 LOG = log.getLogger(__name__)
 
 
 class XMLAPIConnector(object):
+    """Client of the VNX XML API.
+
+    Requests are sent over a requests session, which keeps the
+    connections to the Control Station open between requests and holds
+    the session cookie obtained by logging in.
+    """
+
+    # Maximum number of connections kept open to the Control Station.
+    POOL_SIZE = 10
+    # Seconds to wait for the Control Station to answer, longer than the
+    # 300 seconds the tasks it runs are given to complete.
+    TIMEOUT = 360
+
     def __init__(self, configuration, debug=True):
         super(XMLAPIConnector, self).__init__()
         self.storage_ip = configuration.emc_nas_server
@@ -47,44 +62,42 @@ class XMLAPIConnector(object):
         self.auth_url = 'https://' + self.storage_ip + '/Login'
         self._url = ('https://' + self.storage_ip
                      + '/servlets/CelerraManagementServices')
-        https_handler = url_request.HTTPSHandler()
-        cookie_jar = cookielib.CookieJar()
-        cookie_handler = url_request.HTTPCookieProcessor(cookie_jar)
-        self.url_opener = url_request.build_opener(https_handler,
-                                                   cookie_handler)
+        self.session = requests.Session()
+        self.session.mount('https://', adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=self.POOL_SIZE))
+        # Session.send does not apply the verify setting of the session.
+        self._verify = rest_transport.get_system_ca_bundle()
         self._do_setup()
 
     def _do_setup(self):
         credential = ('user=' + self.user_name
                       + '&password=' + self.pass_word
                       + '&Login=Login')
-        req = url_request.Request(self.auth_url, credential,
-                                  constants.CONTENT_TYPE_URLENCODE)
-        resp = self.url_opener.open(req)
-        resp_body = resp.read()
-        self._http_log_resp(resp, resp_body)
+        resp = self._send('POST', self.auth_url, credential,
+                          constants.CONTENT_TYPE_URLENCODE)
+        self._http_log_resp(resp, resp.content)
 
     def _http_log_req(self, req):
         if not self.debug:
             return
 
         string_parts = ['curl -i']
-        string_parts.append(' -X %s' % req.get_method())
+        string_parts.append(' -X %s' % req.method)
 
         for k in req.headers:
             header = ' -H "%s: %s"' % (k, req.headers[k])
             string_parts.append(header)
 
-        if req.data:
-            string_parts.append(" -d '%s'" % req.data)
-        string_parts.append(' ' + req.get_full_url())
+        if req.body:
+            string_parts.append(" -d '%s'" % req.body)
+        string_parts.append(' ' + req.url)
         LOG.debug("\nREQ: %s\n", "".join(string_parts))
 
     def _http_log_resp(self, resp, body, failed_req=None):
         if not self.debug and failed_req is None:
             return
 
-        headers = six.text_type(resp.headers).replace('\n', '\\n')
+        headers = six.text_type(dict(resp.headers))
         if failed_req:
             LOG.error(
                 _LE('REQ: [%(method)s] %(url)s %(req_hdrs)s\n'
@@ -92,11 +105,11 @@ class XMLAPIConnector(object):
                     'RESP: [%(code)s] %(resp_hdrs)s\n'
                     'RESP BODY: %(resp_b)s\n'),
                 {
-                    'method': failed_req.get_method(),
-                    'url': failed_req.get_full_url(),
+                    'method': failed_req.method,
+                    'url': failed_req.url,
                     'req_hdrs': failed_req.headers,
-                    'req_b': failed_req.data,
-                    'code': resp.getcode(),
+                    'req_b': failed_req.body,
+                    'code': resp.status_code,
                     'resp_hdrs': headers,
                     'resp_b': body,
                 }
@@ -106,33 +119,39 @@ class XMLAPIConnector(object):
                 'RESP: [%(code)s] %(resp_hdrs)s\n'
                 'RESP BODY: %(resp_b)s\n',
                 {
-                    'code': resp.getcode(),
+                    'code': resp.status_code,
                     'resp_hdrs': headers,
                     'resp_b': body,
                 }
             )
 
-    def _request(self, req_body=None, method=None,
-                 header=constants.CONTENT_TYPE_URLENCODE):
-        req = url_request.Request(self._url, req_body, header)
-        if method not in (None, 'GET', 'POST'):
-            req.get_method = lambda: method
+    def _send(self, method, url, req_body, header):
+        req = self.session.prepare_request(
+            requests.Request(method, url, data=req_body, headers=header))
         self._http_log_req(req)
-        try:
-            resp = self.url_opener.open(req)
-            resp_body = resp.read()
-            self._http_log_resp(resp, resp_body)
-        except url_error.HTTPError as http_err:
+        resp = self.session.send(req, timeout=self.TIMEOUT,
+                                 verify=self._verify)
+        if resp.status_code >= 400:
+            self._http_log_resp(resp, resp.content, failed_req=req)
             err = {'errorCode': -1,
-                   'httpStatusCode': http_err.code,
-                   'messages': six.text_type(http_err),
+                   'httpStatusCode': resp.status_code,
+                   'messages': resp.reason,
                    'request': req_body}
             msg = (_("The request is invalid. Reason: %(reason)s") %
                    {'reason': err})
-            if '403' == six.text_type(http_err.code):
+            if resp.status_code == 403:
                 raise manila.exception.NotAuthorized()
             else:
                 raise manila.exception.ManilaException(message=msg)
+        return resp
+
+    def _request(self, req_body=None, method=None,
+                 header=constants.CONTENT_TYPE_URLENCODE):
+        if method is None:
+            method = 'POST' if req_body else 'GET'
+        resp = self._send(method, self._url, req_body, header)
+        resp_body = resp.content
+        self._http_log_resp(resp, resp_body)
 
         return resp_body
 
@@ -141,8 +160,7 @@ class XMLAPIConnector(object):
         try:
             resp_body = self._request(req_body, method, header)
         except manila.exception.NotAuthorized:
-            LOG.debug("Login again because client certification "
-                      "may be expired.")
+            LOG.debug("Login again because the session may be expired.")
             self._do_setup()
             resp_body = self._request(req_body, method, header)
 
@@ -241,11 +259,10 @@ class XMLAPIHelper(object):
             return []
         return map(lambda info: info['messageCode'], data['info'])
 
-    def _build_query_package(self, body):
+    def _build_query_package(self, *bodies):
         return self.elt_maker.RequestPacket(
-            self.elt_maker.Request(
-                self.elt_maker.Query(body)
-            )
+            *[self.elt_maker.Request(self.elt_maker.Query(body))
+              for body in bodies]
         )
 
     def _build_task_package(self, body):
@@ -286,7 +303,20 @@ class XMLAPIHelper(object):
         return status, msg
 
     def get_file_system_by_name(self, fs_name, need_capacity=True):
+        return self._query('get_file_system_by_name', fs_name, need_capacity)
+
+    def _get_file_system_by_name_query(self, fs_name, need_capacity=True):
+        return self.elt_maker.FileSystemQueryParams(
+            self.elt_maker.AspectSelection(
+                fileSystems='true',
+                fileSystemCapacityInfos='true' if
+                need_capacity else 'false'
+            ),
+            self.elt_maker.Alias(name=fs_name)
+        )
 
+    def _get_file_system_by_name_result(self, status, msg, result, fs_name,
+                                        need_capacity=True):
         data = {
             'name': '',
             'id': '',
@@ -299,19 +329,6 @@ class XMLAPIHelper(object):
             'cwormState': '',
         }
 
-        request = self._build_query_package(
-            self.elt_maker.FileSystemQueryParams(
-                self.elt_maker.AspectSelection(
-                    fileSystems='true',
-                    fileSystemCapacityInfos='true' if
-                    need_capacity else 'false'
-                ),
-                self.elt_maker.Alias(name=fs_name)
-            )
-        )
-
-        status, msg, result = self._send_request(request)
-
         if constants.STATUS_OK != status:
             return status, msg
 
@@ -486,13 +503,49 @@ class XMLAPIHelper(object):
         req_xml = constants.XML_HEADER + ET.tostring(req)
         rsp_xml = self._conn.request(req_xml)
 
-        result = parser.parse_xml_api(
-            parser.xml_to_tupletree(rsp_xml)
-        )
+        result = parser.parse_xml_api_string(rsp_xml)
 
         status, msg_info = self._verify_response(result)
         return status, msg_info, result
 
+    def query_batch(self, *queries):
+        """Run several queries with a single request packet.
+
+        Each query is a tuple of the name of a query method of this
+        class taking part in batching (get_file_system_by_name,
+        get_mover_by_id, get_mover_ref_by_name, get_vdm_by_name and
+        list_storage_pool) and its arguments.
+
+        Returns the list of what the query methods would have returned.
+        """
+        bodies = [getattr(self, '_%s_query' % query[0])(*query[1:])
+                  for query in queries]
+        req_xml = (constants.XML_HEADER +
+                   ET.tostring(self._build_query_package(*bodies)))
+        responses = parser.parse_xml_api_packet(self._conn.request(req_xml))
+
+        if (len(responses) != len(queries) or
+                not all(isinstance(r, list) for r in responses)):
+            # The packet as a whole was rejected, report its problems as
+            # the result of each query.
+            problems = []
+            for fault in responses:
+                if not isinstance(fault, list) and len(fault) > 2:
+                    problems.extend(fault[2])
+            fault = ('Fault', {'maxSeverity': constants.STATUS_ERROR},
+                     problems)
+            responses = [[fault]] * len(queries)
+
+        results = []
+        for query, result in zip(queries, responses):
+            status, msg = self._verify_response(result)
+            results.append(getattr(self, '_%s_result' % query[0])(
+                status, msg, result, *query[1:]))
+        return results
+
+    def _query(self, method, *args):
+        return self.query_batch((method,) + args)[0]
+
     def _is_not_internal_device(self, device):
         for device_type in ('mge', 'fxg', 'tks', 'fsn'):
             if device.find(device_type) == 0:
@@ -591,13 +644,13 @@ class XMLAPIHelper(object):
         return status, check_point
 
     def list_storage_pool(self):
-        pools = []
+        return self._query('list_storage_pool')
 
-        request = self._build_query_package(
-            self.elt_maker.StoragePoolQueryParams()
-        )
+    def _list_storage_pool_query(self):
+        return self.elt_maker.StoragePoolQueryParams()
 
-        status, msg, result = self._send_request(request)
+    def _list_storage_pool_result(self, status, msg, result):
+        pools = []
 
         if constants.STATUS_OK != status:
             return status, msg
@@ -643,19 +696,19 @@ class XMLAPIHelper(object):
         return status, pools
 
     def get_mover_ref_by_name(self, name):
+        return self._query('get_mover_ref_by_name', name)
+
+    def _get_mover_ref_by_name_query(self, name):
+        return self.elt_maker.MoverQueryParams(
+            self.elt_maker.AspectSelection(movers='true')
+        )
 
+    def _get_mover_ref_by_name_result(self, status, msg, result, name):
         mover = {
             'name': '',
             'id': '',
         }
 
-        request = self._build_query_package(
-            self.elt_maker.MoverQueryParams(
-                self.elt_maker.AspectSelection(movers='true')
-            )
-        )
-
-        status, msg, result = self._send_request(request)
         if constants.STATUS_ERROR == status:
             return status, msg
 
@@ -670,7 +723,24 @@ class XMLAPIHelper(object):
         return status, mover
 
     def get_mover_by_id(self, mover_id):
+        return self._query('get_mover_by_id', mover_id)
+
+    def _get_mover_by_id_query(self, mover_id):
+        return self.elt_maker.MoverQueryParams(
+            self.elt_maker.AspectSelection(
+                moverDeduplicationSettings='true',
+                moverDnsDomains='true',
+                moverInterfaces='true',
+                moverNetworkDevices='true',
+                moverNisDomains='true',
+                moverRoutes='true',
+                movers='true',
+                moverStatuses='true'
+            ),
+            mover=mover_id
+        )
 
+    def _get_mover_by_id_result(self, status, msg, result, mover_id):
         mover = {
             'name': '',
             'id': '',
@@ -683,23 +753,6 @@ class XMLAPIHelper(object):
             'dns_domain': [],
         }
 
-        request = self._build_query_package(
-            self.elt_maker.MoverQueryParams(
-                self.elt_maker.AspectSelection(
-                    moverDeduplicationSettings='true',
-                    moverDnsDomains='true',
-                    moverInterfaces='true',
-                    moverNetworkDevices='true',
-                    moverNisDomains='true',
-                    moverRoutes='true',
-                    movers='true',
-                    moverStatuses='true'
-                ),
-                mover=mover_id
-            )
-        )
-
-        status, msg, result = self._send_request(request)
         if constants.STATUS_OK != status:
             return status, msg
 
@@ -804,6 +857,12 @@ class XMLAPIHelper(object):
         return status, msg
 
     def get_vdm_by_name(self, name):
+        return self._query('get_vdm_by_name', name)
+
+    def _get_vdm_by_name_query(self, name):
+        return self.elt_maker.VdmQueryParams()
+
+    def _get_vdm_by_name_result(self, status, msg, result, name):
         vdm = {
             "name": '',
             "id": '',
@@ -812,9 +871,6 @@ class XMLAPIHelper(object):
             'interfaces': [],
         }
 
-        request = self._build_query_package(self.elt_maker.VdmQueryParams())
-
-        status, msg, result = self._send_request(request)
         if constants.STATUS_OK != status:
             return status, msg
 
@@ -1086,12 +1142,26 @@ class SSHConnector(object):
         return stdout, stderr
 
 
+class _NFSAccessOp(object):
+    """Hosts to add to and remove from the access lists of an NFS share."""
+
+    def __init__(self, add_hosts, remove_hosts):
+        self.add_hosts = add_hosts
+        self.remove_hosts = remove_hosts
+        self.done = False
+        self.result = None
+        self.exc_info = None
+
+
 @vnx_utils.decorate_all_methods(vnx_utils.log_enter_exit,
                                 debug_only=True)
 class NASCommandHelper(object):
     def __init__(self, configuration):
         super(NASCommandHelper, self).__init__()
         self._conn = SSHConnector(configuration)
+        # Pending NFS access updates by (mover name, share path).
+        self._pending_access = {}
+        self._pending_lock = threading.Lock()
 
     def get_interconnect_id(self, src, dest):
 
@@ -1332,83 +1402,80 @@ class NASCommandHelper(object):
         return status, data
 
     def allow_nfs_share_access(self, path, host_ip, mover_name):
-        sharename = path.strip('/')
-
-        @utils.synchronized('emc-shareaccess-' + sharename)
-        def do_allow_access(path, host_ip, mover_name):
-            ok = (constants.STATUS_OK, '')
-            status, share = self.get_nfs_share_by_path(path, mover_name)
-            if constants.STATUS_OK != status:
-                return constants.STATUS_ERROR, ('Query nfs share %(path)s '
-                                                'failed. Reason %(err)s'
-                                                % {'path': path, 'err': share})
-
-            mover_name = share['mover_name']
-            changed = False
-            rwhosts = share['RwHosts']
-            if host_ip not in rwhosts:
-                rwhosts.append(host_ip)
-                changed = True
-            roothosts = share['RootHosts']
-            if host_ip not in roothosts:
-                roothosts.append(host_ip)
-                changed = True
-            accesshosts = share['AccessHosts']
-            if host_ip not in accesshosts:
-                accesshosts.append(host_ip)
-                changed = True
-
-            if not changed:
-                LOG.debug("%(host)s already in access list of share %(path)s",
-                          {'host': host_ip, 'path': path})
-                return ok
-            else:
-                return self.set_nfs_share_access(path,
-                                                 mover_name,
-                                                 rwhosts,
-                                                 roothosts,
-                                                 accesshosts)
-
-        return do_allow_access(path, host_ip, mover_name)
+        return self.update_nfs_share_access(path, mover_name,
+                                            add_hosts=[host_ip])
 
     def deny_nfs_share_access(self, path, host_ip, mover_name):
-        sharename = path.strip('/')
-
-        @utils.synchronized('emc-shareaccess-' + sharename)
-        def do_deny_access(path, host_ip, mover_name):
-            ok = (constants.STATUS_OK, '')
-            status, share = self.get_nfs_share_by_path(path, mover_name)
-            if constants.STATUS_OK != status:
-                return constants.STATUS_ERROR, ('Query nfs share %(path)s '
-                                                'failed. Reason %(err)s'
-                                                % {'path': path, 'err': share})
-
-            mover_name = share['mover_name']
-            changed = False
-            rwhosts = set(share['RwHosts'])
-            if host_ip in rwhosts:
-                rwhosts.remove(host_ip)
-                changed = True
-            roothosts = set(share['RootHosts'])
-            if host_ip in roothosts:
-                roothosts.remove(host_ip)
-                changed = True
-            accesshosts = set(share['AccessHosts'])
-            if host_ip in accesshosts:
-                accesshosts.remove(host_ip)
-                changed = True
-
-            if not changed:
-                LOG.debug("%(host)s already in access list of share %(path)s",
-                          {'host': host_ip, 'path': path})
-                return ok
-            else:
-                return self.set_nfs_share_access(path, mover_name,
-                                                 rwhosts,
-                                                 roothosts,
-                                                 accesshosts)
-
-        return do_deny_access(path, host_ip, mover_name)
+        return self.update_nfs_share_access(path, mover_name,
+                                            remove_hosts=[host_ip])
+
+    def update_nfs_share_access(self, path, mover_name, add_hosts=(),
+                                remove_hosts=()):
+        """Add and remove hosts to and from the access lists of a share.
+
+        The export is queried once and rewritten at most once. Updates
+        of the same share requested while another one is running are
+        applied together by the next caller getting the share lock.
+        """
+        op = _NFSAccessOp(add_hosts, remove_hosts)
+        key = (mover_name, path)
+        with self._pending_lock:
+            self._pending_access.setdefault(key, []).append(op)
+
+        @utils.synchronized('emc-shareaccess-' + path.strip('/'))
+        def do_update_access():
+            if op.done:
+                # Applied along with the update of another caller.
+                return
+            with self._pending_lock:
+                ops = self._pending_access.pop(key, [])
+            try:
+                result = self._apply_nfs_share_access(path, mover_name, ops)
+            except Exception:
+                # Every caller of the batch fails with the same error.
+                for pending_op in ops:
+                    pending_op.exc_info = sys.exc_info()
+                    pending_op.done = True
+                return
+            for pending_op in ops:
+                pending_op.result = result
+                pending_op.done = True
+
+        do_update_access()
+        if op.exc_info:
+            six.reraise(*op.exc_info)
+        return op.result
+
+    def _apply_nfs_share_access(self, path, mover_name, ops):
+        ok = (constants.STATUS_OK, '')
+        status, share = self.get_nfs_share_by_path(path, mover_name)
+        if constants.STATUS_OK != status:
+            return constants.STATUS_ERROR, ('Query nfs share %(path)s '
+                                            'failed. Reason %(err)s'
+                                            % {'path': path, 'err': share})
+
+        mover_name = share['mover_name']
+        host_lists = (share['RwHosts'], share['RootHosts'],
+                      share['AccessHosts'])
+        changed = False
+        for op in ops:
+            for host in op.add_hosts:
+                for hosts in host_lists:
+                    if host not in hosts:
+                        hosts.append(host)
+                        changed = True
+            for host in op.remove_hosts:
+                for hosts in host_lists:
+                    while host in hosts:
+                        hosts.remove(host)
+                        changed = True
+
+        if not changed:
+            LOG.debug("Access lists of share %s are already up to date.",
+                      path)
+            return ok
+        else:
+            return self.set_nfs_share_access(path, mover_name, *host_lists)
 
     def set_nfs_share_access(self, path, mover_name,
                              rw_hosts,
@@ -12,12 +12,16 @@
 #    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
 #    License for the specific language governing permissions and limitations
 #    under the License.
+import copy
+import time
 import types
 
 from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import timeutils
 
+from manila.share.drivers.emc.plugins.vnx import constants
+
 CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
@@ -57,3 +61,44 @@ def log_enter_exit(func):
         return ret
 
     return inner
+
+
+class TopologyCache(object):
+    """Cache of lookups of Data Movers and VDMs by name.
+
+    Entries are keyed by (kind, name) tuples and hold the (status, out)
+    result of the lookup. Only successful lookups are cached, and they
+    expire after ttl seconds or when invalidated; a ttl of 0 disables
+    the cache. Results are copied in and out, so that callers changing
+    the records they get do not change the cache.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+
+    def lookup(self, key):
+        """Returns the cached result for key, or None."""
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] > time.time():
+            self.hits += 1
+            return copy.deepcopy(entry[0])
+        self._entries.pop(key, None)
+        self.misses += 1
+        return None
+
+    def store(self, key, result):
+        if self.ttl > 0 and constants.STATUS_OK == result[0]:
+            self._entries[key] = (copy.deepcopy(result),
+                                  time.time() + self.ttl)
+
+    def invalidate(self, kind, name=None):
+        """Drops the entry of name, or all entries of kind."""
+        for key in list(self._entries):
+            if key[0] == kind and (name is None or key[1] == name):
+                del self._entries[key]
+
+    def clear(self):
+        self._entries.clear()
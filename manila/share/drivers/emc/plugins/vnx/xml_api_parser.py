@@ -13,7 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 import types
-import xml.dom.minidom
+from xml.parsers import expat
 
 from oslo_log import log
 
@@ -55,33 +55,35 @@ def parse_xml_api(tt):
     return child
 
 
+RESPONSE_CHILDREN = [
+    'QueryStatus',
+    'FileSystem',
+    'FileSystemCapabilities',
+    'FileSystemCapacityInfo',
+    'Mount',
+    'CifsShare',
+    'CifsServer',
+    'Volume',
+    'StoragePool',
+    'Fault',
+    'TaskResponse',
+    'Checkpoint',
+    'NfsExport',
+    'Mover',
+    'MoverStatus',
+    'MoverDnsDomain',
+    'MoverInterface',
+    'MoverRoute',
+    'LogicalNetworkDevice',
+    'MoverDeduplicationSettings',
+    'Vdm',
+]
+
+
 def parse_response(tt):
     check_node(tt, 'Response')
 
-    list_child = [
-        'QueryStatus',
-        'FileSystem',
-        'FileSystemCapabilities',
-        'FileSystemCapacityInfo',
-        'Mount',
-        'CifsShare',
-        'CifsServer',
-        'Volume',
-        'StoragePool',
-        'Fault',
-        'TaskResponse',
-        'Checkpoint',
-        'NfsExport',
-        'Mover',
-        'MoverStatus',
-        'MoverDnsDomain',
-        'MoverInterface',
-        'MoverRoute',
-        'LogicalNetworkDevice',
-        'MoverDeduplicationSettings',
-        'Vdm',
-    ]
-    return list_of_various(tt, list_child)
+    return list_of_various(tt, RESPONSE_CHILDREN)
 
 
 def parse_querystatus(tt):
@@ -994,7 +996,119 @@ def dom_to_tupletree(node):
     return node_name, attributes, contents, None
 
 
+class _TupleTreeBuilder(object):
+    """Build a tuple tree from expat events.
+
+    The resulting tree is the same dom_to_tupletree makes of the
+    document, without building the DOM first. Adjacent character data
+    is merged into one text node.
+
+    If on_record is given, each child element of a Response element is
+    handed to it along with the Response element once complete, instead
+    of being added to the tree, so that records are processed as they
+    are read and do not pile up.
+    """
+
+    def __init__(self, on_record=None):
+        self.root = None
+        self._stack = []
+        self._text = []
+        self._on_record = on_record
+
+    def _flush_text(self):
+        if self._text:
+            self._stack[-1][2].append(''.join(self._text))
+            self._text = []
+
+    def start_element(self, node_name, attributes):
+        if self._stack:
+            self._flush_text()
+        self._stack.append((node_name, attributes, [], None))
+
+    def end_element(self, node_name):
+        self._flush_text()
+        tt = self._stack.pop()
+        if not self._stack:
+            self.root = tt
+        elif (self._on_record is not None and len(self._stack) == 2 and
+                name(self._stack[-1]) == 'Response'):
+            self._on_record(self._stack[-1], tt)
+        else:
+            self._stack[-1][2].append(tt)
+
+    def character_data(self, data):
+        # Character data outside of the root element is dropped.
+        if self._stack:
+            self._text.append(data)
+
+    def parse(self, xml_string):
+        xml_parser = expat.ParserCreate()
+        xml_parser.buffer_text = True
+        xml_parser.StartElementHandler = self.start_element
+        xml_parser.EndElementHandler = self.end_element
+        xml_parser.CharacterDataHandler = self.character_data
+        xml_parser.Parse(xml_string, True)
+        return self.root
+
+
 def xml_to_tupletree(xml_string):
     """Parse XML straight into tupletree."""
-    dom_xml = xml.dom.minidom.parseString(xml_string)
-    return dom_to_tupletree(dom_xml)
+    return _TupleTreeBuilder().parse(xml_string)
+
+
+def _parse_packet(xml_string):
+    """Parse a response packet, parsing the records of its responses.
+
+    Returns the tuple tree of the packet without the records, and a dict
+    mapping the id of each Response element to its parsed records.
+    """
+    records = {}
+
+    def on_record(response, tt):
+        if name(tt) not in RESPONSE_CHILDREN:
+            LOG.warn(_LW('Expected one of %(expected)s under'
+                         ' %(parent)s, got %(actual)s.'),
+                     {'expected': RESPONSE_CHILDREN,
+                      'parent': name(response),
+                      'actual': repr(name(tt))})
+        result = parse_any(tt)
+        response_records = records.setdefault(id(response), [])
+        if result is not None:
+            response_records.append(result)
+
+    tt = _TupleTreeBuilder(on_record=on_record).parse(xml_string)
+    check_node(tt, 'ResponsePacket', ['xmlns'])
+    return tt, records
+
+
+def parse_xml_api_string(xml_string):
+    """Parse an XML API response packet in one pass.
+
+    Returns the same as parse_xml_api(xml_to_tupletree(xml_string)),
+    but each record of the response is parsed as soon as it is read,
+    and only the parsed result is kept.
+    """
+    tt, records = _parse_packet(xml_string)
+    k = kids(tt)
+    if len(k) == 1 and name(k[0]) == 'Response':
+        check_node(k[0], 'Response')
+        return records.get(id(k[0]), [])
+    return optional_child(tt, ['Response', 'PacketFault'])
+
+
+def parse_xml_api_packet(xml_string):
+    """Parse an XML API response packet with any number of responses.
+
+    Returns a list with an item for each child of the packet, in order:
+    the list of parsed records for a Response, the parsed fault for a
+    PacketFault.
+    """
+    tt, records = _parse_packet(xml_string)
+    result = []
+    for child in kids(tt):
+        if name(child) == 'Response':
+            check_node(child, 'Response')
+            result.append(records.get(id(child), []))
+        else:
+            result.append(parse_any(child))
+    return result
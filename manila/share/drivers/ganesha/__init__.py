@@ -81,13 +81,20 @@ class GaneshaNASHelper(NASHelperBase):
 
     def init_helper(self):
         """Initializes protocol-specific NAS drivers."""
-        self.ganesha = ganesha_manager.GaneshaManager(
-            self._execute,
-            self.tag,
+        kwargs = dict(
             ganesha_config_path=self.configuration.ganesha_config_path,
             ganesha_export_dir=self.configuration.ganesha_export_dir,
             ganesha_db_path=self.configuration.ganesha_db_path,
             ganesha_service_name=self.configuration.ganesha_service_name)
+        if self.configuration.ganesha_batch_exports:
+            self.ganesha = ganesha_manager.BatchingGaneshaManager(
+                self._execute, self.tag,
+                flush_interval=(
+                    self.configuration.ganesha_export_flush_interval),
+                **kwargs)
+        else:
+            self.ganesha = ganesha_manager.GaneshaManager(
+                self._execute, self.tag, **kwargs)
         system_export_template = self._load_conf_dir(
             self.configuration.ganesha_export_template_dir,
             must_exist=False)
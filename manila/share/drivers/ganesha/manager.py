@@ -13,10 +13,14 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
+import copy
+import hashlib
 import os
 import pipes
 import re
 import sys
+import threading
 
 from oslo_log import log
 from oslo_serialization import jsonutils
@@ -25,6 +29,7 @@ import six
 from manila import exception
 from manila.i18n import _
 from manila.i18n import _LE
+from manila.i18n import _LW
 from manila.share.drivers.ganesha import utils as ganesha_utils
 from manila import utils
 
@@ -32,97 +37,86 @@ LOG = log.getLogger(__name__)
 IWIDTH = 4
 
 
-def _conf2json(conf):
-    """Convert Ganesha config to JSON."""
-
-    # tokenize config string
-    token_list = [six.StringIO()]
-    state = {
-        'in_quote': False,
-        'in_comment': False,
-        'escape': False,
-    }
-
-    cbk = []
-    for char in conf:
-        if state['in_quote']:
-            if not state['escape']:
-                if char == '"':
-                    state['in_quote'] = False
-                    cbk.append(lambda: token_list.append(six.StringIO()))
-                elif char == '\\':
-                    cbk.append(lambda: state.update({'escape': True}))
-        else:
-            if char == "#":
-                state['in_comment'] = True
-            if state['in_comment']:
-                if char == "\n":
-                    state['in_comment'] = False
-            else:
-                if char == '"':
-                    token_list.append(six.StringIO())
-                    state['in_quote'] = True
-        state['escape'] = False
-        if not state['in_comment']:
-            token_list[-1].write(char)
-        while cbk:
-            cbk.pop(0)()
-
-    if state['in_quote']:
-        raise RuntimeError("Unterminated quoted string")
-
-    # jsonify tokens
-    js_token_list = ["{"]
-    for tok in token_list:
-        tok = tok.getvalue()
-
-        if tok[0] == '"':
-            js_token_list.append(tok)
-            continue
-
-        for pat, s in [
-                # add omitted "=" signs to block openings
-                ('([^=\s])\s*{', '\\1={'),
-                # delete trailing semicolons in blocks
-                (';\s*}', '}'),
-                # add omitted semicolons after blocks
-                ('}\s*([^}\s])', '};\\1'),
-                # separate syntactically significant characters
-                ('([;{}=])', ' \\1 ')]:
-            tok = re.sub(pat, s, tok)
-
-        # map tokens to JSON equivalents
-        for word in tok.split():
-            if word == "=":
-                word = ":"
-            elif word == ";":
-                word = ','
-            elif (word in ['{', '}'] or
-                  re.search('\A-?[1-9]\d*(\.\d+)?\Z', word)):
-                pass
+_CONF_TOKEN_RX = re.compile(r"""
+    (\s+) |                    # whitespace
+    (\#[^\n]*) |               # comment
+    "((?:[^"\\]|\\.)*)" |      # quoted string
+    ([{};=]) |                 # punctuation
+    ([^\s{};="\#]+) |          # bare word
+    (")                        # unterminated quoted string
+""", re.VERBOSE | re.DOTALL)
+_CONF_NUMBER_RX = re.compile('\A-?[1-9]\d*(\.\d+)?\Z')
+
+
+def _conf_value(words):
+    """Make a config value from the words of an assignment."""
+    if not words:
+        raise ValueError("Missing value in Ganesha config")
+    if len(words) == 1:
+        quoted, word = words[0]
+        if not quoted:
+            match = _CONF_NUMBER_RX.match(word)
+            if match:
+                return float(word) if match.group(1) else int(word)
+    return ''.join(w for _q, w in words)
+
+
+def _parse_conf(conf):
+    """Parse Ganesha config to dict in a single pass."""
+    if isinstance(conf, six.binary_type):
+        conf = conf.decode('utf-8')
+
+    stack = [{}]
+    words = []
+    key = None
+    for m in _CONF_TOKEN_RX.finditer(conf):
+        space, comment, quoted, punct, word, unterminated = m.groups()
+        if word is not None:
+            words.append((False, word))
+        elif quoted is not None:
+            if '\\' in quoted:
+                quoted = jsonutils.loads('"%s"' % quoted)
+            words.append((True, quoted))
+        elif punct is not None:
+            if punct == '=':
+                if key is not None or not words:
+                    raise ValueError("Unexpected '=' in Ganesha config")
+                key = ''.join(w for _q, w in words)
+                words = []
+                continue
+            if punct == '{':
+                if key is None:
+                    key = ''.join(w for _q, w in words)
+                elif words:
+                    raise ValueError("Unexpected '{' in Ganesha config")
+                block = {}
+                stack[-1][key] = block
+                stack.append(block)
             else:
-                word = jsonutils.dumps(word)
-            js_token_list.append(word)
-    js_token_list.append("}")
-
-    # group quouted strings
-    token_grp_list = []
-    for tok in js_token_list:
-        if tok[0] == '"':
-            if not (token_grp_list and isinstance(token_grp_list[-1], list)):
-                token_grp_list.append([])
-            token_grp_list[-1].append(tok)
-        else:
-            token_grp_list.append(tok)
+                if key is not None:
+                    stack[-1][key] = _conf_value(words)
+                elif words:
+                    raise ValueError("Missing '=' in Ganesha config")
+                if punct == '}':
+                    if len(stack) == 1:
+                        raise ValueError("Unbalanced '}' in Ganesha config")
+                    stack.pop()
+            words = []
+            key = None
+        elif unterminated is not None:
+            raise RuntimeError("Unterminated quoted string")
+    if key is not None:
+        stack[-1][key] = _conf_value(words)
+    elif words:
+        raise ValueError("Missing '=' in Ganesha config")
+    if len(stack) != 1:
+        raise ValueError("Unterminated block in Ganesha config")
+    return stack[0]
 
-    # process quoted string groups by joining them
-    js_token_list2 = []
-    for x in token_grp_list:
-        if isinstance(x, list):
-            x = ''.join(['"'] + [tok[1:-1] for tok in x] + ['"'])
-        js_token_list2.append(x)
 
-    return ''.join(js_token_list2)
+def _conf2json(conf):
+    """Convert Ganesha config to JSON."""
+    return jsonutils.dumps(_parse_conf(conf))
 
 
 def _dump_to_conf(confdict, out=sys.stdout, indent=0):
@@ -149,18 +143,38 @@ def _dump_to_conf(confdict, out=sys.stdout, indent=0):
             out.write(dj)
 
 
-def parseconf(conf):
+_PARSECONF_CACHE = collections.OrderedDict()
+PARSECONF_CACHE_SIZE = 128
+
+
+def parseconf(conf, cache=False):
     """Parse Ganesha config.
 
     Both native format and JSON are supported.
+
+    If cache is set, the result is memoized by the hash of conf, keeping
+    the PARSECONF_CACHE_SIZE most recently used ones, and a copy of it is
+    returned.
     """
 
+    if cache:
+        digest = hashlib.sha1(conf.encode('utf-8') if
+                              isinstance(conf, six.text_type) else
+                              conf).hexdigest()
+        d = _PARSECONF_CACHE.pop(digest, None)
+        if d is None:
+            d = parseconf(conf)
+            while len(_PARSECONF_CACHE) >= PARSECONF_CACHE_SIZE:
+                _PARSECONF_CACHE.popitem(last=False)
+        _PARSECONF_CACHE[digest] = d
+        return copy.deepcopy(d)
+
     try:
         # allow config to be specified in JSON --
         # for sake of people who might feel Ganesha config foreign.
         d = jsonutils.loads(conf)
     except ValueError:
-        d = jsonutils.loads(_conf2json(conf))
+        d = _parse_conf(conf)
     return d
 
 
@@ -254,10 +268,11 @@ class GaneshaManager(object):
     def _read_export_file(self, name):
         """Return the dict of the export identified by name."""
         return parseconf(self.execute("cat", self._getpath(name),
-                                      message='reading export ' + name)[0])
+                                      message='reading export ' + name)[0],
+                         cache=True)
 
-    def _write_export_file(self, name, confdict):
-        """Write confdict to the export file of name."""
+    def _check_export_block(self, confdict):
+        """Check that confdict has no unfilled template values."""
         for k, v in ganesha_utils.walk(confdict):
             # values in the export block template that need to be
             # filled in by Manila are pre-fixed by '@'
@@ -265,6 +280,10 @@ class GaneshaManager(object):
                 msg = _("Incomplete export block: value %(val)s of attribute "
                         "%(key)s is a stub.") % {'key': k, 'val': v}
                 raise exception.InvalidParameterValue(err=msg)
+
+    def _write_export_file(self, name, confdict):
+        """Write confdict to the export file of name."""
+        self._check_export_block(confdict)
         return self._write_conf_file(name, mkconf(confdict))
 
     def _rm_export_file(self, name):
@@ -343,3 +362,156 @@ class GaneshaManager(object):
         self.execute('sh', '-c',
                      'rm -f %s/*.conf' % pipes.quote(self.ganesha_export_dir))
         self._mkindex()
+
+
+class _ExportOp(object):
+    """A queued export change awaiting flush."""
+
+    def __init__(self, kind, name, confdict=None):
+        self.kind = kind
+        self.name = name
+        self.confdict = confdict
+        self.exc_info = None
+
+
+class BatchingGaneshaManager(GaneshaManager):
+    """Ganesha instrumentation with in-memory export state.
+
+    The set of exports and the export id counter are kept in memory, and
+    persisted together as a JSON document to a single state file next to
+    the Ganesha database. Export changes are queued and flushed every
+    flush_interval seconds: all export files of a flush, the index file
+    and the state file are written by one shell invocation, followed by
+    the D-Bus calls of the flush. Callers of add_export and remove_export
+    block until the flush carrying their change is done.
+    """
+
+    def __init__(self, execute, tag, **kwargs):
+        self.flush_interval = kwargs.pop('flush_interval', 0)
+        self.ganesha_state_path = (
+            os.path.splitext(kwargs['ganesha_db_path'])[0] + '.json')
+        self._exports = {}
+        self._export_id = None
+        self._lock = threading.Lock()
+        self._committer = ganesha_utils.GroupCommitter(
+            self._flush, interval=self.flush_interval)
+        super(BatchingGaneshaManager, self).__init__(execute, tag, **kwargs)
+
+    def _load_state(self):
+        """Load persisted state, falling back to the export database."""
+        try:
+            out = self.execute('cat', self.ganesha_state_path,
+                               run_as_root=False, makelog=False)[0]
+            self._export_id = int(jsonutils.loads(out)['exportid'])
+        except (exception.GaneshaCommandFailure, ValueError, KeyError,
+                TypeError):
+            self._export_id = super(BatchingGaneshaManager,
+                                    self).get_export_id(bump=False)
+
+    def _dump_state(self):
+        return jsonutils.dumps({'exportid': self._export_id,
+                                'exports': sorted(self._exports)})
+
+    def _write_file_cmd(self, path, data):
+        """Return shell code writing data to path atomically."""
+        dirpath, fname = os.path.split(path)
+        return ('tmpf=$(mktemp -p %(dir)s -t %(tmpl)s) && '
+                'echo %(data)s > "$tmpf" && mv "$tmpf" %(path)s') % {
+                    'dir': pipes.quote(dirpath),
+                    'tmpl': pipes.quote(fname + '.XXXXXX'),
+                    'data': pipes.quote(data),
+                    'path': pipes.quote(path)}
+
+    def _sync_files(self, added=(), removed=()):
+        """Write export files, index and state in one shell invocation."""
+        script = ['set -e']
+        for name in added:
+            script.append(self._write_file_cmd(
+                self._getpath(name), mkconf(self._exports[name])))
+        for name in removed:
+            script.append('rm -f %s' % pipes.quote(self._getpath(name)))
+        index = "".join("%include " + self._getpath(name) + "\n"
+                        for name in sorted(self._exports))
+        script.append(self._write_file_cmd(self._getpath('INDEX'), index))
+        script.append(self._write_file_cmd(self.ganesha_state_path,
+                                           self._dump_state()))
+        self.execute('sh', '-c', '\n'.join(script),
+                     message='syncing exports of Ganesha node ' + self.tag)
+
+    def _flush(self, ops):
+        """Apply queued export changes."""
+        @utils.synchronized("ganesha-index-" + self.tag, external=True)
+        def _flush():
+            saved_exports = dict(self._exports)
+            added = []
+            removed = []
+            for op in ops:
+                if op.kind == 'add':
+                    self._exports[op.name] = op.confdict
+                    added.append(op.name)
+                else:
+                    op.confdict = self._exports.pop(op.name, None)
+                    removed.append(op.name)
+            try:
+                self._sync_files(
+                    added=[n for n in added if n in self._exports],
+                    removed=[n for n in removed if n not in self._exports])
+            except Exception:
+                self._exports = saved_exports
+                for op in ops:
+                    op.exc_info = sys.exc_info()
+                return
+
+            failed = []
+            for op in ops:
+                try:
+                    if op.kind == 'add':
+                        self._dbus_send_ganesha(
+                            "AddExport", "string:" + self._getpath(op.name),
+                            "string:EXPORT(Export_Id=%d)" %
+                            op.confdict["EXPORT"]["Export_Id"])
+                    elif op.confdict is not None:
+                        self._remove_export_dbus(
+                            op.confdict["EXPORT"]["Export_Id"])
+                    else:
+                        LOG.warning(_LW("Export %(name)s is unknown to "
+                                        "Ganesha node %(tag)s."),
+                                    {'name': op.name, 'tag': self.tag})
+                except Exception:
+                    op.exc_info = sys.exc_info()
+                    if op.kind == 'add':
+                        failed.append(op.name)
+            if failed:
+                for name in failed:
+                    self._exports.pop(name, None)
+                try:
+                    self._sync_files(removed=failed)
+                except Exception:
+                    LOG.exception(_LE("Failed to clean up exports on "
+                                      "Ganesha node %s."), self.tag)
+        _flush()
+
+    def add_export(self, name, confdict):
+        """Add an export to Ganesha specified by confdict."""
+        self._check_export_block(confdict)
+        self._committer.submit(_ExportOp('add', name, confdict))
+
+    def remove_export(self, name):
+        """Remove an export from Ganesha."""
+        self._committer.submit(_ExportOp('remove', name))
+
+    def get_export_id(self, bump=True):
+        """Get a new export id."""
+        with self._lock:
+            if self._export_id is None:
+                self._load_state()
+            if bump:
+                self._export_id += 1
+            return self._export_id
+
+    def reset_exports(self):
+        """Delete all export files."""
+        self._exports = {}
+        self.execute('sh', '-c',
+                     'rm -f %s/*.conf' % pipes.quote(self.ganesha_export_dir))
+        self._sync_files()
@@ -15,6 +15,9 @@
 
 import os
 import pipes
+import sys
+import threading
+import time
 
 from oslo_concurrency import processutils
 import six
@@ -78,6 +81,81 @@ class SSHExecutor(object):
         return ret
 
 
+_ssh_executors = {}
+_ssh_executors_lock = threading.Lock()
+
+
+def get_ssh_executor(ip, port, conn_timeout, login, password=None,
+                     privatekey=None):
+    """Return an SSHExecutor shared by all callers with the same login.
+
+    Executors (and thus their SSH connection pools) are kept in a registry
+    keyed by the connection parameters, so that repeatedly instantiated
+    consumers reuse established connections.
+    """
+    key = (ip, port, login, password, privatekey)
+    with _ssh_executors_lock:
+        executor = _ssh_executors.get(key)
+        if executor is None:
+            executor = SSHExecutor(ip, port, conn_timeout, login,
+                                   password=password, privatekey=privatekey)
+            _ssh_executors[key] = executor
+    return executor
+
+
 def path_from(fpath, *rpath):
     """Return the join of the dir of fpath and rpath in absolute form."""
     return os.path.join(os.path.abspath(os.path.dirname(fpath)), *rpath)
+
+
+class GroupCommitter(object):
+    """Applies concurrently submitted changes together.
+
+    The first caller submitting a change while no commit is scheduled
+    leads: it waits interval seconds, so that further changes pile up,
+    then commits all the pending changes with one call. The other callers
+    wait for the commit carrying their change.
+    """
+
+    def __init__(self, commit, interval=0):
+        """Initialize the committer.
+
+        :param commit: called with the list of the pending changes. It
+                       fails a change alone by setting its exc_info
+                       attribute; if it raises, all the changes fail.
+        :param interval: seconds the leader waits before committing.
+        """
+        self.commit = commit
+        self.interval = interval
+        self._pending = []
+        self._scheduled = False
+        self._lock = threading.Lock()
+
+    def submit(self, change):
+        """Queue change, wait for its commit and re-raise its error.
+
+        :param change: object with an exc_info attribute, set to None.
+        """
+        done = threading.Event()
+        with self._lock:
+            self._pending.append((change, done))
+            leader = not self._scheduled
+            self._scheduled = True
+        if leader:
+            # Let further changes pile up, then commit them all at once.
+            if self.interval:
+                time.sleep(self.interval)
+            with self._lock:
+                batch, self._pending = self._pending, []
+                self._scheduled = False
+            try:
+                self.commit([c for c, e in batch])
+            except Exception:
+                for c, e in batch:
+                    c.exc_info = sys.exc_info()
+            finally:
+                for c, e in batch:
+                    e.set()
+        done.wait()
+        if change.exc_info:
+            six.reraise(*change.exc_info)
@@ -27,6 +27,7 @@ import errno
 import os
 import re
 import sys
+import time
 import xml.etree.cElementTree as etree
 
 from oslo_config import cfg
@@ -77,6 +78,18 @@ GlusterfsManilaShare_opts = [
                help="Remote Ganesha server node's login password. "
                     "This is not required if 'glusterfs_path_to_private_key'"
                     ' is configured.'),
+    cfg.FloatOpt('glusterfs_nfs_export_flush_interval',
+                 default=0.5,
+                 help='Number of seconds access changes of shares served '
+                      'by Gluster-NFS are collected before being applied '
+                      'together with one update of the nfs.export-dir '
+                      'volume option.'),
+    cfg.IntOpt('glusterfs_nfs_export_dir_cache_ttl',
+               default=300,
+               help='Number of seconds the nfs.export-dir volume option '
+                    'is used from cache before it is read again from the '
+                    'GlusterFS volume to check for changes made outside '
+                    'of Manila.'),
 ]
 
 CONF = cfg.CONF
@@ -108,17 +121,10 @@ class GlusterManager(object):
                            presence, False: require its absence, None: don't
                            require anything about volume).
         """
-        m = self.scheme.search(address)
-        if m:
-            self.volume = m.group('vol')
-            if (has_volume is True and not self.volume) or (
-               has_volume is False and self.volume):
-                m = None
-        if not m:
-            raise exception.GlusterfsException(
-                _('Invalid gluster address %s.') % address)
-        self.remote_user = m.group('user')
-        self.host = m.group('host')
+        parsed = self.parse(address, has_volume=has_volume)
+        self.volume = parsed['vol']
+        self.remote_user = parsed['user']
+        self.host = parsed['host']
         self.qualified = address
         if self.volume:
             self.export = ':/'.join([self.host, self.volume])
@@ -128,10 +134,29 @@ class GlusterManager(object):
         self.remote_server_password = remote_server_password
         self.gluster_call = self.make_gluster_call(execf)
 
+    @classmethod
+    def parse(cls, address, has_volume=True):
+        """Parse a Gluster URI without setting up command execution.
+
+        :param address: the Gluster URI (in [<user>@]<host>:/<vol> format).
+        :param has_volume: same as for __init__.
+        :returns: dict with 'user', 'host' and 'vol' keys.
+        """
+        m = cls.scheme.search(address)
+        if m:
+            volume = m.group('vol')
+            if (has_volume is True and not volume) or (
+               has_volume is False and volume):
+                m = None
+        if not m:
+            raise exception.GlusterfsException(
+                _('Invalid gluster address %s.') % address)
+        return m.groupdict()
+
     def make_gluster_call(self, execf):
         """Execute a Gluster command locally or remotely."""
         if self.remote_user:
-            gluster_execf = ganesha_utils.SSHExecutor(
+            gluster_execf = ganesha_utils.get_ssh_executor(
                 self.host, 22, None, self.remote_user,
                 password=self.remote_server_password,
                 privatekey=self.path_to_private_key)
@@ -440,6 +465,16 @@ class GlusterfsShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
         self._get_helper(share).deny_access('/', share, access)
 
 
+class _AccessOp(object):
+    """A queued access change awaiting flush."""
+
+    def __init__(self, share_name, access_to, cbk):
+        self.share_name = share_name
+        self.access_to = access_to
+        self.cbk = cbk
+        self.exc_info = None
+
+
 class GlusterNFSHelper(ganesha.NASHelperBase):
     """Manage shares with Gluster-NFS server."""
 
@@ -447,6 +482,11 @@ class GlusterNFSHelper(ganesha.NASHelperBase):
         self.gluster_manager = kwargs.pop('gluster_manager')
         super(GlusterNFSHelper, self).__init__(execute, config_object,
                                                **kwargs)
+        self._export_dir_dict = None
+        self._export_dir_time = 0
+        self._committer = ganesha_utils.GroupCommitter(
+            self._flush,
+            interval=self.configuration.glusterfs_nfs_export_flush_interval)
 
     def init_helper(self):
         # exporting the whole volume must be prohibited
@@ -480,10 +520,33 @@ class GlusterNFSHelper(ganesha.NASHelperBase):
                 edh[d] = e.split('|')
         return edh
 
+    def _get_cached_export_dir_dict(self):
+        """Get the export entries, using the cached ones if recent.
+
+        When the entries are read again from the volume, they are
+        checked against the cached ones, which reflect the last update
+        done by us, to detect changes made behind our back.
+        """
+        now = time.time()
+        if (self._export_dir_dict is None or
+                now - self._export_dir_time >=
+                self.configuration.glusterfs_nfs_export_dir_cache_ttl):
+            export_dir_dict = self._get_export_dir_dict()
+            if (self._export_dir_dict is not None and
+                    export_dir_dict != self._export_dir_dict):
+                LOG.warn(_LW("%(option)s of GlusterFS volume %(volume)s "
+                             "was changed outside of Manila."),
+                         {'option': NFS_EXPORT_DIR,
+                          'volume': self.gluster_manager.volume})
+            self._export_dir_dict = export_dir_dict
+            self._export_dir_time = now
+        return self._export_dir_dict
+
     def _manage_access(self, share_name, access_type, access_to, cbk):
         """Manage share access with cbk.
 
         Adjust the exports of the Gluster-NFS server using cbk.
+        Concurrent access changes of the volume are applied together.
 
         :param share_name: name of the share
         :type share_name: string
@@ -506,8 +569,16 @@ class GlusterNFSHelper(ganesha.NASHelperBase):
 
         if access_type != 'ip':
             raise exception.InvalidShareAccess('only ip access type allowed')
-        export_dir_dict = self._get_export_dir_dict()
-        if cbk(export_dir_dict, share_name, access_to):
+        self._committer.submit(_AccessOp(share_name, access_to, cbk))
+
+    def _flush(self, ops):
+        """Apply queued access changes with one volume set."""
+        export_dir_dict = self._get_cached_export_dir_dict()
+        changed = False
+        for op in ops:
+            if not op.cbk(export_dir_dict, op.share_name, op.access_to):
+                changed = True
+        if not changed:
             return
 
         if export_dir_dict:
@@ -521,6 +592,9 @@ class GlusterNFSHelper(ganesha.NASHelperBase):
         try:
             self.gluster_manager.gluster_call(*args)
         except exception.ProcessExecutionError as exc:
+            # The cached entries have been modified, read them again
+            # next time.
+            self._export_dir_dict = None
             LOG.error(_LE("Error in gluster volume set: %s"), exc.stderr)
             raise
 
@@ -552,7 +626,7 @@ class GaneshaNFSHelper(ganesha.GaneshaNASHelper):
     def __init__(self, execute, config_object, **kwargs):
         self.gluster_manager = kwargs.pop('gluster_manager')
         if config_object.glusterfs_ganesha_server_ip:
-            execute = ganesha_utils.SSHExecutor(
+            execute = ganesha_utils.get_ssh_executor(
                 config_object.glusterfs_ganesha_server_ip, 22, None,
                 config_object.glusterfs_ganesha_server_username,
                 password=config_object.glusterfs_ganesha_server_password,
@@ -25,6 +25,7 @@ with the GlusterFS backend can mount and hence use the share.
 Supports working with multiple glusterfs volumes.
 """
 
+import bisect
 import errno
 import pipes
 import random
@@ -32,8 +33,11 @@ import re
 import shutil
 import string
 import tempfile
+import time
 import xml.etree.cElementTree as etree
 
+import eventlet
+from eventlet import queue
 from oslo_config import cfg
 from oslo_log import log
 import six
@@ -83,6 +87,18 @@ glusterfs_native_manila_share_opts = [
                     'In latter example, the number that matches "#{size}", '
                     'that is, 3, is an indication that the size of volume '
                     'is 3G.'),
+    cfg.IntOpt('glusterfs_volume_sync_interval',
+               default=60,
+               help='Minimum number of seconds between two refreshes of '
+                    'the index of unused GlusterFS volumes from the '
+                    'servers. The refresh is done along with the periodic '
+                    'share stats update.'),
+    cfg.IntOpt('glusterfs_scrub_workers',
+               default=2,
+               help='Number of background workers wiping the GlusterFS '
+                    'volumes of deleted shares. Volumes are reused for new '
+                    'shares only once they are wiped. Set to 0 to wipe '
+                    'volumes synchronously on share deletion.'),
 ]
 
 CONF = cfg.CONF
@@ -93,6 +109,9 @@ AUTH_SSL_ALLOW = 'auth.ssl-allow'
 CLIENT_SSL = 'client.ssl'
 NFS_EXPORT_VOL = 'nfs.export-volumes'
 SERVER_SSL = 'server.ssl'
+# Volume option marking the volume of a deleted share as waiting to be
+# wiped, so that the wipe is resumed if the service restarts meanwhile.
+USER_MANILA_DIRTY = 'user.manila-dirty'
 # The dict specifying named parameters
 # that can be used with glusterfs_volume_pattern
 # in #{<param>} format.
@@ -105,6 +124,109 @@ PATTERN_DICT = {'size': {'pattern': '(?P<size>\d+)', 'trans': int}}
 GLUSTERFS_VERSION_MIN = (3, 6)
 
 
+def _remove_sorted(seq, item):
+    i = bisect.bisect_left(seq, item)
+    if i < len(seq) and seq[i] == item:
+        del seq[i]
+
+
+class GlusterVolumeAllocator(object):
+    """Index of unused Gluster volumes.
+
+    Volumes are kept per host in sorted lists: all of them by name,
+    the ones with a size indication by (size, name), and the rest by
+    name. Best-fit lookup is a bisection on each host's list, and adding
+    or removing a volume is a bisection plus a list insertion/deletion.
+    """
+
+    def __init__(self):
+        # {<host>: {'all': [<vol>], 'sized': [(<size>, <vol>)],
+        #           'unsized': [<vol>]}}
+        self._hosts = {}
+        # {<vol>: (<host>, <size>)}
+        self._vols = {}
+
+    def __len__(self):
+        return len(self._vols)
+
+    def __contains__(self, vol):
+        return vol in self._vols
+
+    def add(self, vol, size=None):
+        """Add vol (in <host>:/<volname> format) to the index."""
+        if vol in self._vols:
+            return
+        host = glusterfs.GlusterManager.parse(vol)['host']
+        hostvols = self._hosts.setdefault(
+            host, {'all': [], 'sized': [], 'unsized': []})
+        bisect.insort(hostvols['all'], vol)
+        if size:
+            bisect.insort(hostvols['sized'], (size, vol))
+        else:
+            bisect.insort(hostvols['unsized'], vol)
+        self._vols[vol] = (host, size)
+
+    def remove(self, vol):
+        """Remove vol from the index, if it's there."""
+        try:
+            host, size = self._vols.pop(vol)
+        except KeyError:
+            return
+        hostvols = self._hosts[host]
+        _remove_sorted(hostvols['all'], vol)
+        if size:
+            _remove_sorted(hostvols['sized'], (size, vol))
+        else:
+            _remove_sorted(hostvols['unsized'], vol)
+        if not hostvols['all']:
+            del self._hosts[host]
+
+    def pick(self, size=None):
+        """Return the best fitting volume, or None if there is none.
+
+        If size is given, the volume with the smallest size indication
+        that is greater-than-or-equal to size is chosen; failing that,
+        a volume without size indication. Otherwise any volume will do.
+        Ties among hosts are broken randomly to tend towards even
+        distribution of share backing volumes among Gluster clusters;
+        within a host the alphabetically first volume is chosen, to
+        make it predictable. The volume is not removed from the index.
+        """
+        key = 'all'
+        if size:
+            best, candidates = None, []
+            for hostvols in six.itervalues(self._hosts):
+                sized = hostvols['sized']
+                i = bisect.bisect_left(sized, (size,))
+                if i == len(sized):
+                    continue
+                volsize, vol = sized[i]
+                if best is None or volsize < best:
+                    best, candidates = volsize, [vol]
+                elif volsize == best:
+                    candidates.append(vol)
+            if candidates:
+                return random.choice(candidates)
+            key = 'unsized'
+        candidates = [hostvols[key][0] for hostvols in
+                      six.itervalues(self._hosts) if hostvols[key]]
+        if candidates:
+            return random.choice(candidates)
+
+    def sync(self, voldict):
+        """Make the index hold the volumes of voldict.
+
+        voldict maps volumes to their size indication. Only the
+        difference to the current content of the index is applied.
+        """
+        for vol in set(self._vols) - set(voldict):
+            self.remove(vol)
+        for vol, size in six.iteritems(voldict):
+            if vol in self._vols and self._vols[vol][1] != size:
+                self.remove(vol)
+            self.add(vol, size)
+
+
 class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     """GlusterFS native protocol (glusterfs) share driver.
 
@@ -135,6 +257,18 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                 srvaddr, has_volume=False)
         self.glusterfs_servers = glusterfs_servers
         self.glusterfs_versions = {}
+        self.gluster_free_vols = GlusterVolumeAllocator()
+        # Volumes of deleted shares waiting to be wiped, with the
+        # progress of their scrubbing:
+        # {<vol>: {'gmgr': <GlusterManager>, 'state': <state>,
+        #          'attempts': <int>, 'queued_at': <time>,
+        #          'started_at': <time>}}
+        # where <state> is one of 'queued', 'scrubbing' and 'failed'.
+        self.gluster_dirty_vols = {}
+        self._scrub_queue = queue.Queue()
+        self._scrub_workers_started = False
+        self._gluster_volumes = {}
+        self._gluster_volumes_sync_time = 0
 
     def _compile_volume_pattern(self):
         """Compile a RegexObject from the config specified regex template.
@@ -197,7 +331,7 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                 'minvers': gluster_version_min_str})
         self.glusterfs_versions = glusterfs_versions
 
-        gluster_volumes_initial = set(self._fetch_gluster_volumes())
+        gluster_volumes_initial = self._fetch_gluster_volumes()
         if not gluster_volumes_initial:
             # No suitable volumes are found on the Gluster end.
             # Raise exception.
@@ -209,6 +343,8 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
 
         LOG.info(_LI("Found %d Gluster volumes allocated for Manila."
                      ), len(gluster_volumes_initial))
+        self._recover_dirty_vols(gluster_volumes_initial)
+        self._index_gluster_volumes(gluster_volumes_initial)
 
         try:
             self._execute('mount.glusterfs', check_exit_code=False)
@@ -269,6 +405,80 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                 volumes_dict[gsrv + ':/' + volname] = pattern_dict
         return volumes_dict
 
+    def _fetch_dirty_volumes(self):
+        """Return the set of volumes marked as waiting to be wiped."""
+
+        dirty_vols = set()
+        for gsrv, gluster_mgr in six.iteritems(self.glusterfs_servers):
+            try:
+                out, err = gluster_mgr.gluster_call('--xml', 'volume', 'info')
+            except exception.ProcessExecutionError as exc:
+                LOG.error(_LE("Error retrieving volume info: %s"), exc.stderr)
+                raise exception.GlusterfsException(
+                    _('gluster volume info failed'))
+            vix = etree.fromstring(out)
+            for volume in vix.findall('./volInfo/volumes/volume'):
+                for option in volume.findall('./options/option'):
+                    if (option.find('name').text == USER_MANILA_DIRTY and
+                            option.find('value').text == 'yes'):
+                        dirty_vols.add(gsrv + ':/' +
+                                       volume.find('name').text)
+        return dirty_vols
+
+    def _recover_dirty_vols(self, voldict):
+        """Resume the wipes that were pending when the service stopped.
+
+        The marked volumes are kept out of the index of unused volumes
+        until they are wiped.
+        """
+        for vol in self._fetch_dirty_volumes():
+            if vol not in voldict or vol in self.gluster_dirty_vols:
+                continue
+            LOG.info(_LI("Resuming the wipe of gluster volume %s."), vol)
+            self._add_dirty_vol(vol, self._glustermanager(vol))
+            self._resume_scrub(vol)
+
+    def _volume_size(self, vol):
+        """Return the size indication of vol as used by the allocator."""
+        if 'size' not in self.volume_pattern_keys:
+            return None
+        return self._gluster_volumes.get(vol, {}).get('size')
+
+    def _index_gluster_volumes(self, voldict):
+        """Update the index of unused volumes from voldict.
+
+        voldict is a result of _fetch_gluster_volumes(). Volumes
+        bound to shares are left out of the index.
+        """
+        self._gluster_volumes = voldict
+        self._gluster_volumes_sync_time = time.time()
+        self.gluster_free_vols.sync(dict(
+            (vol, self._volume_size(vol)) for vol in voldict
+            if vol not in self.gluster_used_vols_dict and
+            vol not in self.gluster_dirty_vols))
+
+    @utils.synchronized("glusterfs_native", external=False)
+    def _index_gluster_volumes_locked(self, voldict):
+        self._index_gluster_volumes(voldict)
+
+    def _sync_gluster_volumes(self):
+        """Refresh the index of unused volumes in the background.
+
+        Called from the periodic stats update. The volume list is
+        fetched without holding the allocation lock, at most once per
+        glusterfs_volume_sync_interval seconds.
+        """
+        if (time.time() - self._gluster_volumes_sync_time <
+                self.configuration.glusterfs_volume_sync_interval):
+            return
+        try:
+            voldict = self._fetch_gluster_volumes()
+        except exception.GlusterfsException:
+            LOG.warn(_LW("Could not refresh the list of gluster volumes."))
+            return
+        self._index_gluster_volumes_locked(voldict)
+        self._retry_failed_scrubs()
+
     def _setup_gluster_vol(self, vol):
         # Enable gluster volumes for SSL access only.
 
@@ -343,24 +553,25 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     def _pop_gluster_vol(self, size=None):
         """Pick an unbound volume.
 
-        Do a _fetch_gluster_volumes() first to get the complete
-        list of usable volumes.
-        Keep only the unbound ones (ones that are not yet used to
-        back a share).
+        The volume is looked up in the index of unused volumes, which
+        is kept up to date by _sync_gluster_volumes(). If none of the
+        indexed volumes is suitable, the index is refreshed from the
+        servers once.
         If size is given, try to pick one which has a size specification
         (according to the 'size' named group of the volume pattern),
         and its size is greater-than-or-equal to the given size.
         Return the volume chosen (in <host>:/<volname> format).
         """
 
-        voldict = self._fetch_gluster_volumes()
-        # calculate the set of unused volumes
-        set1, set2 = (
-            set(d) for d in (voldict, self.gluster_used_vols_dict)
-        )
-        unused_vols = set1 - set2
+        if 'size' not in self.volume_pattern_keys:
+            size = None
+        vol = self.gluster_free_vols.pick(size)
+        if vol is None:
+            # Volumes might have been added since the last refresh.
+            self._index_gluster_volumes(self._fetch_gluster_volumes())
+            vol = self.gluster_free_vols.pick(size)
 
-        if not unused_vols:
+        if not self.gluster_free_vols:
             # No volumes available for use as share. Warn user.
             msg = (_("No unused gluster volumes available for use as share! "
                      "Create share won't be supported unless existing shares "
@@ -372,77 +583,116 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
                          "%(inuse-numvols)s. Number of gluster volumes "
                          "available for use as share: %(unused-numvols)s"),
                      {'inuse-numvols': len(self.gluster_used_vols_dict),
-                     'unused-numvols': len(unused_vols)})
-
-        # volmap is the data structure used to categorize and sort
-        # the unused volumes. It's a nested dictionary of structure
-        # {<size>: <hostmap>}
-        # where <size> is either an integer or None,
-        # <hostmap> is a dictionary of structure {<host>: <vols>}
-        # where <host> is a host name (IP address), <vols> is a list
-        # of volumes (gluster addresses).
-        volmap = {None: {}}
-        # if both caller has specified size and 'size' occurs as
-        # a parameter in the volume pattern...
-        if size and 'size' in self.volume_pattern_keys:
-            # then this function is used to extract the
-            # size value for a given volume from the voldict...
-            get_volsize = lambda vol: voldict[vol]['size']
-        else:
-            # else just use a stub.
-            get_volsize = lambda vol: None
-        for vol in unused_vols:
-            # For each unused volume, we extract the <size>
-            # and <host> values with which it can be inserted
-            # into the volmap, and conditionally perform
-            # the insertion (with the condition being: once
-            # caller specified size and a size indication was
-            # found in the volume name, we require that the
-            # indicated size adheres to caller's spec).
-            volsize = get_volsize(vol)
-            if not volsize or volsize >= size:
-                hostmap = volmap.get(volsize)
-                if not hostmap:
-                    hostmap = {}
-                    volmap[volsize] = hostmap
-                host = self._glustermanager(vol).host
-                hostvols = hostmap.get(host)
-                if not hostvols:
-                    hostvols = []
-                    hostmap[host] = hostvols
-                hostvols.append(vol)
-        if len(volmap) > 1:
-            # volmap has keys apart from the default None,
-            # ie. volumes with sensible and adherent size
-            # indication have been found. Then pick the smallest
-            # of the size values.
-            chosen_size = sorted(n for n in volmap.keys() if n)[0]
-        else:
-            chosen_size = None
-        chosen_hostmap = volmap[chosen_size]
-        if not chosen_hostmap:
+                     'unused-numvols': len(self.gluster_free_vols)})
+
+        if vol is None:
             msg = (_("Couldn't find a free gluster volume to use."))
+            if self.gluster_dirty_vols:
+                msg += (_(" %d volume(s) of deleted shares are waiting to "
+                          "be wiped.") % len(self.gluster_dirty_vols))
             LOG.error(msg)
             raise exception.GlusterfsException(msg)
 
-        # From the hosts we choose randomly to tend towards
-        # even distribution of share backing volumes among
-        # Gluster clusters.
-        chosen_host = random.choice(list(chosen_hostmap.keys()))
-        # Within a host's volumes, choose alphabetically first,
-        # to make it predictable.
-        vol = sorted(chosen_hostmap[chosen_host])[0]
+        # If the setup fails, the volume is left out of the index
+        # until the next refresh finds it again.
+        self.gluster_free_vols.remove(vol)
         self.gluster_used_vols_dict[vol] = self._setup_gluster_vol(vol)
         return vol
 
     @utils.synchronized("glusterfs_native", external=False)
-    def _push_gluster_vol(self, exp_locn):
+    def _push_gluster_vol(self, exp_locn, dirty=False):
+        """Put back a volume which is no longer bound to a share.
+
+        If dirty, the volume is queued for wiping instead of being
+        made available for new shares right away.
+        """
         try:
-            self.gluster_used_vols_dict.pop(exp_locn)
+            gmgr = self.gluster_used_vols_dict.pop(exp_locn)
         except KeyError:
             msg = (_("Couldn't find the share in used list."))
             LOG.error(msg)
             raise exception.GlusterfsException(msg)
+        if dirty:
+            self._add_dirty_vol(exp_locn, gmgr)
+            self._queue_scrub(exp_locn)
+        elif exp_locn in self._gluster_volumes:
+            self.gluster_free_vols.add(exp_locn, self._volume_size(exp_locn))
+
+    def _add_dirty_vol(self, vol, gmgr):
+        self.gluster_dirty_vols[vol] = {
+            'gmgr': gmgr, 'state': 'queued', 'attempts': 0,
+            'queued_at': time.time(), 'started_at': None}
+
+    def _mark_dirty(self, gluster_mgr, dirty=True):
+        """Record on the volume whether it is waiting to be wiped."""
+        if dirty:
+            args = ('volume', 'set', gluster_mgr.volume, USER_MANILA_DIRTY,
+                    'yes')
+        else:
+            args = ('volume', 'reset', gluster_mgr.volume, USER_MANILA_DIRTY)
+        try:
+            gluster_mgr.gluster_call(*args)
+        except exception.ProcessExecutionError as exc:
+            msg = (_("Error in gluster volume %(op)s of option %(option)s. "
+                     "Volume: %(volname)s, Error: %(error)s") %
+                   {'op': args[1], 'option': USER_MANILA_DIRTY,
+                    'volname': gluster_mgr.volume, 'error': exc.stderr})
+            LOG.error(msg)
+            raise exception.GlusterfsException(msg)
+
+    def _queue_scrub(self, vol):
+        if not self._scrub_workers_started:
+            for i in range(self.configuration.glusterfs_scrub_workers):
+                eventlet.spawn_n(self._scrub_worker)
+            self._scrub_workers_started = True
+        self._scrub_queue.put(vol)
+
+    def _scrub_worker(self):
+        while True:
+            self._scrub_gluster_vol(self._scrub_queue.get())
+
+    def _scrub_gluster_vol(self, vol):
+        """Wipe a dirty volume and make it available again."""
+        status = self.gluster_dirty_vols.get(vol)
+        if not status or status['state'] != 'queued':
+            return
+        status['state'] = 'scrubbing'
+        status['attempts'] += 1
+        status['started_at'] = time.time()
+        LOG.debug("Wiping gluster volume %(vol)s, attempt %(attempts)d.",
+                  {'vol': vol, 'attempts': status['attempts']})
+        try:
+            self._wipe_gluster_vol(status['gmgr'])
+            self._mark_dirty(status['gmgr'], dirty=False)
+        except Exception:
+            status['state'] = 'failed'
+            LOG.exception(_LE("Error wiping gluster volume %s, it will be "
+                              "retried on the next volume refresh."), vol)
+            return
+        self._release_dirty_vol(vol)
+        LOG.info(_LI("Gluster volume %(vol)s wiped in %(secs).1f seconds "
+                     "(%(pending)d volume(s) left to wipe)."),
+                 {'vol': vol, 'secs': time.time() - status['started_at'],
+                  'pending': len(self.gluster_dirty_vols)})
+
+    @utils.synchronized("glusterfs_native", external=False)
+    def _release_dirty_vol(self, vol):
+        self.gluster_dirty_vols.pop(vol, None)
+        if vol in self._gluster_volumes:
+            self.gluster_free_vols.add(vol, self._volume_size(vol))
+
+    def _resume_scrub(self, vol):
+        if self.configuration.glusterfs_scrub_workers > 0:
+            self._queue_scrub(vol)
+        else:
+            # Without workers, volumes are wiped synchronously.
+            self._scrub_gluster_vol(vol)
+
+    def _retry_failed_scrubs(self):
+        for vol, status in list(six.iteritems(self.gluster_dirty_vols)):
+            if status['state'] == 'failed':
+                status['state'] = 'queued'
+                self._resume_scrub(vol)
 
     def _do_mount(self, gluster_export, mntdir):
 
@@ -581,7 +831,7 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         """Delete a share on the GlusterFS volume.
 
         1 Manila share = 1 GlusterFS volume. Put the gluster
-        volume back in the available list.
+        volume back in the available list once it's wiped.
         """
         exp_locn = share.get('export_location', None)
         try:
@@ -594,8 +844,14 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             return
 
         try:
-            self._wipe_gluster_vol(gmgr)
-            self._push_gluster_vol(exp_locn)
+            if self.configuration.glusterfs_scrub_workers > 0:
+                # The volume is wiped in the background. It is marked
+                # first, so that a restart does not take it for clean.
+                self._mark_dirty(gmgr)
+                self._push_gluster_vol(exp_locn, dirty=True)
+            else:
+                self._wipe_gluster_vol(gmgr)
+                self._push_gluster_vol(exp_locn)
         except exception.GlusterfsException:
             msg = (_LE("Error during delete_share request for "
                        "share %(share_id)s"), {'share_id': share['id']})
@@ -798,8 +1054,11 @@ class GlusterfsNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
 
         super(GlusterfsNativeShareDriver, self)._update_share_stats(data)
 
+        self._sync_gluster_volumes()
+
     def ensure_share(self, context, share, share_server=None):
         """Invoked to ensure that share is exported."""
         vol = share['export_location']
         gluster_mgr = self._glustermanager(vol)
         self.gluster_used_vols_dict[vol] = gluster_mgr
+        self.gluster_free_vols.remove(vol)
@@ -39,6 +39,7 @@ import six
 from manila import exception
 from manila.i18n import _
 from manila.share import driver
+from manila.share.drivers.hdfs import webhdfs
 from manila import utils
 
 LOG = log.getLogger(__name__)
@@ -65,11 +66,27 @@ hdfs_native_share_opts = [
                default=None,
                help='Path to HDFS namenode SSH private '
                     'key for login.'),
+    cfg.BoolOpt('hdfs_webhdfs_enabled',
+                default=False,
+                help='Run the HDFS operations through the WebHDFS REST '
+                     'API of the namenode when possible, instead of '
+                     'starting an hdfs command line client for each.'),
+    cfg.IntOpt('hdfs_webhdfs_port',
+               default=50070,
+               help='The port of the namenode HTTP service.'),
+    cfg.StrOpt('hdfs_webhdfs_user',
+               default=None,
+               help='User the WebHDFS calls are made as, with simple '
+                    'authentication. Defaults to hdfs_ssh_name.'),
 ]
 
 CONF = cfg.CONF
 CONF.register_opts(hdfs_native_share_opts)
 
+# Owner, group and other entries of the ACL set on a share, matching the
+# permissions its directory is created with.
+BASE_ACL_SPEC = ['user::rwx', 'group::r-x', 'other::r-x']
+
 
 class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     """HDFS Share Driver.
@@ -78,6 +95,7 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     API version history:
 
         1.0 - Initial Version
+        1.1 - WebHDFS execution backend
     """
 
     def __init__(self, *args, **kwargs):
@@ -89,6 +107,7 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         self._hdfs_execute = None
         self._hdfs_bin = None
         self._hdfs_base_path = None
+        self._webhdfs = None
 
     def do_setup(self, context):
         """Do initialization while the share driver starts."""
@@ -100,6 +119,13 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         else:
             self._hdfs_execute = self._hdfs_remote_execute
 
+        if self.configuration.hdfs_webhdfs_enabled:
+            self._webhdfs = webhdfs.WebHdfsClient(
+                host, self.configuration.hdfs_webhdfs_port,
+                user=(self.configuration.hdfs_webhdfs_user or
+                      self.configuration.hdfs_ssh_name),
+                timeout=self.configuration.ssh_conn_timeout)
+
         self._hdfs_bin = self._get_hdfs_bin_path()
         self._hdfs_base_path = (
             'hdfs://' + self.configuration.hdfs_namenode_ip + ':'
@@ -159,6 +185,25 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             LOG.error(msg)
             raise exception.HDFSException(msg)
 
+    def _webhdfs_call(self, method, *args):
+        """Runs a WebHDFS client method, if WebHDFS is enabled.
+
+        Returns False when the operation is left to the hdfs command
+        line client: WebHDFS is disabled, or the NameNode does not
+        support the operation, e.g. quotas on older NameNodes.
+        """
+        if not self._webhdfs:
+            return False
+        try:
+            getattr(self._webhdfs, method)(*args)
+        except webhdfs.WebHdfsError as e:
+            if e.unsupported_op:
+                LOG.debug('WebHDFS does not support %(method)s, running '
+                          'the hdfs command line client.', {'method': method})
+                return False
+            raise
+        return True
+
     def _get_hdfs_bin_path(self):
         try:
             (out, __) = self._hdfs_execute('locate', '/bin/hdfs')
@@ -188,9 +233,10 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         sizestr = six.text_type(share['size']) + 'g'
 
         try:
-            self._hdfs_execute(self._hdfs_bin, 'dfs',
-                               '-mkdir', share_dir)
-        except exception.ProcessExecutionError as e:
+            if not self._webhdfs_call('mkdirs', share_dir):
+                self._hdfs_execute(self._hdfs_bin, 'dfs',
+                                   '-mkdir', share_dir)
+        except (exception.ProcessExecutionError, webhdfs.WebHdfsError) as e:
             msg = (_('Failed to create directory in hdfs for the '
                      'share %(sharename)s. Error: %(excmsg)s.') %
                    {'sharename': share['name'],
@@ -199,9 +245,11 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             raise exception.HDFSException(msg)
 
         try:
-            self._hdfs_execute(self._hdfs_bin, 'dfsadmin',
-                               '-setSpaceQuota', sizestr, share_dir)
-        except exception.ProcessExecutionError as e:
+            if not self._webhdfs_call('set_space_quota', share_dir,
+                                      share['size'] * units.Gi):
+                self._hdfs_execute(self._hdfs_bin, 'dfsadmin',
+                                   '-setSpaceQuota', sizestr, share_dir)
+        except (exception.ProcessExecutionError, webhdfs.WebHdfsError) as e:
             msg = (_('Failed to set space quota for the '
                      'share %(sharename)s. Error: %(excmsg)s.') %
                    {'sharename': share['name'],
@@ -210,9 +258,10 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             raise exception.HDFSException(msg)
 
         try:
-            self._hdfs_execute(self._hdfs_bin, 'dfsadmin',
-                               '-allowSnapshot', share_dir)
-        except exception.ProcessExecutionError as e:
+            if not self._webhdfs_call('allow_snapshot', share_dir):
+                self._hdfs_execute(self._hdfs_bin, 'dfsadmin',
+                                   '-allowSnapshot', share_dir)
+        except (exception.ProcessExecutionError, webhdfs.WebHdfsError) as e:
             msg = (_('Failed to allow snapshot for the '
                      'share %(sharename)s. Error: %(excmsg)s.') %
                    {'sharename': share['name'],
@@ -268,8 +317,10 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         cmd = [self._hdfs_bin, 'dfs', '-createSnapshot',
                share_dir, snapshot_name]
         try:
-            self._hdfs_execute(*cmd)
-        except exception.ProcessExecutionError as e:
+            if not self._webhdfs_call('create_snapshot', share_dir,
+                                      snapshot_name):
+                self._hdfs_execute(*cmd)
+        except (exception.ProcessExecutionError, webhdfs.WebHdfsError) as e:
             msg = (_('Failed to create snapshot %(snapshotname)s for '
                      'the share %(sharename)s. Error: %(excmsg)s.') %
                    {'snapshotname': snapshot_name,
@@ -284,8 +335,9 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
 
         cmd = [self._hdfs_bin, 'dfs', '-rm', '-r', share_dir]
         try:
-            self._hdfs_execute(*cmd)
-        except exception.ProcessExecutionError as e:
+            if not self._webhdfs_call('delete', share_dir, True):
+                self._hdfs_execute(*cmd)
+        except (exception.ProcessExecutionError, webhdfs.WebHdfsError) as e:
             msg = (_('Failed to delete share %(sharename)s. '
                      'Error: %(excmsg)s.') %
                    {'sharename': share['name'],
@@ -300,8 +352,10 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
         cmd = [self._hdfs_bin, 'dfs', '-deleteSnapshot',
                share_dir, snapshot['name']]
         try:
-            self._hdfs_execute(*cmd)
-        except exception.ProcessExecutionError as e:
+            if not self._webhdfs_call('delete_snapshot', share_dir,
+                                      snapshot['name']):
+                self._hdfs_execute(*cmd)
+        except (exception.ProcessExecutionError, webhdfs.WebHdfsError) as e:
             msg = (_('Failed to delete snapshot %(snapshotname)s. '
                      'Error: %(excmsg)s.') %
                    {'snapshotname': snapshot['name'],
@@ -312,8 +366,8 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
     def ensure_share(self, context, share, share_server=None):
         """Ensure the storage are exported."""
 
-    def allow_access(self, context, share, access, share_server=None):
-        """Allows access to the share for a given user."""
+    def _get_user_access(self, access):
+        """Returns the ACL entry of an access, e.g. user:name:rwx."""
         if access['access_type'] != 'user':
             msg = _("Only 'user' access type allowed!")
             LOG.error(msg)
@@ -331,10 +385,13 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             LOG.error(msg)
             raise exception.InvalidShareAccess(msg)
 
+        return ':'.join([access['access_type'], access['access_to'],
+                         access_level])
+
+    def allow_access(self, context, share, access, share_server=None):
+        """Allows access to the share for a given user."""
+        user_access = self._get_user_access(access)
         share_dir = '/' + share['name']
-        user_access = ':'.join([access['access_type'],
-                                access['access_to'],
-                                access_level])
 
         cmd = [self._hdfs_bin, 'dfs', '-setfacl', '-m', '-R',
                user_access, share_dir]
@@ -369,7 +426,91 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
             LOG.error(msg)
             raise exception.HDFSException(msg)
 
+    def update_access(self, context, share, access_rules, add_rules=None,
+                      delete_rules=None, share_server=None):
+        """Updates the ACL entries of the share tree at once.
+
+        Hadoop's 'setfacl -R' applies only the access entries of an ACL
+        spec to files and also the default entries to directories, so a
+        single recursive call changes the whole tree and makes new files
+        and directories inherit the entries.
+
+        With add_rules or delete_rules, the entries of the removed users
+        are dropped with one 'setfacl -R -x' and those of the added rules
+        set with one 'setfacl -R -m'. Without them, the named users of
+        the share directory's ACL that are not in access_rules are read
+        with 'getfacl' and dropped, then one 'setfacl -R -m' sets the
+        entries of all access_rules along with the default base entries.
+
+        'setfacl --set -R' is not used to re-sync: it replaces the whole
+        ACL of every file and directory, permission bits included, so
+        files would become executable and the entries set by users
+        inside the share would be lost.
+        """
+        sync = add_rules is None and delete_rules is None
+        if sync:
+            add_rules = access_rules
+        added = [self._get_user_access(access) for access in add_rules or []]
+        share_dir = '/' + share['name']
+
+        try:
+            if sync:
+                wanted = set(access['access_to'] for access in access_rules)
+                removed = [user_name for user_name
+                           in self._get_acl_users(share_dir)
+                           if user_name not in wanted]
+            else:
+                removed = [access['access_to']
+                           for access in delete_rules or []
+                           if access['access_type'] == 'user']
+
+            if removed:
+                self._hdfs_execute(
+                    self._hdfs_bin, 'dfs', '-setfacl', '-R', '-x',
+                    ','.join(entry for user_name in removed
+                             for entry in ('user:' + user_name,
+                                           'default:user:' + user_name)),
+                    share_dir, check_exit_code=True)
+
+            acl_spec = added + ['default:' + entry for entry in added]
+            if sync:
+                acl_spec += ['default:' + entry for entry in BASE_ACL_SPEC]
+            if acl_spec:
+                self._hdfs_execute(
+                    self._hdfs_bin, 'dfs', '-setfacl', '-R', '-m',
+                    ','.join(acl_spec), share_dir, check_exit_code=True)
+        except exception.ProcessExecutionError as e:
+            msg = (_('Failed to set ACL of share %(sharename)s. '
+                     'Error: %(excmsg)s.') %
+                   {'sharename': share['name'],
+                    'excmsg': six.text_type(e)})
+            LOG.error(msg)
+            raise exception.HDFSException(msg)
+
+    def _get_acl_users(self, path):
+        """Returns the users named in the access or default ACL of a path."""
+        (out, __) = self._hdfs_execute(self._hdfs_bin, 'dfs', '-getfacl',
+                                       path, check_exit_code=True)
+        user_names = []
+        for line in out.splitlines():
+            entry = line.strip().split('#')[0]
+            if entry.startswith('default:'):
+                entry = entry[len('default:'):]
+            fields = entry.split(':')
+            if (len(fields) == 3 and fields[0] == 'user' and fields[1] and
+                    fields[1] not in user_names):
+                user_names.append(fields[1])
+        return user_names
+
     def _check_hdfs_state(self):
+        if self._webhdfs:
+            try:
+                return self._webhdfs.is_healthy()
+            except webhdfs.WebHdfsError:
+                msg = _('Failed to check the utility of hdfs.')
+                LOG.error(msg)
+                raise exception.HDFSException(msg)
+
         try:
             (out, __) = self._hdfs_execute(self._hdfs_bin, 'fsck', '/')
         except exception.ProcessExecutionError as e:
@@ -404,6 +545,16 @@ class HDFSNativeShareDriver(driver.ExecuteMixin, driver.ShareDriver):
 
     def _get_available_capacity(self):
         """Calculate available space on path."""
+        if self._webhdfs:
+            try:
+                return self._webhdfs.get_capacity()
+            except webhdfs.WebHdfsError as e:
+                msg = (_('Failed to check available capacity for hdfs.'
+                         'Error: %(excmsg)s.') %
+                       {'excmsg': six.text_type(e)})
+                LOG.error(msg)
+                raise exception.HDFSException(msg)
+
         try:
             (out, __) = self._hdfs_execute(self._hdfs_bin, 'dfsadmin',
                                            '-report')
@@ -0,0 +1,145 @@
+# Copyright (c) 2015 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""WebHDFS client of the HDFS native driver.
+
+Running the hdfs command line client starts a JVM for each command,
+which takes seconds. The driver calls the operations that have a WebHDFS
+equivalent as REST calls to the NameNode instead, over a keep-alive
+session.
+"""
+
+from oslo_log import log
+import requests
+import six
+
+from manila.i18n import _
+from manila.share.drivers import rest_transport
+
+LOG = log.getLogger(__name__)
+
+# Value of a quota that is left unchanged.
+QUOTA_DONT_SET = 2 ** 63 - 1
+
+FS_NAMESYSTEM_BEAN = 'Hadoop:service=NameNode,name=FSNamesystem'
+FS_NAMESYSTEM_STATE_BEAN = 'Hadoop:service=NameNode,name=FSNamesystemState'
+
+
+class WebHdfsError(Exception):
+    """A WebHDFS call failed."""
+
+    def __init__(self, status, exception_name, message):
+        super(WebHdfsError, self).__init__(message)
+        self.status = status
+        self.exception_name = exception_name
+        self.message = message
+
+    @property
+    def unsupported_op(self):
+        """Whether the NameNode does not know the operation called."""
+        return self.status == 400 and 'parameter "op"' in self.message
+
+
+class WebHdfsClient(object):
+    """Client of the WebHDFS REST API and JMX servlet of a NameNode."""
+
+    def __init__(self, host, port, user=None, timeout=None):
+        self.user = user
+        self._transport = rest_transport.RestTransport(
+            base_url='http://%s:%s' % (host, port), timeout=timeout)
+
+    def call(self, method, path, op, **params):
+        """Calls a WebHDFS operation on a path and returns its result."""
+        params['op'] = op
+        if self.user:
+            params['user.name'] = self.user
+        response = self._request(method, '/webhdfs/v1' + path, params)
+        if response.status_code >= 400:
+            try:
+                error = response.json()['RemoteException']
+                exception_name = error['exception']
+                message = error['message']
+            except (ValueError, KeyError, TypeError):
+                exception_name = None
+                message = response.text
+            raise WebHdfsError(response.status_code, exception_name, message)
+        return response.json() if response.content else {}
+
+    def _request(self, method, url, params):
+        try:
+            return self._transport.request(method, url, params=params)
+        except requests.RequestException as e:
+            raise WebHdfsError(None, None, six.text_type(e))
+
+    def _call_boolean(self, method, path, op, **params):
+        """Calls an operation answering a boolean, False being a failure."""
+        if not self.call(method, path, op, **params)['boolean']:
+            raise WebHdfsError(None, None,
+                               _('%(op)s of %(path)s failed.') %
+                               {'op': op, 'path': path})
+        return True
+
+    def mkdirs(self, path):
+        return self._call_boolean('PUT', path, 'MKDIRS')
+
+    def delete(self, path, recursive=False):
+        return self._call_boolean('DELETE', path, 'DELETE',
+                                  recursive=six.text_type(recursive).lower())
+
+    def create_snapshot(self, path, snapshot_name):
+        return self.call('PUT', path, 'CREATESNAPSHOT',
+                         snapshotname=snapshot_name)['Path']
+
+    def delete_snapshot(self, path, snapshot_name):
+        self.call('DELETE', path, 'DELETESNAPSHOT',
+                  snapshotname=snapshot_name)
+
+    def allow_snapshot(self, path):
+        self.call('PUT', path, 'ALLOWSNAPSHOT')
+
+    def set_space_quota(self, path, size):
+        self.call('PUT', path, 'SETQUOTA', namespacequota=QUOTA_DONT_SET,
+                  storagespacequota=size)
+
+    def set_acl(self, path, acl_spec):
+        self.call('PUT', path, 'SETACL', aclspec=acl_spec)
+
+    def get_jmx(self, bean):
+        """Returns the attributes of a NameNode JMX bean."""
+        response = self._request('GET', '/jmx', {'qry': bean})
+        try:
+            response.raise_for_status()
+            return response.json()['beans'][0]
+        except (requests.HTTPError, ValueError, KeyError, IndexError) as e:
+            raise WebHdfsError(response.status_code, None,
+                               _('Failed to get JMX bean %(bean)s: %(e)s') %
+                               {'bean': bean, 'e': six.text_type(e)})
+
+    def get_capacity(self):
+        """Returns the total and free capacity of the file system."""
+        state = self.get_jmx(FS_NAMESYSTEM_STATE_BEAN)
+        try:
+            return (int(state['CapacityTotal']),
+                    int(state['CapacityRemaining']))
+        except (KeyError, ValueError) as e:
+            raise WebHdfsError(None, None,
+                               _('Failed to get capacity: %s') %
+                               six.text_type(e))
+
+    def is_healthy(self):
+        """Whether the file system has no missing or corrupt blocks."""
+        namesystem = self.get_jmx(FS_NAMESYSTEM_BEAN)
+        return (namesystem.get('MissingBlocks') == 0 and
+                namesystem.get('CorruptBlocks') == 0)
@@ -21,16 +21,17 @@ import base64
 import socket
 import time
 
-import httplib2
 from oslo_config import cfg
 from oslo_log import log
 from oslo_serialization import jsonutils as json
 from oslo_utils import units
+import requests
 import six
 
 from manila import exception
 from manila.i18n import _LW
 from manila.share import driver
+from manila.share.drivers import rest_transport
 
 LOG = log.getLogger(__name__)
 
@@ -49,6 +50,25 @@ CONF = cfg.CONF
 CONF.register_opts(hdssop_share_opts)
 
 
+class SopHttpClient(object):
+    """Sends SOPAPI requests over a keep-alive, retrying transport.
+
+    Responses are returned as a (headers, content) tuple, the status
+    being in headers['status'], as httplib2 does.
+    """
+
+    def __init__(self):
+        self._transport = rest_transport.RestTransport(verify=False)
+
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):
+        response = self._transport.request(method, uri, data=body or None,
+                                           headers=headers, **kwargs)
+        resp_headers = dict((name.lower(), value)
+                            for name, value in response.headers.items())
+        resp_headers['status'] = six.text_type(response.status_code)
+        return resp_headers, response.content
+
+
 class SopShareDriver(driver.ShareDriver):
     """Execute commands relating to Shares."""
 
@@ -60,13 +80,14 @@ class SopShareDriver(driver.ShareDriver):
         self.sop_target = self.configuration.safe_get('hdssop_target')
         self.sopuser = self.configuration.safe_get('hdssop_adminuser')
         self.soppassword = self.configuration.safe_get('hdssop_adminpassword')
+        self._httpclient = SopHttpClient()
 
     def get_sop_auth_header(self):
         return 'Basic ' + base64.b64encode(
             self.sopuser + ':' +
             self.soppassword).encode('utf-8').decode('ascii')
 
-    def _wait_for_job_completion(self, httpclient, job_uri):
+    def _wait_for_job_completion(self, job_uri):
         """Wait for job identified by job_uri to complete."""
         count = 0
         headers = dict(Authorization=self.get_sop_auth_header())
@@ -77,9 +98,8 @@ class SopShareDriver(driver.ShareDriver):
             if count > 300:
                 raise exception.SopAPIError(err=_('job timed out'))
 
-            resp_headers, resp_content = httpclient.request(job_uri, 'GET',
-                                                            body='',
-                                                            headers=headers)
+            resp_headers, resp_content = self._httpclient.request(
+                job_uri, 'GET', body='', headers=headers)
             if int(resp_headers['status']) != 200:
                 raise exception.SopAPIError(err=_('error getting job status'))
 
@@ -103,7 +123,7 @@ class SopShareDriver(driver.ShareDriver):
         resp_code = int(resp_headers['status'])
         if resp_code == 202:
             job_loc = resp_headers['location']
-            self._wait_for_job_completion(httpclient, job_loc)
+            self._wait_for_job_completion(job_loc)
         else:
             raise exception.SopAPIError(
                 err=(_('received error: %s') %
@@ -121,7 +141,7 @@ class SopShareDriver(driver.ShareDriver):
         resp_code = int(resp_headers['status'])
         if resp_code == 202:
             job_loc = resp_headers['location']
-            job = self._wait_for_job_completion(httpclient, job_loc)
+            job = self._wait_for_job_completion(job_loc)
             if job['properties']['completion-status'] == 'COMPLETE':
                 return job['properties']['resource-name']
         else:
@@ -174,8 +194,7 @@ class SopShareDriver(driver.ShareDriver):
         """Create new share on HDS Scale-out Platform."""
         sharesize = int(six.text_type(share['size']))
 
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._httpclient
 
         if share['share_proto'] != 'NFS':
             raise exception.InvalidShare(
@@ -216,7 +235,7 @@ class SopShareDriver(driver.ShareDriver):
         resp_code = int(resp_headers['status'])
         if resp_code == 202:
             job_loc = resp_headers['location']
-            self._wait_for_job_completion(httpclient, job_loc)
+            self._wait_for_job_completion(job_loc)
         else:
             raise exception.SopAPIError(err=_('received error: %s') %
                                         resp_headers['status'])
@@ -232,7 +251,7 @@ class SopShareDriver(driver.ShareDriver):
         resp_code = int(resp_headers['status'])
         if resp_code == 202:
             job_loc = resp_headers['location']
-            self._wait_for_job_completion(httpclient, job_loc)
+            self._wait_for_job_completion(job_loc)
         else:
             raise exception.SopAPIError(err=_('received error: %s') %
                                         resp_headers['status'])
@@ -240,8 +259,7 @@ class SopShareDriver(driver.ShareDriver):
     def delete_share(self, context, share, share_server=None):
         """Remove a share from Sop volume."""
 
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._httpclient
         self._delete_share_sopapi(
             httpclient,
             self._get_share_id_by_name(httpclient, share['id']))
@@ -272,8 +290,7 @@ class SopShareDriver(driver.ShareDriver):
             raise exception.InvalidShareAccess(
                 reason=_('only IP access type allowed'))
 
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._httpclient
         sop_share_id = self._get_share_id_by_name(httpclient, share['id'])
 
         if access['access_level'] == 'rw':
@@ -306,7 +323,7 @@ class SopShareDriver(driver.ShareDriver):
         resp_code = int(resp_headers['status'])
         if resp_code == 202:
             job_loc = resp_headers['location']
-            self._wait_for_job_completion(httpclient, job_loc)
+            self._wait_for_job_completion(job_loc)
         else:
             raise exception.SopAPIError(err=_('received error: %s') %
                                         resp_headers['status'])
@@ -320,8 +337,7 @@ class SopShareDriver(driver.ShareDriver):
             LOG.warn(_LW('Only ip access type allowed.'))
             return
 
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._httpclient
         sop_share_id = self._get_share_id_by_name(httpclient, share['id'])
         payload = {
             'action': 'delete-access-rule',
@@ -338,7 +354,7 @@ class SopShareDriver(driver.ShareDriver):
         resp_code = int(resp_headers['status'])
         if resp_code == 202:
             job_loc = resp_headers['location']
-            self._wait_for_job_completion(httpclient, job_loc)
+            self._wait_for_job_completion(job_loc)
         else:
             raise exception.SopAPIError(err=_('received error: %s') %
                                         resp_headers['status'])
@@ -353,11 +369,8 @@ class SopShareDriver(driver.ShareDriver):
         headers = dict(Authorization=self.get_sop_auth_header())
         uri = self.sop_target + '/sopapi/clusters'
         try:
-            httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                       timeout=5)
-            resp_headers, resp_content = httpclient.request(uri, 'GET',
-                                                            body='',
-                                                            headers=headers)
+            resp_headers, resp_content = self._httpclient.request(
+                uri, 'GET', body='', headers=headers, timeout=5)
             response = json.loads(resp_content)
             if 'messages' in response:
                 soperror = _('received error: %(code)s: %(msg)s') % {
@@ -365,7 +378,7 @@ class SopShareDriver(driver.ShareDriver):
                     'msg': response['messages'][0]['message'],
                 }
                 raise exception.SopAPIError(err=soperror)
-        except socket.timeout:
+        except (socket.timeout, requests.Timeout):
             raise exception.SopAPIError(
                 err=_('connection to SOPAPI timed out'))
 
@@ -373,8 +386,7 @@ class SopShareDriver(driver.ShareDriver):
         """Calculate cluster storage capacity and return in GiB."""
         headers = dict(Authorization=self.get_sop_auth_header())
         uri = self.sop_target + '/sopapi/clusters'
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._httpclient
         resp_headers, resp_content = httpclient.request(uri, 'GET',
                                                         body='',
                                                         headers=headers)
@@ -254,6 +254,29 @@ class HP3ParShareDriver(driver.ShareDriver):
                                  self.fpg,
                                  self.vfs)
 
+    def update_access(self, context, share, access_rules, add_rules=None,
+                      delete_rules=None, share_server=None):
+        """Update access to the share in batches.
+
+        Without add_rules and delete_rules, the access of the share is
+        made to match access_rules, removing the clients not in them.
+        """
+        if add_rules is None and delete_rules is None:
+            self._hp3par.sync_access(share['project_id'],
+                                     share['id'],
+                                     share['share_proto'],
+                                     self.fpg,
+                                     self.vfs,
+                                     access_rules)
+            return
+        self._hp3par.update_access(share['project_id'],
+                                   share['id'],
+                                   share['share_proto'],
+                                   self.fpg,
+                                   self.vfs,
+                                   add_rules=add_rules,
+                                   delete_rules=delete_rules)
+
     def _update_share_stats(self):
         """Retrieve stats info from share group."""
 
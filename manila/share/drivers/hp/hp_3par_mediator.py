@@ -54,6 +54,9 @@ class HP3ParMediator(object):
 
         self.ssh_conn_timeout = kwargs.get('ssh_conn_timeout')
         self._client = None
+        # (share name, protocol, fpg, vfs) -> fstore of the shares created
+        # or found, to skip the getfshare search on access changes.
+        self._fstores = {}
 
     def do_setup(self):
 
@@ -266,6 +269,8 @@ class HP3ParMediator(object):
             LOG.exception(msg)
             raise exception.ShareBackendException(msg)
 
+        self._fstores[(share_name, protocol, fpg, vfs)] = fstore
+
         if protocol == 'nfs':
             return result['members'][0]['sharePath']
         else:
@@ -328,6 +333,7 @@ class HP3ParMediator(object):
             # Share does not exist.
             return
 
+        self._forget_fstore(share_name, fpg, vfs)
         try:
             self._client.removefshare(protocol, vfs, share_name,
                                       fpg=fpg, fstore=fstore)
@@ -523,27 +529,45 @@ class HP3ParMediator(object):
 
         protocol = self.ensure_supported_protocol(share_proto)
         self.validate_access_type(protocol, access_type)
+        self._change_access_batch(plus_or_minus, project_id, share_id,
+                                  protocol, [(access_type, access_to)],
+                                  fpg, vfs)
+
+    def _change_access_batch(self, plus_or_minus, project_id, share_id,
+                             protocol, accesses, fpg, vfs):
+        """Allow or deny access to a share for many clients at once.
+
+        All the (access_type, access_to) accesses are changed with a single
+        setfshare, listing the clients of each option comma separated.
+        """
 
         share_name = self.ensure_prefix(share_id)
         fstore = self._find_fstore(project_id, share_id, protocol, fpg, vfs,
                                    allow_cross_protocol=True)
 
+        ips = [access_to for access_type, access_to in accesses
+               if access_type == 'ip']
+        users = [access_to for access_type, access_to in accesses
+                 if access_type != 'ip']
         try:
             if protocol == 'nfs':
                 result = self._client.setfshare(
                     protocol, vfs, share_name, fpg=fpg, fstore=fstore,
-                    clientip='%s%s' % (plus_or_minus, access_to))
+                    clientip='%s%s' % (plus_or_minus, ','.join(ips)))
             elif protocol == 'smb':
-                if access_type == 'ip':
-                    result = self._client.setfshare(
-                        protocol, vfs, share_name, fpg=fpg, fstore=fstore,
-                        allowip='%s%s' % (plus_or_minus, access_to))
-                else:
+                options = {}
+                if ips:
+                    options['allowip'] = '%s%s' % (plus_or_minus,
+                                                   ','.join(ips))
+                if users:
                     access_str = 'fullcontrol'
-                    perm = '%s%s:%s' % (plus_or_minus, access_to, access_str)
-                    result = self._client.setfshare(protocol, vfs, share_name,
-                                                    fpg=fpg, fstore=fstore,
-                                                    allowperm=perm)
+                    options['allowperm'] = '%s%s' % (
+                        plus_or_minus,
+                        ','.join('%s:%s' % (user, access_str)
+                                 for user in users))
+                result = self._client.setfshare(protocol, vfs, share_name,
+                                                fpg=fpg, fstore=fstore,
+                                                **options)
             else:
                 msg = (_("Unexpected error:  After ensure_supported_protocol "
                          "only 'nfs' or 'smb' strings are allowed, but found: "
@@ -552,10 +576,14 @@ class HP3ParMediator(object):
 
             LOG.debug("setfshare result=%s", result)
         except Exception as e:
+            # The share may have moved or gone, look it up again next time.
+            self._forget_fstore(share_name, fpg, vfs)
             msg = (_('Failed to change (%(change)s) access to FPG/share '
                      '%(fpg)s/%(share)s to %(type)s %(to)s): %(e)s') %
                    {'change': plus_or_minus, 'fpg': fpg, 'share': share_name,
-                    'type': access_type, 'to': access_to,
+                    'type': ','.join(sorted(set(
+                        access_type for access_type, __ in accesses))),
+                    'to': ','.join(access_to for __, access_to in accesses),
                     'e': six.text_type(e)})
             LOG.exception(msg)
             raise exception.ShareBackendException(msg)
@@ -563,16 +591,25 @@ class HP3ParMediator(object):
     def _find_fstore(self, project_id, share_id, share_proto, fpg, vfs,
                      allow_cross_protocol=False):
 
-        share = self._find_fshare(project_id, share_id, share_proto, fpg, vfs)
+        protocols = [share_proto]
+        if allow_cross_protocol:
+            protocols.append(self.other_protocol(share_proto))
 
-        if not share and allow_cross_protocol:
-            share = self._find_fshare(project_id,
-                                      share_id,
-                                      self.other_protocol(share_proto),
-                                      fpg,
-                                      vfs)
-
-        return share.get('fstoreName') if share else None
+        share_name = self.ensure_prefix(share_id)
+        for protocol in protocols:
+            key = (share_name, self.ensure_supported_protocol(protocol), fpg,
+                   vfs)
+            if key not in self._fstores:
+                share = self._find_fshare(project_id, share_id, protocol,
+                                          fpg, vfs)
+                if not share:
+                    continue
+                self._fstores[key] = share.get('fstoreName')
+            return self._fstores[key]
+
+    def _forget_fstore(self, share_name, fpg, vfs):
+        for protocol in ('nfs', 'smb'):
+            self._fstores.pop((share_name, protocol, fpg, vfs), None)
 
     def _find_fshare(self, project_id, share_id, share_proto, fpg, vfs):
 
@@ -637,3 +674,65 @@ class HP3ParMediator(object):
 
         self._change_access(DENY, project_id, share_id, share_proto,
                             access_type, access_to, fpg, vfs)
+
+    def update_access(self, project_id, share_id, share_proto, fpg, vfs,
+                      add_rules=None, delete_rules=None):
+        """Deny then grant access to a share in batches.
+
+        The access_type and access_to of the delete_rules, then of the
+        add_rules, are each changed with a single setfshare.
+        """
+
+        protocol = self.ensure_supported_protocol(share_proto)
+        add_rules = add_rules or []
+        delete_rules = delete_rules or []
+        for rule in delete_rules + add_rules:
+            self.validate_access_type(protocol, rule['access_type'])
+
+        for plus_or_minus, rules in ((DENY, delete_rules),
+                                     (ALLOW, add_rules)):
+            if rules:
+                self._change_access_batch(
+                    plus_or_minus, project_id, share_id, protocol,
+                    [(rule['access_type'], rule['access_to'])
+                     for rule in rules],
+                    fpg, vfs)
+
+    def sync_access(self, project_id, share_id, share_proto, fpg, vfs,
+                    access_rules):
+        """Make the access of a share match access_rules exactly.
+
+        The clients the share allows are read with getfshare, then the
+        ones that are not in access_rules are denied and the missing ones
+        allowed. The 127.0.0.1 client the share is created with is kept.
+        """
+
+        protocol = self.ensure_supported_protocol(share_proto)
+        for rule in access_rules:
+            self.validate_access_type(protocol, rule['access_type'])
+
+        share = self._find_fshare(project_id, share_id, protocol, fpg, vfs)
+        if not share:
+            msg = (_('Failed to find share %(share_id)s to sync its '
+                     'access.') % {'share_id': share_id})
+            LOG.error(msg)
+            raise exception.ShareBackendException(msg)
+
+        if protocol == 'nfs':
+            current = [('ip', client) for client in share.get('clients', [])]
+        else:
+            current = [('ip', client) for client in share.get('allowIP', [])]
+            current.extend(('user', perm[0])
+                           for perm in share.get('allowPerm', []))
+        current = set(current)
+        wanted = set((rule['access_type'], rule['access_to'])
+                     for rule in access_rules)
+        wanted.add(('ip', '127.0.0.1'))
+
+        delete_rules = [{'access_type': access_type, 'access_to': access_to}
+                        for access_type, access_to in sorted(current - wanted)]
+        add_rules = [rule for rule in access_rules
+                     if (rule['access_type'], rule['access_to'])
+                     not in current]
+        self.update_access(project_id, share_id, share_proto, fpg, vfs,
+                           add_rules=add_rules, delete_rules=delete_rules)
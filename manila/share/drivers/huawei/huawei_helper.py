@@ -18,14 +18,14 @@ from xml.etree import ElementTree as ET
 
 from oslo_log import log
 from oslo_serialization import jsonutils
+from oslo_utils import excutils
 from oslo_utils import units
 import six
-from six.moves import http_cookiejar
-from six.moves.urllib import request as urlreq  # pylint: disable=E0611
 
 from manila import exception
 from manila.i18n import _, _LE, _LW
 from manila.share.drivers.huawei import constants
+from manila.share.drivers import rest_transport
 from manila import utils
 
 LOG = log.getLogger(__name__)
@@ -36,12 +36,19 @@ class RestHelper():
 
     def __init__(self, configuration):
         self.configuration = configuration
-        self.cookie = http_cookiejar.CookieJar()
         self.url = None
-        self.headers = {
-            "Connection": "keep-alive",
-            "Content-Type": "application/json",
-        }
+        # The session cookie and the iBaseToken header set at login are
+        # kept by the transport and sent with every further request.
+        self.transport = rest_transport.RestTransport(
+            headers={"Content-Type": "application/json"},
+            timeout=constants.SOCKET_TIMEOUT)
+        self.headers = self.transport.headers
+        # Lookups by name are served from these indexes, filled on first
+        # use and kept up to date by the helper's own changes:
+        # (share type, share path) -> {'ID': ..., 'FSID': ...}
+        self._share_index = {}
+        # (share client type, share id) -> {access name: access id}
+        self._access_index = {}
 
     def call(self, url, data=None, method=None):
         """Send requests to server.
@@ -56,15 +63,13 @@ class RestHelper():
                       {'url': url,
                        'method': method,
                        'data': data})
-        opener = urlreq.build_opener(urlreq.HTTPCookieProcessor(self.cookie))
-        urlreq.install_opener(opener)
+        if not method:
+            method = 'POST' if data else 'GET'
 
         try:
-            req = urlreq.Request(url, data, self.headers)
-            if method:
-                req.get_method = lambda: method
-            res_temp = urlreq.urlopen(req, timeout=constants.SOCKET_TIMEOUT)
-            res = res_temp.read().decode("utf-8")
+            response = self.transport.request(method, url, data=data)
+            response.raise_for_status()
+            res = response.content.decode("utf-8")
 
             LOG.debug('Response Data: %(res)s.', {'res': res})
 
@@ -201,7 +206,10 @@ class RestHelper():
         self._assert_rest_result(result, msg)
         self._assert_data_in_result(result, msg)
 
-        return result['data']['ID']
+        share_id = result['data']['ID']
+        self._share_index[(share_type, share_path)] = {'ID': share_id,
+                                                       'FSID': fs_id}
+        return share_id
 
     def _delete_share(self, share_name, share_proto):
         """Delete share."""
@@ -220,6 +228,8 @@ class RestHelper():
         share_id = share['ID']
         share_fs_id = share['FSID']
 
+        self._forget_share(share_name, share_proto, share_id)
+
         if share_id:
             self._delete_share_by_id(share_id, share_type)
 
@@ -420,7 +430,14 @@ class RestHelper():
                      share_name)
             return
 
-        self._remove_access_from_share(access_id, share_client_type)
+        try:
+            self._remove_access_from_share(access_id, share_client_type)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                # The cached share or access may be gone from the array.
+                self._forget_share(share_name, share_proto, share['ID'])
+        self._access_index.get((share_client_type, share['ID']),
+                               {}).pop(access_to, None)
 
     def _remove_access_from_share(self, access_id, access_type):
         url = self.url + "/" + access_type + "/" + access_id
@@ -440,25 +457,28 @@ class RestHelper():
         return int(result['data']['COUNT'])
 
     def _get_access_from_share(self, share_id, access_to, share_client_type):
-        """Segments to find access for a period of 100."""
-        count = self._get_access_from_count(share_id, share_client_type)
+        """Find the access id of a client of the share."""
+        return self._get_access_index(share_id,
+                                      share_client_type).get(access_to)
 
-        access_id = None
-        range_begin = 0
-        while True:
-            if count < 0 or access_id:
-                break
-            access_id = self._get_access_from_share_range(share_id,
-                                                          access_to,
-                                                          range_begin,
-                                                          share_client_type)
-            range_begin += 100
-            count -= 100
+    def _get_access_index(self, share_id, share_client_type):
+        """Get the {name: id} index of the accesses of a share.
 
-        return access_id
-
-    def _get_access_from_share_range(self, share_id,
-                                     access_to, range_begin,
+        The accesses are read from the array, 100 at a time, the first
+        time only.
+        """
+        key = (share_client_type, share_id)
+        if key not in self._access_index:
+            count = self._get_access_from_count(share_id, share_client_type)
+            access_index = {}
+            for range_begin in six.moves.range(0, count, 100):
+                for item in self._get_access_from_share_range(
+                        share_id, range_begin, share_client_type):
+                    access_index[item['NAME']] = item['ID']
+            self._access_index[key] = access_index
+        return self._access_index[key]
+
+    def _get_access_from_share_range(self, share_id, range_begin,
                                      share_client_type):
         range_end = range_begin + 100
         url = (self.url + "/" + share_client_type + "?filter=PARENTID::"
@@ -467,10 +487,7 @@ class RestHelper():
         result = self.call(url, None, "GET")
         self._assert_rest_result(result, 'Get access id by share error!')
 
-        if "data" in result:
-            for item in result['data']:
-                if access_to == item['NAME']:
-                    return item['ID']
+        return result.get('data', [])
 
     def _allow_access(self, share_name, access, share_proto):
         """Allow access to the share."""
@@ -494,7 +511,12 @@ class RestHelper():
             raise exception.InvalidShareAccess(reason=err_msg)
 
         share_id = share['ID']
-        self._allow_access_rest(share_id, access_to, share_proto)
+        try:
+            self._allow_access_rest(share_id, access_to, share_proto)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                # The cached share may be gone from the array.
+                self._forget_share(share_name, share_proto, share_id)
 
     def _allow_access_rest(self, share_id, access_to, share_proto):
         """Allow access to the share."""
@@ -525,6 +547,12 @@ class RestHelper():
         msg = 'Allow access error.'
         self._assert_rest_result(result, msg)
 
+        key = (access_type, share_id)
+        if key in self._access_index and 'ID' in result.get('data', {}):
+            self._access_index[key][access_to] = result['data']['ID']
+        else:
+            self._access_index.pop(key, None)
+
     def _get_share_client_type(self, share_proto):
         share_client_type = None
         if share_proto == 'NFS':
@@ -585,6 +613,41 @@ class RestHelper():
         return result['data']['ID']
 
     def _get_share_by_name(self, share_name, share_type):
+        """Find the ID and FSID of a share by name."""
+        share_path = self._get_share_path(share_name)
+        key = (share_type, share_path)
+        if key not in self._share_index:
+            share = self._get_share_by_path(share_path, share_type)
+            if not share:
+                return {}
+            self._share_index[key] = share
+        return dict(self._share_index[key])
+
+    def _forget_share(self, share_name, share_proto, share_id):
+        """Drops the cached IDs of a share and of its accesses."""
+        self._share_index.pop(
+            (self._get_share_type(share_proto),
+             self._get_share_path(share_name)), None)
+        self._access_index.pop(
+            (self._get_share_client_type(share_proto), share_id), None)
+
+    def _get_share_by_path(self, share_path, share_type):
+        """Find a share with an exact match filter on its path."""
+        url = (self.url + "/" + share_type + "?filter=SHAREPATH::"
+               + share_path)
+        result = self.call(url, None, "GET")
+        if result['error']['code'] != 0:
+            LOG.debug('Share filter not supported, scanning all the '
+                      'shares. result: %s.', result)
+            return self._scan_share_by_name(share_path.strip("/"),
+                                            share_type)
+
+        for item in result.get('data', []):
+            if share_path == item['SHAREPATH']:
+                return {'ID': item['ID'], 'FSID': item['FSID']}
+        return {}
+
+    def _scan_share_by_name(self, share_name, share_type):
         """Segments to find share for a period of 100."""
         count = self._get_share_count(share_type)
 
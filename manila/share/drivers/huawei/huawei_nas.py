@@ -134,8 +134,14 @@ class HuaweiNasDriver(driver.ShareDriver):
 
         sharefsid = share['FSID']
         snapshot_name = "share_snapshot_" + snap_name
-        snap_id = self.helper._create_snapshot(sharefsid,
-                                               snapshot_name)
+        try:
+            snap_id = self.helper._create_snapshot(sharefsid,
+                                                   snapshot_name)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                # The cached share may be gone from the array.
+                self.helper._forget_share(share_name, share_proto,
+                                          share['ID'])
         LOG.info(_LI('Creating snapshot id %s.'), snap_id)
 
     def delete_snapshot(self, context, snapshot, share_server=None):
@@ -35,7 +35,10 @@ import os
 import pipes
 import re
 import socket
+import threading
+import time
 
+from eventlet import greenpool
 from oslo_config import cfg
 from oslo_log import log
 from oslo_utils import excutils
@@ -46,6 +49,7 @@ import six
 
 from manila import exception
 from manila.i18n import _, _LE, _LI
+from manila.openstack.common import loopingcall
 from manila.share import driver
 from manila.share.drivers.ibm import ganesha_utils
 from manila import utils
@@ -89,6 +93,16 @@ gpfs_share_opts = [
     cfg.StrOpt('gpfs_ssh_private_key',
                default=None,
                help='Path to GPFS server SSH private key for login.'),
+    cfg.IntOpt('gpfs_nfs_publish_concurrency',
+               default=8,
+               help='Maximum number of NFS servers from '
+                    'gpfs_nfs_server_list that an export change is '
+                    'published to at the same time.'),
+    cfg.IntOpt('gpfs_stats_update_interval',
+               default=60,
+               help='Interval in seconds between refreshes of the cached '
+                    'GPFS file system capacity. Set to 0 to read it on '
+                    'every stats update instead.'),
     cfg.ListOpt('gpfs_share_helpers',
                 default=[
                     'KNFS=manila.share.drivers.ibm.gpfs.KNFSHelper',
@@ -129,9 +143,12 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
         self.configuration.append_config_values(gpfs_share_opts)
         self.backend_name = self.configuration.safe_get(
             'share_backend_name') or "IBM Storage System"
-        self.sshpool = None
         self.ssh_connections = {}
+        self._ssh_connections_lock = threading.Lock()
         self._gpfs_execute = None
+        self._stats_cache = {}
+        self._stats_updated_at = None
+        self._stats_lock = threading.Lock()
 
     def do_setup(self, context):
         """Any initialization the share driver does while starting."""
@@ -143,6 +160,14 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
         else:
             self._gpfs_execute = self._gpfs_remote_execute
         self._setup_helpers()
+        self._start_stats_task()
+
+    def _start_stats_task(self):
+        interval = self.configuration.gpfs_stats_update_interval
+        if interval > 0:
+            stats_task = loopingcall.FixedIntervalLoopingCall(
+                self._refresh_stats)
+            stats_task.start(interval=interval)
 
     def _gpfs_local_execute(self, *cmd, **kwargs):
         if 'run_as_root' not in kwargs:
@@ -161,25 +186,8 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
                  check_exit_code=True):
         command = ' '.join(pipes.quote(cmd_arg) for cmd_arg in cmd_list)
 
-        if not self.sshpool:
-            gpfs_ssh_login = self.configuration.gpfs_ssh_login
-            password = self.configuration.gpfs_ssh_password
-            privatekey = self.configuration.gpfs_ssh_private_key
-            gpfs_ssh_port = self.configuration.gpfs_ssh_port
-            ssh_conn_timeout = self.configuration.ssh_conn_timeout
-            min_size = self.configuration.ssh_min_pool_conn
-            max_size = self.configuration.ssh_max_pool_conn
-
-            self.sshpool = utils.SSHPool(host,
-                                         gpfs_ssh_port,
-                                         ssh_conn_timeout,
-                                         gpfs_ssh_login,
-                                         password=password,
-                                         privatekey=privatekey,
-                                         min_size=min_size,
-                                         max_size=max_size)
         try:
-            with self.sshpool.item() as ssh:
+            with self._get_ssh_pool(host).item() as ssh:
                 return self._gpfs_ssh_execute(
                     ssh,
                     command,
@@ -194,6 +202,25 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
                 LOG.error(msg)
                 raise exception.GPFSException(msg)
 
+    def _get_ssh_pool(self, host):
+        """Returns the pool of SSH connections to host, creating it once.
+
+        The lock keeps concurrent commands from each creating a pool for
+        the same host and leaking the connections of all but one.
+        """
+        with self._ssh_connections_lock:
+            if host not in self.ssh_connections:
+                self.ssh_connections[host] = utils.SSHPool(
+                    host,
+                    self.configuration.gpfs_ssh_port,
+                    self.configuration.ssh_conn_timeout,
+                    self.configuration.gpfs_ssh_login,
+                    password=self.configuration.gpfs_ssh_password,
+                    privatekey=self.configuration.gpfs_ssh_private_key,
+                    min_size=self.configuration.ssh_min_pool_conn,
+                    max_size=self.configuration.ssh_max_pool_conn)
+            return self.ssh_connections[host]
+
     def _gpfs_ssh_execute(self, ssh, cmd, ignore_exit_codes=None,
                           check_exit_code=True):
         sanitized_cmd = strutils.mask_password(cmd)
@@ -275,8 +302,9 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
         for helper_str in self.configuration.gpfs_share_helpers:
             share_proto, _, import_str = helper_str.partition('=')
             helper = importutils.import_class(import_str)
-            self._helpers[share_proto.upper()] = helper(self._gpfs_execute,
-                                                        self.configuration)
+            self._helpers[share_proto.upper()] = helper(
+                self._gpfs_execute, self.configuration,
+                ssh_execute=self._run_ssh)
 
     def _local_path(self, sharename):
         """Get local path for a share or share snapshot by name."""
@@ -284,6 +312,9 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
                             sharename)
 
     def _get_gpfs_device(self):
+        if self._stats_cache:
+            return self._stats_cache['device']
+
         fspath = self.configuration.gpfs_mount_point_base
         try:
             (out, _) = self._gpfs_execute('df', fspath)
@@ -383,21 +414,40 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
             LOG.error(msg)
             raise exception.GPFSException(msg)
 
-    def _get_available_capacity(self, path):
-        """Calculate available space on path."""
+    def _collect_stats(self):
+        """Read the GPFS device and capacity with one df call."""
+        path = self.configuration.gpfs_mount_point_base
         try:
             out, __ = self._gpfs_execute('df', '-P', '-B', '1', path)
+            fsdev, size, __, available = out.splitlines()[1].split()[:4]
         except exception.ProcessExecutionError as e:
-            msg = (_('Failed to check available capacity for %(path)s.'
+            msg = (_('Failed to collect stats for %(path)s. '
                      'Error: %(excmsg)s.') %
                    {'path': path, 'excmsg': e})
             LOG.error(msg)
             raise exception.GPFSException(msg)
 
-        out = out.splitlines()[1]
-        size = int(out.split()[1])
-        available = int(out.split()[3])
-        return available, size
+        return {
+            'device': fsdev,
+            'total': int(size),
+            'free': int(available),
+        }
+
+    def _get_stats(self, refresh=False):
+        """Return the cached stats, collecting them when out of date."""
+        interval = self.configuration.gpfs_stats_update_interval
+        with self._stats_lock:
+            if (refresh or interval <= 0 or self._stats_updated_at is None
+                    or time.time() - self._stats_updated_at >= interval):
+                self._stats_cache = self._collect_stats()
+                self._stats_updated_at = time.time()
+            return self._stats_cache
+
+    def _refresh_stats(self):
+        try:
+            self._get_stats(refresh=True)
+        except Exception:
+            LOG.exception(_LE('Failed to refresh GPFS stats.'))
 
     def _create_share_snapshot(self, snapshot):
         """Create a snapshot of the share."""
@@ -546,11 +596,10 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
             storage_protocol='NFS',
             reserved_percentage=self.configuration.reserved_share_percentage)
 
-        free, capacity = self._get_available_capacity(
-            self.configuration.gpfs_mount_point_base)
+        stats = self._get_stats()
 
-        data['total_capacity_gb'] = math.ceil(capacity / units.Gi)
-        data['free_capacity_gb'] = math.ceil(free / units.Gi)
+        data['total_capacity_gb'] = math.ceil(stats['total'] / units.Gi)
+        data['free_capacity_gb'] = math.ceil(stats['free'] / units.Gi)
 
         super(GPFSShareDriver, self)._update_share_stats(data)
 
@@ -580,9 +629,10 @@ class GPFSShareDriver(driver.ExecuteMixin, driver.GaneshaMixin,
 class NASHelperBase(object):
     """Interface to work with share."""
 
-    def __init__(self, execute, config_object):
+    def __init__(self, execute, config_object, ssh_execute=None):
         self.configuration = config_object
         self._execute = execute
+        self._ssh_execute = ssh_execute
 
     def create_export(self, local_path):
         """Construct location of new export."""
@@ -605,9 +655,11 @@ class NASHelperBase(object):
 class KNFSHelper(NASHelperBase):
     """Wrapper for Kernel NFS Commands."""
 
-    def __init__(self, execute, config_object):
-        super(KNFSHelper, self).__init__(execute, config_object)
+    def __init__(self, execute, config_object, ssh_execute=None):
+        super(KNFSHelper, self).__init__(execute, config_object,
+                                         ssh_execute=ssh_execute)
         self._execute = execute
+        self._local_ips = None
         try:
             self._execute('exportfs', check_exit_code=True, run_as_root=True)
         except exception.ProcessExecutionError as e:
@@ -615,22 +667,55 @@ class KNFSHelper(NASHelperBase):
             LOG.error(msg)
             raise exception.GPFSException(msg)
 
-    def _publish_access(self, *cmd):
-        for server in self.configuration.gpfs_nfs_server_list:
-            localserver_iplist = socket.gethostbyname_ex(
+    def _get_local_ips(self):
+        if self._local_ips is None:
+            self._local_ips = socket.gethostbyname_ex(
                 socket.gethostname())[2]
-            run_local = True
-            if server not in localserver_iplist:
-                sshlogin = self.configuration.gpfs_ssh_login
-                remote_login = sshlogin + '@' + server
-                cmd = ['ssh', remote_login] + list(cmd)
-                run_local = False
-            try:
-                utils.execute(*cmd,
-                              run_as_root=run_local,
-                              check_exit_code=True)
-            except exception.ProcessExecutionError:
-                raise
+        return self._local_ips
+
+    def _publish_access(self, *cmd):
+        """Runs cmd on all the NFS servers at the same time.
+
+        Every server is tried even if some of them fail, and the failed
+        servers are then reported together.
+        """
+        servers = self.configuration.gpfs_nfs_server_list
+        local_ips = self._get_local_ips()
+        pool = greenpool.GreenPool(
+            max(1, self.configuration.gpfs_nfs_publish_concurrency))
+        errors = pool.imap(
+            lambda server: self._publish_access_on_server(
+                server, local_ips, cmd),
+            servers)
+
+        failures = [(server, error)
+                    for server, error in zip(servers, errors) if error]
+        for server, error in failures:
+            LOG.error(_LE('Failed to publish access on NFS server '
+                          '%(server)s. Error: %(excmsg)s.'),
+                      {'server': server, 'excmsg': error})
+        if failures:
+            raise exception.ProcessExecutionError(
+                cmd=' '.join(cmd),
+                description=(_('Failed on %(failed)d of %(total)d NFS '
+                               'servers.') %
+                             {'failed': len(failures),
+                              'total': len(servers)}),
+                stderr='; '.join('%s: %s' % failure for failure in failures))
+
+    def _publish_access_on_server(self, server, local_ips, cmd):
+        """Runs cmd on an NFS server, returning the error if it fails."""
+        try:
+            if server in local_ips:
+                utils.execute(*cmd, run_as_root=True, check_exit_code=True)
+            elif self._ssh_execute:
+                self._ssh_execute(server, cmd)
+            else:
+                remote_login = self.configuration.gpfs_ssh_login + '@' + server
+                utils.execute('ssh', remote_login, *cmd,
+                              run_as_root=False, check_exit_code=True)
+        except Exception as e:
+            return e
 
     def _get_export_options(self, share):
         """Set various export attributes for share."""
@@ -706,8 +791,9 @@ class KNFSHelper(NASHelperBase):
 class GNFSHelper(NASHelperBase):
     """Wrapper for Ganesha NFS Commands."""
 
-    def __init__(self, execute, config_object):
-        super(GNFSHelper, self).__init__(execute, config_object)
+    def __init__(self, execute, config_object, ssh_execute=None):
+        super(GNFSHelper, self).__init__(execute, config_object,
+                                         ssh_execute=ssh_execute)
         self.default_export_options = dict()
         for m in AVPATTERN.finditer(
             self.configuration.ganesha_nfs_export_options
@@ -19,14 +19,18 @@ Contains classes required to issue API calls to Data ONTAP and OnCommand DFM.
 """
 
 import copy
-import urllib2
+import threading
+import time
 
 from lxml import etree
 from oslo_log import log
+import requests
+from requests import adapters
 import six
 
 from manila import exception
 from manila.i18n import _
+from manila.share.drivers import rest_transport
 
 
 LOG = log.getLogger(__name__)
@@ -43,6 +47,85 @@ EVOL_NOT_MOUNTED = '14716'
 ESIS_CLONE_NOT_LICENSED = '14956'
 EOBJECTNOTFOUND = '15661'
 
+# Maximum number of connections kept open to a cluster.
+CONNECTION_POOL_SIZE = 10
+
+
+class _ConnectionPools(object):
+    """HTTP sessions shared by all NaServer objects of a cluster.
+
+    Each session keeps a pool of connections to the cluster alive, so
+    that ZAPI calls do not pay for a new TCP and TLS handshake, whatever
+    the vserver they are tunneled to.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Returns the session for (protocol, host, port, user, password)."""
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                session.auth = (key[3], key[4])
+                session.verify = rest_transport.get_system_ca_bundle()
+                session.mount(key[0] + '://', adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=CONNECTION_POOL_SIZE))
+                self._sessions[key] = session
+            return session
+
+    def clear(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+class _ApiMetrics(object):
+    """Number, latency and response size of ZAPI calls per API name."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, api_name, seconds, size):
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                api_name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                           'bytes': 0})
+            metrics['calls'] += 1
+            metrics['seconds'] += seconds
+            metrics['max_seconds'] = max(metrics['max_seconds'], seconds)
+            metrics['bytes'] += size
+
+    def get(self):
+        with self._lock:
+            return copy.deepcopy(self._metrics)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+_POOLS = _ConnectionPools()
+_METRICS = _ApiMetrics()
+
+
+def get_api_metrics():
+    """Returns the call metrics of each API name invoked so far.
+
+    Each value is a dict with the number of calls, their total and
+    maximum latency in seconds, and the total size of the responses in
+    bytes.
+    """
+    return _METRICS.get()
+
+
+def reset_api_metrics():
+    _METRICS.reset()
+
 
 class NaServer(object):
     """Encapsulates server connection logic."""
@@ -70,7 +153,6 @@ class NaServer(object):
         self._username = username
         self._password = password
         self._trace = trace
-        self._refresh_conn = True
         self._trace = trace
 
         LOG.debug('Using NetApp controller: %s', self._host)
@@ -99,7 +181,6 @@ class NaServer(object):
                 self.set_port(443)
             else:
                 self.set_port(8488)
-        self._refresh_conn = True
 
     def get_style(self):
         """Get the authorization style for communicating with the server."""
@@ -133,7 +214,6 @@ class NaServer(object):
         else:
             self._url = NaServer.URL_DFM
         self._ns = NaServer.NETAPP_NS
-        self._refresh_conn = True
 
     def set_api_version(self, major, minor):
         """Set the API version."""
@@ -144,7 +224,6 @@ class NaServer(object):
                 six.text_type(minor)
         except ValueError:
             raise ValueError('Major and minor versions must be integers')
-        self._refresh_conn = True
 
     def get_api_version(self):
         """Gets the API version tuple."""
@@ -159,7 +238,6 @@ class NaServer(object):
         except ValueError:
             raise ValueError('Port must be integer')
         self._port = six.text_type(port)
-        self._refresh_conn = True
 
     def get_port(self):
         """Get the server communication port."""
@@ -197,12 +275,10 @@ class NaServer(object):
     def set_username(self, username):
         """Set the user name for authentication."""
         self._username = username
-        self._refresh_conn = True
 
     def set_password(self, password):
         """Set the password for authentication."""
         self._password = password
-        self._refresh_conn = True
 
     def set_trace(self, trace=True):
         """Enable or disable the API tracing facility."""
@@ -219,20 +295,21 @@ class NaServer(object):
         if self._trace:
             LOG.debug("Request: %s", request_element.to_string(pretty=True))
 
-        if not hasattr(self, '_opener') or not self._opener \
-                or self._refresh_conn:
-            self._build_opener()
+        start = time.time()
         try:
-            if hasattr(self, '_timeout'):
-                response = self._opener.open(request, timeout=self._timeout)
-            else:
-                response = self._opener.open(request)
-        except urllib2.HTTPError as e:
-            raise NaApiError(e.code, e.msg)
+            response = self._get_session().post(
+                self._get_url(), data=request,
+                headers={'Content-Type': 'text/xml', 'charset': 'utf-8'},
+                timeout=getattr(self, '_timeout', None))
         except Exception as e:
             raise NaApiError('Unexpected error', e)
 
-        response_xml = response.read()
+        if response.status_code >= 400:
+            raise NaApiError(response.status_code, response.reason)
+
+        response_xml = response.content
+        _METRICS.record(na_element.get_name(), time.time() - start,
+                        len(response_xml))
         response_element = self._get_result(response_xml)
 
         if self._trace:
@@ -271,10 +348,7 @@ class NaServer(object):
         if enable_tunneling:
             self._enable_tunnel_request(netapp_elem)
         netapp_elem.add_child_elem(na_element)
-        request_d = netapp_elem.to_string()
-        request = urllib2.Request(
-            self._get_url(), data=request_d,
-            headers={'Content-Type': 'text/xml', 'charset': 'utf-8'})
+        request = netapp_elem.to_string()
         return request, netapp_elem
 
     def _enable_tunnel_request(self, netapp_elem):
@@ -314,23 +388,11 @@ class NaServer(object):
         return '%s://%s:%s/%s' % (self._protocol, self._host, self._port,
                                   self._url)
 
-    def _build_opener(self):
-        if self._auth_style == NaServer.STYLE_LOGIN_PASSWORD:
-            auth_handler = self._create_basic_auth_handler()
-        else:
-            auth_handler = self._create_certificate_auth_handler()
-        opener = urllib2.build_opener(auth_handler)
-        self._opener = opener
-
-    def _create_basic_auth_handler(self):
-        password_man = urllib2.HTTPPasswordMgrWithDefaultRealm()
-        password_man.add_password(None, self._get_url(), self._username,
-                                  self._password)
-        auth_handler = urllib2.HTTPBasicAuthHandler(password_man)
-        return auth_handler
-
-    def _create_certificate_auth_handler(self):
-        raise NotImplementedError()
+    def _get_session(self):
+        if self._auth_style != NaServer.STYLE_LOGIN_PASSWORD:
+            raise NotImplementedError()
+        return _POOLS.get((self._protocol, self._host, self._port,
+                           self._username, self._password))
 
     def __str__(self):
         return "server: %s" % (self._host)
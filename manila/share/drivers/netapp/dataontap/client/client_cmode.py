@@ -31,6 +31,7 @@ from manila.share.drivers.netapp import utils as na_utils
 
 LOG = log.getLogger(__name__)
 DELETED_PREFIX = 'deleted_manila_'
+DEFAULT_MAX_PAGE_LENGTH = 50
 
 
 class NetAppCmodeClient(client_base.NetAppBaseClient):
@@ -58,6 +59,32 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
         else:
             return True
 
+    def _get_iter_records(self, api_name, api_args=None,
+                          max_page_length=DEFAULT_MAX_PAGE_LENGTH):
+        """Yields the records returned by a *-get-iter API, page by page.
+
+        The next-tag of each response is followed until the last page,
+        so that no records are left out while only one page of them is
+        held at a time. Use desired-attributes in api_args to limit the
+        fields returned for each record.
+        """
+        tag = None
+        while True:
+            page_args = dict(api_args or {})
+            page_args['max-records'] = max_page_length
+            if tag:
+                page_args['tag'] = tag
+            result = self.send_request(api_name, page_args)
+
+            attributes_list = result.get_child_by_name(
+                'attributes-list') or netapp_api.NaElement('none')
+            for record in attributes_list.get_children():
+                yield record
+
+            tag = result.get_child_content('next-tag')
+            if not tag:
+                return
+
     def set_vserver(self, vserver):
         self.vserver = vserver
         self.connection.set_vserver(vserver)
@@ -101,6 +128,7 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Vserver names are unique, so no more than one record can match.
         result = self.send_request('vserver-get-iter', api_args)
         return self._has_records(result)
 
@@ -119,6 +147,7 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Vserver names are unique, so no more than one record can match.
         vserver_info = self.send_request('vserver-get-iter', api_args)
 
         try:
@@ -150,11 +179,9 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
         if query:
             api_args['query'] = query
 
-        result = self.send_request('vserver-get-iter', api_args)
-        vserver_info_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
         return [vserver_info.get_child_content('vserver-name')
-                for vserver_info in vserver_info_list.get_children()]
+                for vserver_info in self._get_iter_records(
+                    'vserver-get-iter', api_args)]
 
     @na_utils.trace
     def get_vserver_volume_count(self, max_records=20):
@@ -173,6 +200,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Only the first page is read on purpose: callers just need to
+        # know whether there are fewer than max_records volumes.
         volumes_data = self.send_request('volume-get-iter', api_args)
         return int(volumes_data.get_child_content('num-records'))
 
@@ -240,11 +269,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_request('system-node-get-iter', api_args)
-        nodes_info_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
         return [node_info.get_child_content('node') for node_info
-                in nodes_info_list.get_children()]
+                in self._get_iter_records('system-node-get-iter', api_args)]
 
     @na_utils.trace
     def list_node_data_ports(self, node):
@@ -272,12 +298,9 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_request('net-port-get-iter', api_args)
-        net_port_info_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-
         ports = []
-        for port_info in net_port_info_list.get_children():
+        for port_info in self._get_iter_records('net-port-get-iter',
+                                                api_args):
 
             # Skip physical ports that are part of interface groups.
             if port_info.get_child_content('ifgrp-port'):
@@ -313,22 +336,19 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
     @na_utils.trace
     def list_aggregates(self):
         """Get names of all aggregates."""
-        try:
-            api_args = {
-                'desired-attributes': {
-                    'aggr-attributes': {
-                        'aggregate-name': None,
-                    },
+        api_args = {
+            'desired-attributes': {
+                'aggr-attributes': {
+                    'aggregate-name': None,
                 },
-            }
-            result = self.send_request('aggr-get-iter', api_args)
-            aggr_list = result.get_child_by_name(
-                'attributes-list').get_children()
-        except AttributeError:
+            },
+        }
+        aggr_names = [aggr.get_child_content('aggregate-name') for aggr
+                      in self._get_iter_records('aggr-get-iter', api_args)]
+        if not aggr_names:
             msg = _("Could not list aggregates.")
             raise exception.NetAppException(msg)
-        return [aggr.get_child_content('aggregate-name') for aggr
-                in aggr_list]
+        return aggr_names
 
     @na_utils.trace
     def list_vserver_aggregates(self):
@@ -416,6 +436,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Only whether any LIF matches is needed, which the first page
+        # answers.
         result = self.send_request('net-interface-get-iter', api_args)
         return self._has_records(result)
 
@@ -429,11 +451,9 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_request('net-interface-get-iter', api_args)
-        lif_info_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
         return [lif_info.get_child_content('interface-name') for lif_info
-                in lif_info_list.get_children()]
+                in self._get_iter_records('net-interface-get-iter',
+                                          api_args)]
 
     @na_utils.trace
     def get_network_interfaces(self, protocols=None):
@@ -451,12 +471,9 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
             }
         } if protocols else None
 
-        result = self.send_request('net-interface-get-iter', api_args)
-        lif_info_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-
         interfaces = []
-        for lif_info in lif_info_list.get_children():
+        for lif_info in self._get_iter_records('net-interface-get-iter',
+                                               api_args):
             lif = {
                 'address': lif_info.get_child_content('address'),
                 'home-node': lif_info.get_child_content('home-node'),
@@ -584,11 +601,7 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
         if desired_attributes:
             api_args['desired-attributes'] = desired_attributes
 
-        result = self.send_request('aggr-get-iter', api_args)
-        if not self._has_records(result):
-            return []
-        else:
-            return result.get_child_by_name('attributes-list').get_children()
+        return list(self._get_iter_records('aggr-get-iter', api_args))
 
     @na_utils.trace
     def setup_security_services(self, security_services, vserver_client,
@@ -820,6 +833,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Volume names are unique within a vserver, so no more than one
+        # record can match.
         result = self.send_request('volume-get-iter', api_args)
         return self._has_records(result)
 
@@ -844,6 +859,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Volume names are unique within a vserver, so no more than one
+        # record can match.
         result = self.send_request('volume-get-iter', api_args)
 
         attributes_list = result.get_child_by_name(
@@ -946,6 +963,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Snapshot names are unique within a volume, so no more than one
+        # record can match.
         result = self.send_request('snapshot-get-iter', api_args)
 
         error_record_list = result.get_child_by_name(
@@ -1018,6 +1037,25 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
         }
         self.send_request('cifs-share-access-control-create', api_args)
 
+    @na_utils.trace
+    def get_cifs_share_access(self, share_name):
+        """Returns the users and groups a CIFS share grants access to."""
+        api_args = {
+            'query': {
+                'cifs-share-access-control': {
+                    'share': share_name,
+                },
+            },
+            'desired-attributes': {
+                'cifs-share-access-control': {
+                    'user-or-group': None,
+                },
+            },
+        }
+        return [access_control.get_child_content('user-or-group')
+                for access_control in self._get_iter_records(
+                    'cifs-share-access-control-get-iter', api_args)]
+
     @na_utils.trace
     def remove_cifs_share_access(self, share_name, user_name):
         api_args = {'user-or-group': user_name, 'share': share_name}
@@ -1091,14 +1129,9 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_request('export-rule-get-iter', api_args)
-
-        attributes_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-        export_rule_info_list = attributes_list.get_children()
-
         rule_indices = [int(export_rule_info.get_child_content('rule-index'))
-                        for export_rule_info in export_rule_info_list]
+                        for export_rule_info in self._get_iter_records(
+                            'export-rule-get-iter', api_args)]
         rule_indices.sort()
         return [six.text_type(rule_index) for rule_index in rule_indices]
 
@@ -1120,6 +1153,100 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 if e.code != netapp_api.EOBJECTNOTFOUND:
                     raise
 
+    @na_utils.trace
+    def get_nfs_export_rules(self, policy_name):
+        """Returns the rules of an export policy, ordered by rule index.
+
+        Each rule is a dict with its rule-index, client-match and whether
+        it is read only.
+        """
+        api_args = {
+            'query': {
+                'export-rule-info': {
+                    'policy-name': policy_name,
+                },
+            },
+            'desired-attributes': {
+                'export-rule-info': {
+                    'client-match': None,
+                    'rule-index': None,
+                    'rw-rule': {
+                        'security-flavor': None,
+                    },
+                },
+            },
+        }
+        rules = []
+        for export_rule_info in self._get_iter_records('export-rule-get-iter',
+                                                       api_args):
+            rw_rule = export_rule_info.get_child_by_name(
+                'rw-rule') or netapp_api.NaElement('none')
+            rw_flavors = [flavor.get_content()
+                          for flavor in rw_rule.get_children()]
+            rules.append({
+                'rule-index': int(
+                    export_rule_info.get_child_content('rule-index')),
+                'client-match': export_rule_info.get_child_content(
+                    'client-match'),
+                'readonly': 'never' in rw_flavors,
+            })
+        return sorted(rules, key=lambda rule: rule['rule-index'])
+
+    @na_utils.trace
+    def update_nfs_export_rules(self, policy_name, add_rules=None,
+                                remove_rules=None):
+        """Adds, changes and removes rules of an export policy at once.
+
+        :param policy_name: name of the export policy
+        :param add_rules: dict mapping the client-match of each rule to
+            add or change to whether it is read only
+        :param remove_rules: client-match of each rule to remove
+        """
+        existing_rules = self.get_nfs_export_rules(policy_name)
+        rules = dict((rule['client-match'], rule['readonly'])
+                     for rule in reversed(existing_rules))
+        rules.update(add_rules or {})
+        for rule in remove_rules or []:
+            rules.pop(rule, None)
+        self._apply_nfs_export_rules(policy_name, existing_rules, rules)
+
+    @na_utils.trace
+    def reconcile_nfs_export_rules(self, policy_name, rules):
+        """Makes the rules of an export policy match the given ones.
+
+        :param policy_name: name of the export policy
+        :param rules: dict mapping the client-match of each rule the
+            policy should have to whether it is read only
+        """
+        self._apply_nfs_export_rules(
+            policy_name, self.get_nfs_export_rules(policy_name), rules)
+
+    def _apply_nfs_export_rules(self, policy_name, existing_rules, rules):
+        """Turns the existing rules of a policy into the given ones.
+
+        Rules that are already right are left alone, and stale rules are
+        modified into missing ones before any rule is created or
+        destroyed, so that a call is made per rule at most.
+        """
+        missing_rules = dict(rules)
+        stale_indices = []
+        for rule in existing_rules:
+            client_match = rule['client-match']
+            if missing_rules.get(client_match) == rule['readonly']:
+                del missing_rules[client_match]
+            else:
+                stale_indices.append(six.text_type(rule['rule-index']))
+        missing_rules = sorted(missing_rules.items())
+
+        for rule_index, (rule, readonly) in zip(stale_indices,
+                                                missing_rules):
+            self._update_nfs_export_rule(policy_name, rule, readonly,
+                                         rule_index)
+        self._remove_nfs_export_rules(policy_name,
+                                      stale_indices[len(missing_rules):])
+        for rule, readonly in missing_rules[len(stale_indices):]:
+            self._add_nfs_export_rule(policy_name, rule, readonly)
+
     @na_utils.trace
     def clear_nfs_export_policy_for_volume(self, volume_name):
         self.set_nfs_export_policy_for_volume(volume_name, 'default')
@@ -1164,6 +1291,8 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
+        # Volume names are unique within a vserver, so no more than one
+        # record can match.
         result = self.send_request('volume-get-iter', api_args)
 
         attributes_list = result.get_child_by_name(
@@ -1245,13 +1374,9 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                 },
             },
         }
-        result = self.send_request('export-policy-get-iter', api_args)
-
-        attributes_list = result.get_child_by_name(
-            'attributes-list') or netapp_api.NaElement('none')
-
         policy_map = {}
-        for export_info in attributes_list.get_children():
+        for export_info in self._get_iter_records('export-policy-get-iter',
+                                                  api_args):
             vserver = export_info.get_child_content('vserver')
             policies = policy_map.get(vserver, [])
             policies.append(export_info.get_child_content('policy-name'))
@@ -1350,6 +1475,7 @@ class NetAppCmodeClient(client_base.NetAppBaseClient):
                     },
                 },
             }
+            # A single page is enough, since max-records is 1.
             result = self.send_request('storage-disk-get-iter', api_args)
 
             attributes_list = result.get_child_by_name(
@@ -70,6 +70,12 @@ class NetAppCmodeMultiSvmShareDriver(driver.ShareDriver):
     def deny_access(self, context, share, access, **kwargs):
         self.library.deny_access(context, share, access, **kwargs)
 
+    def update_access(self, context, share, access_rules, add_rules=None,
+                      delete_rules=None, **kwargs):
+        self.library.update_access(context, share, access_rules,
+                                   add_rules=add_rules,
+                                   delete_rules=delete_rules, **kwargs)
+
     def _update_share_stats(self, data=None):
         data = self.library.get_share_stats()
         super(NetAppCmodeMultiSvmShareDriver, self)._update_share_stats(
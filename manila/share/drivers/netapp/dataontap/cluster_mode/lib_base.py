@@ -45,6 +45,7 @@ class NetAppCmodeFileStorageLibrary(object):
 
     AUTOSUPPORT_INTERVAL_SECONDS = 3600  # hourly
     SSC_UPDATE_INTERVAL_SECONDS = 3600  # hourly
+    POOL_STATS_UPDATE_INTERVAL_SECONDS = 60  # every minute
     HOUSEKEEPING_INTERVAL_SECONDS = 600  # ten minutes
 
     # Maps NetApp qualified extra specs keys to corresponding backend API
@@ -78,6 +79,7 @@ class NetAppCmodeFileStorageLibrary(object):
         self._client = None
         self._clients = {}
         self._ssc_stats = {}
+        self._pool_stats = ()
         self._have_cluster_creds = None
 
         self._app_version = kwargs.get('app_version', 'unknown')
@@ -154,6 +156,15 @@ class NetAppCmodeFileStorageLibrary(object):
         ssc_periodic_task.start(interval=self.SSC_UPDATE_INTERVAL_SECONDS,
                                 initial_delay=self.SSC_UPDATE_INTERVAL_SECONDS)
 
+        # Collect pool stats once now as well, so that the first call of
+        # get_share_stats has them, then keep them up to date.
+        self._update_pool_stats()
+        pool_stats_periodic_task = loopingcall.FixedIntervalLoopingCall(
+            self._update_pool_stats)
+        pool_stats_periodic_task.start(
+            interval=self.POOL_STATS_UPDATE_INTERVAL_SECONDS,
+            initial_delay=self.POOL_STATS_UPDATE_INTERVAL_SECONDS)
+
         # Start the task that logs autosupport (EMS) data to the controller
         ems_periodic_task = loopingcall.FixedIntervalLoopingCall(
             self._handle_ems_logging)
@@ -199,10 +210,28 @@ class NetAppCmodeFileStorageLibrary(object):
             'storage_protocol': 'NFS_CIFS',
             'total_capacity_gb': 0.0,
             'free_capacity_gb': 0.0,
+            'pools': [dict(pool) for pool in self._pool_stats],
         }
+        return data
+
+    @na_utils.trace
+    def _update_pool_stats(self):
+        """Periodically runs to collect capacity and SSC data of the pools.
+
+        get_share_stats reports the last data collected, so that the
+        stats reporting of the share manager does not wait for the
+        cluster. The data is replaced at once, and is never modified.
+        """
+        try:
+            aggr_space = self._get_aggregate_space()
+        except Exception as e:
+            # Keep the task running and the previous data reported.
+            LOG.error(_LE("Could not update pool stats for backend "
+                          "'%(backend)s'. %(error)s"),
+                      {'backend': self._backend_name, 'error': e})
+            return
 
         pools = []
-        aggr_space = self._get_aggregate_space()
 
         for aggr_name in sorted(aggr_space.keys()):
 
@@ -229,8 +258,7 @@ class NetAppCmodeFileStorageLibrary(object):
 
             pools.append(pool)
 
-        data['pools'] = pools
-        return data
+        self._pool_stats = tuple(pools)
 
     @na_utils.trace
     def _handle_ems_logging(self):
@@ -616,6 +644,21 @@ class NetAppCmodeFileStorageLibrary(object):
         helper.set_client(vserver_client)
         helper.deny_access(context, share, share_name, access)
 
+    @na_utils.trace
+    def update_access(self, context, share, access_rules, add_rules=None,
+                      delete_rules=None, share_server=None):
+        """Updates access rules of a given NAS storage at once.
+
+        Without add_rules and delete_rules, the access rules of the
+        storage are made to match access_rules, e.g. to re-sync them.
+        """
+        vserver, vserver_client = self._get_vserver(share_server=share_server)
+        share_name = self._get_valid_share_name(share['id'])
+        helper = self._get_helper(share)
+        helper.set_client(vserver_client)
+        helper.update_access(context, share, share_name, access_rules,
+                             add_rules=add_rules, delete_rules=delete_rules)
+
     def setup_server(self, network_info, metadata=None):
         raise NotImplementedError()
 
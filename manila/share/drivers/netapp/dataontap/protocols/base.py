@@ -44,6 +44,21 @@ class NetAppBaseHelper(object):
     def deny_access(self, context, share, share_name, access):
         """Denies new_rules to a given NAS storage in new_rules."""
 
+    def update_access(self, context, share, share_name, access_rules,
+                      add_rules=None, delete_rules=None):
+        """Updates access rules of a given NAS storage, rule by rule.
+
+        Making the storage match access_rules, without add_rules and
+        delete_rules, needs its current rules, so helpers that can read
+        them override this.
+        """
+        if add_rules is None and delete_rules is None:
+            raise NotImplementedError()
+        for access in delete_rules or []:
+            self.deny_access(context, share, share_name, access)
+        for access in add_rules or []:
+            self.allow_access(context, share, share_name, access)
+
     @abc.abstractmethod
     def get_target(self, share):
         """Returns host where the share located."""
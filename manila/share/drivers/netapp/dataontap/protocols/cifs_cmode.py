@@ -79,6 +79,26 @@ class NetAppCmodeCIFSHelper(base.NetAppBaseHelper):
             else:
                 raise e
 
+    @na_utils.trace
+    def update_access(self, context, share, share_name, access_rules,
+                      add_rules=None, delete_rules=None):
+        """Updates the users allowed to the CIFS share at once.
+
+        Without add_rules and delete_rules, the users the share grants
+        access to are read and made to match access_rules.
+        """
+        if add_rules is None and delete_rules is None:
+            target, cifs_share_name = self._get_export_location(share)
+            current = set(self._client.get_cifs_share_access(cifs_share_name))
+            wanted = set(access['access_to'] for access in access_rules)
+            delete_rules = [{'access_type': 'user', 'access_to': user_name}
+                            for user_name in sorted(current - wanted)]
+            add_rules = [access for access in access_rules
+                         if access['access_to'] not in current]
+        super(NetAppCmodeCIFSHelper, self).update_access(
+            context, share, share_name, access_rules,
+            add_rules=add_rules, delete_rules=delete_rules)
+
     @na_utils.trace
     def get_target(self, share):
         """Returns OnTap target IP based on share export location."""
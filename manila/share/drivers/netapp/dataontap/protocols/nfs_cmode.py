@@ -57,14 +57,7 @@ class NetAppCmodeNFSHelper(base.NetAppBaseHelper):
         self._ensure_export_policy(share, share_name)
         export_policy_name = self._get_export_policy_name(share)
         rule = access['access_to']
-
-        if access['access_level'] == constants.ACCESS_LEVEL_RW:
-            readonly = False
-        elif access['access_level'] == constants.ACCESS_LEVEL_RO:
-            readonly = True
-        else:
-            raise exception.InvalidShareAccessLevel(
-                level=access['access_level'])
+        readonly = self._is_readonly(access)
 
         self._client.add_nfs_export_rule(export_policy_name, rule, readonly)
 
@@ -79,6 +72,49 @@ class NetAppCmodeNFSHelper(base.NetAppBaseHelper):
         rule = access['access_to']
         self._client.remove_nfs_export_rule(export_policy_name, rule)
 
+    @na_utils.trace
+    def update_access(self, context, share, share_name, access_rules,
+                      add_rules=None, delete_rules=None):
+        """Updates the export rules of an NFS share at once.
+
+        The export policy is read once and only the rules that differ
+        are changed. Without add_rules and delete_rules, the policy is
+        made to match access_rules.
+        """
+        self._ensure_export_policy(share, share_name)
+        export_policy_name = self._get_export_policy_name(share)
+
+        if add_rules is None and delete_rules is None:
+            self._client.reconcile_nfs_export_rules(
+                export_policy_name, self._get_export_rules(access_rules))
+        else:
+            self._client.update_nfs_export_rules(
+                export_policy_name,
+                add_rules=self._get_export_rules(add_rules or []),
+                remove_rules=[access['access_to']
+                              for access in delete_rules or []
+                              if access['access_type'] == 'ip'])
+
+    @staticmethod
+    def _is_readonly(access):
+        if access['access_level'] == constants.ACCESS_LEVEL_RW:
+            return False
+        elif access['access_level'] == constants.ACCESS_LEVEL_RO:
+            return True
+        else:
+            raise exception.InvalidShareAccessLevel(
+                level=access['access_level'])
+
+    def _get_export_rules(self, access_rules):
+        """Maps the client of each access rule to whether it is read only."""
+        rules = {}
+        for access in access_rules:
+            if access['access_type'] != 'ip':
+                reason = _('Only ip access type allowed.')
+                raise exception.InvalidShareAccess(reason)
+            rules[access['access_to']] = self._is_readonly(access)
+        return rules
+
     @na_utils.trace
     def get_target(self, share):
         """Returns ID of target OnTap device based on export location."""
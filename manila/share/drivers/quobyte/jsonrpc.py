@@ -19,19 +19,18 @@ Control Quobyte over its JSON RPC API.
 """
 
 import base64
-import httplib
-import socket
-import ssl
-import time
+import itertools
 
 from oslo_log import log
 from oslo_serialization import jsonutils
+import requests
 import six
 import six.moves.urllib.parse as urlparse
 
 from manila import exception
 from manila.i18n import _
 from manila.i18n import _LW
+from manila.share.drivers import rest_transport
 
 LOG = log.getLogger(__name__)
 
@@ -39,6 +38,8 @@ ERROR_ENOENT = 2
 
 CONNECTION_RETRIES = 3
 
+DEFAULT_POOL_SIZE = 10
+
 
 class BasicAuthCredentials(object):
     def __init__(self, username, password):
@@ -55,132 +56,146 @@ class BasicAuthCredentials(object):
         return 'BASIC %s' % auth
 
 
-class HTTPSConnectionWithCaVerification(httplib.HTTPConnection):
-    """Verify server cert against a given CA certificate."""
-
-    default_port = httplib.HTTPS_PORT
-
-    def __init__(self, host, port=None, key_file=None, cert_file=None,
-                 ca_file=None, strict=None,
-                 timeout=socket._GLOBAL_DEFAULT_TIMEOUT):
-        httplib.HTTPConnection.__init__(self, host, port, strict, timeout)
-        self.key_file = key_file
-        self.cert_file = cert_file
-        self.ca_file = ca_file
-
-    def connect(self):
-        """Connect to a host on a given (SSL) port."""
-        sock = socket.create_connection((self.host, self.port), self.timeout)
-        if self._tunnel_host:
-            self.sock = sock
-            self._tunnel()
-        self.sock = ssl.wrap_socket(sock, keyfile=self.key_file,
-                                    certfile=self.cert_file,
-                                    ca_certs=self.ca_file,
-                                    cert_reqs=ssl.CERT_REQUIRED)
-
-    httplib.__all__.append("HTTPSConnectionWithCaVerification")
+class JsonRpc(object):
+    """JSON RPC client of the Quobyte API service.
 
+    Calls are posted over a pool of keep-alive connections, so concurrent
+    green threads may share one client. call_batch posts several calls as
+    one JSON-RPC 2.0 batch request, or one by one if the service does not
+    accept batches.
+    """
 
-class JsonRpc(object):
-    def __init__(self, url, user_credentials, ca_file=None):
+    def __init__(self, url, user_credentials, ca_file=None,
+                 pool_size=DEFAULT_POOL_SIZE):
         parsedurl = urlparse.urlparse(url)
         self._url = parsedurl.geturl()
         self._netloc = parsedurl.netloc
         self._ca_file = ca_file
+        self._ids = itertools.count(1)
+        self._credentials = BasicAuthCredentials(
+            user_credentials[0], user_credentials[1])
+        self._require_cert_verify = self._ca_file is not None
+        self._disabled_cert_verification = False
+        self._batch_unsupported = False
+        verify = True
         if parsedurl.scheme == 'https':
             if self._ca_file:
-                self._connection = HTTPSConnectionWithCaVerification(
-                    self._netloc,
-                    ca_file=self._ca_file.name)
+                verify = self._ca_file.name
             else:
-                self._connection = httplib.HTTPSConnection(self._netloc)
                 LOG.warning(_LW(
                     "Will not verify the server certificate of the API service"
                     " because the CA certificate is not available."))
-        else:
-            self._connection = httplib.HTTPConnection(self._netloc)
-        self._id = 0
-        self._fail_fast = True
-        self._credentials = BasicAuthCredentials(
-            user_credentials[0], user_credentials[1])
-        self._require_cert_verify = self._ca_file is not None
-        self._disabled_cert_verification = False
-
-    def call(self, method_name, user_parameters):
-
+        # Connections to the API service are kept alive between calls,
+        # and calls that cannot connect are retried with a backoff.
+        self._transport = rest_transport.RestTransport(
+            headers=dict(Authorization=(self._credentials.
+                                        get_authorization_header())),
+            verify=verify,
+            retries=CONNECTION_RETRIES - 1,
+            pool_size=pool_size)
+
+    def _make_call_body(self, method_name, user_parameters):
         parameters = {'retry': 'INFINITELY'}  # Backend specific setting
         if user_parameters:
             parameters.update(user_parameters)
-        call_body = {'jsonrpc': '2.0',
-                     'method': method_name,
-                     'params': parameters,
-                     'id': six.text_type(self._id)}
-        self.call_counter = 0
-
-        while self.call_counter < CONNECTION_RETRIES:
-            self.call_counter += 1
-            try:
-                self._id += 1
-                call_body['id'] = six.text_type(self._id)
-                LOG.debug("Posting to Quobyte backend: %s",
-                          jsonutils.dumps(call_body))
-                self._connection.request(
-                    "POST", self._url + '/', jsonutils.dumps(call_body),
-                    dict(Authorization=(self._credentials.
-                                        get_authorization_header())))
-
-                response = self._connection.getresponse()
-                self._throw_on_http_error(response)
-                result = jsonutils.loads(response.read())
-                LOG.debug("Retrieved data from Quobyte backend: %s", result)
-                return self._checked_for_application_error(result)
-            except ssl.SSLError as e:
-                # Generic catch because OpenSSL does not return
-                # meaningful errors.
-                if (not self._disabled_cert_verification
-                        and not self._require_cert_verify):
-                    LOG.warning(_LW(
-                        "Could not verify server certificate of "
-                        "API service against CA."))
-                    self._connection.close()
-                    # Core HTTPSConnection does no certificate verification.
-                    self._connection = httplib.HTTPSConnection(self._netloc)
-                    self._disabled_cert_verification = True
-                else:
-                    raise exception.QBException(_(
-                        "Client SSL subsystem returned error: %s") % e)
-            except httplib.BadStatusLine as e:
+        return {'jsonrpc': '2.0',
+                'method': method_name,
+                'params': parameters,
+                'id': six.text_type(next(self._ids))}
+
+    def call(self, method_name, user_parameters):
+        call_body = self._make_call_body(method_name, user_parameters)
+        LOG.debug("Posting to Quobyte backend: %s",
+                  jsonutils.dumps(call_body))
+
+        response = self._post(jsonutils.dumps(call_body))
+        self._throw_on_http_error(response)
+        result = jsonutils.loads(response.text)
+        LOG.debug("Retrieved data from Quobyte backend: %s", result)
+        return self._checked_for_application_error(result)
+
+    def call_batch(self, calls):
+        """Posts several calls in one batch request.
+
+        :param calls: list of (method_name, user_parameters) tuples.
+        :returns: the list of the results of the calls, in the order of
+                  calls. The first failed call raises its error.
+        """
+        if not calls:
+            return []
+        if self._batch_unsupported:
+            return self._call_each(calls)
+        call_bodies = [self._make_call_body(method_name, user_parameters)
+                       for method_name, user_parameters in calls]
+        LOG.debug("Posting batch to Quobyte backend: %s",
+                  jsonutils.dumps(call_bodies))
+
+        response = self._post(jsonutils.dumps(call_bodies))
+        self._throw_on_http_error(response)
+        results = jsonutils.loads(response.text)
+        LOG.debug("Retrieved data from Quobyte backend: %s", results)
+        if not isinstance(results, list):
+            # A single error object answers a batch the service rejects,
+            # so the calls are posted one by one from now on.
+            LOG.warning(_LW("The Quobyte API service rejected a batch "
+                            "request: %s. Posting the calls one by one."),
+                        results)
+            self._batch_unsupported = True
+            return self._call_each(calls)
+
+        results_by_id = dict((result.get('id'), result)
+                             for result in results)
+        checked_results = []
+        for call_body in call_bodies:
+            result = results_by_id.get(call_body['id'])
+            if result is None:
+                raise exception.QBException(
+                    _("JSON RPC failed: no response to %s in batch") %
+                    call_body['method'])
+            checked_results.append(
+                self._checked_for_application_error(result))
+        return checked_results
+
+    def _call_each(self, calls):
+        return [self.call(method_name, user_parameters)
+                for method_name, user_parameters in calls]
+
+    def _post(self, body):
+        try:
+            return self._transport.post(self._url + '/', data=body)
+        except requests.exceptions.SSLError as e:
+            # Generic catch because OpenSSL does not return
+            # meaningful errors.
+            if (self._disabled_cert_verification
+                    or self._require_cert_verify):
                 raise exception.QBException(_(
-                    "If SSL is enabled for the API service, the URL must"
-                    " start with 'https://' for the URL. Failed to parse"
-                    " status code from server response. Error was %s")
-                    % e)
-            except (httplib.HTTPException, socket.error) as e:
-                if self._fail_fast:
-                    raise exception.QBException(msg=six.text_type(e))
-                else:
-                    LOG.warning(_LW("Encountered error, retrying: %s"),
-                                six.text_type(e))
-                    time.sleep(1)
-        raise exception.QBException("Unable to connect to backend after "
-                                    "%s retries" %
-                                    six.text_type(CONNECTION_RETRIES))
+                    "Client SSL subsystem returned error: %s") % e)
+            LOG.warning(_LW(
+                "Could not verify server certificate of "
+                "API service against CA."))
+            self._transport.verify = False
+            self._disabled_cert_verification = True
+            return self._post(body)
+        except requests.RequestException as e:
+            raise exception.QBException(_(
+                "Unable to connect to backend after %(retries)s retries: "
+                "%(error)s") % {'retries': CONNECTION_RETRIES,
+                                'error': six.text_type(e)})
 
     def _throw_on_http_error(self, response):
-        if response.status == 401:
+        if response.status_code == 401:
             raise exception.QBException(
                 _("JSON RPC failed: unauthorized user %(status)s %(reason)s"
                   " Please check the Quobyte API service log for "
                   "more details.")
-                % {'status': six.text_type(response.status),
+                % {'status': six.text_type(response.status_code),
                    'reason': response.reason})
-        elif response.status >= 300:
+        elif response.status_code >= 300:
             raise exception.QBException(
                 _("JSON RPC failed:  %(status)s %(reason)s"
                   " Please check the Quobyte API service log for "
                   "more details.")
-                % {'status': six.text_type(response.status),
+                % {'status': six.text_type(response.status_code),
                    'reason': response.reason})
 
     def _checked_for_application_error(self, result):
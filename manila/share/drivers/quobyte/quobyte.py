@@ -58,6 +58,10 @@ quobyte_manila_share_opts = [
     cfg.StrOpt('quobyte_default_volume_group',
                default='root',
                help='Default owning group for new volumes.'),
+    cfg.IntOpt('quobyte_api_pool_size',
+               default=jsonrpc.DEFAULT_POOL_SIZE,
+               help='Number of connections to the Quobyte API server '
+                    'kept alive for concurrent calls.'),
 ]
 
 CONF = cfg.CONF
@@ -82,7 +86,8 @@ class QuobyteShareDriver(driver.ExecuteMixin, driver.ShareDriver,):
             ca_file=self.configuration.quobyte_api_ca,
             user_credentials=(
                 self.configuration.quobyte_api_username,
-                self.configuration.quobyte_api_password))
+                self.configuration.quobyte_api_password),
+            pool_size=self.configuration.quobyte_api_pool_size)
 
         try:
             self.rpc.call('getInformation', {})
@@ -214,3 +219,65 @@ class QuobyteShareDriver(driver.ExecuteMixin, driver.ShareDriver,):
         self.rpc.call('exportVolume', dict(
             volume_uuid=volume_uuid,
             remove_allow_ip=access['access_to']))
+
+    def update_access(self, context, share, access_rules, add_rules=None,
+                      delete_rules=None, share_server=None):
+        """Update the ip white-list of a share in one batch of calls.
+
+        Without add_rules and delete_rules, the white-list is read from
+        the Quobyte configuration and made to match access_rules: the ips
+        not in them are removed and the missing ones added. Adding rules
+        of other access types than ip fails, as allow_access does, while
+        removing them is ignored.
+        """
+        sync = add_rules is None and delete_rules is None
+        if sync:
+            add_rules = access_rules
+        add_rules = add_rules or []
+        if any(access['access_type'] != 'ip' for access in add_rules):
+            raise exception.InvalidShareAccess(
+                _('Quobyte driver only supports ip access control'))
+        removed_ips = [access['access_to'] for access in delete_rules or []
+                       if access['access_type'] == 'ip']
+        if not sync and not add_rules and not removed_ips:
+            return
+
+        volume_uuid = self._resolve_volume_name(
+            share['name'],
+            self._get_project_name(context, share['project_id']))
+        if sync:
+            allowed = self._get_allowed_ips(volume_uuid)
+            wanted_ips = set(access['access_to'] for access in add_rules)
+            removed_ips = sorted(ip for ip in allowed if ip not in wanted_ips)
+            add_rules = [access for access in add_rules
+                         if allowed.get(access['access_to']) !=
+                         self._is_read_only(access)]
+            if not add_rules and not removed_ips:
+                return
+
+        calls = [('exportVolume', dict(volume_uuid=volume_uuid,
+                                       remove_allow_ip=ip))
+                 for ip in removed_ips]
+        calls.extend(
+            ('exportVolume', dict(
+                volume_uuid=volume_uuid,
+                read_only=self._is_read_only(access),
+                add_allow_ip=access['access_to']))
+            for access in add_rules)
+        self.rpc.call_batch(calls)
+
+    @staticmethod
+    def _is_read_only(access):
+        return (access['access_level'] ==
+                manila.common.constants.ACCESS_LEVEL_RO)
+
+    def _get_allowed_ips(self, volume_uuid):
+        """Maps the white-listed ips of a volume to whether they are ro."""
+        result = self.rpc.call('getConfiguration', {})
+        allowed = {}
+        for tenant in result.get('tenant_configuration', []):
+            for volume_access in tenant.get('volume_access', []):
+                if volume_access.get('volume_uuid') == volume_uuid:
+                    allowed[volume_access['restrict_to_network']] = bool(
+                        volume_access.get('read_only'))
+        return allowed
@@ -0,0 +1,291 @@
+# Copyright (c) 2015 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+HTTP transport shared by the share drivers talking to a REST API.
+
+Each RestTransport owns a requests session, so its cookies and
+credentials are kept between calls and its connections to the storage
+endpoint are kept alive and reused. Calls answered with a retryable
+status, or failing to connect, are sent again after an exponential
+backoff with jitter, and the number, latency and size of the calls are
+recorded per endpoint. A call whose connection failed after it may have
+been sent is only sent again if it is idempotent.
+"""
+
+import copy
+import errno
+import random
+import os
+import socket
+import ssl
+import threading
+import time
+
+from oslo_log import log
+import requests
+from requests import adapters
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+import six
+from six.moves import http_client
+import six.moves.urllib.parse as urlparse
+
+LOG = log.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF = 0.5
+MAX_BACKOFF = 30
+
+# Methods whose calls may be sent again after a connection failure
+# without the risk of applying them twice.
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+
+# CA bundles of the common distributions, looked for when the OpenSSL
+# build of the interpreter does not point at one.
+SYSTEM_CA_BUNDLES = (
+    '/etc/ssl/certs/ca-certificates.crt',
+    '/etc/pki/tls/certs/ca-bundle.crt',
+    '/etc/ssl/ca-bundle.pem',
+)
+
+
+def get_system_ca_bundle():
+    """Returns the CA bundle of the system to verify servers with.
+
+    requests verifies certificates against the bundle it ships, which
+    lacks the private CAs deployments add to the system store that the
+    urllib2 and httplib clients used by the drivers before verified
+    against. True, i.e. the bundle of requests, is returned when the
+    system has no bundle file.
+    """
+    paths = ssl.get_default_verify_paths()
+    for path in (paths.cafile, paths.openssl_cafile) + SYSTEM_CA_BUNDLES:
+        if path and os.path.isfile(path):
+            return path
+    return True
+
+
+class _TransportMetrics(object):
+    """Number, latency and size of HTTP calls per endpoint."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, endpoint):
+        return self._metrics.setdefault(
+            endpoint, {'calls': 0, 'errors': 0, 'retries': 0,
+                       'seconds': 0.0, 'max_seconds': 0.0,
+                       'bytes_sent': 0, 'bytes_received': 0})
+
+    def record(self, endpoint, seconds, sent=0, received=0, error=False):
+        with self._lock:
+            metrics = self._get(endpoint)
+            metrics['calls'] += 1
+            metrics['errors'] += int(error)
+            metrics['seconds'] += seconds
+            metrics['max_seconds'] = max(metrics['max_seconds'], seconds)
+            metrics['bytes_sent'] += sent
+            metrics['bytes_received'] += received
+
+    def record_retry(self, endpoint):
+        with self._lock:
+            self._get(endpoint)['retries'] += 1
+
+    def get(self):
+        with self._lock:
+            return copy.deepcopy(self._metrics)
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
+
+
+_METRICS = _TransportMetrics()
+
+
+def get_metrics():
+    """Returns the call metrics of each endpoint called so far.
+
+    Each value is a dict with the number of calls, connection errors and
+    retries, the total and maximum latency in seconds, and the total
+    size of the requests and responses in bytes.
+    """
+    return _METRICS.get()
+
+
+def reset_metrics():
+    _METRICS.reset()
+
+
+def _get_endpoint(url):
+    parsed_url = urlparse.urlparse(url)
+    return '%s://%s' % (parsed_url.scheme, parsed_url.netloc)
+
+
+def _is_connect_error(error):
+    """Whether a connection error happened before the request was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    while error is not None:
+        if isinstance(error, urllib3_exceptions.ConnectTimeoutError):
+            return True
+        if (isinstance(error, socket.error) and
+                error.errno == errno.ECONNREFUSED):
+            return True
+        # Follow the error wrapped by requests and urllib3.
+        reason = getattr(error, 'reason', None)
+        if not isinstance(reason, Exception):
+            reason = None
+            for arg in getattr(error, 'args', ()):
+                if isinstance(arg, Exception):
+                    reason = arg
+                    break
+        error = reason
+    return False
+
+
+def _get_size(data):
+    if data is None or isinstance(data, dict):
+        return 0
+    return len(data)
+
+
+class RestTransport(object):
+    """Keep-alive, retrying HTTP client of a single REST endpoint."""
+
+    def __init__(self, base_url='', auth=None, headers=None, verify=True,
+                 timeout=None, retries=DEFAULT_RETRIES,
+                 retry_statuses=(http_client.SERVICE_UNAVAILABLE,),
+                 backoff=DEFAULT_BACKOFF, pool_size=DEFAULT_POOL_SIZE,
+                 retry_errors=True):
+        """Initialize the transport.
+
+        :param base_url: prefix of the URLs that are not absolute.
+        :param auth: requests authentication, e.g. a (user, password) tuple.
+        :param headers: headers sent with every request.
+        :param verify: whether, or with which CA bundle, to verify the
+                       server certificate; True verifies it against the
+                       CA bundle of the system.
+        :param timeout: seconds to wait for the server, None to wait forever.
+        :param retries: times a failed call is sent again.
+        :param retry_statuses: HTTP statuses that are retried.
+        :param backoff: seconds the first retry waits at most; each
+                        further retry waits twice longer at most.
+        :param pool_size: connections kept alive to the endpoint.
+        :param retry_errors: whether calls failing to connect are retried.
+        """
+        self.base_url = base_url
+        self.verify = get_system_ca_bundle() if verify is True else verify
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_statuses = frozenset(retry_statuses)
+        self.backoff = backoff
+        self.retry_errors = retry_errors
+        self.session = requests.Session()
+        self.session.auth = auth
+        self.session.headers.update(headers or {})
+        adapter = adapters.HTTPAdapter(pool_connections=1,
+                                       pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    @property
+    def headers(self):
+        """Headers sent with every request, e.g. a session token."""
+        return self.session.headers
+
+    @property
+    def cookies(self):
+        return self.session.cookies
+
+    def request(self, method, url, retries=None, retry_statuses=None,
+                idempotent=None, **kwargs):
+        """Sends a request and returns its requests.Response.
+
+        url is appended to base_url unless it is absolute, and the other
+        arguments are passed to requests. Calls that cannot connect or
+        get a retry status are sent again up to retries times, which
+        like retry_statuses defaults to the value given to the
+        transport; the last response, or connection error, is returned
+        or raised.
+
+        A connection error after the request may have reached the server,
+        e.g. a read error, is only retried for idempotent calls. idempotent
+        defaults to whether method is in IDEMPOTENT_METHODS.
+        """
+        if retries is None:
+            retries = self.retries
+        if retry_statuses is None:
+            retry_statuses = self.retry_statuses
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        if not url.startswith(('http://', 'https://')):
+            url = self.base_url + url
+        kwargs.setdefault('timeout', self.timeout)
+        kwargs.setdefault('verify', self.verify)
+        endpoint = _get_endpoint(url)
+        sent = _get_size(kwargs.get('data'))
+
+        attempt = 0
+        while True:
+            start = time.time()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.ConnectionError as e:
+                _METRICS.record(endpoint, time.time() - start, sent=sent,
+                                error=True)
+                # Certificate errors are not transient, and a call which
+                # may have been applied must not be applied twice.
+                if (attempt >= retries or not self.retry_errors or
+                        isinstance(e, requests.exceptions.SSLError) or
+                        not (idempotent or _is_connect_error(e))):
+                    raise
+                reason = six.text_type(e)
+            else:
+                _METRICS.record(endpoint, time.time() - start, sent=sent,
+                                received=len(response.content))
+                if (response.status_code not in retry_statuses or
+                        attempt >= retries):
+                    return response
+                reason = response.status_code
+
+            delay = self._get_backoff(attempt)
+            LOG.debug('%(method)s %(url)s failed (%(reason)s), retrying in '
+                      '%(delay).2f seconds.',
+                      {'method': method, 'url': url, 'reason': reason,
+                       'delay': delay})
+            _METRICS.record_retry(endpoint)
+            time.sleep(delay)
+            attempt += 1
+
+    def _get_backoff(self, attempt):
+        """Returns a random delay of up to backoff * 2^attempt seconds."""
+        return random.uniform(0, min(MAX_BACKOFF, self.backoff * 2 ** attempt))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    def put(self, url, data=None, **kwargs):
+        return self.request('PUT', url, data=data, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def close(self):
+        self.session.close()
@@ -19,13 +19,12 @@ TODO(diemtran): this module needs to be placed in a library common to OpenStack
 """
 
 import httplib
-import time
 
 from oslo_serialization import jsonutils
+import requests
 import six
-# pylint: disable=E0611,F0401
-from six.moves.urllib import error as urlerror
-from six.moves.urllib import request as urlrequest
+
+from manila.share.drivers import rest_transport
 
 
 def log_debug_msg(obj, message):
@@ -75,28 +74,22 @@ class Status(object):
 
 class RestResult(object):
     """Result from a REST API operation."""
-    def __init__(self, logfunc=None, response=None, err=None):
+    def __init__(self, logfunc=None, response=None):
         """Initialize a RestResult containing the results from a REST call.
 
         :param logfunc: debug log function.
         :param response: HTTP response.
-        :param err: HTTP error.
         """
         self.response = response
         self.log_function = logfunc
-        self.error = err
         self.data = ""
         self.status = 0
-        if self.response:
-            self.status = self.response.getcode()
-            result = self.response.read()
-            while result:
-                self.data += result
-                result = self.response.read()
-
-        if self.error:
-            self.status = self.error.code
-            self.data = httplib.responses[self.status]
+        if self.response is not None:
+            self.status = self.response.status_code
+            if self.status >= httplib.BAD_REQUEST:
+                self.data = httplib.responses.get(self.status, "")
+            else:
+                self.data = self.response.text
 
         log_debug_msg(self, 'Response code: %s' % self.status)
         log_debug_msg(self, 'Response data: %s' % self.data)
@@ -109,8 +102,7 @@ class RestResult(object):
         """
         if self.response is None:
             return None
-        info = self.response.info()
-        return info.getheader(name)
+        return self.response.headers.get(name)
 
 
 class RestClientError(Exception):
@@ -157,6 +149,9 @@ class RestClientURL(object):  # pylint: disable=R0902
         self.headers = {"content-type": "application/json"}
         self.do_logout = False
         self.auth_str = None
+        # Connection errors fail the call right away, as they always did.
+        self.transport = rest_transport.RestTransport(
+            timeout=self.timeout, retries=0, retry_errors=False)
 
     def _path(self, path, base_path=None):
         """Build rest url path."""
@@ -266,12 +261,7 @@ class RestClientURL(object):  # pylint: disable=R0902
             if isinstance(body, dict):
                 body = six.text_type(jsonutils.dumps(body))
 
-        if body and len(body):
-            out_hdrs['content-length'] = len(body)
-
         zfssaurl = self._path(path, kwargs.get("base_path"))
-        req = urlrequest.Request(zfssaurl, body, out_hdrs)
-        req.get_method = lambda: request
         maxreqretries = kwargs.get("maxreqretries", 10)
         retry = 0
         response = None
@@ -283,50 +273,44 @@ class RestClientURL(object):  # pylint: disable=R0902
 
         while retry < maxreqretries:
             try:
-                response = urlrequest.urlopen(req, timeout=self.timeout)
-            except urlerror.HTTPError as err:
-                if err.code == httplib.NOT_FOUND:
-                    log_debug_msg(self, 'REST Not Found: %s' % err.code)
-                else:
-                    log_debug_msg(self, ('REST Not Available: %s') % err.code)
-
-                if (err.code == httplib.SERVICE_UNAVAILABLE and
-                        retry < maxreqretries):
-                    retry += 1
-                    time.sleep(1)
-                    log_debug_msg(self, ('Server Busy retry request: %s')
-                                  % retry)
-                    continue
-                if ((err.code == httplib.UNAUTHORIZED or
-                     err.code == httplib.INTERNAL_SERVER_ERROR) and
-                        '/access/v1' not in zfssaurl):
-                    try:
-                        log_debug_msg(self, ('Authorizing request: '
-                                             '%(zfssaurl)s'
-                                             'retry: %(retry)d .')
-                                      % {'zfssaurl': zfssaurl,
-                                         'retry': retry})
-                        self._authorize()
-                        req.add_header('x-auth-session',
-                                       self.headers['x-auth-session'])
-                    except RestClientError:
-                        log_debug_msg(self, ('Cannot authorize.'))
-                    retry += 1
-                    time.sleep(1)
-                    continue
-
-                return RestResult(self.log_function, err=err)
-
-            except urlerror.URLError as err:
-                log_debug_msg(self, ('URLError: %s') % err.reason)
+                # Busy (503) answers are retried by the transport, with
+                # an exponential backoff rather than a fixed one.
+                response = self.transport.request(
+                    request, zfssaurl, data=body, headers=out_hdrs,
+                    retries=maxreqretries - 1,
+                    retry_statuses=(httplib.SERVICE_UNAVAILABLE,))
+            except requests.RequestException as err:
+                log_debug_msg(self, ('URLError: %s') % err)
                 raise RestClientError(-1, name="ERR_URLError",
-                                      message=err.reason)
+                                      message=six.text_type(err))
+
+            status = response.status_code
+            if status == httplib.NOT_FOUND:
+                log_debug_msg(self, 'REST Not Found: %s' % status)
+            elif status >= httplib.BAD_REQUEST:
+                log_debug_msg(self, ('REST Not Available: %s') % status)
+
+            if ((status == httplib.UNAUTHORIZED or
+                 status == httplib.INTERNAL_SERVER_ERROR) and
+                    '/access/v1' not in zfssaurl):
+                try:
+                    log_debug_msg(self, ('Authorizing request: '
+                                         '%(zfssaurl)s'
+                                         'retry: %(retry)d .')
+                                  % {'zfssaurl': zfssaurl,
+                                     'retry': retry})
+                    self._authorize()
+                    out_hdrs['x-auth-session'] = (
+                        self.headers['x-auth-session'])
+                except RestClientError:
+                    log_debug_msg(self, ('Cannot authorize.'))
+                retry += 1
+                continue
             break
 
-        if ((response and
-             response.getcode() == httplib.SERVICE_UNAVAILABLE) and
-                retry >= maxreqretries):
-            raise RestClientError(response.getcode(), name="ERR_HTTPError",
+        if (response is not None and
+                response.status_code == httplib.SERVICE_UNAVAILABLE):
+            raise RestClientError(response.status_code, name="ERR_HTTPError",
                                   message="REST Not Available: Disabled")
 
         return RestResult(self.log_function, response=response)
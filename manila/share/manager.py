@@ -172,30 +172,45 @@ class ShareManager(manager.SchedulerDependentManager):
                     ctxt, share['id'], export_locations)
 
             rules = self.db.share_access_get_all_for_share(ctxt, share['id'])
-            for access_ref in rules:
-                if access_ref['state'] != access_ref.STATE_ACTIVE:
-                    continue
-
-                try:
-                    self.driver.allow_access(ctxt, share, access_ref,
-                                             share_server=share_server)
-                except exception.ShareAccessExists:
-                    pass
-                except Exception as e:
-                    LOG.error(
-                        _LE("Unexpected exception during share access"
-                            " allow operation. Share id is '%(s_id)s'"
-                            ", access rule type is '%(ar_type)s', "
-                            "access rule id is '%(ar_id)s', exception"
-                            " is '%(e)s'."),
-                        {'s_id': share['id'],
-                         'ar_type': access_ref['access_type'],
-                         'ar_id': access_ref['id'],
-                         'e': six.text_type(e)},
-                    )
+            active_rules = [access_ref for access_ref in rules
+                            if access_ref['state'] == access_ref.STATE_ACTIVE]
+            try:
+                self.driver.update_access(ctxt, share, active_rules,
+                                          share_server=share_server)
+            except NotImplementedError:
+                self._allow_access_rules(ctxt, share, active_rules,
+                                         share_server)
+            except Exception as e:
+                LOG.error(
+                    _LE("Unexpected exception during share access"
+                        " update operation. Share id is '%(s_id)s'"
+                        ", exception is '%(e)s'."),
+                    {'s_id': share['id'], 'e': six.text_type(e)},
+                )
 
         self.publish_service_capabilities(ctxt)
 
+    def _allow_access_rules(self, ctxt, share, rules, share_server):
+        """Allows the rules one by one, for drivers without update_access."""
+        for access_ref in rules:
+            try:
+                self.driver.allow_access(ctxt, share, access_ref,
+                                         share_server=share_server)
+            except exception.ShareAccessExists:
+                pass
+            except Exception as e:
+                LOG.error(
+                    _LE("Unexpected exception during share access"
+                        " allow operation. Share id is '%(s_id)s'"
+                        ", access rule type is '%(ar_type)s', "
+                        "access rule id is '%(ar_id)s', exception"
+                        " is '%(e)s'."),
+                    {'s_id': share['id'],
+                     'ar_type': access_ref['access_type'],
+                     'ar_id': access_ref['id'],
+                     'e': six.text_type(e)},
+                )
+
     def _provide_share_server_for_share(self, context, share_network_id,
                                         share_id):
         """Gets or creates share_server and updates share with its id.
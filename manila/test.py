@@ -36,6 +36,7 @@ from oslo_messaging import conffixture as messaging_conffixture
 import oslotest.base as base_test
 import six
 
+from manila.common import client_cache
 from manila.db import migration
 from manila.db.sqlalchemy import api as db_api
 from manila.db.sqlalchemy import models as db_models
@@ -146,6 +147,9 @@ class TestCase(base_test.BaseTestCase):
 
         fake_notifier.stub_notifier(self)
 
+        client_cache.clear()
+        self.addCleanup(client_cache.clear)
+
     def tearDown(self):
         """Runs after each test method to tear down test environment."""
         super(TestCase, self).tearDown()
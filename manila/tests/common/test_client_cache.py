@@ -0,0 +1,178 @@
+# Copyright 2015 Mirantis Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import time
+
+import mock
+from novaclient import exceptions as nova_exception
+
+from manila.common import client_cache
+from manila import test
+
+
+class ClientCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(ClientCacheTestCase, self).setUp()
+        self.cache = client_cache.ClientCache()
+        self.factory = mock.Mock(side_effect=lambda: object())
+
+    def test_get_reuses_client(self):
+        key = ('nova', 'user', 'project', 'token', 'url')
+
+        first = self.cache.get(key, self.factory)
+        second = self.cache.get(key, self.factory)
+
+        self.assertIs(first, second)
+        self.factory.assert_called_once_with()
+
+    def test_get_different_tokens(self):
+        first = self.cache.get(('nova', 'u', 'p', 'token1', 'url'),
+                               self.factory)
+        second = self.cache.get(('nova', 'u', 'p', 'token2', 'url'),
+                                self.factory)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_get_expired(self):
+        self.flags(client_cache_ttl=10)
+        key = ('cinder', 'user', 'project', 'token', 'url')
+        self.mock_object(time, 'time', mock.Mock(return_value=100))
+        first = self.cache.get(key, self.factory)
+        time.time.return_value = 111
+
+        second = self.cache.get(key, self.factory)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_get_disabled(self):
+        self.flags(client_cache_ttl=0)
+        key = ('neutron', None, None, 'token', 'url')
+
+        self.cache.get(key, self.factory)
+        self.cache.get(key, self.factory)
+
+        self.assertEqual(2, self.factory.call_count)
+        self.assertEqual(0, len(self.cache))
+
+    def test_get_evicts_least_recently_used(self):
+        self.flags(client_cache_size=2)
+        first = self.cache.get(('a',), self.factory)
+        self.cache.get(('b',), self.factory)
+        self.cache.get(('a',), self.factory)
+
+        self.cache.get(('c',), self.factory)
+
+        self.assertEqual(2, len(self.cache))
+        self.assertIs(first, self.cache.get(('a',), self.factory))
+        self.assertEqual(3, self.factory.call_count)
+        self.cache.get(('b',), self.factory)
+        self.assertEqual(4, self.factory.call_count)
+
+    def test_invalidate(self):
+        key = ('nova', 'user', 'project', 'token', 'url')
+        first = self.cache.get(key, self.factory)
+
+        self.cache.invalidate(key)
+
+        self.assertIsNot(first, self.cache.get(key, self.factory))
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_get_token_expired(self):
+        self.flags(client_cache_ttl=300)
+        key = ('nova', 'user', 'project', 'token', 'url')
+        self.mock_object(time, 'time', mock.Mock(return_value=100))
+        expires_at = mock.Mock(return_value=110)
+        first = self.cache.get(key, self.factory, expires_at=expires_at)
+        self.assertIs(first, self.cache.get(key, self.factory,
+                                            expires_at=expires_at))
+        time.time.return_value = 111
+
+        second = self.cache.get(key, self.factory, expires_at=expires_at)
+
+        self.assertIsNot(first, second)
+        expires_at.assert_called_with(first)
+        self.assertEqual(2, self.factory.call_count)
+
+    def test_get_token_expiry_unknown(self):
+        key = ('nova', 'user', 'project', 'token', 'url')
+        expires_at = mock.Mock(return_value=None)
+
+        first = self.cache.get(key, self.factory, expires_at=expires_at)
+
+        self.assertIs(first, self.cache.get(key, self.factory,
+                                            expires_at=expires_at))
+
+    def test_invalidate_other_client(self):
+        key = ('nova', 'user', 'project', 'token', 'url')
+        first = self.cache.get(key, self.factory)
+
+        self.cache.invalidate(key, client=object())
+
+        self.assertIs(first, self.cache.get(key, self.factory))
+
+    def test_token_expiry_from_catalog(self):
+        http_client = mock.Mock(spec=['service_catalog'])
+        http_client.service_catalog.catalog = {
+            'access': {'token': {'expires': '1970-01-01T00:01:40Z'}}}
+
+        self.assertEqual(100, client_cache.token_expiry(http_client))
+
+    def test_token_expiry_from_auth_ref(self):
+        http_client = mock.Mock()
+        http_client.auth_ref.expires = datetime.datetime(1970, 1, 1, 0, 1, 40)
+
+        self.assertEqual(100, client_cache.token_expiry(http_client))
+
+    def test_token_expiry_unknown(self):
+        http_client = mock.Mock(spec=['service_catalog'])
+        http_client.service_catalog = None
+
+        self.assertIsNone(client_cache.token_expiry(http_client))
+        self.assertIsNone(client_cache.token_expiry(mock.Mock()))
+
+    def test_drop_on_unauthorized(self):
+        key = ('nova', 'user', 'project', 'token', 'url')
+
+        @client_cache.drop_on_unauthorized(
+            lambda e: isinstance(e, nova_exception.Unauthorized),
+            lambda api, ctx: key)
+        class FakeAPI(object):
+            def call(self, ctx):
+                client_cache.get(key, factory).call()
+
+        factory = mock.Mock()
+        factory.return_value.call.side_effect = [
+            nova_exception.NotFound(404), nova_exception.Unauthorized(401)]
+        first = client_cache.get(key, factory)
+
+        self.assertRaises(nova_exception.NotFound, FakeAPI().call, 'ctx')
+        self.assertIs(first, client_cache.get(key, factory))
+        self.assertRaises(nova_exception.Unauthorized, FakeAPI().call, 'ctx')
+        self.assertIsNone(client_cache._CACHE._clients.get(key))
+
+    def test_module_level_cache_is_shared(self):
+        key = ('nova', 'user', 'project', 'token', 'url')
+
+        first = client_cache.get(key, self.factory)
+        second = client_cache.get(key, self.factory)
+        client_cache.clear()
+        third = client_cache.get(key, self.factory)
+
+        self.assertIs(first, second)
+        self.assertIsNot(first, third)
@@ -255,6 +255,52 @@ class NovaApiTestCase(test.TestCase):
         self.assertEqual(net_id, net['id'])
 
 
+class NovaclientTestCase(test.TestCase):
+
+    def setUp(self):
+        super(NovaclientTestCase, self).setUp()
+        self.mock_object(nova.nova_client, 'Client')
+
+    def test_admin_client_is_reused(self):
+        ctx = context.get_admin_context()
+
+        first = nova.novaclient(ctx)
+        second = nova.novaclient(ctx)
+
+        self.assertIs(first, second)
+        nova.nova_client.Client.assert_called_once_with(
+            nova.CONF.nova_admin_username, nova.CONF.nova_admin_password,
+            nova.CONF.nova_admin_tenant_name, nova.CONF.nova_admin_auth_url,
+            connection_pool=True)
+        first.authenticate.assert_called_once_with()
+
+    def test_user_clients_are_keyed_by_token(self):
+        catalog = [{'type': 'compute', 'name': 'nova',
+                    'endpoints': [{'publicURL': 'http://fake_url'}]}]
+        ctx1 = context.RequestContext('user', 'project', auth_token='t1',
+                                      service_catalog=catalog)
+        ctx2 = context.RequestContext('user', 'project', auth_token='t2',
+                                      service_catalog=catalog)
+
+        nova.novaclient(ctx1)
+        nova.novaclient(ctx1)
+        nova.novaclient(ctx2)
+
+        self.assertEqual(2, nova.nova_client.Client.call_count)
+
+    def test_unauthorized_client_is_dropped(self):
+        ctx = context.get_admin_context()
+        client = nova.novaclient(ctx)
+        client.servers.pause.side_effect = nova.nova_exception.Unauthorized(
+            401)
+
+        self.assertRaises(nova.nova_exception.Unauthorized,
+                          nova.API().server_pause, ctx, 'fake_id')
+
+        nova.novaclient(ctx)
+        self.assertEqual(2, nova.nova_client.Client.call_count)
+
+
 class ToDictTestCase(test.TestCase):
 
     def test_dict_provided(self):
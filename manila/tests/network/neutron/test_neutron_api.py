@@ -32,6 +32,9 @@ CONF = cfg.CONF
 
 class FakeNeutronClient(object):
 
+    def __init__(self):
+        self.httpclient = mock.Mock()
+
     def create_port(self, body):
         return body
 
@@ -96,8 +99,8 @@ class NeutronApiTest(test.TestCase):
         neutron_api_instance = neutron_api.API()
 
         # Verify results
-        self.assertTrue(clientv20.Client.called)
         self.assertTrue(hasattr(neutron_api_instance, 'client'))
+        self.assertTrue(clientv20.Client.called)
         self.assertTrue(hasattr(neutron_api_instance, 'configuration'))
         self.assertEqual('DEFAULT', neutron_api_instance.config_group_name)
 
@@ -109,8 +112,8 @@ class NeutronApiTest(test.TestCase):
         obj = neutron_api.API(fake_config_group_name)
 
         # Verify results
-        self.assertTrue(clientv20.Client.called)
         self.assertTrue(hasattr(obj, 'client'))
+        self.assertTrue(clientv20.Client.called)
         self.assertTrue(hasattr(obj, 'configuration'))
         self.assertEqual(
             fake_config_group_name, obj.configuration._group.name)
@@ -14,12 +14,17 @@
 # under the License.
 
 import mock
+from oslo_config import cfg
 from oslo_log import log
 
 from manila import exception
+from manila.share import configuration as config
+from manila.share.drivers.emc import driver as emc_driver
 from manila.share.drivers.emc.plugins.isilon import isilon
+from manila.share.drivers.emc.plugins.isilon import isilon_api
 from manila import test
 
+CONF = cfg.CONF
 LOG = log.getLogger(__name__)
 
 
@@ -38,6 +43,9 @@ class IsilonTest(test.TestCase):
 
     class MockConfig(object):
 
+        def append_config_values(self, opts):
+            pass
+
         def safe_get(self, value):
             if value == 'emc_nas_server':
                 return '10.0.0.1'
@@ -49,6 +57,10 @@ class IsilonTest(test.TestCase):
                 return 'a'
             elif value == 'isilon_share_root_dir':
                 return '/ifs/manila-test'
+            elif value == 'isilon_clone_workers':
+                return 4
+            elif value == 'isilon_clone_retries':
+                return 2
             else:
                 return None
 
@@ -400,7 +412,7 @@ class IsilonTest(test.TestCase):
 
         # verify clone_directory(container_path) method called
         self._mock_isilon_api.clone_snapshot.assert_called_once_with(
-            snapshot_name, self.SHARE_DIR)
+            snapshot_name, self.SHARE_DIR, progress_callback=mock.ANY)
         expected_location = '{0}:{1}'.format(
             self.ISILON_ADDR, self.SHARE_DIR)
         self.assertEqual(expected_location, location)
@@ -425,7 +437,7 @@ class IsilonTest(test.TestCase):
         self._mock_isilon_api.create_smb_share.assert_called_once_with(
             new_share_name, self.CLONE_DIR)
         self._mock_isilon_api.clone_snapshot.assert_called_once_with(
-            snapshot_name, self.CLONE_DIR)
+            snapshot_name, self.CLONE_DIR, progress_callback=mock.ANY)
         expected_location = '\\\\{0}\\{1}'.format(self.ISILON_ADDR,
                                                   new_share_name)
         self.assertEqual(expected_location, location)
@@ -545,6 +557,29 @@ class IsilonTest(test.TestCase):
         expected_password = mock_config.safe_get('emc_nas_password')
         self.assertEqual(expected_password, storage_connection._password)
         self.assertFalse(storage_connection._verify_ssl_cert)
+        mock_isi_api.assert_called_once_with(
+            storage_connection._server_url,
+            auth=(expected_username, expected_password),
+            verify_ssl_cert=False, clone_workers=4, clone_retries=2)
+
+    @mock.patch(
+        'manila.share.drivers.emc.plugins.isilon.isilon.isilon_api.IsilonApi',
+        autospec=True)
+    def test_connect_backend_configuration(self, mock_isi_api):
+        configuration = config.Configuration(emc_driver.EMC_NAS_OPTS,
+                                             config_group='isilon_backend')
+        CONF.set_override('emc_nas_server', '10.0.0.1',
+                          group='isilon_backend')
+        storage_connection = isilon.IsilonStorageConnection(LOG)
+
+        storage_connection.connect(mock.Mock(configuration=configuration),
+                                   self.mock_context)
+
+        self.assertEqual('/ifs/manila-shares', storage_connection._root_dir)
+        self.assertEqual(isilon_api.DEFAULT_CLONE_WORKERS,
+                         mock_isi_api.call_args[1]['clone_workers'])
+        self.assertEqual(isilon_api.DEFAULT_CLONE_RETRIES,
+                         mock_isi_api.call_args[1]['clone_retries'])
 
     @mock.patch(
         'manila.share.drivers.emc.plugins.isilon.isilon.isilon_api.IsilonApi',
@@ -14,11 +14,13 @@
 #    under the License.
 
 import ddt
+import mock
 from oslo_serialization import jsonutils as json
 import requests
 import requests_mock
 import six
 
+from manila import exception
 from manila.share.drivers.emc.plugins.isilon import isilon_api
 from manila import test
 
@@ -34,6 +36,7 @@ class IsilonApiTest(test.TestCase):
         self.isilon_api = isilon_api.IsilonApi(
             self._mock_url, _mock_auth
         )
+        self.mock_sleep = self.mock_object(isilon_api.greenthread, 'sleep')
 
     @ddt.data(False, True)
     def test_create_directory(self, is_recursive):
@@ -136,6 +139,108 @@ class IsilonApiTest(test.TestCase):
 
         self._verify_clone_snapshot_calls(expected_calls, m.request_history)
 
+    @requests_mock.mock()
+    def test_clone_snapshot_paged_listing(self, m):
+        self._add_create_directory_response(m, '/ifs/admin/target', False)
+        self._add_get_snapshot_response(
+            m, 'snapshot01',
+            '{"snapshots": [{"name": "snapshot01", '
+            '"path": "/ifs/admin/source"}]}')
+        m.get(self._mock_url + '/namespace/ifs/.snapshot/snapshot01/admin/'
+              'source?detail=default&limit=1000',
+              json={'children': [{'name': 'file1', 'type': 'object'}],
+                    'resume': 'token/1'})
+        m.get(self._mock_url + '/namespace/ifs/.snapshot/snapshot01/admin/'
+              'source?resume=token%2F1',
+              json={'children': [{'name': 'file2', 'type': 'object'}]})
+        self._add_file_clone_response(m, '/ifs/admin/target/file1',
+                                      'snapshot01')
+        self._add_file_clone_response(m, '/ifs/admin/target/file2',
+                                      'snapshot01')
+        progress_callback = mock.Mock()
+
+        self.isilon_api.clone_snapshot('snapshot01', '/ifs/admin/target',
+                                       progress_callback=progress_callback)
+
+        cloned = sorted(r.url for r in m.request_history
+                        if 'clone=true' in r.url)
+        self.assertEqual(
+            [self._mock_url + '/namespace/ifs/admin/target/file1'
+             '?clone=true&snapshot=snapshot01',
+             self._mock_url + '/namespace/ifs/admin/target/file2'
+             '?clone=true&snapshot=snapshot01'], cloned)
+        progress_callback.assert_called_once_with(
+            {'directories': 1, 'files_found': 2, 'files_cloned': 2,
+             'retries': 0})
+
+    @requests_mock.mock()
+    def test_clone_snapshot_retry(self, m):
+        self._add_create_directory_response(m, '/ifs/admin/target', False)
+        self._add_get_snapshot_response(
+            m, 'snapshot01',
+            '{"snapshots": [{"name": "snapshot01", '
+            '"path": "/ifs/admin/source"}]}')
+        self._add_get_directory_listing_response(
+            m, '/ifs/.snapshot/snapshot01/admin/source',
+            '{"children": [{"name": "file1", "type": "object"}]}')
+        m.put(self._mock_url + '/namespace/ifs/admin/target/file1'
+              '?clone=true&snapshot=snapshot01',
+              [{'status_code': 500}, {'status_code': 200}])
+
+        self.isilon_api.clone_snapshot('snapshot01', '/ifs/admin/target')
+
+        cloned = [r for r in m.request_history if 'clone=true' in r.url]
+        self.assertEqual(2, len(cloned))
+        self.assertEqual(1, self.mock_sleep.call_count)
+        backoff = self.mock_sleep.call_args[0][0]
+        self.assertTrue(0 <= backoff <= isilon_api.CLONE_RETRY_BACKOFF)
+
+    @requests_mock.mock()
+    def test_clone_snapshot_progress_callback_error(self, m):
+        self._add_create_directory_response(m, '/ifs/admin/target', False)
+        self._add_get_snapshot_response(
+            m, 'snapshot01',
+            '{"snapshots": [{"name": "snapshot01", '
+            '"path": "/ifs/admin/source"}]}')
+        self._add_get_directory_listing_response(
+            m, '/ifs/.snapshot/snapshot01/admin/source',
+            '{"children": [{"name": "file1", "type": "object"}]}')
+        self._add_file_clone_response(m, '/ifs/admin/target/file1',
+                                      'snapshot01')
+        self.mock_object(isilon_api, 'CLONE_PROGRESS_INTERVAL', 0)
+        progress_callback = mock.Mock(side_effect=Exception('fake'))
+
+        self.isilon_api.clone_snapshot('snapshot01', '/ifs/admin/target',
+                                       progress_callback=progress_callback)
+
+        cloned = [r for r in m.request_history if 'clone=true' in r.url]
+        self.assertEqual(1, len(cloned))
+        self.assertTrue(progress_callback.called)
+
+    @requests_mock.mock()
+    def test_clone_snapshot_failure(self, m):
+        self.isilon_api.clone_retries = 1
+        self._add_create_directory_response(m, '/ifs/admin/target', False)
+        self._add_get_snapshot_response(
+            m, 'snapshot01',
+            '{"snapshots": [{"name": "snapshot01", '
+            '"path": "/ifs/admin/source"}]}')
+        self._add_get_directory_listing_response(
+            m, '/ifs/.snapshot/snapshot01/admin/source',
+            '{"children": [{"name": "file1", "type": "object"}, '
+            '{"name": "file2", "type": "object"}]}')
+        self._add_file_clone_response(m, '/ifs/admin/target/file1',
+                                      'snapshot01')
+        m.put(self._mock_url + '/namespace/ifs/admin/target/file2'
+              '?clone=true&snapshot=snapshot01', status_code=500)
+
+        self.assertRaises(exception.ShareBackendException,
+                          self.isilon_api.clone_snapshot, 'snapshot01',
+                          '/ifs/admin/target')
+
+        cloned = [r for r in m.request_history if 'clone=true' in r.url]
+        self.assertEqual(3, len(cloned))
+
     class ExpectedCall(object):
         DIR_CREATION = 'dir_creation'
         FILE_CLONE = 'file_clone'
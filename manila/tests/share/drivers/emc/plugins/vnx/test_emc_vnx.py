@@ -14,8 +14,12 @@
 #    under the License.
 
 import doctest
+import sys
+import traceback
+from xml.dom import minidom
 
 import ddt
+import eventlet
 from lxml import doctestcompare
 import mock
 from oslo_log import log
@@ -25,12 +29,19 @@ import manila.db
 from manila import exception
 from manila.share import configuration as conf
 from manila.share.drivers.emc import driver as emc_driver
+from manila.share.drivers.emc.plugins.vnx import constants
 from manila.share.drivers.emc.plugins.vnx import helper
+from manila.share.drivers.emc.plugins.vnx import utils as vnx_utils
+from manila.share.drivers.emc.plugins.vnx import xml_api_parser as parser
+from manila.share.drivers import rest_transport
 from manila import test
 from manila.tests import fake_share
 
 LOG = log.getLogger(__name__)
 
+# Other tests replace the request method of the connector class for good.
+XMLAPIConnector_request = helper.XMLAPIConnector.request
+
 
 def query(func):
     def inner(*args, **kwargs):
@@ -70,6 +81,21 @@ def response(func):
     return inner
 
 
+def _batch(packets, item, packet):
+    parts = [p[p.index('<%s>' % item):p.rindex('</%s>' % packet)]
+             for p in packets]
+    return (packets[0][:packets[0].index('<%s>' % item)] + ''.join(parts)
+            + '</%s>' % packet)
+
+
+def batch_requests(*requests):
+    return _batch(requests, 'Request', 'RequestPacket')
+
+
+def batch_responses(*responses):
+    return _batch(responses, 'Response', 'ResponsePacket')
+
+
 class EMCVNXDriverTestData(object):
     emc_share_backend_default = 'vnx'
     emc_nas_server_container_default = 'server_2'
@@ -1176,14 +1202,14 @@ class EMCShareDriverVNXTestCase(test.TestCase):
 
     def driver_setup(self):
         hook = RequestSideEffect()
-        hook.append(TD.resp_get_mover_ref())
-        hook.append(TD.resp_get_storage_pools())
+        hook.append(batch_responses(TD.resp_get_mover_ref(),
+                                    TD.resp_get_storage_pools()))
         helper.XMLAPIConnector.request = EMCMock(side_effect=hook)
         helper.XMLAPIConnector._do_setup = EMCMock()
         self.driver.do_setup(None)
         expected_calls = [
-            mock.call(TD.req_get_mover_ref()),
-            mock.call(TD.req_get_storage_pools()),
+            mock.call(batch_requests(TD.req_get_mover_ref(),
+                                     TD.req_get_storage_pools())),
         ]
         helper.XMLAPIConnector.request.assert_has_calls(expected_calls)
         helper.XMLAPIConnector._do_setup.assert_called_once_with()
@@ -1201,14 +1227,12 @@ class EMCShareDriverVNXTestCase(test.TestCase):
         if_ip1 = if_data1['ip_address']
         if_name2 = 'if-' + if_data2['id'][-12:]
         if_ip2 = if_data2['ip_address']
-        hook.append(TD.resp_get_mover_ref())
         hook.append(TD.resp_get_vdm_not_exist())
         hook.append(TD.resp_task_succeed())
-        hook.append(TD.resp_get_created_vdm())
-        hook.append(TD.resp_get_mover_by_id())
+        hook.append(batch_responses(TD.resp_get_created_vdm(),
+                                    TD.resp_get_mover_by_id()))
         hook.append(TD.resp_task_succeed())
         hook.append(TD.resp_task_succeed())
-        hook.append(TD.resp_get_mover_ref())
         hook.append(TD.resp_task_succeed())
         hook.append(TD.resp_task_succeed())
         ssh_hook.append('', '')
@@ -1216,14 +1240,12 @@ class EMCShareDriverVNXTestCase(test.TestCase):
         helper.SSHConnector.run_ssh = mock.Mock(side_effect=ssh_hook)
         self.driver.setup_server(network_info, None)
         expected_calls = [
-            mock.call(TD.req_get_mover_ref()),
             mock.call(TD.req_get_vdm_by_name()),
             mock.call(TD.req_create_vdm()),
-            mock.call(TD.req_get_vdm_by_name()),
-            mock.call(TD.req_get_mover_by_id()),
+            mock.call(batch_requests(TD.req_get_vdm_by_name(),
+                                     TD.req_get_mover_by_id())),
             mock.call(TD.req_create_mover_interface(if_name1, if_ip1)),
             mock.call(TD.req_create_mover_interface(if_name2, if_ip2)),
-            mock.call(TD.req_get_mover_ref()),
             mock.call(TD.req_create_dns_domain()),
             mock.call(TD.req_create_cifs_server(if_ip1)),
         ]
@@ -1267,6 +1289,49 @@ class EMCShareDriverVNXTestCase(test.TestCase):
         helper.XMLAPIConnector.request.assert_has_calls(expected_calls)
         helper.SSHConnector.run_ssh.assert_has_calls(ssh_calls)
 
+    def test_get_vdm_by_name_cached(self):
+        hook = RequestSideEffect()
+        hook.append(TD.resp_get_vdm_by_name())
+        helper.XMLAPIConnector.request = EMCMock(side_effect=hook)
+        topology = self.driver.plugin._topology
+        hits, misses = topology.hits, topology.misses
+
+        first = self.driver.plugin._get_vdm_by_name(TD.default_vdm_name)
+        second = self.driver.plugin._get_vdm_by_name(TD.default_vdm_name)
+
+        helper.XMLAPIConnector.request.assert_has_calls(
+            [mock.call(TD.req_get_vdm_by_name())])
+        self.assertEqual(first, second)
+        self.assertEqual((hits + 1, misses + 1),
+                         (topology.hits, topology.misses))
+
+    def test_teardown_server_invalidates_vdm(self):
+        server_details = TD.fake_server_details()
+        hook = RequestSideEffect()
+        hook.append(TD.resp_get_vdm_by_name())
+        hook.append(TD.resp_task_succeed())
+        hook.append(TD.resp_task_succeed())
+        hook.append(TD.resp_task_succeed())
+        hook.append(TD.resp_get_vdm_not_exist())
+        helper.XMLAPIConnector.request = EMCMock(side_effect=hook)
+        ssh_hook = SSHSideEffect()
+        ssh_hook.append(TD.resp_get_interfaces_by_vdm())
+        ssh_hook.append(TD.resp_disable_nfs_service_success())
+        helper.SSHConnector.run_ssh = mock.Mock(side_effect=ssh_hook)
+        self.driver.plugin._get_vdm_by_name(TD.default_vdm_name)
+
+        self.driver.teardown_server(server_details, None)
+
+        self.assertIsNone(self.driver.plugin._get_vdm_by_name(
+            TD.default_vdm_name, allow_absence=True))
+        helper.XMLAPIConnector.request.assert_has_calls([
+            mock.call(TD.req_get_vdm_by_name()),
+            mock.call(TD.delete_mover_interface(server_details['cifs_if'])),
+            mock.call(TD.delete_mover_interface(server_details['nfs_if'])),
+            mock.call(TD.delete_vdm(TD.default_vdm_id)),
+            mock.call(TD.req_get_vdm_by_name()),
+        ])
+
     def test_teardown_server_without_share_server_name(self):
         security_services = TD.fake_security_services()
         server_details = {}
@@ -1556,6 +1621,98 @@ class EMCShareDriverVNXTestCase(test.TestCase):
         ]
         helper.SSHConnector.run_ssh.assert_has_calls(expected_calls)
 
+    def test_update_nfs_share_access(self):
+        mover_name = TD.default_vdm_name
+        path = '/fakeshare'
+        sshHook = SSHSideEffect()
+        sshHook.append(TD.resp_get_nfs_share_by_path(mover_name, path,
+                                                     ['1.1.1.1']))
+        sshHook.append(TD.resp_change_nfs_share_success(mover_name))
+        helper.SSHConnector.run_ssh = mock.Mock(side_effect=sshHook)
+
+        result = self.driver.plugin._NASCmd_helper.update_nfs_share_access(
+            path, mover_name, add_hosts=['2.2.2.2', '3.3.3.3'],
+            remove_hosts=['1.1.1.1'])
+
+        self.assertEqual((constants.STATUS_OK, ''), result)
+        helper.SSHConnector.run_ssh.assert_has_calls([
+            mock.call(TD.req_get_nfs_share_by_path(mover_name, path)),
+            mock.call(TD.req_set_nfs_share_access(
+                path, mover_name, ['2.2.2.2', '3.3.3.3'])),
+        ])
+
+    def test_update_nfs_share_access_unchanged(self):
+        mover_name = TD.default_vdm_name
+        path = '/fakeshare'
+        sshHook = SSHSideEffect()
+        sshHook.append(TD.resp_get_nfs_share_by_path(mover_name, path,
+                                                     ['1.1.1.1']))
+        helper.SSHConnector.run_ssh = mock.Mock(side_effect=sshHook)
+
+        result = self.driver.plugin._NASCmd_helper.update_nfs_share_access(
+            path, mover_name, add_hosts=['1.1.1.1'],
+            remove_hosts=['2.2.2.2'])
+
+        self.assertEqual((constants.STATUS_OK, ''), result)
+        helper.SSHConnector.run_ssh.assert_called_once_with(
+            TD.req_get_nfs_share_by_path(mover_name, path))
+
+    def test_update_nfs_share_access_coalesced(self):
+        nas_helper = self.driver.plugin._NASCmd_helper
+        mover_name = TD.default_vdm_name
+        path = '/fakeshare'
+        sshHook = SSHSideEffect()
+        sshHook.append(TD.resp_get_nfs_share_by_path(mover_name, path))
+        sshHook.append(TD.resp_change_nfs_share_success(mover_name))
+        helper.SSHConnector.run_ssh = mock.Mock(side_effect=sshHook)
+        # Queued by a concurrent caller still waiting for the share lock.
+        pending_op = helper._NFSAccessOp(['1.1.1.1'], [])
+        nas_helper._pending_access[(mover_name, path)] = [pending_op]
+
+        result = nas_helper.deny_nfs_share_access(path, '2.2.2.2',
+                                                  mover_name)
+
+        self.assertEqual((constants.STATUS_OK, ''), result)
+        self.assertEqual(result, pending_op.result)
+        self.assertEqual({}, nas_helper._pending_access)
+        helper.SSHConnector.run_ssh.assert_has_calls([
+            mock.call(TD.req_get_nfs_share_by_path(mover_name, path)),
+            mock.call(TD.req_set_nfs_share_access(
+                path, mover_name, ['1.1.1.1'])),
+        ])
+
+    def test_update_nfs_share_access_batch_fails(self):
+        nas_helper = self.driver.plugin._NASCmd_helper
+        mover_name = TD.default_vdm_name
+        path = '/fakeshare'
+        error = exception.EMCVnxXMLAPIError(err='fake')
+
+        def apply_access(path, mover_name, ops):
+            # Let the other callers queue their updates meanwhile.
+            eventlet.sleep(0.01)
+            raise error
+
+        self.mock_object(nas_helper, '_apply_nfs_share_access',
+                         mock.Mock(side_effect=apply_access))
+
+        threads = [eventlet.spawn(nas_helper.allow_nfs_share_access,
+                                  path, host, mover_name)
+                   for host in ('1.1.1.1', '2.2.2.2', '3.3.3.3')]
+
+        for thread in threads:
+            try:
+                thread.wait()
+            except exception.EMCVnxXMLAPIError:
+                # The traceback of every caller leads to the failed apply.
+                self.assertEqual('apply_access', traceback.extract_tb(
+                    sys.exc_info()[2])[-1][2])
+            else:
+                self.fail('EMCVnxXMLAPIError not raised.')
+        self.assertEqual(2, nas_helper._apply_nfs_share_access.call_count)
+        self.assertEqual(
+            2, len(nas_helper._apply_nfs_share_access.call_args[0][2]))
+        self.assertEqual({}, nas_helper._pending_access)
+
     def test_nfs_allow_access_subnet(self):
         share = TD.fake_share(share_proto='NFS')
         access = TD.fake_access_subnet()
@@ -1752,3 +1909,282 @@ class EMCShareDriverVNXTestCase(test.TestCase):
         elif value == 'driver_handles_share_servers':
             return True
         return None
+
+
+@ddt.ddt
+class XMLAPIParserTestCase(test.TestCase):
+
+    def _dom_parse(self, xml_string):
+        return parser.parse_xml_api(
+            parser.dom_to_tupletree(minidom.parseString(xml_string)))
+
+    @ddt.data(TD.resp_get_storage_pools(),
+              TD.resp_get_vdm_by_name(),
+              TD.resp_get_vdm_not_exist(),
+              TD.resp_get_mover(),
+              TD.resp_get_mover_ref(),
+              TD.resp_get_mover_by_id(),
+              TD.resp_task_succeed(),
+              TD.resp_get_cifsservers(),
+              TD.resp_get_cifs_share_by_name(),
+              TD.resp_get_filesystem(),
+              TD.resp_get_check_point('fakename'),
+              TD.resp_mount_query(),
+              TD.resp_query_snapshot(),
+              TD.resp_query_snapshot_error(),
+              TD.resp_get_filesystem_error(),
+              TD.resp_get_vdm(),
+              TD.resp_get_created_vdm())
+    def test_parse_xml_api_string(self, xml_string):
+        expected = self._dom_parse(xml_string)
+
+        self.assertEqual(expected,
+                         parser.parse_xml_api(
+                             parser.xml_to_tupletree(xml_string)))
+        self.assertEqual(expected, parser.parse_xml_api_string(xml_string))
+
+    def test_xml_to_tupletree_merges_text(self):
+        tt = parser.xml_to_tupletree(
+            '<Aliases>\n  <li>a&amp;b</li><li/></Aliases>')
+
+        self.assertEqual(
+            ('Aliases', {}, [u'\n  ', ('li', {}, [u'a&b'], None),
+                             ('li', {}, [], None)], None),
+            tt)
+
+    def test_parse_xml_api_string_packet_fault(self):
+        xml_string = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<ResponsePacket '
+            'xmlns="http://www.emc.com/schemas/celerra/xml_api">'
+            '<PacketFault maxSeverity="error">'
+            '<Problem messageCode="1" component="API" severity="error">'
+            '<Description>fake description</Description>'
+            '</Problem>'
+            '</PacketFault>'
+            '</ResponsePacket>')
+
+        result = parser.parse_xml_api_string(xml_string)
+
+        self.assertEqual(self._dom_parse(xml_string), result)
+        self.assertEqual('PacketFault', result[0])
+
+    def test_parse_xml_api_string_unexpected_record(self):
+        xml_string = (
+            '<ResponsePacket xmlns="fake"><Response>'
+            '<QueryStatus maxSeverity="ok"/><Unknown/>'
+            '</Response></ResponsePacket>')
+        self.mock_object(parser.LOG, 'warn')
+
+        result = parser.parse_xml_api_string(xml_string)
+
+        self.assertEqual([('QueryStatus', {'maxSeverity': 'ok'})], result)
+        self.assertEqual(2, parser.LOG.warn.call_count)
+
+    def test_parse_xml_api_packet(self):
+        xml_string = batch_responses(TD.resp_get_mover_ref(),
+                                     TD.resp_get_storage_pools())
+
+        result = parser.parse_xml_api_packet(xml_string)
+
+        self.assertEqual(
+            [parser.parse_xml_api_string(TD.resp_get_mover_ref()),
+             parser.parse_xml_api_string(TD.resp_get_storage_pools())],
+            result)
+
+
+class XMLAPIHelperTestCase(test.TestCase):
+
+    def setUp(self):
+        super(XMLAPIHelperTestCase, self).setUp()
+        self.configuration = conf.Configuration(None)
+        self.configuration.emc_nas_server = TD.emc_nas_server_default
+        self.configuration.emc_nas_login = 'fakename'
+        self.configuration.emc_nas_password = 'fakepwd'
+        self.mock_object(helper.XMLAPIConnector, '_do_setup')
+        self.helper = helper.XMLAPIHelper(self.configuration)
+
+    def test_query_batch(self):
+        self.mock_object(self.helper._conn, 'request', EMCMock(
+            return_value=batch_responses(TD.resp_get_mover_ref(),
+                                         TD.resp_get_storage_pools())))
+
+        mover, pools = self.helper.query_batch(
+            ('get_mover_ref_by_name', 'server_2'), ('list_storage_pool',))
+
+        self.helper._conn.request.assert_has_calls([
+            mock.call(batch_requests(TD.req_get_mover_ref(),
+                                     TD.req_get_storage_pools()))])
+        self.assertEqual((constants.STATUS_OK,
+                          {'name': 'server_2', 'id': '1'}), mover)
+        self.assertEqual(constants.STATUS_OK, pools[0])
+        self.assertEqual('fakepool', pools[1][0]['name'])
+
+    def test_query_batch_single(self):
+        self.mock_object(self.helper._conn, 'request', EMCMock(
+            return_value=TD.resp_get_mover_ref()))
+
+        result = self.helper.get_mover_ref_by_name('server_2')
+
+        self.helper._conn.request.assert_has_calls([
+            mock.call(TD.req_get_mover_ref())])
+        self.assertEqual((constants.STATUS_OK,
+                          {'name': 'server_2', 'id': '1'}), result)
+
+    def test_query_batch_packet_fault(self):
+        self.mock_object(self.helper._conn, 'request', mock.Mock(
+            return_value=(
+                '<ResponsePacket xmlns="fake">'
+                '<PacketFault maxSeverity="error">'
+                '<Problem messageCode="1" component="API" severity="error">'
+                '<Description>fake description</Description>'
+                '</Problem>'
+                '</PacketFault>'
+                '</ResponsePacket>')))
+
+        results = self.helper.query_batch(('get_vdm_by_name', 'fake'),
+                                          ('list_storage_pool',))
+
+        self.assertEqual(2, len(results))
+        for status, out in results:
+            self.assertEqual(constants.STATUS_ERROR, status)
+            self.assertEqual('1', out['info'][0]['messageCode'])
+
+
+class XMLAPIConnectorTestCase(test.TestCase):
+
+    def setUp(self):
+        super(XMLAPIConnectorTestCase, self).setUp()
+        self.configuration = conf.Configuration(None)
+        self.configuration.emc_nas_server = TD.emc_nas_server_default
+        self.configuration.emc_nas_login = 'fakename'
+        self.configuration.emc_nas_password = 'fakepwd'
+        self.mock_object(helper.XMLAPIConnector, '_do_setup')
+        self.connector = helper.XMLAPIConnector(self.configuration)
+        self.session = mock.Mock()
+        self.session.prepare_request.side_effect = lambda req: mock.Mock(
+            method=req.method, url=req.url, headers=req.headers,
+            body=req.data)
+        self.connector.session = self.session
+
+    def _response(self, status_code=200, content='fake_response'):
+        return mock.Mock(status_code=status_code, content=content,
+                         reason='fake_reason', headers={})
+
+    def test_init_mounts_keep_alive_adapter(self):
+        adapter = helper.XMLAPIConnector(
+            self.configuration).session.get_adapter(
+                'https://' + TD.emc_nas_server_default)
+
+        self.assertEqual(helper.XMLAPIConnector.POOL_SIZE,
+                         adapter._pool_maxsize)
+
+    def test_request(self):
+        self.session.send.return_value = self._response()
+
+        result = self.connector._request('fake_body')
+
+        self.assertEqual('fake_response', result)
+        sent = self.session.send.call_args[0][0]
+        self.assertEqual('POST', sent.method)
+        self.assertEqual(self.connector._url, sent.url)
+        self.assertEqual('fake_body', sent.body)
+        self.assertEqual(helper.XMLAPIConnector.TIMEOUT,
+                         self.session.send.call_args[1]['timeout'])
+        self.assertEqual(rest_transport.get_system_ca_bundle(),
+                         self.session.send.call_args[1]['verify'])
+
+    def test_request_get(self):
+        self.session.send.return_value = self._response()
+
+        self.connector._request()
+
+        self.assertEqual('GET', self.session.send.call_args[0][0].method)
+
+    def test_request_error(self):
+        self.session.send.return_value = self._response(status_code=500)
+
+        self.assertRaises(exception.ManilaException,
+                          self.connector._request, 'fake_body')
+
+    def test_request_not_authorized(self):
+        self.session.send.return_value = self._response(status_code=403)
+
+        self.assertRaises(exception.NotAuthorized,
+                          self.connector._request, 'fake_body')
+
+    def test_request_login_again(self):
+        self.mock_object(self.connector, '_request', mock.Mock(
+            side_effect=[exception.NotAuthorized(), 'fake_response']))
+        self.connector._do_setup.reset_mock()
+
+        result = XMLAPIConnector_request(self.connector, 'fake_body')
+
+        self.assertEqual('fake_response', result)
+        self.connector._do_setup.assert_called_once_with()
+        self.assertEqual(2, self.connector._request.call_count)
+
+
+@ddt.ddt
+class TopologyCacheTestCase(test.TestCase):
+
+    def setUp(self):
+        super(TopologyCacheTestCase, self).setUp()
+        self.cache = vnx_utils.TopologyCache(10)
+        self.mock_object(vnx_utils.time, 'time', mock.Mock(return_value=100))
+
+    def test_lookup(self):
+        result = (constants.STATUS_OK, {'name': 'fake', 'id': '1'})
+
+        self.assertIsNone(self.cache.lookup(('vdm', 'fake')))
+        self.cache.store(('vdm', 'fake'), result)
+
+        self.assertEqual(result, self.cache.lookup(('vdm', 'fake')))
+        self.assertEqual((1, 1), (self.cache.hits, self.cache.misses))
+
+    def test_lookup_returns_copies(self):
+        mover = {'name': 'fake', 'interfaces': [{'ip': '1.1.1.1'}]}
+        self.cache.store(('mover', 'fake'), (constants.STATUS_OK, mover))
+        mover['name'] = 'changed'
+
+        status, out = self.cache.lookup(('mover', 'fake'))
+        out['interfaces'].append({'ip': '2.2.2.2'})
+
+        self.assertEqual(
+            (constants.STATUS_OK,
+             {'name': 'fake', 'interfaces': [{'ip': '1.1.1.1'}]}),
+            self.cache.lookup(('mover', 'fake')))
+
+    def test_lookup_expired(self):
+        self.cache.store(('vdm', 'fake'), (constants.STATUS_OK, {}))
+        vnx_utils.time.time.return_value = 111
+
+        self.assertIsNone(self.cache.lookup(('vdm', 'fake')))
+        self.assertEqual(1, self.cache.misses)
+
+    @ddt.data((10, constants.STATUS_NOT_FOUND),
+              (10, constants.STATUS_ERROR),
+              (0, constants.STATUS_OK))
+    @ddt.unpack
+    def test_store_not_cached(self, ttl, status):
+        self.cache.ttl = ttl
+
+        self.cache.store(('vdm', 'fake'), (status, {}))
+
+        self.assertIsNone(self.cache.lookup(('vdm', 'fake')))
+
+    def test_invalidate(self):
+        for key in (('vdm', 'fake1'), ('vdm', 'fake2'),
+                    ('mover_ref', 'fake1')):
+            self.cache.store(key, (constants.STATUS_OK, {}))
+
+        self.cache.invalidate('vdm', 'fake1')
+
+        self.assertIsNone(self.cache.lookup(('vdm', 'fake1')))
+        self.assertIsNotNone(self.cache.lookup(('vdm', 'fake2')))
+        self.assertIsNotNone(self.cache.lookup(('mover_ref', 'fake1')))
+
+        self.cache.invalidate('vdm')
+
+        self.assertIsNone(self.cache.lookup(('vdm', 'fake2')))
+        self.assertIsNotNone(self.cache.lookup(('mover_ref', 'fake1')))
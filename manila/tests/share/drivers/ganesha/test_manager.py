@@ -106,6 +106,56 @@ class GaneshaConfigTests(test.TestCase):
         ret = manager._conf2json(test_ganesha_cnf_with_comment)
         self.assertEqual(test_dict_unicode, jsonutils.loads(ret))
 
+    def test_conf2json_unterminated_quote(self):
+        self.assertRaises(RuntimeError, manager._conf2json,
+                          'EXPORT { Path = "/fakepath; }')
+
+    def test_parseconf_syntax_variants(self):
+        conf = """EXPORT = {
+    Path = "/fake path";  # trailing comment "with quote"
+    Pseudo = "/fake" "/pseudo";
+    Tag = "fake\\"tag";
+    Export_Id = -101;
+    CLIENT { Clients = ip1, ip2 }
+    Ratio = 1.5;
+    Zero = 0;
+}"""
+        ret = manager.parseconf(conf)
+        self.assertEqual({'EXPORT': {'Path': '/fake path',
+                                     'Pseudo': '/fake/pseudo',
+                                     'Tag': 'fake"tag',
+                                     'Export_Id': -101,
+                                     'CLIENT': {'Clients': 'ip1,ip2'},
+                                     'Ratio': 1.5,
+                                     'Zero': '0'}}, ret)
+
+    def test_parseconf_invalid_input(self):
+        for conf in ('EXPORT {', 'EXPORT }', 'Export_Id 101;',
+                     'Export_Id = ;'):
+            self.assertRaises(ValueError, manager.parseconf, conf)
+
+    def test_parseconf_cache(self):
+        manager._PARSECONF_CACHE.clear()
+        self.addCleanup(manager._PARSECONF_CACHE.clear)
+        self.mock_object(manager, '_parse_conf',
+                         mock.Mock(return_value=test_dict_unicode))
+        ret1 = manager.parseconf(test_ganesha_cnf, cache=True)
+        ret1['EXPORT']['CLIENT']['Clients'] = 'ip2'
+        ret2 = manager.parseconf(test_ganesha_cnf, cache=True)
+        manager._parse_conf.assert_called_once_with(test_ganesha_cnf)
+        self.assertEqual(test_dict_unicode, ret2)
+
+    def test_parseconf_cache_size(self):
+        manager._PARSECONF_CACHE.clear()
+        self.addCleanup(manager._PARSECONF_CACHE.clear)
+        self.mock_object(manager, 'PARSECONF_CACHE_SIZE', 2)
+        self.mock_object(manager, '_parse_conf',
+                         mock.Mock(return_value={}))
+        for conf in ('a {}', 'b {}', 'a {}', 'c {}', 'a {}'):
+            manager.parseconf(conf, cache=True)
+        self.assertEqual(3, manager._parse_conf.call_count)
+        self.assertEqual(2, len(manager._PARSECONF_CACHE))
+
     def test_parseconf_ganesha_cnf_input(self):
         ret = manager.parseconf(test_ganesha_cnf)
         self.assertEqual(test_dict_unicode, ret)
@@ -290,7 +340,8 @@ class GaneshaManagerTestCase(test.TestCase):
         self._manager._getpath.assert_called_once_with(test_name)
         self._manager.execute.assert_called_once_with(
             *test_args, **test_kwargs)
-        manager.parseconf.assert_called_once_with(test_ganesha_cnf)
+        manager.parseconf.assert_called_once_with(test_ganesha_cnf,
+                                                  cache=True)
         self.assertEqual(test_dict_unicode, ret)
 
     def test_write_export_file(self):
@@ -521,3 +572,149 @@ class GaneshaManagerTestCase(test.TestCase):
             'sh', '-c', 'rm -f /fakedir0/export.d/*.conf')
         self._manager._mkindex.assert_called_once_with()
         self.assertEqual(None, ret)
+
+
+class BatchingGaneshaManagerTestCase(test.TestCase):
+    """Tests BatchingGaneshaManager."""
+
+    def setUp(self):
+        super(BatchingGaneshaManagerTestCase, self).setUp()
+        self._execute = mock.Mock(return_value=('', ''))
+        with contextlib.nested(
+            mock.patch.object(manager.BatchingGaneshaManager,
+                              'get_export_id', return_value=100),
+            mock.patch.object(manager.BatchingGaneshaManager,
+                              'reset_exports'),
+            mock.patch.object(manager.BatchingGaneshaManager,
+                              'restart_service')
+        ):
+            self._manager = manager.BatchingGaneshaManager(
+                self._execute, 'faketag', flush_interval=0,
+                **manager_fake_kwargs)
+        self._manager._export_id = 100
+        self.mock_object(utils, 'synchronized',
+                         mock.Mock(return_value=lambda f: f))
+
+    def test_init(self):
+        self.assertEqual(0, self._manager.flush_interval)
+        self.assertEqual(0, self._manager._committer.interval)
+        self.assertEqual('/fakedir1/fake.json',
+                         self._manager.ganesha_state_path)
+        self.assertEqual({}, self._manager._exports)
+
+    def test_get_export_id(self):
+        self.mock_object(self._manager, 'execute')
+        self.assertEqual(101, self._manager.get_export_id())
+        self.assertEqual(102, self._manager.get_export_id())
+        self.assertEqual(102, self._manager.get_export_id(bump=False))
+        self.assertFalse(self._manager.execute.called)
+
+    def test_get_export_id_loads_state(self):
+        self._manager._export_id = None
+        self.mock_object(self._manager, 'execute',
+                         mock.Mock(return_value=('{"exportid": 120}', '')))
+        ret = self._manager.get_export_id()
+        self._manager.execute.assert_called_once_with(
+            'cat', '/fakedir1/fake.json', run_as_root=False, makelog=False)
+        self.assertEqual(121, ret)
+
+    def test_get_export_id_loads_state_from_db(self):
+        self._manager._export_id = None
+        self.mock_object(self._manager, 'execute', mock.Mock(side_effect=[
+            exception.GaneshaCommandFailure(), ('exportid|130', '')]))
+        ret = self._manager.get_export_id(bump=False)
+        self._manager.execute.assert_called_with(
+            'sqlite3', self._manager.ganesha_db_path,
+            'select * from ganesha where key = "exportid";',
+            run_as_root=False)
+        self.assertEqual(130, ret)
+
+    def test_add_export(self):
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(self._manager, '_dbus_send_ganesha')
+        ret = self._manager.add_export(test_name, test_dict_str)
+        self.assertEqual({test_name: test_dict_str}, self._manager._exports)
+        self.assertEqual(1, self._manager.execute.call_count)
+        script = self._manager.execute.call_args[0][2]
+        self.assertIn("mv \"$tmpf\" %s" % test_path, script)
+        self.assertIn('%include ' + test_path, script)
+        self.assertIn("mv \"$tmpf\" /fakedir0/export.d/INDEX.conf", script)
+        self.assertIn("mv \"$tmpf\" /fakedir1/fake.json", script)
+        self._manager._dbus_send_ganesha.assert_called_once_with(
+            'AddExport', 'string:' + test_path,
+            'string:EXPORT(Export_Id=101)')
+        self.assertEqual(None, ret)
+
+    def test_add_export_error_incomplete_export_block(self):
+        self.mock_object(self._manager._committer, 'submit')
+        self.assertRaises(exception.InvalidParameterValue,
+                          self._manager.add_export, test_name,
+                          {'EXPORT': {'Path': '@config'}})
+        self.assertFalse(self._manager._committer.submit.called)
+
+    def test_add_export_error_during_sync(self):
+        self.mock_object(
+            self._manager, 'execute',
+            mock.Mock(side_effect=exception.GaneshaCommandFailure))
+        self.mock_object(self._manager, '_dbus_send_ganesha')
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.add_export, test_name, test_dict_str)
+        self.assertEqual({}, self._manager._exports)
+        self.assertFalse(self._manager._dbus_send_ganesha.called)
+
+    def test_add_export_error_during_dbus_send_ganesha(self):
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(
+            self._manager, '_dbus_send_ganesha',
+            mock.Mock(side_effect=exception.GaneshaCommandFailure))
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self._manager.add_export, test_name, test_dict_str)
+        self.assertEqual({}, self._manager._exports)
+        self.assertEqual(2, self._manager.execute.call_count)
+        self.assertIn('rm -f ' + test_path,
+                      self._manager.execute.call_args[0][2])
+
+    def test_remove_export(self):
+        self._manager._exports = {test_name: test_dict_unicode}
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(self._manager, '_remove_export_dbus')
+        ret = self._manager.remove_export(test_name)
+        self.assertEqual({}, self._manager._exports)
+        self.assertEqual(1, self._manager.execute.call_count)
+        self.assertIn('rm -f ' + test_path,
+                      self._manager.execute.call_args[0][2])
+        self._manager._remove_export_dbus.assert_called_once_with(101)
+        self.assertEqual(None, ret)
+
+    def test_remove_export_unknown(self):
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(self._manager, '_remove_export_dbus')
+        self.mock_object(manager.LOG, 'warning')
+        self._manager.remove_export(test_name)
+        self.assertFalse(self._manager._remove_export_dbus.called)
+        self.assertEqual(1, manager.LOG.warning.call_count)
+
+    def test_flush_coalesces_changes(self):
+        self._manager._exports = {'old': test_dict_unicode}
+        self.mock_object(self._manager, 'execute')
+        self.mock_object(self._manager, '_dbus_send_ganesha')
+        ops = [manager._ExportOp('add', 'new1', test_dict_str),
+               manager._ExportOp('add', 'new2', test_dict_str),
+               manager._ExportOp('remove', 'old')]
+        self._manager._flush(ops)
+        self.assertEqual(['new1', 'new2'], sorted(self._manager._exports))
+        self._manager.execute.assert_called_once_with(
+            'sh', '-c', mock.ANY, message=mock.ANY)
+        self.assertEqual(3, self._manager._dbus_send_ganesha.call_count)
+        self.assertTrue(all(op.exc_info is None for op in ops))
+
+    def test_reset_exports(self):
+        self._manager._exports = {test_name: test_dict_unicode}
+        self.mock_object(self._manager, 'execute')
+        ret = self._manager.reset_exports()
+        self.assertEqual({}, self._manager._exports)
+        self.assertEqual(
+            mock.call('sh', '-c', 'rm -f /fakedir0/export.d/*.conf'),
+            self._manager.execute.call_args_list[0])
+        self.assertEqual(2, self._manager.execute.call_count)
+        self.assertEqual(None, ret)
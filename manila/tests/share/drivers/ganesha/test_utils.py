@@ -14,10 +14,12 @@
 #    under the License.
 
 import os
+import sys
 
 import ddt
 import mock
 
+from manila import exception
 from manila.share.drivers.ganesha import utils as ganesha_utils
 from manila import test
 
@@ -76,3 +78,87 @@ class SSHExecutorTestCase(test.TestCase):
         self.execute.pool.get.assert_called_once_with()
         ganesha_utils.processutils.ssh_execute.assert_called_once_with(
             fake_ssh_object, expected_prefix + 'ls')
+
+    def test_get_ssh_executor(self):
+        self.mock_object(ganesha_utils, '_ssh_executors', {'fake': 'fake'})
+        self.mock_object(ganesha_utils, 'SSHExecutor',
+                         mock.Mock(side_effect=[mock.Mock(), mock.Mock()]))
+        exec1 = ganesha_utils.get_ssh_executor('fakeip', 22, None, 'user1',
+                                               password='fakepass')
+        exec2 = ganesha_utils.get_ssh_executor('fakeip', 22, None, 'user1',
+                                               password='fakepass')
+        exec3 = ganesha_utils.get_ssh_executor('fakeip', 22, None, 'user2',
+                                               password='fakepass')
+        self.assertIs(exec1, exec2)
+        self.assertIsNot(exec1, exec3)
+        ganesha_utils.SSHExecutor.assert_has_calls([
+            mock.call('fakeip', 22, None, 'user1', password='fakepass',
+                      privatekey=None),
+            mock.call('fakeip', 22, None, 'user2', password='fakepass',
+                      privatekey=None)])
+
+
+class FakeChange(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.exc_info = None
+
+
+class GroupCommitterTestCase(test.TestCase):
+
+    def setUp(self):
+        super(GroupCommitterTestCase, self).setUp()
+        self.commit = mock.Mock()
+        self.committer = ganesha_utils.GroupCommitter(self.commit,
+                                                      interval=0.5)
+        self.change1 = FakeChange('change1')
+        self.change2 = FakeChange('change2')
+        self.done2 = ganesha_utils.threading.Event()
+        # Another change arrives while the first one is waiting to be
+        # committed.
+        self.mock_object(ganesha_utils.time, 'sleep', mock.Mock(
+            side_effect=lambda i: self.committer._pending.append(
+                (self.change2, self.done2))))
+
+    def test_submit_batches_pending_changes(self):
+        self.committer.submit(self.change1)
+
+        ganesha_utils.time.sleep.assert_called_once_with(0.5)
+        self.commit.assert_called_once_with([self.change1, self.change2])
+        self.assertTrue(self.done2.is_set())
+        self.assertIsNone(self.change2.exc_info)
+        self.assertEqual([], self.committer._pending)
+        self.assertFalse(self.committer._scheduled)
+
+    def test_submit_no_interval(self):
+        self.committer.interval = 0
+
+        self.committer.submit(self.change1)
+
+        self.assertFalse(ganesha_utils.time.sleep.called)
+        self.commit.assert_called_once_with([self.change1])
+
+    def test_submit_commit_fails(self):
+        self.commit.side_effect = exception.GaneshaCommandFailure
+
+        self.assertRaises(exception.GaneshaCommandFailure,
+                          self.committer.submit, self.change1)
+        self.assertTrue(self.done2.is_set())
+        self.assertEqual(exception.GaneshaCommandFailure,
+                         self.change2.exc_info[0])
+
+    def test_submit_change_fails(self):
+        def commit(changes):
+            try:
+                raise exception.GaneshaCommandFailure()
+            except exception.GaneshaCommandFailure:
+                changes[1].exc_info = sys.exc_info()
+
+        self.commit.side_effect = commit
+
+        self.committer.submit(self.change1)
+
+        self.assertIsNone(self.change1.exc_info)
+        self.assertEqual(exception.GaneshaCommandFailure,
+                         self.change2.exc_info[0])
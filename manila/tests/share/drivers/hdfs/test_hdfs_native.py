@@ -19,12 +19,14 @@ import socket
 import mock
 from oslo_concurrency import processutils
 from oslo_config import cfg
+from oslo_utils import units
 import six
 
 from manila import context
 from manila import exception
 import manila.share.configuration as config
 import manila.share.drivers.hdfs.hdfs_native as hdfs_native
+from manila.share.drivers.hdfs import webhdfs
 from manila import test
 from manila.tests import fake_share
 from manila import utils
@@ -69,6 +71,26 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
         self._driver._get_hdfs_bin_path = mock.Mock()
         self._driver.do_setup(self._context)
         self._driver._get_hdfs_bin_path.assert_called_once_with()
+        self.assertIsNone(self._driver._webhdfs)
+
+    def test_do_setup_webhdfs(self):
+        self.flags(hdfs_webhdfs_enabled=True, hdfs_webhdfs_user='fake_user')
+        self._driver._get_hdfs_bin_path = mock.Mock()
+
+        self._driver.do_setup(self._context)
+
+        self.assertIsInstance(self._driver._webhdfs, webhdfs.WebHdfsClient)
+        self.assertEqual('fake_user', self._driver._webhdfs.user)
+        self.assertEqual(self._driver._hdfs_local_execute,
+                         self._driver._hdfs_execute)
+
+    def test_do_setup_webhdfs_default_user(self):
+        self.flags(hdfs_webhdfs_enabled=True)
+        self._driver._get_hdfs_bin_path = mock.Mock()
+
+        self._driver.do_setup(self._context)
+
+        self.assertEqual('fake_sshname', self._driver._webhdfs.user)
 
     def test_create_share(self):
         self._driver._create_share = mock.Mock()
@@ -102,6 +124,44 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
         self._driver._hdfs_execute.assert_any_call(
             'fake_hdfs_bin', 'dfsadmin', '-allowSnapshot', share_dir)
 
+    def test__create_share_webhdfs(self):
+        share_dir = '/' + self.share['name']
+        self._driver._webhdfs = mock.Mock()
+        self._driver._hdfs_execute = mock.Mock()
+
+        self._driver._create_share(self.share)
+
+        self._driver._webhdfs.mkdirs.assert_called_once_with(share_dir)
+        self._driver._webhdfs.set_space_quota.assert_called_once_with(
+            share_dir, self.share['size'] * units.Gi)
+        self._driver._webhdfs.allow_snapshot.assert_called_once_with(
+            share_dir)
+        self.assertFalse(self._driver._hdfs_execute.called)
+
+    def test__create_share_webhdfs_unsupported_op(self):
+        share_dir = '/' + self.share['name']
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.allow_snapshot.side_effect = (
+            webhdfs.WebHdfsError(400, 'IllegalArgumentException',
+                                 'Invalid value for webhdfs parameter "op"'))
+        self._driver._hdfs_execute = mock.Mock()
+
+        self._driver._create_share(self.share)
+
+        self._driver._hdfs_execute.assert_called_once_with(
+            'fake_hdfs_bin', 'dfsadmin', '-allowSnapshot', share_dir)
+
+    def test__create_share_webhdfs_exception(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.mkdirs.side_effect = webhdfs.WebHdfsError(
+            403, 'AccessControlException', 'Permission denied')
+        self._driver._hdfs_execute = mock.Mock()
+
+        self.assertRaises(exception.HDFSException,
+                          self._driver._create_share, self.share)
+        self.assertFalse(self._driver._webhdfs.set_space_quota.called)
+        self.assertFalse(self._driver._hdfs_execute.called)
+
     def test__create_share_exception(self):
         share_dir = '/' + self.share['name']
         self._driver._hdfs_execute = mock.Mock(
@@ -158,6 +218,17 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
             'fake_hdfs_bin', 'dfs', '-createSnapshot',
             '/' + self.snapshot['share_name'], self.snapshot['name'])
 
+    def test_create_snapshot_webhdfs(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._hdfs_execute = mock.Mock()
+
+        self._driver.create_snapshot(self._context, self.snapshot,
+                                     share_server=None)
+
+        self._driver._webhdfs.create_snapshot.assert_called_once_with(
+            '/' + self.snapshot['share_name'], self.snapshot['name'])
+        self.assertFalse(self._driver._hdfs_execute.called)
+
     def test_create_snapshot_exception(self):
         self._driver._hdfs_execute = mock.Mock(
             side_effect=exception.ProcessExecutionError)
@@ -177,6 +248,28 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
             'fake_hdfs_bin', 'dfs', '-rm', '-r',
             '/' + self.share['name'])
 
+    def test_delete_share_webhdfs(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._hdfs_execute = mock.Mock()
+
+        self._driver.delete_share(self._context, self.share,
+                                  share_server=None)
+
+        self._driver._webhdfs.delete.assert_called_once_with(
+            '/' + self.share['name'], True)
+        self.assertFalse(self._driver._hdfs_execute.called)
+
+    def test_delete_share_webhdfs_exception(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.delete.side_effect = webhdfs.WebHdfsError(
+            None, None, 'delete of /share-0 failed.')
+        self._driver._hdfs_execute = mock.Mock()
+
+        self.assertRaises(exception.HDFSException,
+                          self._driver.delete_share, self._context,
+                          self.share, share_server=None)
+        self.assertFalse(self._driver._hdfs_execute.called)
+
     def test_delete_share_exception(self):
         self._driver._hdfs_execute = mock.Mock(
             side_effect=exception.ProcessExecutionError)
@@ -198,6 +291,17 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
             'fake_hdfs_bin', 'dfs', '-deleteSnapshot',
             '/' + self.snapshot['share_name'], self.snapshot['name'])
 
+    def test_delete_snapshot_webhdfs(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._hdfs_execute = mock.Mock()
+
+        self._driver.delete_snapshot(self._context, self.snapshot,
+                                     share_server=None)
+
+        self._driver._webhdfs.delete_snapshot.assert_called_once_with(
+            '/' + self.snapshot['share_name'], self.snapshot['name'])
+        self.assertFalse(self._driver._hdfs_execute.called)
+
     def test_delete_snapshot_exception(self):
         self._driver._hdfs_execute = mock.Mock(
             side_effect=exception.ProcessExecutionError)
@@ -291,6 +395,100 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
         self._driver._hdfs_execute.assert_called_once_with(
             *cmd, check_exit_code=True)
 
+    def test_update_access(self):
+        self._driver._hdfs_execute = mock.Mock(return_value=['', ''])
+        share_dir = '/' + self.share['name']
+        access_ro = fake_share.fake_access(access_type='user',
+                                           access_to='fake_user',
+                                           access_level='ro')
+        access_old = fake_share.fake_access(access_type='user',
+                                            access_to='old_user')
+
+        self._driver.update_access(self._context, self.share,
+                                   [self.access, access_ro],
+                                   add_rules=[access_ro],
+                                   delete_rules=[access_old])
+
+        self.assertEqual(
+            [mock.call('fake_hdfs_bin', 'dfs', '-setfacl', '-R', '-x',
+                       'user:old_user,default:user:old_user', share_dir,
+                       check_exit_code=True),
+             mock.call('fake_hdfs_bin', 'dfs', '-setfacl', '-R', '-m',
+                       'user:fake_user:r-x,default:user:fake_user:r-x',
+                       share_dir, check_exit_code=True)],
+            self._driver._hdfs_execute.call_args_list)
+
+    def test_update_access_all_rules(self):
+        getfacl_out = ('# file: /%(share)s\n'
+                       '# owner: hdfs\n'
+                       '# group: supergroup\n'
+                       'user::rwx\n'
+                       'user:%(user)s:rwx\n'
+                       'user:stale_user:r-x\n'
+                       'group::r-x\n'
+                       'mask::rwx\n'
+                       'other::r-x\n'
+                       'default:user::rwx\n'
+                       'default:user:%(user)s:rwx\n'
+                       'default:user:stale_user:r-x\t#effective:r-x\n'
+                       % {'share': self.share['name'],
+                          'user': self.access['access_to']})
+        self._driver._hdfs_execute = mock.Mock(return_value=[getfacl_out,
+                                                             ''])
+        share_dir = '/' + self.share['name']
+        user_access = 'user:%s:rwx' % self.access['access_to']
+
+        self._driver.update_access(self._context, self.share, [self.access])
+
+        self.assertEqual(
+            [mock.call('fake_hdfs_bin', 'dfs', '-getfacl', share_dir,
+                       check_exit_code=True),
+             mock.call('fake_hdfs_bin', 'dfs', '-setfacl', '-R', '-x',
+                       'user:stale_user,default:user:stale_user', share_dir,
+                       check_exit_code=True),
+             mock.call('fake_hdfs_bin', 'dfs', '-setfacl', '-R', '-m',
+                       user_access + ',default:' + user_access +
+                       ',default:user::rwx,default:group::r-x,'
+                       'default:other::r-x',
+                       share_dir, check_exit_code=True)],
+            self._driver._hdfs_execute.call_args_list)
+
+    def test_update_access_delete_only(self):
+        self._driver._hdfs_execute = mock.Mock(return_value=['', ''])
+        share_dir = '/' + self.share['name']
+
+        self._driver.update_access(self._context, self.share, [],
+                                   add_rules=[], delete_rules=[self.access])
+
+        self._driver._hdfs_execute.assert_called_once_with(
+            'fake_hdfs_bin', 'dfs', '-setfacl', '-R', '-x',
+            'user:%(user)s,default:user:%(user)s'
+            % {'user': self.access['access_to']}, share_dir,
+            check_exit_code=True)
+
+    def test_update_access_invalid_access_type(self):
+        self._driver._hdfs_execute = mock.Mock()
+
+        self.assertRaises(exception.InvalidShareAccess,
+                          self._driver.update_access,
+                          self._context,
+                          self.share,
+                          [fake_share.fake_access(access_type='ip')])
+
+        self.assertFalse(self._driver._hdfs_execute.called)
+
+    def test_update_access_exception(self):
+        self._driver._hdfs_execute = mock.Mock(
+            side_effect=exception.ProcessExecutionError)
+
+        self.assertRaises(exception.HDFSException,
+                          self._driver.update_access,
+                          self._context,
+                          self.share,
+                          [self.access])
+
+        self.assertEqual(1, self._driver._hdfs_execute.call_count)
+
     def test__check_hdfs_state_healthy(self):
         fake_out = "fakeinfo\n...Status: HEALTHY"
         self._driver._hdfs_execute = mock.Mock(return_value=(fake_out, ''))
@@ -315,6 +513,40 @@ class HDFSNativeShareDriverTestCase(test.TestCase):
         self._driver._hdfs_execute.assert_called_once_with(
             'fake_hdfs_bin', 'fsck', '/')
 
+    def test__check_hdfs_state_webhdfs(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.is_healthy.return_value = False
+        self._driver._hdfs_execute = mock.Mock()
+
+        self.assertFalse(self._driver._check_hdfs_state())
+
+        self.assertFalse(self._driver._hdfs_execute.called)
+
+    def test__check_hdfs_state_webhdfs_exception(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.is_healthy.side_effect = webhdfs.WebHdfsError(
+            500, None, 'fake')
+
+        self.assertRaises(exception.HDFSException,
+                          self._driver._check_hdfs_state)
+
+    def test__get_available_capacity_webhdfs(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.get_capacity.return_value = (2, 1)
+        self._driver._hdfs_execute = mock.Mock()
+
+        self.assertEqual((2, 1), self._driver._get_available_capacity())
+
+        self.assertFalse(self._driver._hdfs_execute.called)
+
+    def test__get_available_capacity_webhdfs_exception(self):
+        self._driver._webhdfs = mock.Mock()
+        self._driver._webhdfs.get_capacity.side_effect = (
+            webhdfs.WebHdfsError(None, None, 'fake'))
+
+        self.assertRaises(exception.HDFSException,
+                          self._driver._get_available_capacity)
+
     def test__get_available_capacity(self):
         fake_out = 'Configured Capacity: 2.4\n' + \
             'Total Capacity: 2\n' + \
@@ -0,0 +1,151 @@
+# Copyright (c) 2015 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from oslo_utils import units
+import requests
+import requests_mock
+
+from manila.share.drivers.hdfs import webhdfs
+from manila import test
+
+BASE_URL = 'http://1.2.3.4:50070'
+
+
+class WebHdfsClientTestCase(test.TestCase):
+
+    def setUp(self):
+        super(WebHdfsClientTestCase, self).setUp()
+        self.client = webhdfs.WebHdfsClient('1.2.3.4', 50070,
+                                            user='fake_user')
+
+    @requests_mock.mock()
+    def test_mkdirs(self, m):
+        m.put(BASE_URL + '/webhdfs/v1/share-0', json={'boolean': True})
+
+        self.assertTrue(self.client.mkdirs('/share-0'))
+
+        request = m.request_history[0]
+        self.assertEqual({'op': ['mkdirs'], 'user.name': ['fake_user']},
+                         request.qs)
+
+    @requests_mock.mock()
+    def test_delete(self, m):
+        m.delete(BASE_URL + '/webhdfs/v1/share-0', json={'boolean': True})
+
+        self.assertTrue(self.client.delete('/share-0', recursive=True))
+
+        self.assertEqual(['true'], m.request_history[0].qs['recursive'])
+
+    @requests_mock.mock()
+    def test_mkdirs_false(self, m):
+        m.put(BASE_URL + '/webhdfs/v1/share-0', json={'boolean': False})
+
+        error = self.assertRaises(webhdfs.WebHdfsError,
+                                  self.client.mkdirs, '/share-0')
+
+        self.assertIsNone(error.status)
+
+    @requests_mock.mock()
+    def test_delete_false(self, m):
+        m.delete(BASE_URL + '/webhdfs/v1/share-0', json={'boolean': False})
+
+        self.assertRaises(webhdfs.WebHdfsError,
+                          self.client.delete, '/share-0', recursive=True)
+
+    @requests_mock.mock()
+    def test_create_snapshot(self, m):
+        m.put(BASE_URL + '/webhdfs/v1/share-0',
+              json={'Path': '/share-0/.snapshot/snap'})
+
+        path = self.client.create_snapshot('/share-0', 'snap')
+
+        self.assertEqual('/share-0/.snapshot/snap', path)
+        request = m.request_history[0]
+        self.assertEqual(['createsnapshot'], request.qs['op'])
+        self.assertEqual(['snap'], request.qs['snapshotname'])
+
+    @requests_mock.mock()
+    def test_set_space_quota(self, m):
+        m.put(BASE_URL + '/webhdfs/v1/share-0')
+
+        self.client.set_space_quota('/share-0', units.Gi)
+
+        request = m.request_history[0]
+        self.assertEqual(['setquota'], request.qs['op'])
+        self.assertEqual([str(units.Gi)], request.qs['storagespacequota'])
+
+    @requests_mock.mock()
+    def test_call_error(self, m):
+        m.put(BASE_URL + '/webhdfs/v1/share-0', status_code=403,
+              json={'RemoteException': {
+                  'exception': 'AccessControlException',
+                  'message': 'Permission denied'}})
+
+        error = self.assertRaises(webhdfs.WebHdfsError,
+                                  self.client.mkdirs, '/share-0')
+
+        self.assertEqual(403, error.status)
+        self.assertEqual('AccessControlException', error.exception_name)
+        self.assertEqual('Permission denied', error.message)
+        self.assertFalse(error.unsupported_op)
+
+    @requests_mock.mock()
+    def test_call_unsupported_op(self, m):
+        m.put(BASE_URL + '/webhdfs/v1/share-0', status_code=400,
+              json={'RemoteException': {
+                  'exception': 'IllegalArgumentException',
+                  'message': 'Invalid value for webhdfs parameter "op"'}})
+
+        error = self.assertRaises(webhdfs.WebHdfsError,
+                                  self.client.allow_snapshot, '/share-0')
+
+        self.assertTrue(error.unsupported_op)
+
+    @requests_mock.mock()
+    def test_call_connection_error(self, m):
+        self.mock_object(webhdfs.rest_transport.time, 'sleep')
+        m.put(BASE_URL + '/webhdfs/v1/share-0', exc=requests.ConnectionError)
+
+        error = self.assertRaises(webhdfs.WebHdfsError,
+                                  self.client.mkdirs, '/share-0')
+
+        self.assertIsNone(error.status)
+
+    @requests_mock.mock()
+    def test_get_capacity(self, m):
+        m.get(BASE_URL + '/jmx', json={'beans': [
+            {'CapacityTotal': 2 * units.Gi, 'CapacityRemaining': units.Gi}]})
+
+        self.assertEqual((2 * units.Gi, units.Gi),
+                         self.client.get_capacity())
+
+        self.assertEqual([webhdfs.FS_NAMESYSTEM_STATE_BEAN.lower()],
+                         m.request_history[0].qs['qry'])
+
+    @requests_mock.mock()
+    def test_get_capacity_error(self, m):
+        m.get(BASE_URL + '/jmx', json={'beans': []})
+
+        self.assertRaises(webhdfs.WebHdfsError, self.client.get_capacity)
+
+    @requests_mock.mock()
+    def test_is_healthy(self, m):
+        m.get(BASE_URL + '/jmx', [
+            {'json': {'beans': [{'MissingBlocks': 0, 'CorruptBlocks': 0}]}},
+            {'json': {'beans': [{'MissingBlocks': 1, 'CorruptBlocks': 0}]}},
+        ])
+
+        self.assertTrue(self.client.is_healthy())
+        self.assertFalse(self.client.is_healthy())
@@ -15,9 +15,6 @@
 
 """Unit tests for the Hitachi Data Systems Scale-out Platform manila driver."""
 
-import time
-
-import httplib2
 import mock
 from oslo_config import cfg
 from oslo_serialization import jsonutils as json
@@ -64,8 +61,7 @@ class SopShareDriverTestCase(test.TestCase):
         self._driver.share_backend_name = 'HDS_SOP'
 
     def test_add_file_system_sopapi(self):
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = sop.SopHttpClient()
 
         httpretval = ({'status': '202',
                        'content-length': '0',
@@ -101,12 +97,10 @@ class SopShareDriverTestCase(test.TestCase):
             body=json.dumps(fakepayload1),
             headers=fake_authorization)
         self._driver._wait_for_job_completion.assert_called_once_with(
-            httpclient,
             'https://1.2.3.4/sopapi/jobs/fakeuuid')
 
     def test_add_file_system_sopapi_belowminsize(self):
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = sop.SopHttpClient()
 
         httpretval = ({'status': '400',
                        'content-type': 'application/jsson',
@@ -151,8 +145,7 @@ class SopShareDriverTestCase(test.TestCase):
         self.assertEqual(False, self._driver._wait_for_job_completion.called)
 
     def test_wait_for_job_completion_simple(self):
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._driver._httpclient
 
         httpreturn = [
             ({'status': '200',
@@ -193,8 +186,9 @@ class SopShareDriverTestCase(test.TestCase):
 
         self.mock_object(httpclient, 'request',
                          mock.Mock(side_effect=httpreturn))
+        self.mock_object(sop.time, 'sleep')
 
-        fsadd = self._driver._wait_for_job_completion(httpclient, 'fakeuri')
+        fsadd = self._driver._wait_for_job_completion('fakeuri')
 
         expectedresult = {
             u'id': u'fakeuuid',
@@ -223,8 +217,7 @@ class SopShareDriverTestCase(test.TestCase):
         self.assertEqual(httpcalls, httpclient.request.call_args_list)
 
     def test_wait_for_job_completion_notimeout(self):
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._driver._httpclient
 
         httpreturn = [({'status': '200',
                         'content-location':
@@ -268,9 +261,9 @@ class SopShareDriverTestCase(test.TestCase):
 
         self.mock_object(httpclient, 'request',
                          mock.Mock(side_effect=httpreturn))
-        self.mock_object(time, 'sleep', mock.Mock())
+        mock_sleep = self.mock_object(sop.time, 'sleep')
 
-        fsadd = self._driver._wait_for_job_completion(httpclient, 'fakeuri')
+        fsadd = self._driver._wait_for_job_completion('fakeuri')
 
         expectedresult = {
             u'id': u'fakeuuid',
@@ -299,11 +292,10 @@ class SopShareDriverTestCase(test.TestCase):
                      for x in xrange(201)]
         self.assertEqual(httpcalls, httpclient.request.call_args_list)
         timecalls = [mock.call(1) for x in xrange(200)]
-        self.assertEqual(timecalls, time.sleep.call_args_list)
+        self.assertEqual(timecalls, mock_sleep.call_args_list)
 
     def test_wait_for_job_completion_timeout(self):
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = self._driver._httpclient
 
         httpret = [({'status': '200',
                      'content-location': 'https://1.2.3.4/sopapi/jobs/'
@@ -346,11 +338,10 @@ class SopShareDriverTestCase(test.TestCase):
                         ':""}}'))
 
         self.mock_object(httpclient, 'request', mock.Mock(side_effect=httpret))
-        self.mock_object(time, 'sleep', mock.Mock())
+        mock_sleep = self.mock_object(sop.time, 'sleep')
 
         self.assertRaises(exception.SopAPIError,
-                          self._driver._wait_for_job_completion,
-                          httpclient, 'fakeuri')
+                          self._driver._wait_for_job_completion, 'fakeuri')
         httpcalls = [mock.call('fakeuri',
                                'GET',
                                body='',
@@ -358,11 +349,10 @@ class SopShareDriverTestCase(test.TestCase):
                      for x in xrange(301)]
         self.assertEqual(httpcalls, httpclient.request.call_args_list)
         timecalls = [mock.call(1) for x in xrange(301)]
-        self.assertEqual(timecalls, time.sleep.call_args_list)
+        self.assertEqual(timecalls, mock_sleep.call_args_list)
 
     def test_add_share_sopapi(self):
-        httpclient = httplib2.Http(disable_ssl_certificate_validation=True,
-                                   timeout=None)
+        httpclient = sop.SopHttpClient()
 
         httpret = ({'status': '202',
                     'content-length': '0',
@@ -407,7 +397,7 @@ class SopShareDriverTestCase(test.TestCase):
                                headers=fake_authorization)]
         self.assertEqual(httpcalls, httpclient.request.call_args_list)
         self._driver._wait_for_job_completion.assert_called_once_with(
-            httpclient, 'https://' +
+            'https://' +
             self.server['backend_details']['ip'] +
             '/sopapi/jobs/fakeuuid')
 
@@ -491,7 +481,7 @@ class SopShareDriverTestCase(test.TestCase):
         self.mock_object(self._driver, '_get_share_id_by_name',
                          mock.Mock(return_value='fakeuuid'))
         self.mock_object(self._driver, '_wait_for_job_completion', mock.Mock())
-        self.mock_object(httplib2.Http, 'request', mock.Mock(
+        self.mock_object(sop.SopHttpClient, 'request', mock.Mock(
             return_value=({'status': '202',
                            'content-length': '0',
                            'x-sopapi-version': '1.0.0',
@@ -513,14 +503,14 @@ class SopShareDriverTestCase(test.TestCase):
 
         headers = dict(Authorization=self._driver.get_sop_auth_header())
 
-        httplib2.Http.request.assert_called_once_with(
+        sop.SopHttpClient.request.assert_called_once_with(
             'https://1.2.3.4/sopapi/shares/fakeuuid', 'POST',
             body=json.dumps(payload),
             headers=headers)
         self._driver._get_share_id_by_name.assert_called_once_with(
             mock.ANY, 'fakeid')
         self._driver._wait_for_job_completion.assert_called_once_with(
-            mock.ANY, 'https://' +
+            'https://' +
             self.server['backend_details']['ip'] +
             '/sopapi/jobs/fakeuuid')
 
@@ -541,7 +531,7 @@ class SopShareDriverTestCase(test.TestCase):
         self.mock_object(self._driver, '_get_share_id_by_name',
                          mock.Mock(return_value='fakeuuid'))
         self.mock_object(self._driver, '_wait_for_job_completion', mock.Mock())
-        self.mock_object(httplib2.Http, 'request', mock.Mock(
+        self.mock_object(sop.SopHttpClient, 'request', mock.Mock(
             return_value=({'status': '202',
                            'content-length': '0',
                            'x-sopapi-version': '1.0.0',
@@ -563,14 +553,14 @@ class SopShareDriverTestCase(test.TestCase):
 
         headers = dict(Authorization=self._driver.get_sop_auth_header())
 
-        httplib2.Http.request.assert_called_once_with(
+        sop.SopHttpClient.request.assert_called_once_with(
             'https://1.2.3.4/sopapi/shares/fakeuuid', 'POST',
             body=json.dumps(payload),
             headers=headers)
         self._driver._get_share_id_by_name.assert_called_once_with(
             mock.ANY, 'fakeid')
         self._driver._wait_for_job_completion.assert_called_once_with(
-            mock.ANY, 'https://' +
+            'https://' +
             self.server['backend_details']['ip'] +
             '/sopapi/jobs/fakeuuid')
 
@@ -583,7 +573,7 @@ class SopShareDriverTestCase(test.TestCase):
         self.mock_object(self._driver, '_get_share_id_by_name',
                          mock.Mock(return_value='fakeuuid'))
         self.mock_object(self._driver, '_wait_for_job_completion', mock.Mock())
-        self.mock_object(httplib2.Http, 'request', mock.Mock(
+        self.mock_object(sop.SopHttpClient, 'request', mock.Mock(
             return_value=({'status': '202', 'content-length': '0',
                            'x-sopapi-version': '1.0.0',
                            'set-cookie': 'JSESSIONID=abcdef;Path=/sopapi;S'
@@ -603,13 +593,13 @@ class SopShareDriverTestCase(test.TestCase):
 
         headers = dict(Authorization=self._driver.get_sop_auth_header())
 
-        httplib2.Http.request.assert_called_once_with(
+        sop.SopHttpClient.request.assert_called_once_with(
             'https://1.2.3.4/sopapi/shares/fakeuuid', 'POST',
             body=json.dumps(payload),
             headers=headers)
         self._driver._get_share_id_by_name.assert_called_once_with(
             mock.ANY, 'fakeid')
         self._driver._wait_for_job_completion.assert_called_once_with(
-            mock.ANY, 'https://' +
+            'https://' +
             self.server['backend_details']['ip'] +
             '/sopapi/jobs/fakeuuid')
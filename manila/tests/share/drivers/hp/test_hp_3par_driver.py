@@ -408,6 +408,45 @@ class HP3ParDriverTestCase(test.TestCase):
         ]
         self.mock_mediator.assert_has_calls(expected_calls)
 
+    def test_driver_update_access(self):
+        self.init_driver()
+
+        context = None
+        self.driver.update_access(context,
+                                  constants.NFS_SHARE_INFO,
+                                  [],
+                                  add_rules=[constants.ACCESS_INFO],
+                                  delete_rules=[])
+
+        expected_calls = [
+            mock.call.update_access(constants.EXPECTED_PROJECT_ID,
+                                    constants.EXPECTED_SHARE_ID,
+                                    constants.NFS,
+                                    constants.EXPECTED_FPG,
+                                    constants.EXPECTED_VFS,
+                                    add_rules=[constants.ACCESS_INFO],
+                                    delete_rules=[])
+        ]
+        self.mock_mediator.assert_has_calls(expected_calls)
+
+    def test_driver_update_access_all_rules(self):
+        self.init_driver()
+
+        context = None
+        self.driver.update_access(context,
+                                  constants.NFS_SHARE_INFO,
+                                  [constants.ACCESS_INFO])
+
+        expected_calls = [
+            mock.call.sync_access(constants.EXPECTED_PROJECT_ID,
+                                  constants.EXPECTED_SHARE_ID,
+                                  constants.NFS,
+                                  constants.EXPECTED_FPG,
+                                  constants.EXPECTED_VFS,
+                                  [constants.ACCESS_INFO])
+        ]
+        self.mock_mediator.assert_has_calls(expected_calls)
+
     def test_driver_get_share_stats_no_refresh(self):
         """Driver does not call mediator when refresh=False."""
 
@@ -921,6 +921,209 @@ class HP3ParMediatorTestCase(test.TestCase):
                          hp3parmediator.HP3ParMediator().ensure_prefix(
                              uid, protocol=protocol))
 
+    def test_mediator_update_access_cifs(self):
+        """Deny then allow many clients of a cifs share in two calls."""
+        self.init_mediator()
+        add_rules = [
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_1234},
+            {'access_type': constants.USER,
+             'access_to': constants.USERNAME},
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_127},
+        ]
+        delete_rules = [
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_10203040},
+        ]
+
+        self.mediator.update_access(constants.EXPECTED_PROJECT_ID,
+                                    constants.EXPECTED_SHARE_ID,
+                                    constants.CIFS,
+                                    constants.EXPECTED_FPG,
+                                    constants.EXPECTED_VFS,
+                                    add_rules=add_rules,
+                                    delete_rules=delete_rules)
+
+        expected_calls = [
+            mock.call(constants.SMB_LOWER,
+                      constants.EXPECTED_VFS,
+                      constants.EXPECTED_SHARE_ID,
+                      allowip='-%s' % constants.EXPECTED_IP_10203040,
+                      fpg=constants.EXPECTED_FPG,
+                      fstore=constants.EXPECTED_FSTORE),
+            mock.call(constants.SMB_LOWER,
+                      constants.EXPECTED_VFS,
+                      constants.EXPECTED_SHARE_ID,
+                      allowip='+%s,%s' % (constants.EXPECTED_IP_1234,
+                                          constants.EXPECTED_IP_127),
+                      allowperm='+%s:fullcontrol' % constants.USERNAME,
+                      fpg=constants.EXPECTED_FPG,
+                      fstore=constants.EXPECTED_FSTORE),
+        ]
+        self.assertEqual(expected_calls,
+                         self.mock_client.setfshare.call_args_list)
+        # The fstore is looked up for the first change only.
+        self.assertEqual(1, self.mock_client.getfshare.call_count)
+
+    def test_mediator_update_access_nfs(self):
+        """Allow many clients of a nfs share in one call."""
+        self.init_mediator()
+        add_rules = [
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_1234},
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_127},
+        ]
+
+        self.mediator.update_access(constants.EXPECTED_PROJECT_ID,
+                                    constants.EXPECTED_SHARE_ID,
+                                    constants.NFS,
+                                    constants.EXPECTED_FPG,
+                                    constants.EXPECTED_VFS,
+                                    add_rules=add_rules)
+
+        self.mock_client.setfshare.assert_called_once_with(
+            constants.NFS.lower(),
+            constants.EXPECTED_VFS,
+            constants.EXPECTED_SHARE_ID,
+            clientip='+%s,%s' % (constants.EXPECTED_IP_1234,
+                                 constants.EXPECTED_IP_127),
+            fpg=constants.EXPECTED_FPG,
+            fstore=constants.EXPECTED_FSTORE)
+
+    def test_mediator_sync_access_nfs(self):
+        """Deny the stale clients and allow the missing ones of a share."""
+        self.init_mediator()
+        self.mock_client.getfshare.return_value = {
+            'total': 1,
+            'members': [
+                {'fstoreName': constants.EXPECTED_FSTORE,
+                 'shareName': constants.EXPECTED_SHARE_ID,
+                 'clients': [constants.EXPECTED_IP_127,
+                             constants.EXPECTED_IP_10203040]}]
+        }
+        access_rules = [
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_1234},
+        ]
+
+        self.mediator.sync_access(constants.EXPECTED_PROJECT_ID,
+                                  constants.EXPECTED_SHARE_ID,
+                                  constants.NFS,
+                                  constants.EXPECTED_FPG,
+                                  constants.EXPECTED_VFS,
+                                  access_rules)
+
+        expected_calls = [
+            mock.call(constants.NFS.lower(),
+                      constants.EXPECTED_VFS,
+                      constants.EXPECTED_SHARE_ID,
+                      clientip='-%s' % constants.EXPECTED_IP_10203040,
+                      fpg=constants.EXPECTED_FPG,
+                      fstore=constants.EXPECTED_FSTORE),
+            mock.call(constants.NFS.lower(),
+                      constants.EXPECTED_VFS,
+                      constants.EXPECTED_SHARE_ID,
+                      clientip='+%s' % constants.EXPECTED_IP_1234,
+                      fpg=constants.EXPECTED_FPG,
+                      fstore=constants.EXPECTED_FSTORE),
+        ]
+        self.assertEqual(expected_calls,
+                         self.mock_client.setfshare.call_args_list)
+
+    def test_mediator_sync_access_cifs_in_sync(self):
+        self.init_mediator()
+        self.mock_client.getfshare.return_value = {
+            'total': 1,
+            'members': [
+                {'fstoreName': constants.EXPECTED_FSTORE,
+                 'shareName': constants.EXPECTED_SHARE_ID,
+                 'allowIP': [constants.EXPECTED_IP_127,
+                             constants.EXPECTED_IP_1234],
+                 'allowPerm': [[constants.USERNAME, 'fullcontrol']]}]
+        }
+        access_rules = [
+            {'access_type': constants.IP,
+             'access_to': constants.EXPECTED_IP_1234},
+            {'access_type': constants.USER,
+             'access_to': constants.USERNAME},
+        ]
+
+        self.mediator.sync_access(constants.EXPECTED_PROJECT_ID,
+                                  constants.EXPECTED_SHARE_ID,
+                                  constants.CIFS,
+                                  constants.EXPECTED_FPG,
+                                  constants.EXPECTED_VFS,
+                                  access_rules)
+
+        self.assertFalse(self.mock_client.setfshare.called)
+
+    def test_mediator_sync_access_no_share(self):
+        self.init_mediator()
+        self.mock_client.getfshare.return_value = {}
+
+        self.assertRaises(exception.ShareBackendException,
+                          self.mediator.sync_access,
+                          constants.EXPECTED_PROJECT_ID,
+                          constants.EXPECTED_SHARE_ID,
+                          constants.NFS,
+                          constants.EXPECTED_FPG,
+                          constants.EXPECTED_VFS,
+                          [])
+
+    def test_mediator_update_access_bad_type(self):
+        self.init_mediator()
+        add_rules = [
+            {'access_type': constants.USER,
+             'access_to': constants.USERNAME},
+        ]
+
+        self.assertRaises(exception.HP3ParInvalid,
+                          self.mediator.update_access,
+                          constants.EXPECTED_PROJECT_ID,
+                          constants.EXPECTED_SHARE_ID,
+                          constants.NFS,
+                          constants.EXPECTED_FPG,
+                          constants.EXPECTED_VFS,
+                          add_rules=add_rules)
+
+        self.assertFalse(self.mock_client.setfshare.called)
+
+    def test_mediator_change_access_failure_forgets_fstore(self):
+        self.init_mediator()
+        self.mock_client.setfshare.side_effect = Exception('fake')
+
+        for __ in range(2):
+            self.assertRaises(exception.ShareBackendException,
+                              self.mediator.allow_access,
+                              constants.EXPECTED_PROJECT_ID,
+                              constants.EXPECTED_SHARE_ID,
+                              constants.NFS,
+                              constants.IP,
+                              constants.EXPECTED_IP_1234,
+                              constants.EXPECTED_FPG,
+                              constants.EXPECTED_VFS)
+
+        self.assertEqual(2, self.mock_client.getfshare.call_count)
+
+    def test_find_fstore_cached(self):
+        self.init_mediator()
+
+        mock_find_fshare = self.mock_object(
+            self.mediator, '_find_fshare',
+            mock.Mock(return_value={'fstoreName': constants.EXPECTED_FSTORE}))
+
+        for __ in range(2):
+            result = self.mediator._find_fstore(constants.EXPECTED_PROJECT_ID,
+                                                constants.EXPECTED_SHARE_ID,
+                                                constants.NFS,
+                                                constants.EXPECTED_FPG,
+                                                constants.EXPECTED_VFS)
+            self.assertEqual(constants.EXPECTED_FSTORE, result)
+
+        self.assertEqual(1, mock_find_fshare.call_count)
+
     def test_find_fstore_search(self):
         self.init_mediator()
 
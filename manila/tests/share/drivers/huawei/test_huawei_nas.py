@@ -24,6 +24,8 @@ import xml.dom.minidom
 
 import mock
 from oslo_serialization import jsonutils
+import requests
+import requests_mock
 
 from manila import context
 from manila import exception
@@ -86,6 +88,7 @@ class FakeHuaweiNasHelper(huawei_helper.RestHelper):
         self.fs_status_flag = True
         self.create_share_flag = False
         self.snapshot_flag = True
+        self.share_filter_flag = True
 
     def _change_file_mode(self, filepath):
         pass
@@ -118,6 +121,27 @@ class FakeHuaweiNasHelper(huawei_helper.RestHelper):
                     data = """{"error":{"code":0},"data":{
                          "ID":"10"}}"""
 
+            if url == "NFSHARE?filter=SHAREPATH::/share_fake_uuid/":
+                if self.share_filter_flag:
+                    data = """{"error":{"code":0},
+                        "data":[{"ID":"1",
+                        "FSID":"4",
+                        "SHAREPATH":"/share_fake_uuid/"}]}"""
+                else:
+                    data = '{"error":{"code":50331651}}'
+
+            if url == "CIFSHARE?filter=SHAREPATH::/share_fake_uuid/":
+                if self.share_filter_flag:
+                    data = """{"error":{"code":0},
+                        "data":[{"ID":"2",
+                        "FSID":"4",
+                        "SHAREPATH":"/share_fake_uuid/"}]}"""
+                else:
+                    data = '{"error":{"code":50331651}}'
+
+            if url == "NFSHARE?filter=SHAREPATH::/share_not_exist/":
+                data = """{"error":{"code":0},"data":[]}"""
+
             if url == "NFSHARE?range=[100-200]":
                 data = """{"error":{"code":0},
                     "data":[{"ID":"1",
@@ -502,6 +526,113 @@ class HuaweiShareDriverTestCase(test.TestCase):
                                 self.access_user, self.share_server)
         self.assertTrue(self.driver.helper.deny_flag)
 
+    def test_get_share_by_name_filter(self):
+        self.driver.helper.login()
+        self.mock_object(self.driver.helper, 'call',
+                         mock.Mock(side_effect=self.driver.helper.call))
+
+        share = self.driver.helper._get_share_by_name('share-fake-uuid',
+                                                      'NFSHARE')
+        share_again = self.driver.helper._get_share_by_name(
+            'share-fake-uuid', 'NFSHARE')
+
+        self.assertEqual({'ID': '1', 'FSID': '4'}, share)
+        self.assertEqual(share, share_again)
+        self.driver.helper.call.assert_called_once_with(
+            self.driver.helper.url +
+            "/NFSHARE?filter=SHAREPATH::/share_fake_uuid/", None, "GET")
+
+    def test_get_share_by_name_filter_not_supported(self):
+        self.driver.helper.login()
+        self.driver.helper.share_filter_flag = False
+
+        share = self.driver.helper._get_share_by_name('share-fake-uuid',
+                                                      'CIFSHARE')
+
+        self.assertEqual({'ID': '2', 'FSID': '4'}, share)
+
+    def test_get_share_by_name_not_found(self):
+        self.driver.helper.login()
+
+        share = self.driver.helper._get_share_by_name('share-not-exist',
+                                                      'NFSHARE')
+
+        self.assertEqual({}, share)
+        self.assertEqual({}, self.driver.helper._share_index)
+
+    def test_delete_share_invalidates_index(self):
+        self.driver.helper.login()
+        self.driver.deny_access(self._context, self.share_nfs,
+                                self.access_ip, self.share_server)
+        self.assertTrue(self.driver.helper._share_index)
+        self.assertTrue(self.driver.helper._access_index)
+
+        self.driver.delete_share(self._context,
+                                 self.share_nfs, self.share_server)
+
+        self.assertEqual({}, self.driver.helper._share_index)
+        self.assertEqual({}, self.driver.helper._access_index)
+
+    def test_deny_access_uses_access_index(self):
+        self.driver.helper.login()
+        self.mock_object(self.driver.helper, 'call',
+                         mock.Mock(side_effect=self.driver.helper.call))
+        self.driver.helper._access_index[('NFS_SHARE_AUTH_CLIENT', '1')] = {
+            '100.112.0.1': '5'}
+
+        self.driver.deny_access(self._context, self.share_nfs,
+                                self.access_ip, self.share_server)
+
+        self.assertTrue(self.driver.helper.deny_flag)
+        self.assertEqual(2, self.driver.helper.call.call_count)
+        self.assertEqual(
+            {}, self.driver.helper._access_index[('NFS_SHARE_AUTH_CLIENT',
+                                                  '1')])
+
+    def test_allow_access_invalidates_access_index(self):
+        self.driver.helper.login()
+        self.driver.helper._access_index[('NFS_SHARE_AUTH_CLIENT', '1')] = {}
+
+        self.driver.allow_access(self._context, self.share_nfs,
+                                 self.access_ip, self.share_server)
+
+        self.assertTrue(self.driver.helper.allow_flag)
+        self.assertNotIn(('NFS_SHARE_AUTH_CLIENT', '1'),
+                         self.driver.helper._access_index)
+
+    def test_deny_access_error_forgets_share(self):
+        self.driver.helper.login()
+        self.driver.helper._share_index[('NFSHARE', '/share_fake_uuid/')] = {
+            'ID': '1', 'FSID': '4'}
+        self.driver.helper._access_index[('NFS_SHARE_AUTH_CLIENT', '1')] = {
+            '100.112.0.1': '5'}
+        self.mock_object(self.driver.helper, '_remove_access_from_share',
+                         mock.Mock(side_effect=exception.InvalidShare(
+                             reason='fake')))
+
+        self.assertRaises(exception.InvalidShare,
+                          self.driver.deny_access, self._context,
+                          self.share_nfs, self.access_ip, self.share_server)
+
+        self.assertEqual({}, self.driver.helper._share_index)
+        self.assertEqual({}, self.driver.helper._access_index)
+
+    def test_allow_access_error_forgets_share(self):
+        self.driver.helper.login()
+        self.driver.helper._share_index[('NFSHARE', '/share_fake_uuid/')] = {
+            'ID': '1', 'FSID': '4'}
+        self.driver.helper._access_index[('NFS_SHARE_AUTH_CLIENT', '1')] = {}
+        self.mock_object(self.driver.helper, '_allow_access_rest',
+                         mock.Mock(side_effect=exception.InvalidShare(
+                             reason='fake')))
+
+        self.assertRaises(exception.InvalidShare,
+                          self.driver.allow_access, self._context,
+                          self.share_nfs, self.access_ip, self.share_server)
+
+        self.assertEqual({}, self.driver.helper._share_index)
+        self.assertEqual({}, self.driver.helper._access_index)
+
     def test_deny_access_ip_fail(self):
         self.driver.helper.login()
         self.driver.helper.test_normal = False
@@ -523,6 +654,18 @@ class HuaweiShareDriverTestCase(test.TestCase):
                                     self.share_server)
         self.assertTrue(self.driver.helper.create_snapflag)
 
+    def test_create_snapshot_error_forgets_share(self):
+        self.driver.helper.login()
+        self.mock_object(self.driver.helper, '_create_snapshot',
+                         mock.Mock(side_effect=exception.InvalidShare(
+                             reason='fake')))
+
+        self.assertRaises(exception.InvalidShare,
+                          self.driver.create_snapshot, self._context,
+                          self.nfs_snapshot, self.share_server)
+
+        self.assertEqual({}, self.driver.helper._share_index)
+
     def test_create_cifs_snapshot_success(self):
         self.driver.helper.login()
         self.driver.helper.create_snapflag = False
@@ -623,3 +766,36 @@ class HuaweiShareDriverTestCase(test.TestCase):
         fakefile = open(self.fake_conf_file, 'w')
         fakefile.write(doc.toprettyxml(indent=''))
         fakefile.close()
+
+
+class HuaweiRestHelperTestCase(test.TestCase):
+
+    def setUp(self):
+        super(HuaweiRestHelperTestCase, self).setUp()
+        self.helper = huawei_helper.RestHelper(mock.Mock())
+
+    @requests_mock.mock()
+    def test_call(self, m):
+        m.post('https://fake/deviceManager/rest/xx/sessions',
+               text='{"error": {"code": 0}}')
+        m.put('https://fake/deviceManager/rest/fake',
+              text='{"error": {"code": 0}, "data": {}}')
+        self.helper.headers['iBaseToken'] = 'fake_token'
+
+        self.helper.call('https://fake/deviceManager/rest/xx/sessions',
+                         '{"username": "fake"}')
+        result = self.helper.call('https://fake/deviceManager/rest/fake',
+                                  '{}', 'PUT')
+
+        self.assertEqual({'error': {'code': 0}, 'data': {}}, result)
+        self.assertEqual(['POST', 'PUT'],
+                         [request.method for request in m.request_history])
+        self.assertEqual('fake_token',
+                         m.request_history[1].headers['iBaseToken'])
+
+    @requests_mock.mock()
+    def test_call_http_error(self, m):
+        m.get('https://fake/deviceManager/rest/fake', status_code=404)
+
+        self.assertRaises(requests.HTTPError, self.helper.call,
+                          'https://fake/deviceManager/rest/fake')
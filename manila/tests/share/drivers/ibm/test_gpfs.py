@@ -16,6 +16,8 @@
 
 import re
 import socket
+import threading
+import time
 
 import ddt
 import mock
@@ -99,8 +101,8 @@ class GPFSShareDriverTestCase(test.TestCase):
 
     def test_get_share_stats_refresh_true(self):
         self.mock_object(
-            self._driver, '_get_available_capacity',
-            mock.Mock(return_value=(11111.0, 12345.0)))
+            self._driver, '_get_stats',
+            mock.Mock(return_value={'total': 12345.0, 'free': 11111.0}))
         result = self._driver.get_share_stats(True)
         expected_keys = [
             'QoS_support', 'driver_version', 'share_backend_name',
@@ -112,13 +114,84 @@ class GPFSShareDriverTestCase(test.TestCase):
             self.assertIn(key, result)
         self.assertEqual(False, result['driver_handles_share_servers'])
         self.assertEqual('IBM', result['vendor_name'])
-        self._driver._get_available_capacity.assert_called_once_with(
-            self._driver.configuration.gpfs_mount_point_base)
+        self._driver._get_stats.assert_called_once_with()
 
     def test_do_setup(self):
         self.mock_object(self._driver, '_setup_helpers')
+        self.mock_object(self._driver, '_start_stats_task')
         self._driver.do_setup(self._context)
         self._driver._setup_helpers.assert_called_any()
+        self._driver._start_stats_task.assert_called_once_with()
+
+    @ddt.data(0, 30)
+    def test_start_stats_task(self, interval):
+        self._driver.configuration.gpfs_stats_update_interval = interval
+        mock_loopingcall = self.mock_object(
+            gpfs.loopingcall, 'FixedIntervalLoopingCall')
+
+        self._driver._start_stats_task()
+
+        if interval:
+            mock_loopingcall.assert_called_once_with(
+                self._driver._refresh_stats)
+            mock_loopingcall.return_value.start.assert_called_once_with(
+                interval=interval)
+        else:
+            self.assertFalse(mock_loopingcall.called)
+
+    def test__collect_stats(self):
+        df_out = ("Filesystem 1-blocks Used Available Capacity Mounted\n"
+                  "%s 12345 1234 11111 10%% %s\n" %
+                  (self.fakedev, self.fakefspath))
+        self._driver._gpfs_execute = mock.Mock(return_value=(df_out, ''))
+
+        result = self._driver._collect_stats()
+
+        expected = {
+            'device': self.fakedev,
+            'total': 12345,
+            'free': 11111,
+        }
+        self.assertEqual(expected, result)
+        self._driver._gpfs_execute.assert_called_once_with(
+            'df', '-P', '-B', '1',
+            self._driver.configuration.gpfs_mount_point_base)
+
+    def test__collect_stats_exception(self):
+        self._driver._gpfs_execute = mock.Mock(
+            side_effect=exception.ProcessExecutionError)
+        self.assertRaises(exception.GPFSException,
+                          self._driver._collect_stats)
+
+    def test__get_stats_cached(self):
+        self._driver.configuration.gpfs_stats_update_interval = 60
+        self.mock_object(self._driver, '_collect_stats',
+                         mock.Mock(side_effect=['stats1', 'stats2']))
+        self.mock_object(gpfs.time, 'time', mock.Mock(return_value=100))
+
+        self.assertEqual('stats1', self._driver._get_stats())
+        gpfs.time.time.return_value = 159
+        self.assertEqual('stats1', self._driver._get_stats())
+        gpfs.time.time.return_value = 160
+        self.assertEqual('stats2', self._driver._get_stats())
+        self.assertEqual(2, self._driver._collect_stats.call_count)
+
+    def test__get_stats_not_cached(self):
+        self._driver.configuration.gpfs_stats_update_interval = 0
+        self.mock_object(self._driver, '_collect_stats',
+                         mock.Mock(side_effect=['stats1', 'stats2']))
+
+        self.assertEqual('stats1', self._driver._get_stats())
+        self.assertEqual('stats2', self._driver._get_stats())
+
+    def test__refresh_stats_exception(self):
+        self.mock_object(self._driver, '_collect_stats', mock.Mock(
+            side_effect=exception.GPFSException('fake')))
+        self.mock_object(gpfs.LOG, 'exception')
+
+        self._driver._refresh_stats()
+
+        self.assertTrue(gpfs.LOG.exception.called)
 
     def test_setup_helpers(self):
         self._driver._helpers = {}
@@ -313,6 +386,12 @@ class GPFSShareDriverTestCase(test.TestCase):
         self._driver._gpfs_execute.assert_called_once_with('mmlsattr',
                                                            self.fakefspath)
 
+    def test__get_gpfs_device_cached(self):
+        self._driver._stats_cache = {'device': self.fakedev}
+        self._driver._gpfs_execute = mock.Mock()
+        self.assertEqual(self.fakedev, self._driver._get_gpfs_device())
+        self.assertFalse(self._driver._gpfs_execute.called)
+
     def test__get_gpfs_device(self):
         fakeout = "Filesystem\n" + self.fakedev
         orig_val = self._driver.configuration.gpfs_mount_point_base
@@ -452,6 +531,38 @@ class GPFSShareDriverTestCase(test.TestCase):
         self._driver._gpfs_local_execute(cmd)
         utils.execute.assert_called_once_with(cmd, run_as_root=True)
 
+    def test__get_ssh_pool(self):
+        self.mock_object(utils, 'SSHPool', mock.Mock(
+            side_effect=lambda host, *args, **kwargs: host))
+
+        self.assertEqual(self.local_ip,
+                         self._driver._get_ssh_pool(self.local_ip))
+        self.assertEqual(self.remote_ip,
+                         self._driver._get_ssh_pool(self.remote_ip))
+        self._driver._get_ssh_pool(self.local_ip)
+
+        self.assertEqual(2, utils.SSHPool.call_count)
+
+    def test__get_ssh_pool_concurrent(self):
+        def fake_ssh_pool(host, *args, **kwargs):
+            time.sleep(0.01)
+            return mock.Mock()
+
+        self.mock_object(utils, 'SSHPool',
+                         mock.Mock(side_effect=fake_ssh_pool))
+        pools = []
+        threads = [threading.Thread(
+            target=lambda: pools.append(
+                self._driver._get_ssh_pool(self.local_ip)))
+            for __ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(1, utils.SSHPool.call_count)
+        self.assertEqual(1, len(set(id(pool) for pool in pools)))
+
     def test__gpfs_remote_execute(self):
         self._driver._run_ssh = mock.Mock(return_value=True)
         cmd = "testcmd"
@@ -549,21 +660,36 @@ class GPFSShareDriverTestCase(test.TestCase):
 
     def test_knfs__publish_access(self):
         self.mock_object(utils, 'execute')
+        self._knfs_helper.configuration.gpfs_ssh_login = self.sshlogin
         cmd = ['fakecmd']
         self._knfs_helper._publish_access(*cmd)
+        self._knfs_helper._publish_access(*cmd)
         utils.execute.assert_any_call(*cmd, run_as_root=True,
                                       check_exit_code=True)
         remote_login = self.sshlogin + '@' + self.remote_ip
-        cmd = ['ssh', remote_login] + list(cmd)
-        utils.execute.assert_any_call(*cmd, run_as_root=False,
+        utils.execute.assert_any_call('ssh', remote_login, *cmd,
+                                      run_as_root=False,
                                       check_exit_code=True)
-        self.assertTrue(socket.gethostbyname_ex.called)
-        self.assertTrue(socket.gethostname.called)
+        self.assertEqual(4, utils.execute.call_count)
+        socket.gethostbyname_ex.assert_called_once_with('testserver')
+
+    def test_knfs__publish_access_ssh_execute(self):
+        self.mock_object(utils, 'execute')
+        ssh_execute = mock.Mock()
+        self._knfs_helper._ssh_execute = ssh_execute
+        cmd = ['fakecmd']
+        self._knfs_helper._publish_access(*cmd)
+        utils.execute.assert_called_once_with(*cmd, run_as_root=True,
+                                              check_exit_code=True)
+        ssh_execute.assert_called_once_with(self.remote_ip, tuple(cmd))
 
     def test_knfs__publish_access_exception(self):
         self.mock_object(
             utils, 'execute',
             mock.Mock(side_effect=exception.ProcessExecutionError))
+        ssh_execute = mock.Mock()
+        self._knfs_helper._ssh_execute = ssh_execute
+        self.mock_object(gpfs.LOG, 'error')
         cmd = ['fakecmd']
         self.assertRaises(exception.ProcessExecutionError,
                           self._knfs_helper._publish_access, *cmd)
@@ -571,6 +697,8 @@ class GPFSShareDriverTestCase(test.TestCase):
         self.assertTrue(socket.gethostname.called)
         utils.execute.assert_called_once_with(*cmd, run_as_root=True,
                                               check_exit_code=True)
+        ssh_execute.assert_called_once_with(self.remote_ip, tuple(cmd))
+        gpfs.LOG.error.assert_called_once_with(mock.ANY, mock.ANY)
 
     def test_gnfs_allow_access(self):
         self._gnfs_helper._ganesha_process_request = mock.Mock()
@@ -89,6 +89,29 @@ VSERVER_GET_ITER_RESPONSE = etree.XML("""
   </results>
 """ % {'fake_vserver': VSERVER_NAME})
 
+VSERVER_GET_ITER_FIRST_PAGE_RESPONSE = etree.XML("""
+  <results status="passed">
+    <attributes-list>
+      <vserver-info>
+        <vserver-name>%(fake_vserver)s</vserver-name>
+      </vserver-info>
+    </attributes-list>
+    <next-tag>&lt;vserver-get-iter-key-td&gt;</next-tag>
+    <num-records>1</num-records>
+  </results>
+""" % {'fake_vserver': VSERVER_NAME})
+
+VSERVER_GET_ITER_LAST_PAGE_RESPONSE = etree.XML("""
+  <results status="passed">
+    <attributes-list>
+      <vserver-info>
+        <vserver-name>%(fake_vserver)s2</vserver-name>
+      </vserver-info>
+    </attributes-list>
+    <num-records>1</num-records>
+  </results>
+""" % {'fake_vserver': VSERVER_NAME})
+
 VSERVER_GET_ROOT_VOLUME_NAME_RESPONSE = etree.XML("""
   <results status="passed">
     <attributes-list>
@@ -1243,6 +1266,42 @@ EXPORT_RULE_GET_ITER_RESPONSE = etree.XML("""
   </results>
 """ % {'policy': EXPORT_POLICY_NAME, 'rule': IP_ADDRESS})
 
+EXPORT_RULE_GET_ITER_RULES_RESPONSE = etree.XML("""
+  <results status="passed">
+    <attributes-list>
+      <export-rule-info>
+        <client-match>%(rule)s</client-match>
+        <rule-index>3</rule-index>
+        <rw-rule>
+          <security-flavor>never</security-flavor>
+        </rw-rule>
+      </export-rule-info>
+      <export-rule-info>
+        <client-match>%(rule)s</client-match>
+        <rule-index>1</rule-index>
+        <rw-rule>
+          <security-flavor>sys</security-flavor>
+        </rw-rule>
+      </export-rule-info>
+    </attributes-list>
+    <num-records>2</num-records>
+  </results>
+""" % {'rule': IP_ADDRESS})
+
+CIFS_SHARE_ACCESS_CONTROL_GET_ITER_RESPONSE = etree.XML("""
+  <results status="passed">
+    <attributes-list>
+      <cifs-share-access-control>
+        <user-or-group>%(user)s</user-or-group>
+      </cifs-share-access-control>
+      <cifs-share-access-control>
+        <user-or-group>Everyone</user-or-group>
+      </cifs-share-access-control>
+    </attributes-list>
+    <num-records>2</num-records>
+  </results>
+""" % {'user': USER_NAME})
+
 VOLUME_GET_EXPORT_POLICY_RESPONSE = etree.XML("""
   <results status="passed">
     <attributes-list>
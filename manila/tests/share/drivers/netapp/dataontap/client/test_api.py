@@ -19,7 +19,12 @@
 Tests for NetApp API layer
 """
 
+import copy
+
+import mock
+
 from manila.share.drivers.netapp.dataontap.client import api
+from manila.share.drivers import rest_transport
 from manila import test
 
 
@@ -154,3 +159,83 @@ class NetAppApiElementTransTests(test.TestCase):
                           api.NaElement('root').__setitem__,
                           None,
                           'value')
+
+
+class NetAppApiServerTests(test.TestCase):
+    """Test case for NetApp API server methods."""
+
+    RESPONSE = ('<netapp version="1.15" xmlns="%s"><results status="passed">'
+                '<num-records>1</num-records></results></netapp>'
+                % api.NaServer.NETAPP_NS)
+
+    def setUp(self):
+        super(NetAppApiServerTests, self).setUp()
+        self.session = mock.Mock()
+        self.session.post.return_value = mock.Mock(
+            status_code=200, content=self.RESPONSE)
+        self.mock_object(api.requests, 'Session',
+                         mock.Mock(return_value=self.session))
+        api._POOLS.clear()
+        api.reset_api_metrics()
+        self.addCleanup(api._POOLS.clear)
+        self.addCleanup(api.reset_api_metrics)
+        self.server = api.NaServer('fake_host', username='fake_user',
+                                   password='fake_password')
+        self.server.set_api_version(1, 15)
+
+    def test_invoke_elem(self):
+        result = self.server.invoke_elem(api.NaElement('fake-api'))
+
+        self.assertEqual('1', result.get_child_content('num-records'))
+        self.assertEqual(('fake_user', 'fake_password'), self.session.auth)
+        self.assertEqual(rest_transport.get_system_ca_bundle(),
+                         self.session.verify)
+        self.session.post.assert_called_once_with(
+            'http://fake_host:80/' + api.NaServer.URL_FILER,
+            data=mock.ANY,
+            headers={'Content-Type': 'text/xml', 'charset': 'utf-8'},
+            timeout=None)
+        self.assertIn('<fake-api/>', self.session.post.call_args[1]['data'])
+
+    def test_invoke_elem_shares_connection_pool(self):
+        vserver_server = copy.copy(self.server)
+        vserver_server.set_vserver('fake_vserver')
+        vserver_server.set_timeout(25)
+        other_server = api.NaServer('other_host', username='fake_user',
+                                    password='fake_password')
+
+        self.server.invoke_elem(api.NaElement('fake-api'))
+        vserver_server.invoke_elem(api.NaElement('fake-api'), True)
+        other_server.invoke_elem(api.NaElement('fake-api'))
+
+        self.assertEqual(2, api.requests.Session.call_count)
+        self.assertEqual(3, self.session.post.call_count)
+        self.assertIn('vfiler="fake_vserver"',
+                      self.session.post.call_args_list[1][1]['data'])
+        self.assertEqual(25, self.session.post.call_args_list[1][1]['timeout'])
+
+    def test_invoke_elem_http_error(self):
+        self.session.post.return_value = mock.Mock(status_code=401,
+                                                   reason='Unauthorized')
+
+        self.assertRaises(api.NaApiError, self.server.invoke_elem,
+                          api.NaElement('fake-api'))
+        self.assertEqual({}, api.get_api_metrics())
+
+    def test_invoke_elem_connection_error(self):
+        self.session.post.side_effect = Exception('fake_error')
+
+        self.assertRaises(api.NaApiError, self.server.invoke_elem,
+                          api.NaElement('fake-api'))
+
+    def test_invoke_elem_metrics(self):
+        self.mock_object(api.time, 'time', mock.Mock(
+            side_effect=[10.0, 10.5, 20.0, 20.25]))
+
+        self.server.invoke_elem(api.NaElement('fake-api'))
+        self.server.invoke_elem(api.NaElement('fake-api'))
+
+        self.assertEqual(
+            {'fake-api': {'calls': 2, 'seconds': 0.75, 'max_seconds': 0.5,
+                          'bytes': 2 * len(self.RESPONSE)}},
+            api.get_api_metrics())
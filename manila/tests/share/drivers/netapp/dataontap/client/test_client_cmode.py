@@ -79,6 +79,49 @@ class NetAppClientCmodeTestCase(test.TestCase):
         self.assertFalse(self.client._has_records(
             netapp_api.NaElement(fake.NO_RECORDS_RESPONSE)))
 
+    def test_get_iter_records(self):
+        api_responses = [
+            netapp_api.NaElement(fake.VSERVER_GET_ITER_FIRST_PAGE_RESPONSE),
+            netapp_api.NaElement(fake.VSERVER_GET_ITER_LAST_PAGE_RESPONSE),
+        ]
+        self.mock_object(self.client,
+                         'send_request',
+                         mock.Mock(side_effect=api_responses))
+        api_args = {'desired-attributes': {'vserver-info': None}}
+
+        result = self.client._get_iter_records('vserver-get-iter', api_args,
+                                               max_page_length=1)
+
+        self.assertEqual(fake.VSERVER_NAME,
+                         next(result).get_child_content('vserver-name'))
+        self.assertEqual(1, self.client.send_request.call_count)
+        self.assertEqual([fake.VSERVER_NAME + '2'],
+                         [record.get_child_content('vserver-name')
+                          for record in result])
+        self.client.send_request.assert_has_calls([
+            mock.call('vserver-get-iter',
+                      {'desired-attributes': {'vserver-info': None},
+                       'max-records': 1}),
+            mock.call('vserver-get-iter',
+                      {'desired-attributes': {'vserver-info': None},
+                       'max-records': 1,
+                       'tag': '<vserver-get-iter-key-td>'})])
+        self.assertEqual({'desired-attributes': {'vserver-info': None}},
+                         api_args)
+
+    def test_get_iter_records_not_found(self):
+        api_response = netapp_api.NaElement(fake.NO_RECORDS_RESPONSE)
+        self.mock_object(self.client,
+                         'send_request',
+                         mock.Mock(return_value=api_response))
+
+        result = list(self.client._get_iter_records('vserver-get-iter'))
+
+        self.assertEqual([], result)
+        self.client.send_request.assert_called_once_with(
+            'vserver-get-iter',
+            {'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH})
+
     def test_set_vserver(self):
         self.client.set_vserver(fake.VSERVER_NAME)
         self.client.connection.set_vserver.assert_has_calls(
@@ -181,6 +224,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client.list_vservers()
 
         vserver_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'vserver-info': {
                     'vserver-type': 'data'
@@ -207,6 +251,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client.list_vservers(vserver_type='node')
 
         vserver_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'vserver-info': {
                     'vserver-type': 'node'
@@ -477,6 +522,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client.get_node_data_ports(fake.NODE_NAME)
 
         net_port_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'net-port-info': {
                     'node': fake.NODE_NAME,
@@ -733,6 +779,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
                          mock.Mock(return_value=api_response))
 
         net_interface_get_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'desired-attributes': {
                 'net-interface-info': {
                     'interface-name': None,
@@ -768,7 +815,8 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client.get_network_interfaces()
 
         self.client.send_request.assert_has_calls([
-            mock.call('net-interface-get-iter', None)])
+            mock.call('net-interface-get-iter', {
+                'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH})])
         self.assertSequenceEqual(fake.LIFS, result)
 
     def test_get_network_interfaces_filtered_by_protocol(self):
@@ -782,6 +830,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client.get_network_interfaces(protocols=['NFS'])
 
         net_interface_get_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'net-interface-info': {
                     'data-protocols': {
@@ -805,7 +854,8 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client.get_network_interfaces()
 
         self.client.send_request.assert_has_calls([
-            mock.call('net-interface-get-iter', None)])
+            mock.call('net-interface-get-iter', {
+                'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH})])
         self.assertListEqual([], result)
 
     def test_delete_network_interface(self):
@@ -962,7 +1012,8 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client._get_aggregates()
 
         self.client.send_request.assert_has_calls([
-            mock.call('aggr-get-iter', {})])
+            mock.call('aggr-get-iter', {
+                'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH})])
         self.assertListEqual(
             [aggr.to_string() for aggr in api_response.get_child_by_name(
                 'attributes-list').get_children()],
@@ -990,6 +1041,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
             desired_attributes=desired_attributes)
 
         aggr_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'aggr-attributes': {
                     'aggregate-name': '|'.join(fake.SHARE_AGGREGATE_NAMES),
@@ -1015,7 +1067,8 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client._get_aggregates()
 
         self.client.send_request.assert_has_calls([
-            mock.call('aggr-get-iter', {})])
+            mock.call('aggr-get-iter', {
+                'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH})])
         self.assertListEqual([], result)
 
     def test_setup_security_services_ldap(self):
@@ -1810,6 +1863,34 @@ class NetAppClientCmodeTestCase(test.TestCase):
                 'cifs-share-access-control-create',
                 cifs_share_access_control_create_args)])
 
+    def test_get_cifs_share_access(self):
+
+        api_response = netapp_api.NaElement(
+            fake.CIFS_SHARE_ACCESS_CONTROL_GET_ITER_RESPONSE)
+        self.mock_object(self.client,
+                         'send_request',
+                         mock.Mock(return_value=api_response))
+
+        result = self.client.get_cifs_share_access(fake.SHARE_NAME)
+
+        cifs_share_access_control_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
+            'query': {
+                'cifs-share-access-control': {
+                    'share': fake.SHARE_NAME,
+                },
+            },
+            'desired-attributes': {
+                'cifs-share-access-control': {
+                    'user-or-group': None,
+                },
+            },
+        }
+        self.assertEqual([fake.USER_NAME, 'Everyone'], result)
+        self.client.send_request.assert_called_once_with(
+            'cifs-share-access-control-get-iter',
+            cifs_share_access_control_get_iter_args)
+
     def test_remove_cifs_share_access(self):
 
         self.mock_object(self.client, 'send_request')
@@ -1972,6 +2053,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
             fake.EXPORT_POLICY_NAME, fake.IP_ADDRESS)
 
         export_rule_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'export-rule-info': {
                     'policy-name': fake.EXPORT_POLICY_NAME,
@@ -1991,6 +2073,119 @@ class NetAppClientCmodeTestCase(test.TestCase):
         self.client.send_request.assert_has_calls([
             mock.call('export-rule-get-iter', export_rule_get_iter_args)])
 
+    def test_get_nfs_export_rules(self):
+
+        api_response = netapp_api.NaElement(
+            fake.EXPORT_RULE_GET_ITER_RULES_RESPONSE)
+        self.mock_object(self.client,
+                         'send_request',
+                         mock.Mock(return_value=api_response))
+
+        result = self.client.get_nfs_export_rules(fake.EXPORT_POLICY_NAME)
+
+        export_rule_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
+            'query': {
+                'export-rule-info': {
+                    'policy-name': fake.EXPORT_POLICY_NAME,
+                },
+            },
+            'desired-attributes': {
+                'export-rule-info': {
+                    'client-match': None,
+                    'rule-index': None,
+                    'rw-rule': {
+                        'security-flavor': None,
+                    },
+                },
+            },
+        }
+        expected = [
+            {'rule-index': 1, 'client-match': fake.IP_ADDRESS,
+             'readonly': False},
+            {'rule-index': 3, 'client-match': fake.IP_ADDRESS,
+             'readonly': True},
+        ]
+        self.assertEqual(expected, result)
+        self.client.send_request.assert_has_calls([
+            mock.call('export-rule-get-iter', export_rule_get_iter_args)])
+
+    def test_update_nfs_export_rules(self):
+
+        existing_rules = [
+            {'rule-index': 1, 'client-match': '10.0.0.1', 'readonly': False},
+            {'rule-index': 2, 'client-match': '10.0.0.2', 'readonly': False},
+            {'rule-index': 3, 'client-match': '10.0.0.2', 'readonly': True},
+        ]
+        self.mock_object(self.client,
+                         'get_nfs_export_rules',
+                         mock.Mock(return_value=existing_rules))
+        mock_apply_nfs_export_rules = self.mock_object(
+            self.client, '_apply_nfs_export_rules')
+
+        self.client.update_nfs_export_rules(
+            fake.EXPORT_POLICY_NAME,
+            add_rules={'10.0.0.3': True},
+            remove_rules=['10.0.0.1', '10.0.0.4'])
+
+        mock_apply_nfs_export_rules.assert_called_once_with(
+            fake.EXPORT_POLICY_NAME, existing_rules,
+            {'10.0.0.2': False, '10.0.0.3': True})
+
+    def test_reconcile_nfs_export_rules(self):
+
+        existing_rules = [
+            {'rule-index': 1, 'client-match': '10.0.0.1', 'readonly': False},
+        ]
+        self.mock_object(self.client,
+                         'get_nfs_export_rules',
+                         mock.Mock(return_value=existing_rules))
+        mock_apply_nfs_export_rules = self.mock_object(
+            self.client, '_apply_nfs_export_rules')
+
+        self.client.reconcile_nfs_export_rules(fake.EXPORT_POLICY_NAME,
+                                               {'10.0.0.2': True})
+
+        mock_apply_nfs_export_rules.assert_called_once_with(
+            fake.EXPORT_POLICY_NAME, existing_rules, {'10.0.0.2': True})
+
+    @ddt.data(
+        # Nothing to do.
+        ({'10.0.0.1': False, '10.0.0.2': True}, [], [], []),
+        # Access level changed in place.
+        ({'10.0.0.1': True, '10.0.0.2': True},
+         [('10.0.0.1', True, '1')], [], []),
+        # Stale rules are reused for new clients, then destroyed.
+        ({'10.0.0.3': False}, [('10.0.0.3', False, '1')], ['2'], []),
+        # New clients are added once no stale rule is left.
+        ({'10.0.0.1': False, '10.0.0.2': True, '10.0.0.3': False},
+         [], [], [('10.0.0.3', False)]))
+    @ddt.unpack
+    def test_apply_nfs_export_rules(self, rules, updated, removed, added):
+
+        existing_rules = [
+            {'rule-index': 1, 'client-match': '10.0.0.1', 'readonly': False},
+            {'rule-index': 2, 'client-match': '10.0.0.2', 'readonly': True},
+        ]
+        mock_add_nfs_export_rule = self.mock_object(
+            self.client, '_add_nfs_export_rule')
+        mock_update_nfs_export_rule = self.mock_object(
+            self.client, '_update_nfs_export_rule')
+        mock_remove_nfs_export_rules = self.mock_object(
+            self.client, '_remove_nfs_export_rules')
+
+        self.client._apply_nfs_export_rules(fake.EXPORT_POLICY_NAME,
+                                            existing_rules, rules)
+
+        self.assertEqual(
+            [mock.call(fake.EXPORT_POLICY_NAME, *args) for args in updated],
+            mock_update_nfs_export_rule.call_args_list)
+        mock_remove_nfs_export_rules.assert_called_once_with(
+            fake.EXPORT_POLICY_NAME, removed)
+        self.assertEqual(
+            [mock.call(fake.EXPORT_POLICY_NAME, *args) for args in added],
+            mock_add_nfs_export_rule.call_args_list)
+
     def test_remove_nfs_export_rule(self):
 
         fake_indices = ['1', '3', '4']
@@ -2267,6 +2462,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
         result = self.client._get_deleted_nfs_export_policies()
 
         export_policy_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'export-policy-info': {
                     'policy-name': 'deleted_manila_*',
@@ -2408,6 +2604,7 @@ class NetAppClientCmodeTestCase(test.TestCase):
             fake.SHARE_AGGREGATE_NAMES)
 
         aggr_get_iter_args = {
+            'max-records': client_cmode.DEFAULT_MAX_PAGE_LENGTH,
             'query': {
                 'aggr-attributes': {
                     'aggregate-name': '|'.join(fake.SHARE_AGGREGATE_NAMES),
@@ -207,30 +207,39 @@ class NetAppFileStorageLibraryTestCase(test.TestCase):
 
         mock_update_ssc_info = self.mock_object(self.library,
                                                 '_update_ssc_info')
+        mock_update_pool_stats = self.mock_object(self.library,
+                                                  '_update_pool_stats')
         mock_handle_ems_logging = self.mock_object(self.library,
                                                    '_handle_ems_logging')
         mock_handle_housekeeping_tasks = self.mock_object(
             self.library, '_handle_housekeeping_tasks')
         mock_ssc_periodic_task = mock.Mock()
+        mock_pool_stats_periodic_task = mock.Mock()
         mock_ems_periodic_task = mock.Mock()
         mock_housekeeping_periodic_task = mock.Mock()
         mock_loopingcall = self.mock_object(
             loopingcall,
             'FixedIntervalLoopingCall',
             mock.Mock(side_effect=[mock_ssc_periodic_task,
+                                   mock_pool_stats_periodic_task,
                                    mock_ems_periodic_task,
                                    mock_housekeeping_periodic_task]))
 
         self.library._start_periodic_tasks()
 
         self.assertTrue(mock_update_ssc_info.called)
+        self.assertTrue(mock_update_pool_stats.called)
         self.assertFalse(mock_handle_ems_logging.called)
         self.assertFalse(mock_housekeeping_periodic_task.called)
         mock_loopingcall.assert_has_calls(
             [mock.call(mock_update_ssc_info),
+             mock.call(mock_update_pool_stats),
              mock.call(mock_handle_ems_logging),
              mock.call(mock_handle_housekeeping_tasks)])
         self.assertTrue(mock_ssc_periodic_task.start.called)
+        mock_pool_stats_periodic_task.start.assert_called_once_with(
+            interval=self.library.POOL_STATS_UPDATE_INTERVAL_SECONDS,
+            initial_delay=self.library.POOL_STATS_UPDATE_INTERVAL_SECONDS)
         self.assertTrue(mock_ems_periodic_task.start.called)
         self.assertTrue(mock_housekeeping_periodic_task.start.called)
 
@@ -287,6 +296,8 @@ class NetAppFileStorageLibraryTestCase(test.TestCase):
                          '_get_aggregate_space',
                          mock.Mock(return_value=fake.AGGREGATE_CAPACITIES))
         self.library._ssc_stats = fake.SSC_INFO
+        self.library._update_pool_stats()
+        self.library._get_aggregate_space.reset_mock()
 
         result = self.library.get_share_stats()
 
@@ -322,6 +333,32 @@ class NetAppFileStorageLibraryTestCase(test.TestCase):
         }
 
         self.assertDictEqual(expected, result)
+        self.assertFalse(self.library._get_aggregate_space.called)
+        result['pools'][0]['free_capacity_gb'] = 0
+        self.assertEqual(1.1, self.library._pool_stats[0]['free_capacity_gb'])
+
+    def test_get_share_stats_not_collected(self):
+
+        self.mock_object(self.library, '_get_aggregate_space')
+
+        result = self.library.get_share_stats()
+
+        self.assertEqual([], result['pools'])
+        self.assertFalse(self.library._get_aggregate_space.called)
+
+    def test_update_pool_stats_error(self):
+
+        pool_stats = ({'pool_name': fake.AGGREGATES[0]},)
+        self.library._pool_stats = pool_stats
+        self.mock_object(self.library,
+                         '_get_aggregate_space',
+                         mock.Mock(side_effect=exception.NetAppException))
+        self.mock_object(lib_base.LOG, 'error')
+
+        self.library._update_pool_stats()
+
+        self.assertIs(pool_stats, self.library._pool_stats)
+        self.assertEqual(1, lib_base.LOG.error.call_count)
 
     def test_handle_ems_logging(self):
 
@@ -1108,6 +1145,34 @@ class NetAppFileStorageLibraryTestCase(test.TestCase):
             fake.SHARE_NAME,
             fake.SHARE_ACCESS)
 
+    def test_update_access(self):
+
+        protocol_helper = mock.Mock()
+        self.mock_object(self.library,
+                         '_get_helper',
+                         mock.Mock(return_value=protocol_helper))
+        vserver_client = mock.Mock()
+        self.mock_object(self.library,
+                         '_get_vserver',
+                         mock.Mock(return_value=(fake.VSERVER1,
+                                                 vserver_client)))
+
+        self.library.update_access(self.context,
+                                   fake.SHARE,
+                                   [fake.SHARE_ACCESS],
+                                   add_rules=[fake.SHARE_ACCESS],
+                                   delete_rules=[],
+                                   share_server=fake.SHARE_SERVER)
+
+        protocol_helper.set_client.assert_called_once_with(vserver_client)
+        protocol_helper.update_access.assert_called_once_with(
+            self.context,
+            fake.SHARE,
+            fake.SHARE_NAME,
+            [fake.SHARE_ACCESS],
+            add_rules=[fake.SHARE_ACCESS],
+            delete_rules=[])
+
     def test_setup_server(self):
         self.assertRaises(NotImplementedError,
                           self.library.setup_server,
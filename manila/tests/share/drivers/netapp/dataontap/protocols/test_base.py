@@ -15,6 +15,7 @@
 Mock unit tests for the NetApp driver protocols base class module.
 """
 
+from manila.share.drivers.netapp.dataontap.protocols import base
 from manila.share.drivers.netapp.dataontap.protocols import cifs_cmode
 from manila import test
 
@@ -29,3 +30,27 @@ class NetAppNASHelperBaseTestCase(test.TestCase):
 
         helper.set_client('fake_client')
         self.assertEqual('fake_client', helper._client)
+
+    def test_update_access(self):
+        helper = cifs_cmode.NetAppCmodeCIFSHelper()
+        mock_allow_access = self.mock_object(helper, 'allow_access')
+        mock_deny_access = self.mock_object(helper, 'deny_access')
+
+        helper.update_access('context', 'share', 'share_name', ['rule1'],
+                             add_rules=['rule2'], delete_rules=['rule3'])
+
+        mock_allow_access.assert_called_once_with(
+            'context', 'share', 'share_name', 'rule2')
+        mock_deny_access.assert_called_once_with(
+            'context', 'share', 'share_name', 'rule3')
+
+    def test_update_access_resync(self):
+        helper = cifs_cmode.NetAppCmodeCIFSHelper()
+        mock_allow_access = self.mock_object(helper, 'allow_access')
+
+        self.assertRaises(NotImplementedError,
+                          base.NetAppBaseHelper.update_access,
+                          helper, 'context', 'share', 'share_name',
+                          ['rule1', 'rule2'])
+
+        self.assertFalse(mock_allow_access.called)
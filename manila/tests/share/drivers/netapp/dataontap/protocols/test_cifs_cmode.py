@@ -175,6 +175,38 @@ class NetAppClusteredCIFSHelperTestCase(test.TestCase):
                           fake.SHARE_NAME,
                           fake.USER_ACCESS)
 
+    def test_update_access(self):
+
+        self.mock_client.get_cifs_share_access.return_value = [
+            'Everyone', fake.USER_ACCESS['access_to']]
+        other_access = dict(fake.USER_ACCESS, access_to='other_user')
+
+        self.helper.update_access(self.mock_context,
+                                  fake.CIFS_SHARE,
+                                  fake.SHARE_NAME,
+                                  [fake.USER_ACCESS, other_access])
+
+        self.mock_client.get_cifs_share_access.assert_called_once_with(
+            fake.SHARE_NAME)
+        self.mock_client.remove_cifs_share_access.assert_called_once_with(
+            fake.SHARE_NAME, 'Everyone')
+        self.mock_client.add_cifs_share_access.assert_called_once_with(
+            fake.SHARE_NAME, 'other_user')
+
+    def test_update_access_add_and_delete_rules(self):
+
+        self.helper.update_access(self.mock_context,
+                                  fake.CIFS_SHARE,
+                                  fake.SHARE_NAME,
+                                  [fake.USER_ACCESS],
+                                  add_rules=[fake.USER_ACCESS],
+                                  delete_rules=[])
+
+        self.assertFalse(self.mock_client.get_cifs_share_access.called)
+        self.assertFalse(self.mock_client.remove_cifs_share_access.called)
+        self.mock_client.add_cifs_share_access.assert_called_once_with(
+            fake.SHARE_NAME, fake.USER_ACCESS['access_to'])
+
     def test_get_target(self):
 
         target = self.helper.get_target(fake.CIFS_SHARE)
@@ -167,6 +167,56 @@ class NetAppClusteredNFSHelperTestCase(test.TestCase):
         self.assertFalse(mock_ensure_export_policy.called)
         self.assertFalse(self.mock_client.remove_nfs_export_rule.called)
 
+    def test_update_access(self):
+
+        mock_ensure_export_policy = self.mock_object(self.helper,
+                                                     '_ensure_export_policy')
+        ro_access = copy.deepcopy(fake.IP_ACCESS)
+        ro_access['access_to'] = fake.CLIENT_ADDRESS_2
+        ro_access['access_level'] = constants.ACCESS_LEVEL_RO
+
+        self.helper.update_access(self.mock_context,
+                                  fake.NFS_SHARE,
+                                  fake.SHARE_NAME,
+                                  [],
+                                  add_rules=[ro_access],
+                                  delete_rules=[fake.IP_ACCESS,
+                                                fake.USER_ACCESS])
+
+        mock_ensure_export_policy.assert_called_once_with(fake.NFS_SHARE,
+                                                          fake.SHARE_NAME)
+        self.mock_client.update_nfs_export_rules.assert_called_once_with(
+            fake.EXPORT_POLICY_NAME,
+            add_rules={fake.CLIENT_ADDRESS_2: True},
+            remove_rules=[fake.CLIENT_ADDRESS_1])
+        self.assertFalse(self.mock_client.reconcile_nfs_export_rules.called)
+
+    def test_update_access_resync(self):
+
+        self.mock_object(self.helper, '_ensure_export_policy')
+
+        self.helper.update_access(self.mock_context,
+                                  fake.NFS_SHARE,
+                                  fake.SHARE_NAME,
+                                  [fake.IP_ACCESS])
+
+        self.mock_client.reconcile_nfs_export_rules.assert_called_once_with(
+            fake.EXPORT_POLICY_NAME, {fake.CLIENT_ADDRESS_1: False})
+        self.assertFalse(self.mock_client.update_nfs_export_rules.called)
+
+    def test_update_access_invalid_type(self):
+
+        self.mock_object(self.helper, '_ensure_export_policy')
+
+        self.assertRaises(exception.InvalidShareAccess,
+                          self.helper.update_access,
+                          self.mock_context,
+                          fake.NFS_SHARE,
+                          fake.SHARE_NAME,
+                          [],
+                          add_rules=[fake.USER_ACCESS])
+        self.assertFalse(self.mock_client.update_nfs_export_rules.called)
+
     def test_get_target(self):
 
         target = self.helper.get_target(fake.NFS_SHARE)
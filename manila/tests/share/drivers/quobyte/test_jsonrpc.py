@@ -13,13 +13,11 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import httplib
-import socket
-import ssl
 import tempfile
 
 import mock
 from oslo_serialization import jsonutils
+import requests
 import six
 
 from manila import exception
@@ -29,12 +27,9 @@ from manila import test
 
 class FakeResponse(object):
     def __init__(self, status, body):
-        self.status = status
+        self.status_code = status
         self.reason = "HTTP reason"
-        self._body = body
-
-    def read(self):
-        return self._body
+        self.text = body
 
 
 class QuobyteBasicAuthCredentialsTestCase(test.TestCase):
@@ -46,102 +41,38 @@ class QuobyteBasicAuthCredentialsTestCase(test.TestCase):
                          creds.get_authorization_header())
 
 
-class QuobyteHttpsConnectionWithCaVerificationTestCase(test.TestCase):
-
-    @mock.patch.object(socket, "create_connection",
-                       return_value="fake_socket")
-    @mock.patch.object(ssl, "wrap_socket")
-    def test_https_with_ca_connect(self, mock_ssl, mock_cc):
-        key_file = tempfile.TemporaryFile()
-        cert_file = tempfile.gettempdir()
-        ca_file = tempfile.gettempdir()
-        mycon = (jsonrpc.
-                 HTTPSConnectionWithCaVerification(host="localhost",
-                                                   key_file=key_file,
-                                                   cert_file=cert_file,
-                                                   ca_file=ca_file,
-                                                   strict="anything",
-                                                   port=1234,
-                                                   timeout=999))
-
-        mycon.connect()
-
-        mock_cc.assert_called_once_with(("localhost", 1234), 999)
-        mock_ssl.assert_called_once_with("fake_socket",
-                                         keyfile=key_file,
-                                         certfile=cert_file,
-                                         ca_certs=ca_file,
-                                         cert_reqs=mock.ANY)
-
-    @mock.patch.object(httplib.HTTPConnection, "_tunnel")
-    @mock.patch.object(socket, "create_connection",
-                       return_value="fake_socket")
-    @mock.patch.object(ssl, "wrap_socket")
-    def test_https_with_ca_connect_tunnel(self,
-                                          mock_ssl,
-                                          mock_cc,
-                                          mock_tunnel):
-        key_file = tempfile.TemporaryFile()
-        cert_file = tempfile.gettempdir()
-        ca_file = tempfile.gettempdir()
-        mycon = (jsonrpc.
-                 HTTPSConnectionWithCaVerification(host="localhost",
-                                                   key_file=key_file,
-                                                   cert_file=cert_file,
-                                                   ca_file=ca_file,
-                                                   strict="anything",
-                                                   port=1234,
-                                                   timeout=999))
-        mycon._tunnel_host = "fake_tunnel_host"
-
-        mycon.connect()
-
-        mock_tunnel.assert_called_once_with()
-        mock_cc.assert_called_once_with(("localhost", 1234), 999)
-        mock_ssl.assert_called_once_with("fake_socket",
-                                         keyfile=key_file,
-                                         certfile=cert_file,
-                                         ca_certs=ca_file,
-                                         cert_reqs=mock.ANY)
-
-
 class QuobyteJsonRpcTestCase(test.TestCase):
 
     def setUp(self):
         super(QuobyteJsonRpcTestCase, self).setUp()
         self.rpc = jsonrpc.JsonRpc(url="http://test",
                                    user_credentials=("me", "team"))
-        self.rpc._connection = mock.Mock()
-        self.rpc._connection.request = mock.Mock()
+        self.mock_post = self.mock_object(self.rpc._transport, 'post')
 
     def test_request_generation_and_basic_auth(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            return_value=FakeResponse(200, '{"result":"yes"}'))
+        self.mock_post.return_value = FakeResponse(200, '{"result":"yes"}')
 
         self.rpc.call('method', {'param': 'value'})
 
-        self.rpc._connection.request.assert_called_once_with(
-            'POST', 'http://test/',
-            jsonutils.dumps({'jsonrpc': '2.0',
-                             'method': 'method',
-                             'params': {'retry': 'INFINITELY',
-                                        'param': 'value'},
-                             'id': '1'}),
-            dict(Authorization=jsonrpc.BasicAuthCredentials("me", "team")
-                 .get_authorization_header()))
-
-    @mock.patch.object(jsonrpc.HTTPSConnectionWithCaVerification,
-                       '__init__',
-                       return_value=None)
-    def test_jsonrpc_init_with_ca(self, mock_init):
-        foofile = tempfile.TemporaryFile()
+        self.mock_post.assert_called_once_with(
+            'http://test/',
+            data=jsonutils.dumps({'jsonrpc': '2.0',
+                                  'method': 'method',
+                                  'params': {'retry': 'INFINITELY',
+                                             'param': 'value'},
+                                  'id': '1'}))
+        self.assertEqual(
+            jsonrpc.BasicAuthCredentials("me", "team")
+            .get_authorization_header(),
+            self.rpc._transport.headers['Authorization'])
+
+    def test_jsonrpc_init_with_ca(self):
+        foofile = tempfile.NamedTemporaryFile()
         self.rpc = jsonrpc.JsonRpc("https://foo.bar/",
                                    ('fakeuser', 'fakepwd'),
                                    foofile)
 
-        mock_init.assert_called_once_with("foo.bar",
-                                          ca_file=foofile.name)
+        self.assertEqual(foofile.name, self.rpc._transport.verify)
 
     @mock.patch.object(jsonrpc.LOG, "warning")
     def test_jsonrpc_init_without_ca(self, mock_warning):
@@ -153,36 +84,120 @@ class QuobyteJsonRpcTestCase(test.TestCase):
             "Will not verify the server certificate of the API service"
             " because the CA certificate is not available.")
 
-    @mock.patch.object(httplib.HTTPConnection,
-                       '__init__',
-                       return_value=None)
-    def test_jsonrpc_init_no_ssl(self, mock_init):
+    def test_jsonrpc_init_no_ssl(self):
         self.rpc = jsonrpc.JsonRpc("http://foo.bar/",
                                    ('fakeuser', 'fakepwd'))
 
-        mock_init.assert_called_once_with("foo.bar")
+        self.assertTrue(self.rpc._transport.verify)
+        self.assertEqual(jsonrpc.CONNECTION_RETRIES - 1,
+                         self.rpc._transport.retries)
 
     def test_successful_call(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            return_value=FakeResponse(
-                200, '{"result":"Sweet gorilla of Manila"}'))
+        self.mock_post.return_value = FakeResponse(
+            200, '{"result":"Sweet gorilla of Manila"}')
 
         result = self.rpc.call('method', {'param': 'value'})
 
         self.assertEqual("Sweet gorilla of Manila", result)
 
+    def test_call_ids(self):
+        self.mock_post.return_value = FakeResponse(200, '{"result":"yes"}')
+
+        self.rpc.call('method', {})
+        self.rpc.call('method', {})
+
+        ids = [jsonutils.loads(call[1]['data'])['id']
+               for call in self.mock_post.call_args_list]
+        self.assertEqual(['1', '2'], ids)
+
+    def test_jsonrpc_init_pool_size(self):
+        self.rpc = jsonrpc.JsonRpc("http://foo.bar/",
+                                   ('fakeuser', 'fakepwd'), pool_size=4)
+
+        adapter = self.rpc._transport.session.get_adapter('http://foo.bar/')
+        self.assertEqual(4, adapter._pool_maxsize)
+
+    def test_call_batch(self):
+        self.mock_post.return_value = FakeResponse(
+            200, '[{"id":"2","error":{"code":2,"message":"no entry"}},'
+                 '{"id":"1","result":"yes"}]')
+
+        result = self.rpc.call_batch([('method1', {'param': 'value'}),
+                                      ('method2', None)])
+
+        self.assertEqual(['yes', None], result)
+        self.mock_post.assert_called_once_with(
+            'http://test/',
+            data=jsonutils.dumps([
+                {'jsonrpc': '2.0',
+                 'method': 'method1',
+                 'params': {'retry': 'INFINITELY', 'param': 'value'},
+                 'id': '1'},
+                {'jsonrpc': '2.0',
+                 'method': 'method2',
+                 'params': {'retry': 'INFINITELY'},
+                 'id': '2'}]))
+
+    def test_call_batch_empty(self):
+        self.assertEqual([], self.rpc.call_batch([]))
+
+        self.assertFalse(self.mock_post.called)
+
+    def test_call_batch_application_error(self):
+        self.mock_post.return_value = FakeResponse(
+            200, '[{"id":"1","result":"yes"},'
+                 '{"id":"2","error":{"code":28,"message":"text"}}]')
+
+        self.assertRaises(exception.QBRpcException, self.rpc.call_batch,
+                          [('method', {}), ('method', {})])
+
+    def test_call_batch_missing_response(self):
+        self.mock_post.return_value = FakeResponse(
+            200, '[{"id":"1","result":"yes"}]')
+
+        self.assertRaises(exception.QBException, self.rpc.call_batch,
+                          [('method', {}), ('method', {})])
+
+    def test_call_batch_rejected(self):
+        self.mock_post.side_effect = [
+            FakeResponse(
+                200, '{"id":null,"error":{"code":-32600,"message":"text"}}'),
+            FakeResponse(200, '{"id":"3","result":"yes"}'),
+            FakeResponse(200, '{"id":"4","result":"no"}'),
+            FakeResponse(200, '{"id":"5","result":"maybe"}')]
+
+        result = self.rpc.call_batch([('method1', {}), ('method2', {})])
+
+        self.assertEqual(['yes', 'no'], result)
+        self.assertEqual(['method1', 'method2'],
+                         [jsonutils.loads(call[1]['data'])['method']
+                          for call in self.mock_post.call_args_list[1:]])
+
+        self.assertEqual(['maybe'], self.rpc.call_batch([('method3', {})]))
+        self.assertEqual(4, self.mock_post.call_count)
+        self.assertEqual(
+            'method3',
+            jsonutils.loads(self.mock_post.call_args[1]['data'])['method'])
+
     def test_jsonrpc_call_ssl_disable(self):
-        self.rpc._connection.request = mock.Mock(
-            side_effect=ssl.SSLError)
+        self.mock_post.side_effect = [requests.exceptions.SSLError,
+                                      FakeResponse(200, '{"result":"yes"}')]
         jsonrpc.LOG.warning = mock.Mock()
 
-        self.assertRaises(exception.QBException,
-                          self.rpc.call,
-                          'method', {'param': 'value'})
+        self.assertEqual('yes', self.rpc.call('method', {'param': 'value'}))
         jsonrpc.LOG.warning.assert_called_once_with(
             "Could not verify server certificate of "
             "API service against CA.")
+        self.assertFalse(self.rpc._transport.verify)
+
+    def test_jsonrpc_call_ssl_disable_error(self):
+        self.mock_post.side_effect = requests.exceptions.SSLError
+        jsonrpc.LOG.warning = mock.Mock()
+
+        self.assertRaises(exception.QBException,
+                          self.rpc.call,
+                          'method', {'param': 'value'})
+        self.assertEqual(2, self.mock_post.call_count)
 
     def test_jsonrpc_call_ssl_error(self):
         """This test succeeds if a specific exception is thrown.
@@ -190,8 +205,7 @@ class QuobyteJsonRpcTestCase(test.TestCase):
         Throwing a different exception or none at all
         is a failure in this specific test case.
         """
-        self.rpc._connection.request = mock.Mock(
-            side_effect=ssl.SSLError)
+        self.mock_post.side_effect = requests.exceptions.SSLError
         self.rpc._disabled_cert_verification = True
 
         try:
@@ -205,83 +219,39 @@ class QuobyteJsonRpcTestCase(test.TestCase):
         else:
             self.fail('Expected exception not thrown')
 
-    def test_jsonrpc_call_bad_status_line(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            side_effect=httplib.BadStatusLine("fake_line"))
-
-        self.assertRaises(exception.QBException,
-                          self.rpc.call,
-                          'method', {'param': 'value'})
-
-    def test_jsonrpc_call_http_exception(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            side_effect=httplib.HTTPException)
-        jsonrpc.LOG.warning = mock.Mock()
-
-        self.assertRaises(exception.QBException,
-                          self.rpc.call,
-                          'method', {'param': 'value'})
-        jsonrpc.LOG.warning.assert_has_calls([])
-
-    def test_jsonrpc_call_http_exception_retry(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            side_effect=httplib.HTTPException)
-        jsonrpc.LOG.warning = mock.Mock()
-        self.rpc._fail_fast = False
-
-        self.assertRaises(exception.QBException,
-                          self.rpc.call,
-                          'method', {'param': 'value'})
-        jsonrpc.LOG.warning.assert_called_with(
-            "Encountered error, retrying: %s", "")
-
     def test_jsonrpc_call_no_connect(self):
-        orig_retries = jsonrpc.CONNECTION_RETRIES
-        jsonrpc.CONNECTION_RETRIES = 0
+        self.mock_post.side_effect = requests.ConnectionError('fake')
 
         try:
             self.rpc.call('method', {'param': 'value'})
         except exception.QBException as me:
-            self.assertEqual("Unable to connect to backend after 0 retries",
-                             six.text_type(me))
+            self.assertTrue(six.text_type(me).startswith(
+                "Unable to connect to backend after 3 retries"))
         else:
             self.fail('Expected exception not thrown')
-        finally:
-            jsonrpc.CONNECTION_RETRIES = orig_retries
 
     def test_http_error_401(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            return_value=FakeResponse(401, ''))
+        self.mock_post.return_value = FakeResponse(401, '')
 
         self.assertRaises(exception.QBException,
                           self.rpc.call, 'method', {'param': 'value'})
 
     def test_http_error_other(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            return_value=FakeResponse(300, ''))
+        self.mock_post.return_value = FakeResponse(300, '')
 
         self.assertRaises(exception.QBException,
                           self.rpc.call, 'method', {'param': 'value'})
 
     def test_application_error(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            return_value=FakeResponse(
-                200, '{"error":{"code":28,"message":"text"}}'))
+        self.mock_post.return_value = FakeResponse(
+            200, '{"error":{"code":28,"message":"text"}}')
 
         self.assertRaises(exception.QBRpcException,
                           self.rpc.call, 'method', {'param': 'value'})
 
     def test_broken_application_error(self):
-        self.rpc._connection.request = mock.Mock()
-        self.rpc._connection.getresponse = mock.Mock(
-            return_value=FakeResponse(
-                200, '{"error":{"code":28,"messge":"text"}}'))
+        self.mock_post.return_value = FakeResponse(
+            200, '{"error":{"code":28,"messge":"text"}}')
 
         self.assertRaises(exception.QBException,
                           self.rpc.call, 'method', {'param': 'value'})
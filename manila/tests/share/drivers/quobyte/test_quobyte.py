@@ -247,3 +247,88 @@ class QuobyteShareDriverTestCase(test.TestCase):
                  vendor_name='Quobyte',
                  share_backend_name=self._driver.backend_name,
                  driver_version=self._driver.DRIVER_VERSION))
+
+    def test_update_access(self):
+        self._driver.rpc.call = mock.Mock(
+            return_value={'volume_uuid': 'voluuid'})
+        add_rules = [fake_share.fake_access(access_to='10.0.0.2',
+                                            access_level='ro')]
+        delete_rules = [self.access,
+                        fake_share.fake_access(access_type='user')]
+
+        self._driver.update_access(self._context, self.share, add_rules,
+                                   add_rules=add_rules,
+                                   delete_rules=delete_rules)
+
+        self._driver.rpc.call.assert_called_once_with(
+            'resolveVolumeName', {'volume_name': 'fakename',
+                                  'tenant_domain': 'fake_project_uuid'})
+        self._driver.rpc.call_batch.assert_called_once_with([
+            ('exportVolume', {'volume_uuid': 'voluuid',
+                              'remove_allow_ip': '10.0.0.1'}),
+            ('exportVolume', {'volume_uuid': 'voluuid',
+                              'read_only': True,
+                              'add_allow_ip': '10.0.0.2'})])
+
+    def _mock_rpc_call(self, volume_access):
+        def rpc_call(name, args):
+            if name == 'getConfiguration':
+                return {'tenant_configuration': [
+                    {'volume_access': volume_access}]}
+            return {'volume_uuid': 'voluuid'}
+        self._driver.rpc.call = mock.Mock(side_effect=rpc_call)
+
+    def test_update_access_all_rules(self):
+        self._mock_rpc_call([
+            {'volume_uuid': 'voluuid', 'restrict_to_network': '10.0.0.3',
+             'read_only': False},
+            {'volume_uuid': 'othervoluuid',
+             'restrict_to_network': '10.0.0.4', 'read_only': False}])
+
+        self._driver.update_access(self._context, self.share, [self.access])
+
+        self._driver.rpc.call.assert_called_with('getConfiguration', {})
+        self._driver.rpc.call_batch.assert_called_once_with([
+            ('exportVolume', {'volume_uuid': 'voluuid',
+                              'remove_allow_ip': '10.0.0.3'}),
+            ('exportVolume', {'volume_uuid': 'voluuid',
+                              'read_only': False,
+                              'add_allow_ip': '10.0.0.1'})])
+
+    def test_update_access_all_rules_in_sync(self):
+        self._mock_rpc_call([
+            {'volume_uuid': 'voluuid', 'restrict_to_network': '10.0.0.1',
+             'read_only': False}])
+
+        self._driver.update_access(self._context, self.share, [self.access])
+
+        self.assertFalse(self._driver.rpc.call_batch.called)
+
+    def test_update_access_nonip(self):
+        access = fake_share.fake_access(access_type='user')
+
+        self.assertRaises(exception.InvalidShareAccess,
+                          self._driver.update_access, self._context,
+                          self.share, [self.access, access],
+                          add_rules=[self.access, access], delete_rules=[])
+
+        self.assertFalse(self._driver.rpc.call.called)
+        self.assertFalse(self._driver.rpc.call_batch.called)
+
+    def test_update_access_all_rules_nonip(self):
+        access = fake_share.fake_access(access_type='user')
+
+        self.assertRaises(exception.InvalidShareAccess,
+                          self._driver.update_access, self._context,
+                          self.share, [self.access, access])
+
+        self.assertFalse(self._driver.rpc.call_batch.called)
+
+    def test_update_access_delete_nonip(self):
+        access = fake_share.fake_access(access_type='user')
+
+        self._driver.update_access(self._context, self.share, [],
+                                   add_rules=[], delete_rules=[access])
+
+        self.assertFalse(self._driver.rpc.call.called)
+        self.assertFalse(self._driver.rpc.call_batch.called)
@@ -199,6 +199,25 @@ class GaneshaNASHelperTestCase(test.TestCase):
         self.assertEqual(mock_template, self._helper.export_template)
         self.assertEqual(None, ret)
 
+    def test_init_helper_batch_exports(self):
+        CONF.set_default('ganesha_batch_exports', True)
+        CONF.set_default('ganesha_export_flush_interval', 2.0)
+        mock_ganesha_manager = mock.Mock()
+        self.mock_object(ganesha.ganesha_manager, 'BatchingGaneshaManager',
+                         mock.Mock(return_value=mock_ganesha_manager))
+        self.mock_object(self._helper, '_load_conf_dir',
+                         mock.Mock(return_value={'key': 'value'}))
+        self._helper.init_helper()
+        (ganesha.ganesha_manager.BatchingGaneshaManager.
+            assert_called_once_with(
+                self._execute, 'faketag',
+                flush_interval=2.0,
+                ganesha_config_path='/fakedir0/fakeconfig',
+                ganesha_export_dir='/fakedir0/export.d',
+                ganesha_db_path='/fakedir1/fake.db',
+                ganesha_service_name='ganesha.fakeservice'))
+        self.assertEqual(mock_ganesha_manager, self._helper.ganesha)
+
     def test_default_config_hook(self):
         fake_template = {'key': 'value'}
         self.mock_object(ganesha.ganesha_utils, 'path_from',
@@ -16,6 +16,7 @@
 import copy
 import errno
 import os
+import time
 
 import ddt
 import mock
@@ -115,6 +116,24 @@ class GlusterManagerTestCase(test.TestCase):
                           glusterfs.GlusterManager, '127.0.0.1:vol',
                           'self.fake_execf')
 
+    @ddt.data(('testuser@127.0.0.1:/testvol', True,
+               {'user': 'testuser', 'host': '127.0.0.1', 'vol': 'testvol'}),
+              ('127.0.0.1', False,
+               {'user': None, 'host': '127.0.0.1', 'vol': None}),
+              ('127.0.0.1:/testvol', None,
+               {'user': None, 'host': '127.0.0.1', 'vol': 'testvol'}))
+    @ddt.unpack
+    def test_gluster_manager_parse(self, address, has_volume, expected):
+        self.mock_object(glusterfs.GlusterManager, 'make_gluster_call')
+        ret = glusterfs.GlusterManager.parse(address, has_volume=has_volume)
+        self.assertEqual(expected, ret)
+        self.assertFalse(glusterfs.GlusterManager.make_gluster_call.called)
+
+    def test_gluster_manager_parse_invalid(self):
+        self.assertRaises(exception.GlusterfsException,
+                          glusterfs.GlusterManager.parse,
+                          'testuser@127.0.0.1', has_volume=True)
+
     def test_gluster_manager_make_gluster_call_local(self):
         fake_obj = mock.Mock()
         fake_execute = mock.Mock()
@@ -132,14 +151,14 @@ class GlusterManagerTestCase(test.TestCase):
     def test_gluster_manager_make_gluster_call_remote(self):
         fake_obj = mock.Mock()
         fake_execute = mock.Mock()
-        with mock.patch.object(glusterfs.ganesha_utils, 'SSHExecutor',
+        with mock.patch.object(glusterfs.ganesha_utils, 'get_ssh_executor',
                                mock.Mock(return_value=fake_obj)):
             gluster_manager = glusterfs.GlusterManager(
                 'testuser@127.0.0.1:/testvol', self.fake_execf,
                 fake_path_to_private_key, fake_remote_server_password)
             gluster_manager.make_gluster_call(fake_execute)(*fake_args,
                                                             **fake_kwargs)
-            glusterfs.ganesha_utils.SSHExecutor.assert_called_with(
+            glusterfs.ganesha_utils.get_ssh_executor.assert_called_with(
                 gluster_manager.host, 22, None, gluster_manager.remote_user,
                 password=gluster_manager.remote_server_password,
                 privatekey=gluster_manager.path_to_private_key)
@@ -739,6 +758,7 @@ class GlusterNFSHelperTestCase(test.TestCase):
     def setUp(self):
         super(GlusterNFSHelperTestCase, self).setUp()
         fake_utils.stub_out_utils_execute(self)
+        self.flags(glusterfs_nfs_export_flush_interval=0)
         gluster_manager = mock.Mock(**fake_gluster_manager_attrs)
         self._execute = mock.Mock(return_value=('', ''))
         self.fake_conf = config.Configuration(None)
@@ -923,6 +943,94 @@ class GlusterNFSHelperTestCase(test.TestCase):
         self._helper.gluster_manager.gluster_call.assert_called_once_with(
             *args)
 
+    def test_manage_access_uses_cached_export_dir(self):
+        access = fake_share.fake_access()
+        share = fake_share.fake_share()
+        export_str = '/fakename(10.0.0.1)'
+        args = ('volume', 'set', self._helper.gluster_manager.volume,
+                NFS_EXPORT_DIR, export_str)
+        self.mock_object(self._helper, '_get_export_dir_dict',
+                         mock.Mock(return_value={}))
+
+        self._helper.allow_access(None, share, access)
+        self._helper.allow_access(None, share, access)
+        self._helper.deny_access(None, share, access)
+
+        self._helper._get_export_dir_dict.assert_called_once_with()
+        self.assertEqual(
+            [mock.call(*args),
+             mock.call('volume', 'reset', self._helper.gluster_manager.volume,
+                       NFS_EXPORT_DIR)],
+            self._helper.gluster_manager.gluster_call.call_args_list)
+
+    def test_get_cached_export_dir_dict_expired(self):
+        self.flags(glusterfs_nfs_export_dir_cache_ttl=10)
+        self._helper._export_dir_dict = {'fakename': ['10.0.0.1']}
+        self._helper._export_dir_time = 100
+        self.mock_object(glusterfs.time, 'time', mock.Mock(return_value=111))
+        self.mock_object(self._helper, '_get_export_dir_dict',
+                         mock.Mock(return_value={'other': ['10.0.0.2']}))
+        self.mock_object(glusterfs.LOG, 'warn')
+
+        ret = self._helper._get_cached_export_dir_dict()
+
+        self.assertEqual({'other': ['10.0.0.2']}, ret)
+        self.assertEqual(111, self._helper._export_dir_time)
+        self.assertTrue(glusterfs.LOG.warn.called)
+
+    def test_get_cached_export_dir_dict_recent(self):
+        self.flags(glusterfs_nfs_export_dir_cache_ttl=10)
+        export_dir_dict = {'fakename': ['10.0.0.1']}
+        self._helper._export_dir_dict = export_dir_dict
+        self._helper._export_dir_time = 100
+        self.mock_object(glusterfs.time, 'time', mock.Mock(return_value=105))
+        self.mock_object(self._helper, '_get_export_dir_dict')
+
+        ret = self._helper._get_cached_export_dir_dict()
+
+        self.assertIs(export_dir_dict, ret)
+        self.assertFalse(self._helper._get_export_dir_dict.called)
+
+    def test_manage_access_cmd_fail_drops_cache(self):
+        access = fake_share.fake_access()
+        share = fake_share.fake_share()
+        self._helper._export_dir_dict = {}
+        self._helper._export_dir_time = time.time()
+        self.mock_object(
+            self._helper.gluster_manager, 'gluster_call',
+            mock.Mock(side_effect=exception.ProcessExecutionError))
+        self.mock_object(glusterfs.LOG, 'error')
+
+        self.assertRaises(exception.ProcessExecutionError,
+                          self._helper.allow_access, None, share, access)
+        self.assertIsNone(self._helper._export_dir_dict)
+
+    def test_flush_batches_changes(self):
+        def cbk(d, key, value):
+            d.setdefault(key, []).append(value)
+
+        ops = [glusterfs._AccessOp('share1', '10.0.0.1', cbk),
+               glusterfs._AccessOp('share2', '10.0.0.2', cbk)]
+        args = ('volume', 'set', self._helper.gluster_manager.volume,
+                NFS_EXPORT_DIR, '/share1(10.0.0.1),/share2(10.0.0.2)')
+        self.mock_object(self._helper, '_get_export_dir_dict',
+                         mock.Mock(return_value={}))
+
+        self._helper._flush(ops)
+
+        self._helper.gluster_manager.gluster_call.assert_called_once_with(
+            *args)
+
+    def test_manage_access_submits_change(self):
+        self.mock_object(self._helper._committer, 'submit')
+        cbk = mock.Mock()
+
+        self._helper._manage_access('share1', 'ip', '10.0.0.1', cbk)
+
+        op = self._helper._committer.submit.call_args[0][0]
+        self.assertEqual(('share1', '10.0.0.1', cbk),
+                         (op.share_name, op.access_to, op.cbk))
+
 
 class GaneshaNFSHelperTestCase(test.TestCase):
     """Tests GaneshaNFSHelper."""
@@ -953,12 +1061,12 @@ class GaneshaNFSHelperTestCase(test.TestCase):
     def test_init_remote_ganesha_server(self):
         ssh_execute = mock.Mock(return_value=('', ''))
         CONF.set_default('glusterfs_ganesha_server_ip', 'fakeip')
-        self.mock_object(glusterfs.ganesha_utils, 'SSHExecutor',
+        self.mock_object(glusterfs.ganesha_utils, 'get_ssh_executor',
                          mock.Mock(return_value=ssh_execute))
         glusterfs.GaneshaNFSHelper(
             self._execute, self.fake_conf,
             gluster_manager=self.gluster_manager)
-        glusterfs.ganesha_utils.SSHExecutor.assert_called_once_with(
+        glusterfs.ganesha_utils.get_ssh_executor.assert_called_once_with(
             'fakeip', 22, None, 'root', password=None, privatekey=None)
         glusterfs.ganesha.GaneshaNASHelper.__init__.assert_has_calls(
             [mock.call(ssh_execute, self.fake_conf)])
@@ -21,6 +21,7 @@ Test cases for GlusterFS native protocol driver.
 import re
 import shutil
 import tempfile
+import time
 
 import ddt
 import mock
@@ -172,12 +173,55 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
         self.gmgr1.gluster_call.assert_called_once_with(*test_args)
         self.assertTrue(glusterfs_native.LOG.error.called)
 
+    def test_fetch_dirty_volumes(self):
+        vol_info = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<cliOutput>
+  <volInfo>
+    <volumes>
+      <volume>
+        <name>%s</name>
+        <options>
+          <option><name>server.ssl</name><value>on</value></option>
+          <option><name>user.manila-dirty</name><value>yes</value></option>
+        </options>
+      </volume>
+      <volume>
+        <name>%s</name>
+        <options>
+          <option><name>server.ssl</name><value>on</value></option>
+        </options>
+      </volume>
+      <count>2</count>
+    </volumes>
+  </volInfo>
+</cliOutput>"""
+        self._driver.glusterfs_servers = {self.glusterfs_server1: self.gmgr1}
+        self.mock_object(self.gmgr1, 'gluster_call', mock.Mock(
+            return_value=(vol_info % ('manila-share-1-1G', 'share1'), '')))
+
+        ret = self._driver._fetch_dirty_volumes()
+
+        self.assertEqual(set(['root@host1:/manila-share-1-1G']), ret)
+        self.gmgr1.gluster_call.assert_called_once_with(
+            '--xml', 'volume', 'info')
+
+    def test_fetch_dirty_volumes_error(self):
+        self._driver.glusterfs_servers = {self.glusterfs_server1: self.gmgr1}
+        self.mock_object(self.gmgr1, 'gluster_call', mock.Mock(
+            side_effect=exception.ProcessExecutionError))
+        self.mock_object(glusterfs_native.LOG, 'error')
+
+        self.assertRaises(exception.GlusterfsException,
+                          self._driver._fetch_dirty_volumes)
+
     def test_do_setup(self):
         self._driver.glusterfs_servers = {self.glusterfs_server1: self.gmgr1}
         self.mock_object(self.gmgr1, 'get_gluster_version',
                          mock.Mock(return_value=('3', '6')))
         self.mock_object(self._driver, '_fetch_gluster_volumes',
                          mock.Mock(return_value=self.glusterfs_volumes_dict))
+        self.mock_object(self._driver, '_fetch_dirty_volumes',
+                         mock.Mock(return_value=set()))
         self._driver.gluster_used_vols_dict = self.glusterfs_volumes_dict
         self.mock_object(glusterfs_native.LOG, 'warn')
 
@@ -186,9 +230,52 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
         self._driver.do_setup(self._context)
 
         self._driver._fetch_gluster_volumes.assert_called_once_with()
+        self.assertEqual(0, len(self._driver.gluster_free_vols))
         self.assertEqual(expected_exec, fake_utils.fake_execute_get_log())
         self.gmgr1.get_gluster_version.assert_once_called_with()
 
+    def test_do_setup_pending_wipe(self):
+        # The service restarts with the wipe of a deleted share's volume
+        # still pending: the volume must not be handed out before it is
+        # wiped.
+        dirty_vol = 'root@host1:/manila-share-1-1G'
+        self._driver.glusterfs_servers = {self.glusterfs_server1: self.gmgr1}
+        self.mock_object(self.gmgr1, 'get_gluster_version',
+                         mock.Mock(return_value=('3', '6')))
+        self.mock_object(self._driver, '_fetch_gluster_volumes',
+                         mock.Mock(return_value=self.glusterfs_volumes_dict))
+        self.mock_object(self._driver, '_fetch_dirty_volumes',
+                         mock.Mock(return_value=set([dirty_vol])))
+        dirty_gmgr = mock.Mock()
+        self.mock_object(self._driver, '_glustermanager',
+                         mock.Mock(return_value=dirty_gmgr))
+        self.mock_object(self._driver, '_queue_scrub')
+
+        self._driver.do_setup(self._context)
+
+        self.assertNotIn(dirty_vol, self._driver.gluster_free_vols)
+        self.assertIn('root@host2:/manila-share-2-2G',
+                      self._driver.gluster_free_vols)
+        status = self._driver.gluster_dirty_vols[dirty_vol]
+        self.assertEqual('queued', status['state'])
+        self.assertEqual(dirty_gmgr, status['gmgr'])
+        self._driver._queue_scrub.assert_called_once_with(dirty_vol)
+
+    def test_recover_dirty_vols_sync(self):
+        self.flags(glusterfs_scrub_workers=0)
+        dirty_vol = 'root@host1:/manila-share-1-1G'
+        self.mock_object(self._driver, '_fetch_dirty_volumes',
+                         mock.Mock(return_value=set([dirty_vol,
+                                                     'root@host1:/other'])))
+        self.mock_object(self._driver, '_glustermanager')
+        self.mock_object(self._driver, '_scrub_gluster_vol')
+        self.mock_object(self._driver, '_queue_scrub')
+
+        self._driver._recover_dirty_vols(self.glusterfs_volumes_dict)
+
+        self._driver._scrub_gluster_vol.assert_called_once_with(dirty_vol)
+        self.assertFalse(self._driver._queue_scrub.called)
+
     def test_do_setup_unsupported_glusterfs_version(self):
         self._driver.glusterfs_servers = {self.glusterfs_server1: self.gmgr1}
         self.mock_object(self.gmgr1, 'get_gluster_version',
@@ -223,6 +310,7 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
     def test_ensure_share(self):
         share = self.share1
         self.mock_object(self._driver, '_glustermanager')
+        self._driver.gluster_free_vols.add(share['export_location'])
 
         self._driver.ensure_share(self._context, share)
 
@@ -230,6 +318,8 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
             self._driver.gluster_used_vols_dict[share['export_location']]
         )
         self.assertTrue(self._driver._glustermanager.called)
+        self.assertNotIn(share['export_location'],
+                         self._driver.gluster_free_vols)
 
     def test_setup_gluster_vol(self):
         test_args = [
@@ -385,10 +475,10 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
         self.assertEqual(used_vols[expected].export, result)
         self._driver._setup_gluster_vol.assert_called_once_with(result)
 
-    @ddt.data({"voldict": {"share2G": {"size": 2}},
+    @ddt.data({"voldict": {"host:/share2G": {"size": 2}},
                "used_vols": {}, "size": 3},
-              {"voldict": {"share2G": {"size": 2}},
-               "used_vols": {"share2G": "fake_mgr"}, "size": None})
+              {"voldict": {"host:/share2G": {"size": 2}},
+               "used_vols": {"host:/share2G": "fake_mgr"}, "size": None})
     @ddt.unpack
     def test_pop_gluster_vol_excp(self, voldict, used_vols, size):
         self._driver._fetch_gluster_volumes = mock.Mock(return_value=voldict)
@@ -400,6 +490,91 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
                           self._driver._pop_gluster_vol, size=size)
         self.assertFalse(self._driver._setup_gluster_vol.called)
 
+    def test_pop_gluster_vol_indexed(self):
+        gmgr1 = glusterfs.GlusterManager(self.glusterfs_target1,
+                                         self._execute, None, None)
+        self._driver.gluster_free_vols.add(self.glusterfs_target1)
+        self._driver._fetch_gluster_volumes = mock.Mock()
+        self._driver._setup_gluster_vol = mock.Mock(return_value=gmgr1)
+
+        result = self._driver._pop_gluster_vol()
+
+        self.assertEqual(self.glusterfs_target1, result)
+        self.assertFalse(self._driver._fetch_gluster_volumes.called)
+        self.assertNotIn(result, self._driver.gluster_free_vols)
+
+    def test_pop_gluster_vol_refetch_exhausted_index(self):
+        gmgr1 = glusterfs.GlusterManager(self.glusterfs_target1,
+                                         self._execute, None, None)
+        self._driver.gluster_used_vols_dict = {self.glusterfs_target2: 'mgr'}
+        self._driver._fetch_gluster_volumes = mock.Mock(
+            return_value={self.glusterfs_target1: {},
+                          self.glusterfs_target2: {}})
+        self._driver._setup_gluster_vol = mock.Mock(return_value=gmgr1)
+
+        result = self._driver._pop_gluster_vol()
+
+        self.assertEqual(self.glusterfs_target1, result)
+        self._driver._fetch_gluster_volumes.assert_called_once_with()
+        self.assertEqual(0, len(self._driver.gluster_free_vols))
+
+    def test_pop_gluster_vol_setup_fails(self):
+        self._driver._fetch_gluster_volumes = mock.Mock()
+        self._driver._setup_gluster_vol = mock.Mock(
+            side_effect=exception.GlusterfsException)
+        self._driver.gluster_free_vols.add(self.glusterfs_target1)
+
+        self.assertRaises(exception.GlusterfsException,
+                          self._driver._pop_gluster_vol)
+        self.assertNotIn(self.glusterfs_target1,
+                         self._driver.gluster_free_vols)
+        self.assertNotIn(self.glusterfs_target1,
+                         self._driver.gluster_used_vols_dict)
+
+    def test_index_gluster_volumes(self):
+        self._driver.gluster_free_vols.add('root@host1:/gone')
+        self._driver.gluster_used_vols_dict = {
+            'root@host2:/manila-share-2-2G': 'mgr'}
+
+        self._driver._index_gluster_volumes(self.glusterfs_volumes_dict)
+
+        self.assertEqual(1, len(self._driver.gluster_free_vols))
+        self.assertEqual('root@host1:/manila-share-1-1G',
+                         self._driver.gluster_free_vols.pick(1))
+        self.assertIsNone(self._driver.gluster_free_vols.pick(2))
+        self.assertEqual(self.glusterfs_volumes_dict,
+                         self._driver._gluster_volumes)
+
+    def test_sync_gluster_volumes(self):
+        self._driver._fetch_gluster_volumes = mock.Mock(
+            return_value=self.glusterfs_volumes_dict)
+        self._driver._index_gluster_volumes_locked = mock.Mock()
+
+        self._driver._sync_gluster_volumes()
+
+        self._driver._fetch_gluster_volumes.assert_called_once_with()
+        self._driver._index_gluster_volumes_locked.assert_called_once_with(
+            self.glusterfs_volumes_dict)
+
+    def test_sync_gluster_volumes_not_due(self):
+        self._driver._gluster_volumes_sync_time = time.time()
+        self._driver._fetch_gluster_volumes = mock.Mock()
+
+        self._driver._sync_gluster_volumes()
+
+        self.assertFalse(self._driver._fetch_gluster_volumes.called)
+
+    def test_sync_gluster_volumes_fetch_fails(self):
+        self._driver._fetch_gluster_volumes = mock.Mock(
+            side_effect=exception.GlusterfsException)
+        self._driver._index_gluster_volumes_locked = mock.Mock()
+        self.mock_object(glusterfs_native.LOG, 'warn')
+
+        self._driver._sync_gluster_volumes()
+
+        self.assertFalse(self._driver._index_gluster_volumes_locked.called)
+        self.assertTrue(glusterfs_native.LOG.warn.called)
+
     def test_push_gluster_vol(self):
         gmgr = glusterfs.GlusterManager
         gmgr1 = gmgr(self.glusterfs_target1, self._execute, None, None)
@@ -407,12 +582,151 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
 
         self._driver.gluster_used_vols_dict = {
             self.glusterfs_target1: gmgr1, self.glusterfs_target2: gmgr2}
+        self._driver._gluster_volumes = {self.glusterfs_target1: {},
+                                         self.glusterfs_target2: {}}
 
         self._driver._push_gluster_vol(self.glusterfs_target2)
 
         self.assertEqual(1, len(self._driver.gluster_used_vols_dict))
         self.assertFalse(
             self.glusterfs_target2 in self._driver.gluster_used_vols_dict)
+        self.assertIn(self.glusterfs_target2, self._driver.gluster_free_vols)
+
+    def test_push_gluster_vol_dirty(self):
+        gmgr1 = glusterfs.GlusterManager(self.glusterfs_target1,
+                                         self._execute, None, None)
+        self._driver.gluster_used_vols_dict = {self.glusterfs_target1: gmgr1}
+        self._driver._gluster_volumes = {self.glusterfs_target1: {}}
+        self._driver._queue_scrub = mock.Mock()
+
+        self._driver._push_gluster_vol(self.glusterfs_target1, dirty=True)
+
+        self.assertEqual({}, self._driver.gluster_used_vols_dict)
+        self.assertNotIn(self.glusterfs_target1,
+                         self._driver.gluster_free_vols)
+        status = self._driver.gluster_dirty_vols[self.glusterfs_target1]
+        self.assertEqual('queued', status['state'])
+        self.assertEqual(gmgr1, status['gmgr'])
+        self._driver._queue_scrub.assert_called_once_with(
+            self.glusterfs_target1)
+
+    def test_queue_scrub(self):
+        self.mock_object(glusterfs_native.eventlet, 'spawn_n')
+
+        self._driver._queue_scrub(self.glusterfs_target1)
+        self._driver._queue_scrub(self.glusterfs_target2)
+
+        self.assertEqual(
+            [mock.call(self._driver._scrub_worker)] * 2,
+            glusterfs_native.eventlet.spawn_n.call_args_list)
+        self.assertEqual(2, self._driver._scrub_queue.qsize())
+
+    def _dirty_vol(self, vol, state='queued'):
+        gmgr = glusterfs.GlusterManager(vol, self._execute, None, None)
+        self._driver.gluster_dirty_vols[vol] = {
+            'gmgr': gmgr, 'state': state, 'attempts': 0,
+            'queued_at': time.time(), 'started_at': None}
+        self._driver._gluster_volumes[vol] = {}
+        return gmgr
+
+    def test_scrub_gluster_vol(self):
+        gmgr1 = self._dirty_vol(self.glusterfs_target1)
+        self._driver._wipe_gluster_vol = mock.Mock()
+        self._driver._mark_dirty = mock.Mock()
+
+        self._driver._scrub_gluster_vol(self.glusterfs_target1)
+
+        self._driver._wipe_gluster_vol.assert_called_once_with(gmgr1)
+        self._driver._mark_dirty.assert_called_once_with(gmgr1, dirty=False)
+        self.assertEqual({}, self._driver.gluster_dirty_vols)
+        self.assertIn(self.glusterfs_target1, self._driver.gluster_free_vols)
+
+    def test_scrub_gluster_vol_not_queued(self):
+        self._dirty_vol(self.glusterfs_target1, state='scrubbing')
+        self._driver._wipe_gluster_vol = mock.Mock()
+
+        self._driver._scrub_gluster_vol(self.glusterfs_target1)
+        self._driver._scrub_gluster_vol(self.glusterfs_target2)
+
+        self.assertFalse(self._driver._wipe_gluster_vol.called)
+
+    def test_scrub_gluster_vol_fails(self):
+        self._dirty_vol(self.glusterfs_target1)
+        self._driver._wipe_gluster_vol = mock.Mock(
+            side_effect=exception.GlusterfsException)
+        self._driver._queue_scrub = mock.Mock()
+        self.mock_object(glusterfs_native.LOG, 'exception')
+
+        self._driver._scrub_gluster_vol(self.glusterfs_target1)
+
+        status = self._driver.gluster_dirty_vols[self.glusterfs_target1]
+        self.assertEqual('failed', status['state'])
+        self.assertEqual(1, status['attempts'])
+        self.assertNotIn(self.glusterfs_target1,
+                         self._driver.gluster_free_vols)
+        self.assertTrue(glusterfs_native.LOG.exception.called)
+
+        self._driver._retry_failed_scrubs()
+
+        self.assertEqual('queued', status['state'])
+        self._driver._queue_scrub.assert_called_once_with(
+            self.glusterfs_target1)
+
+    def test_scrub_gluster_vol_unmark_fails(self):
+        self._dirty_vol(self.glusterfs_target1)
+        self._driver._wipe_gluster_vol = mock.Mock()
+        self._driver._mark_dirty = mock.Mock(
+            side_effect=exception.GlusterfsException)
+        self.mock_object(glusterfs_native.LOG, 'exception')
+
+        self._driver._scrub_gluster_vol(self.glusterfs_target1)
+
+        status = self._driver.gluster_dirty_vols[self.glusterfs_target1]
+        self.assertEqual('failed', status['state'])
+        self.assertNotIn(self.glusterfs_target1,
+                         self._driver.gluster_free_vols)
+
+    def test_retry_failed_scrubs_sync(self):
+        self.flags(glusterfs_scrub_workers=0)
+        self._dirty_vol(self.glusterfs_target1, state='failed')
+        self._driver._scrub_gluster_vol = mock.Mock()
+
+        self._driver._retry_failed_scrubs()
+
+        self._driver._scrub_gluster_vol.assert_called_once_with(
+            self.glusterfs_target1)
+
+    @ddt.data((True, ('volume', 'set', 'gv1', 'user.manila-dirty', 'yes')),
+              (False, ('volume', 'reset', 'gv1', 'user.manila-dirty')))
+    @ddt.unpack
+    def test_mark_dirty(self, dirty, args):
+        gmgr1 = glusterfs.GlusterManager(self.glusterfs_target1,
+                                         self._execute, None, None)
+        self.mock_object(gmgr1, 'gluster_call')
+
+        self._driver._mark_dirty(gmgr1, dirty=dirty)
+
+        gmgr1.gluster_call.assert_called_once_with(*args)
+
+    def test_mark_dirty_error(self):
+        gmgr1 = glusterfs.GlusterManager(self.glusterfs_target1,
+                                         self._execute, None, None)
+        self.mock_object(gmgr1, 'gluster_call', mock.Mock(
+            side_effect=exception.ProcessExecutionError))
+        self.mock_object(glusterfs_native.LOG, 'error')
+
+        self.assertRaises(exception.GlusterfsException,
+                          self._driver._mark_dirty, gmgr1)
+
+    def test_pop_gluster_vol_dirty_only(self):
+        self._dirty_vol(self.glusterfs_target1)
+        self._driver._fetch_gluster_volumes = mock.Mock(
+            return_value={self.glusterfs_target1: {}})
+        self._driver._setup_gluster_vol = mock.Mock()
+
+        self.assertRaises(exception.GlusterfsException,
+                          self._driver._pop_gluster_vol)
+        self.assertFalse(self._driver._setup_gluster_vol.called)
 
     def test_push_gluster_vol_excp(self):
         gmgr = glusterfs.GlusterManager
@@ -730,6 +1044,7 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
             share['size'])
 
     def test_delete_share(self):
+        self.flags(glusterfs_scrub_workers=0)
         self._driver._push_gluster_vol = mock.Mock()
         self._driver._wipe_gluster_vol = mock.Mock()
         gmgr = glusterfs.GlusterManager
@@ -740,6 +1055,35 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
         self._driver._push_gluster_vol.assert_called_once_with(
             self.glusterfs_target1)
 
+    def test_delete_share_async(self):
+        self._driver._push_gluster_vol = mock.Mock()
+        self._driver._wipe_gluster_vol = mock.Mock()
+        self._driver._mark_dirty = mock.Mock()
+        gmgr = glusterfs.GlusterManager
+        gmgr1 = gmgr(self.glusterfs_target1, self._execute, None, None)
+        self._driver.gluster_used_vols_dict = {self.glusterfs_target1: gmgr1}
+
+        self._driver.delete_share(self._context, self.share1)
+
+        self.assertFalse(self._driver._wipe_gluster_vol.called)
+        self._driver._mark_dirty.assert_called_once_with(gmgr1)
+        self._driver._push_gluster_vol.assert_called_once_with(
+            self.glusterfs_target1, dirty=True)
+
+    def test_delete_share_async_mark_fails(self):
+        self._driver._push_gluster_vol = mock.Mock()
+        self._driver._mark_dirty = mock.Mock(
+            side_effect=exception.GlusterfsException)
+        gmgr1 = glusterfs.GlusterManager(self.glusterfs_target1,
+                                         self._execute, None, None)
+        self._driver.gluster_used_vols_dict = {self.glusterfs_target1: gmgr1}
+
+        self.assertRaises(exception.GlusterfsException,
+                          self._driver.delete_share, self._context,
+                          self.share1)
+
+        self.assertFalse(self._driver._push_gluster_vol.called)
+
     def test_delete_share_warn(self):
         glusterfs_native.LOG.warn = mock.Mock()
         self._driver._wipe_gluster_vol = mock.Mock()
@@ -751,6 +1095,7 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
         self.assertFalse(self._driver._push_gluster_vol.called)
 
     def test_delete_share_excp1(self):
+        self.flags(glusterfs_scrub_workers=0)
         self._driver._wipe_gluster_vol = mock.Mock()
         self._driver._wipe_gluster_vol.side_effect = (
             exception.GlusterfsException)
@@ -1062,7 +1407,75 @@ class GlusterfsNativeShareDriverTestCase(test.TestCase):
             'total_capacity_gb': 'infinite',
             'free_capacity_gb': 'infinite',
         }
+        self._driver._sync_gluster_volumes = mock.Mock()
 
         self._driver._update_share_stats()
 
         self.assertEqual(self._driver._stats, test_data)
+        self._driver._sync_gluster_volumes.assert_called_once_with()
+
+
+@ddt.ddt
+class GlusterVolumeAllocatorTestCase(test.TestCase):
+    """Tests GlusterVolumeAllocator."""
+
+    def setUp(self):
+        super(GlusterVolumeAllocatorTestCase, self).setUp()
+        self.allocator = glusterfs_native.GlusterVolumeAllocator()
+        for vol, size in (('host1:/vol-3G', 3), ('host1:/vol-1G', 1),
+                          ('host2:/vol-2G', 2), ('host2:/vol-b', None),
+                          ('host2:/vol-a', None)):
+            self.allocator.add(vol, size)
+
+    @ddt.data((1, 'host1:/vol-1G'), (2, 'host2:/vol-2G'),
+              (3, 'host1:/vol-3G'), (4, 'host2:/vol-a'))
+    @ddt.unpack
+    def test_pick_best_fit(self, size, expected):
+        self.assertEqual(expected, self.allocator.pick(size))
+
+    def test_pick_random_host(self):
+        self.mock_object(glusterfs_native.random, 'choice',
+                         mock.Mock(side_effect=lambda seq: seq[0]))
+
+        result = self.allocator.pick()
+
+        self.assertIn(result, ('host1:/vol-1G', 'host2:/vol-2G'))
+        self.assertEqual(
+            ['host1:/vol-1G', 'host2:/vol-2G'],
+            sorted(glusterfs_native.random.choice.call_args[0][0]))
+
+    def test_pick_tie_among_hosts(self):
+        self.allocator.add('host3:/vol-2G', 2)
+        self.mock_object(glusterfs_native.random, 'choice',
+                         mock.Mock(side_effect=lambda seq: seq[0]))
+
+        self.allocator.pick(2)
+
+        self.assertEqual(
+            ['host2:/vol-2G', 'host3:/vol-2G'],
+            sorted(glusterfs_native.random.choice.call_args[0][0]))
+
+    def test_pick_empty(self):
+        allocator = glusterfs_native.GlusterVolumeAllocator()
+
+        self.assertIsNone(allocator.pick())
+        self.assertIsNone(allocator.pick(1))
+
+    def test_remove(self):
+        self.allocator.remove('host1:/vol-1G')
+        self.allocator.remove('host1:/vol-3G')
+        self.allocator.remove('host1:/unknown')
+
+        self.assertEqual(3, len(self.allocator))
+        self.assertNotIn('host1:/vol-1G', self.allocator)
+        self.assertEqual('host2:/vol-2G', self.allocator.pick(1))
+        self.assertEqual('host2:/vol-2G', self.allocator.pick())
+
+    def test_sync(self):
+        self.allocator.sync({'host1:/vol-3G': 3, 'host2:/vol-2G': 5,
+                             'host3:/vol-c': None})
+
+        self.assertEqual(3, len(self.allocator))
+        self.assertEqual('host1:/vol-3G', self.allocator.pick(1))
+        self.assertEqual('host2:/vol-2G', self.allocator.pick(4))
+        self.assertEqual('host3:/vol-c', self.allocator.pick(6))
@@ -0,0 +1,236 @@
+# Copyright (c) 2015 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import errno
+import socket
+
+import ddt
+import mock
+import requests
+from requests.packages.urllib3 import exceptions as urllib3_exceptions
+import requests_mock
+
+from manila.share.drivers import rest_transport
+from manila import test
+
+
+def _connection_error(errno_value):
+    """A requests error wrapping a socket error, as urllib3 raises it."""
+    socket_error = socket.error(errno_value, 'fake')
+    return requests.ConnectionError(urllib3_exceptions.MaxRetryError(
+        None, 'https://fake.host:8080/api/fake',
+        urllib3_exceptions.ProtocolError('Connection aborted.',
+                                         socket_error)))
+
+
+@ddt.ddt
+class RestTransportTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RestTransportTestCase, self).setUp()
+        self.transport = rest_transport.RestTransport(
+            base_url='https://fake.host:8080/api', auth=('user', 'pwd'),
+            headers={'X-Fake': 'fake'}, retries=2)
+        self.mock_sleep = self.mock_object(rest_transport.time, 'sleep')
+        rest_transport.reset_metrics()
+        self.addCleanup(rest_transport.reset_metrics)
+
+    @requests_mock.mock()
+    def test_request(self, m):
+        m.post('https://fake.host:8080/api/fake', text='result')
+
+        response = self.transport.post('/fake', data='body')
+
+        self.assertEqual('result', response.text)
+        request = m.request_history[0]
+        self.assertEqual('fake', request.headers['X-Fake'])
+        self.assertIn('Authorization', request.headers)
+        self.assertEqual('body', request.body)
+        self.assertFalse(self.mock_sleep.called)
+        metrics = rest_transport.get_metrics()['https://fake.host:8080']
+        self.assertEqual(1, metrics['calls'])
+        self.assertEqual(0, metrics['retries'])
+        self.assertEqual(4, metrics['bytes_sent'])
+        self.assertEqual(6, metrics['bytes_received'])
+
+    @requests_mock.mock()
+    def test_request_absolute_url(self, m):
+        m.get('http://other.host/fake', status_code=204)
+
+        response = self.transport.get('http://other.host/fake')
+
+        self.assertEqual(204, response.status_code)
+
+    @requests_mock.mock()
+    def test_request_keeps_cookies(self, m):
+        m.get('https://fake.host:8080/api/fake')
+        self.transport.cookies.set('session', 'fake_session')
+
+        self.transport.get('/fake')
+        self.transport.get('/fake')
+
+        for request in m.request_history:
+            self.assertEqual('session=fake_session',
+                             request.headers['Cookie'])
+
+    @requests_mock.mock()
+    def test_request_retry_status(self, m):
+        m.get('https://fake.host:8080/api/fake',
+              [{'status_code': 503}, {'status_code': 200}])
+        self.mock_object(rest_transport.random, 'uniform',
+                         mock.Mock(return_value=0.1))
+
+        response = self.transport.get('/fake')
+
+        self.assertEqual(200, response.status_code)
+        rest_transport.random.uniform.assert_called_once_with(0, 0.5)
+        self.mock_sleep.assert_called_once_with(0.1)
+        metrics = rest_transport.get_metrics()['https://fake.host:8080']
+        self.assertEqual(2, metrics['calls'])
+        self.assertEqual(1, metrics['retries'])
+
+    @requests_mock.mock()
+    def test_request_retry_status_exhausted(self, m):
+        m.get('https://fake.host:8080/api/fake', status_code=503)
+
+        response = self.transport.get('/fake')
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(3, len(m.request_history))
+        self.assertEqual(2, self.mock_sleep.call_count)
+
+    @requests_mock.mock()
+    def test_request_no_retry(self, m):
+        m.get('https://fake.host:8080/api/fake', status_code=503)
+
+        response = self.transport.get('/fake', retries=0)
+
+        self.assertEqual(503, response.status_code)
+        self.assertEqual(1, len(m.request_history))
+
+    @requests_mock.mock()
+    def test_request_retry_connection_error(self, m):
+        m.get('https://fake.host:8080/api/fake',
+              exc=requests.ConnectionError)
+
+        self.assertRaises(requests.ConnectionError,
+                          self.transport.get, '/fake')
+
+        self.assertEqual(3, len(m.request_history))
+        metrics = rest_transport.get_metrics()['https://fake.host:8080']
+        self.assertEqual(3, metrics['errors'])
+
+    def test_request_post_not_replayed_after_read_error(self):
+        self.mock_object(self.transport.session, 'request', mock.Mock(
+            side_effect=_connection_error(errno.ECONNRESET)))
+
+        self.assertRaises(requests.ConnectionError,
+                          self.transport.post, '/fake', data='body')
+
+        self.assertEqual(1, self.transport.session.request.call_count)
+        self.assertFalse(self.mock_sleep.called)
+
+    def test_request_idempotent_replayed_after_read_error(self):
+        self.mock_object(self.transport.session, 'request', mock.Mock(
+            side_effect=[_connection_error(errno.ECONNRESET),
+                         mock.Mock(status_code=200, content='')]))
+
+        response = self.transport.post('/fake', data='body', idempotent=True)
+
+        self.assertEqual(200, response.status_code)
+        self.assertEqual(2, self.transport.session.request.call_count)
+
+    @ddt.data(_connection_error(errno.ECONNREFUSED),
+              requests.exceptions.ConnectTimeout())
+    def test_request_post_retried_when_not_sent(self, error):
+        self.mock_object(self.transport.session, 'request', mock.Mock(
+            side_effect=[error, mock.Mock(status_code=201, content='')]))
+
+        response = self.transport.post('/fake', data='body')
+
+        self.assertEqual(201, response.status_code)
+        self.assertEqual(2, self.transport.session.request.call_count)
+
+    @requests_mock.mock()
+    def test_request_no_retry_errors(self, m):
+        m.get('https://fake.host:8080/api/fake',
+              exc=requests.ConnectionError)
+        self.transport.retry_errors = False
+
+        self.assertRaises(requests.ConnectionError,
+                          self.transport.get, '/fake')
+
+        self.assertEqual(1, len(m.request_history))
+
+    @requests_mock.mock()
+    def test_request_ssl_error(self, m):
+        m.get('https://fake.host:8080/api/fake',
+              exc=requests.exceptions.SSLError)
+
+        self.assertRaises(requests.exceptions.SSLError,
+                          self.transport.get, '/fake')
+
+        self.assertEqual(1, len(m.request_history))
+        self.assertFalse(self.mock_sleep.called)
+
+    def test_verify_system_ca_bundle(self):
+        self.mock_object(rest_transport, 'get_system_ca_bundle',
+                         mock.Mock(return_value='/fake/ca-bundle.crt'))
+
+        self.assertEqual(
+            '/fake/ca-bundle.crt',
+            rest_transport.RestTransport(verify=True).verify)
+        self.assertEqual(
+            '/fake/ca.crt',
+            rest_transport.RestTransport(verify='/fake/ca.crt').verify)
+        self.assertFalse(rest_transport.RestTransport(verify=False).verify)
+
+    def test_get_system_ca_bundle(self):
+        self.mock_object(rest_transport.ssl, 'get_default_verify_paths',
+                         mock.Mock(return_value=mock.Mock(
+                             cafile=None, openssl_cafile='/fake/cert.pem')))
+        self.mock_object(rest_transport.os.path, 'isfile',
+                         mock.Mock(side_effect=lambda path: path in (
+                             '/fake/cert.pem',
+                             rest_transport.SYSTEM_CA_BUNDLES[1])))
+
+        self.assertEqual('/fake/cert.pem',
+                         rest_transport.get_system_ca_bundle())
+
+    def test_get_system_ca_bundle_distribution(self):
+        self.mock_object(rest_transport.ssl, 'get_default_verify_paths',
+                         mock.Mock(return_value=mock.Mock(
+                             cafile=None, openssl_cafile=None)))
+        self.mock_object(rest_transport.os.path, 'isfile',
+                         mock.Mock(side_effect=lambda path: path ==
+                                   rest_transport.SYSTEM_CA_BUNDLES[1]))
+
+        self.assertEqual(rest_transport.SYSTEM_CA_BUNDLES[1],
+                         rest_transport.get_system_ca_bundle())
+
+    def test_get_system_ca_bundle_none(self):
+        self.mock_object(rest_transport.os.path, 'isfile',
+                         mock.Mock(return_value=False))
+
+        self.assertTrue(rest_transport.get_system_ca_bundle())
+
+    def test_get_backoff(self):
+        self.mock_object(rest_transport.random, 'uniform',
+                         mock.Mock(side_effect=lambda low, high: high))
+
+        delays = [self.transport._get_backoff(attempt)
+                  for attempt in (0, 1, 2, 10)]
+
+        self.assertEqual([0.5, 1.0, 2.0, rest_transport.MAX_BACKOFF], delays)
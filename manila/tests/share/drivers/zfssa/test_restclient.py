@@ -0,0 +1,72 @@
+# Copyright (c) 2015, Oracle and/or its affiliates. All rights reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+"""
+Unit tests for Oracle's ZFSSA REST API client.
+"""
+import requests
+import requests_mock
+
+from manila.share.drivers import rest_transport
+from manila.share.drivers.zfssa import restclient
+from manila import test
+
+
+class RestClientURLTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RestClientURLTestCase, self).setUp()
+        self.client = restclient.RestClientURL('https://fakehost:215')
+        self.client.auth_str = 'fakeauth'
+        self.mock_object(rest_transport.time, 'sleep')
+
+    @requests_mock.mock()
+    def test_get(self, m):
+        m.get('https://fakehost:215/api/storage/v1/pools',
+              text='{"pools": []}', headers={'x-fake': 'fake'})
+
+        result = self.client.get('/storage/v1/pools')
+
+        self.assertEqual(restclient.Status.OK, result.status)
+        self.assertEqual('{"pools": []}', result.data)
+        self.assertEqual('fake', result.get_header('x-fake'))
+
+    @requests_mock.mock()
+    def test_request_reauthorizes(self, m):
+        m.get('https://fakehost:215/api/storage/v1/pools',
+              [{'status_code': 401}, {'status_code': 200, 'text': '{}'}])
+        m.post('https://fakehost:215/api/access/v1', status_code=201,
+               headers={'x-auth-session': 'fake_session'})
+
+        result = self.client.get('/storage/v1/pools')
+
+        self.assertEqual(restclient.Status.OK, result.status)
+        self.assertEqual('fake_session',
+                         m.request_history[-1].headers['x-auth-session'])
+
+    @requests_mock.mock()
+    def test_request_busy(self, m):
+        m.get('https://fakehost:215/api/storage/v1/pools', status_code=503)
+
+        self.assertRaises(restclient.RestClientError,
+                          self.client.get, '/storage/v1/pools',
+                          maxreqretries=3)
+        self.assertEqual(3, len(m.request_history))
+
+    @requests_mock.mock()
+    def test_request_connection_error(self, m):
+        m.get('https://fakehost:215/api/storage/v1/pools',
+              exc=requests.ConnectionError)
+
+        self.assertRaises(restclient.RestClientError,
+                          self.client.get, '/storage/v1/pools')
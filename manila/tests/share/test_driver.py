@@ -190,6 +190,13 @@ class ShareDriverTestCase(test.TestCase):
             share_driver.teardown_server,
             'fake_share_server_details')
 
+    def test_update_access(self):
+        share_driver = self._instantiate_share_driver(None, False)
+        self.assertRaises(
+            NotImplementedError,
+            share_driver.update_access,
+            'fake_context', 'fake_share', ['fake_access'])
+
     @ddt.data('manage_existing',
               'unmanage')
     def test_drivers_methods_needed_by_manage_functionality(self, method):
@@ -221,6 +221,68 @@ class ShareManagerTestCase(test.TestCase):
             utils.IsAMatcher(context.RequestContext), shares[0], rules[0],
             share_server=share_server)
 
+    def test_init_host_with_update_access(self):
+        shares = [{'id': 'fake_id_1', 'status': 'available', }]
+        rules = [
+            FakeAccessRule(state='active'),
+            FakeAccessRule(state='error'),
+        ]
+        share_server = 'fake_share_server_type_does_not_matter'
+        self.mock_object(self.share_manager.db,
+                         'share_get_all_by_host',
+                         mock.Mock(return_value=shares))
+        self.mock_object(self.share_manager.driver, 'ensure_share',
+                         mock.Mock(return_value=None))
+        self.mock_object(self.share_manager, '_ensure_share_has_pool')
+        self.mock_object(self.share_manager, '_get_share_server',
+                         mock.Mock(return_value=share_server))
+        self.mock_object(self.share_manager, 'publish_service_capabilities')
+        self.mock_object(self.share_manager.db,
+                         'share_access_get_all_for_share',
+                         mock.Mock(return_value=rules))
+        self.mock_object(self.share_manager.driver, 'update_access')
+        self.mock_object(self.share_manager.driver, 'allow_access')
+
+        self.share_manager.init_host()
+
+        self.share_manager.driver.update_access.assert_called_once_with(
+            utils.IsAMatcher(context.RequestContext), shares[0], [rules[0]],
+            share_server=share_server)
+        self.assertFalse(self.share_manager.driver.allow_access.called)
+
+    def test_init_host_with_exception_on_update_access(self):
+        shares = [
+            {'id': 'fake_id_1', 'status': 'available', },
+            {'id': 'fake_id_2', 'status': 'available', },
+        ]
+        rules = [FakeAccessRule(state='active')]
+        self.mock_object(self.share_manager.db,
+                         'share_get_all_by_host',
+                         mock.Mock(return_value=shares))
+        self.mock_object(self.share_manager.driver, 'ensure_share',
+                         mock.Mock(return_value=None))
+        self.mock_object(self.share_manager, '_ensure_share_has_pool')
+        self.mock_object(self.share_manager, '_get_share_server',
+                         mock.Mock(return_value=None))
+        self.mock_object(self.share_manager, 'publish_service_capabilities')
+        self.mock_object(manager.LOG, 'error')
+        self.mock_object(self.share_manager.db,
+                         'share_access_get_all_for_share',
+                         mock.Mock(return_value=rules))
+        self.mock_object(self.share_manager.driver, 'update_access',
+                         mock.Mock(side_effect=exception.ManilaException(
+                             message="Fake raise")))
+        self.mock_object(self.share_manager.driver, 'allow_access')
+
+        self.share_manager.init_host()
+
+        self.assertEqual(2, self.share_manager.driver.update_access.call_count)
+        self.assertFalse(self.share_manager.driver.allow_access.called)
+        manager.LOG.error.assert_has_calls([
+            mock.call(mock.ANY, mock.ANY),
+            mock.call(mock.ANY, mock.ANY),
+        ])
+
     def test_init_host_with_exception_on_ensure_share(self):
         def raise_exception(*args, **kwargs):
             raise exception.ManilaException(message="Fake raise")
@@ -18,6 +18,7 @@ Handles all requests relating to volumes + cinder.
 """
 
 import copy
+import functools
 import sys
 
 from cinderclient import exceptions as cinder_exception
@@ -26,6 +27,7 @@ from cinderclient.v2 import client as cinder_client
 from oslo_config import cfg
 from oslo_log import log
 
+from manila.common import client_cache
 import manila.context as ctxt
 from manila.db import base
 from manila import exception
@@ -72,16 +74,43 @@ CONF.register_opts(cinder_opts)
 LOG = log.getLogger(__name__)
 
 
-def cinderclient(context):
-    if context.is_admin and context.project_id is None:
-        c = cinder_client.Client(CONF.cinder_admin_username,
-                                 CONF.cinder_admin_password,
-                                 CONF.cinder_admin_tenant_name,
-                                 CONF.cinder_admin_auth_url,
-                                 retries=CONF.cinder_http_retries,)
-        c.authenticate()
-        return c
+def _admin_cinderclient():
+    c = cinder_client.Client(CONF.cinder_admin_username,
+                             CONF.cinder_admin_password,
+                             CONF.cinder_admin_tenant_name,
+                             CONF.cinder_admin_auth_url,
+                             retries=CONF.cinder_http_retries,)
+    c.authenticate()
+    return c
+
+
+def _cinderclient(context, url):
+    LOG.debug('Cinderclient connection created using URL: %s', url)
+
+    c = cinder_client.Client(context.user_id,
+                             context.auth_token,
+                             project_id=context.project_id,
+                             auth_url=url,
+                             insecure=CONF.cinder_api_insecure,
+                             retries=CONF.cinder_http_retries,
+                             cacert=CONF.cinder_ca_certificates_file)
+    # noauth extracts user_id:project_id from auth_token
+    c.client.auth_token = context.auth_token or '%s:%s' % (context.user_id,
+                                                           context.project_id)
+    c.client.management_url = url
+    return c
+
+
+def _is_admin(context):
+    return context.is_admin and context.project_id is None
+
 
+def _client_key(context):
+    """Returns the client cache key of the cinderclient for context."""
+    if _is_admin(context):
+        return ('cinder', CONF.cinder_admin_username,
+                CONF.cinder_admin_tenant_name, None,
+                CONF.cinder_admin_auth_url)
     compat_catalog = {
         'access': {'serviceCatalog': context.service_catalog or []}
     }
@@ -101,20 +130,27 @@ def cinderclient(context):
                      service_name=service_name,
                      endpoint_type=endpoint_type)
 
-    LOG.debug('Cinderclient connection created using URL: %s', url)
+    return ('cinder', context.user_id, context.project_id,
+            context.auth_token, url)
 
-    c = cinder_client.Client(context.user_id,
-                             context.auth_token,
-                             project_id=context.project_id,
-                             auth_url=url,
-                             insecure=CONF.cinder_api_insecure,
-                             retries=CONF.cinder_http_retries,
-                             cacert=CONF.cinder_ca_certificates_file)
-    # noauth extracts user_id:project_id from auth_token
-    c.client.auth_token = context.auth_token or '%s:%s' % (context.user_id,
-                                                           context.project_id)
-    c.client.management_url = url
-    return c
+
+def _is_unauthorized(error):
+    return isinstance(error, cinder_exception.Unauthorized)
+
+
+def _drop_client_key(api, context, *args, **kwargs):
+    return _client_key(context)
+
+
+def cinderclient(context):
+    key = _client_key(context)
+    if _is_admin(context):
+        factory = _admin_cinderclient
+    else:
+        factory = functools.partial(_cinderclient, context, key[-1])
+    return client_cache.get(
+        key, factory,
+        expires_at=lambda c: client_cache.token_expiry(c.client))
 
 
 def _untranslate_volume_summary_view(context, vol):
@@ -205,6 +241,7 @@ def translate_snapshot_exception(method):
     return wrapper
 
 
+@client_cache.drop_on_unauthorized(_is_unauthorized, _drop_client_key)
 class API(base.Base):
     """API for interacting with the volume manager."""
     @translate_volume_exception
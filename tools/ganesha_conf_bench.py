@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015 Red Hat, Inc.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark parsing of large Ganesha configs.
+
+Times the single pass parser of the Ganesha manager against the
+character tokenizer it replaced, kept here as the baseline, and against
+a lookup in its parse cache.
+
+Usage: ganesha_conf_bench.py [number of export blocks] [repeats]
+"""
+
+from __future__ import print_function
+
+import re
+import sys
+import timeit
+
+from oslo_serialization import jsonutils
+import six
+
+from manila.share.drivers.ganesha import manager
+
+EXPORT_BLOCK = """EXPORT {
+    # export %(i)d
+    Export_Id = %(xid)d;
+    Path = "/gluster/vol%(i)d";
+    Pseudo = "/gluster/vol%(i)d--%(i)d";
+    Tag = access%(i)d;
+    Access_Type = RW;
+    Squash = None;
+    SecType = sys;
+    CLIENT {
+        Clients = 10.0.%(a)d.%(b)d, 10.1.%(a)d.%(b)d;
+        Access_Type = RW;
+    }
+    FSAL {
+        Name = GLUSTER;
+        Hostname = "gluster%(a)d.example.com";
+        Volume = "vol%(i)d";
+    }
+}
+"""
+
+
+def baseline_conf2json(conf):
+    """Convert Ganesha config to JSON, as the character tokenizer did."""
+
+    # tokenize config string
+    token_list = [six.StringIO()]
+    state = {
+        'in_quote': False,
+        'in_comment': False,
+        'escape': False,
+    }
+
+    cbk = []
+    for char in conf:
+        if state['in_quote']:
+            if not state['escape']:
+                if char == '"':
+                    state['in_quote'] = False
+                    cbk.append(lambda: token_list.append(six.StringIO()))
+                elif char == '\\':
+                    cbk.append(lambda: state.update({'escape': True}))
+        else:
+            if char == "#":
+                state['in_comment'] = True
+            if state['in_comment']:
+                if char == "\n":
+                    state['in_comment'] = False
+            else:
+                if char == '"':
+                    token_list.append(six.StringIO())
+                    state['in_quote'] = True
+        state['escape'] = False
+        if not state['in_comment']:
+            token_list[-1].write(char)
+        while cbk:
+            cbk.pop(0)()
+
+    if state['in_quote']:
+        raise RuntimeError("Unterminated quoted string")
+
+    # jsonify tokens
+    js_token_list = ["{"]
+    for tok in token_list:
+        tok = tok.getvalue()
+
+        if tok[0] == '"':
+            js_token_list.append(tok)
+            continue
+
+        for pat, s in [
+                # add omitted "=" signs to block openings
+                ('([^=\s])\s*{', '\\1={'),
+                # delete trailing semicolons in blocks
+                (';\s*}', '}'),
+                # add omitted semicolons after blocks
+                ('}\s*([^}\s])', '};\\1'),
+                # separate syntactically significant characters
+                ('([;{}=])', ' \\1 ')]:
+            tok = re.sub(pat, s, tok)
+
+        # map tokens to JSON equivalents
+        for word in tok.split():
+            if word == "=":
+                word = ":"
+            elif word == ";":
+                word = ','
+            elif (word in ['{', '}'] or
+                  re.search('\A-?[1-9]\d*(\.\d+)?\Z', word)):
+                pass
+            else:
+                word = jsonutils.dumps(word)
+            js_token_list.append(word)
+    js_token_list.append("}")
+
+    # group quouted strings
+    token_grp_list = []
+    for tok in js_token_list:
+        if tok[0] == '"':
+            if not (token_grp_list and isinstance(token_grp_list[-1], list)):
+                token_grp_list.append([])
+            token_grp_list[-1].append(tok)
+        else:
+            token_grp_list.append(tok)
+
+    # process quoted string groups by joining them
+    js_token_list2 = []
+    for x in token_grp_list:
+        if isinstance(x, list):
+            x = ''.join(['"'] + [tok[1:-1] for tok in x] + ['"'])
+        js_token_list2.append(x)
+
+    return ''.join(js_token_list2)
+
+
+def baseline_parseconf(conf):
+    return jsonutils.loads(baseline_conf2json(conf))
+
+
+def make_conf(count):
+    return "".join(EXPORT_BLOCK % {'i': i, 'xid': 101 + i,
+                                   'a': i // 256, 'b': i % 256}
+                   for i in range(count))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    conf = make_conf(count)
+    if baseline_parseconf(conf) != manager.parseconf(conf):
+        sys.exit("The parsers disagree on the benchmark config.")
+    for label, func in (
+            ('baseline', lambda: baseline_parseconf(conf)),
+            ('parseconf', lambda: manager.parseconf(conf)),
+            ('parseconf cached',
+             lambda: manager.parseconf(conf, cache=True))):
+        best = min(timeit.repeat(func, number=1, repeat=repeats))
+        print("%-20s %6d exports, %8d bytes: %8.2f ms" %
+              (label, count, len(conf), best * 1000))
+
+
+if __name__ == '__main__':
+    main()
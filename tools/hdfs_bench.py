@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015 OpenStack Foundation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark the hdfs command line client against WebHDFS.
+
+Runs the HDFS operations of a share lifecycle both with the hdfs command
+line client and through WebHDFS, and prints the latency of each.
+
+Usage: hdfs_bench.py <namenode host> [webhdfs port] [repeats] [user]
+                     [namenode port]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from oslo_concurrency import processutils
+
+from manila.share.drivers.hdfs import webhdfs
+
+SHARE_DIR = '/manila-hdfs-bench'
+SNAPSHOT = 'bench-snap'
+
+
+def cli_ops(fs):
+    def hdfs(command, *args):
+        processutils.execute('hdfs', command, '-fs', fs, *args)
+
+    return (
+        ('mkdir', lambda: hdfs('dfs', '-mkdir', SHARE_DIR)),
+        ('allowSnapshot',
+         lambda: hdfs('dfsadmin', '-allowSnapshot', SHARE_DIR)),
+        ('createSnapshot',
+         lambda: hdfs('dfs', '-createSnapshot', SHARE_DIR, SNAPSHOT)),
+        ('deleteSnapshot',
+         lambda: hdfs('dfs', '-deleteSnapshot', SHARE_DIR, SNAPSHOT)),
+        ('rm', lambda: hdfs('dfs', '-rm', '-r', SHARE_DIR)),
+        ('stats', lambda: hdfs('dfsadmin', '-report')),
+    )
+
+
+def webhdfs_ops(client):
+    return (
+        ('mkdir', lambda: client.mkdirs(SHARE_DIR)),
+        ('allowSnapshot', lambda: client.allow_snapshot(SHARE_DIR)),
+        ('createSnapshot',
+         lambda: client.create_snapshot(SHARE_DIR, SNAPSHOT)),
+        ('deleteSnapshot',
+         lambda: client.delete_snapshot(SHARE_DIR, SNAPSHOT)),
+        ('rm', lambda: client.delete(SHARE_DIR, recursive=True)),
+        ('stats', lambda: client.get_capacity()),
+    )
+
+
+def run(label, ops, repeats):
+    timings = dict((name, []) for name, func in ops)
+    for i in range(repeats):
+        for name, func in ops:
+            start = time.time()
+            func()
+            timings[name].append(time.time() - start)
+    for name, func in ops:
+        print("%-8s %-16s %8.2f ms" %
+              (label, name, min(timings[name]) * 1000))
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    host = sys.argv[1]
+    port = int(sys.argv[2]) if len(sys.argv) > 2 else 50070
+    repeats = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+    user = sys.argv[4] if len(sys.argv) > 4 else None
+    namenode_port = int(sys.argv[5]) if len(sys.argv) > 5 else 8020
+    client = webhdfs.WebHdfsClient(host, port, user=user)
+    run('cli', cli_ops('hdfs://%s:%s' % (host, namenode_port)), repeats)
+    run('webhdfs', webhdfs_ops(client), repeats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python
+
+# Copyright (c) 2015 EMC Corporation.
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Benchmark parsing of large VNX XML API responses.
+
+The responses are built by repeating the records of the mount, file
+system and storage pool query responses used by the VNX plugin tests.
+
+Usage: vnx_xml_api_bench.py [number of records] [repeats]
+"""
+
+from __future__ import print_function
+
+import sys
+import timeit
+from xml.dom import minidom
+
+from manila.share.drivers.emc.plugins.vnx import xml_api_parser as parser
+
+RESPONSE = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<ResponsePacket xmlns="http://www.emc.com/schemas/celerra/'
+            'xml_api"><Response><QueryStatus maxSeverity="ok"/>'
+            '%s</Response></ResponsePacket>')
+
+RECORDS = {
+    'mount': (
+        '<Mount fileSystem="%(i)d" disabled="false"'
+        ' ntCredential="false" path="/share-%(i)d" mover="1"'
+        ' moverIdIsVdm="false">'
+        '<NfsOptions ro="false" virusScan="true"'
+        ' prefetch="true" uncached="false"/>'
+        '<CifsOptions cifsSyncwrite="false" notify="true"'
+        ' triggerLevel="512" notifyOnAccess="false"'
+        ' notifyOnWrite="false" oplock="true" accessPolicy="NATIVE"'
+        ' lockingPolicy="nolock"/></Mount>\n'),
+    'filesystem': (
+        '<FileSystem name="share-%(i)d" type="uxfs" volume="%(i)d"'
+        ' storagePools="49" storages="1" containsSlices="true"'
+        ' internalUse="false" dataServicePolicies="Thin=Yes,'
+        ' Compressed=No,Mirrored=No,Tiering policy=Auto-Tier/Optimize Pool"'
+        ' fileSystem="%(i)d">\n'
+        '    <ProductionFileSystemData cwormState="off"/>\n'
+        '</FileSystem>\n'
+        '<FileSystemCapacityInfo volumeSize="1024" fileSystem="%(i)d"/>\n'),
+    'storagepool': (
+        '<StoragePool movers="1 2" memberVolumes="97"'
+        ' storageSystems="1" name="POOL_%(i)d" description=""'
+        ' mayContainSlicesDefault="true" diskType="Performance"'
+        ' size="51199" usedSize="1512" autoSize="51199"'
+        ' virtualProvisioning="false" isHomogeneous="true"'
+        ' dataServicePolicies="Thin=No,Compressed=No,Mirrored=No,Tiering'
+        ' policy=Auto-Tier/Optimize Pool" templatePool="%(i)d"'
+        ' stripeCount="5" stripeSize="256" pool="%(i)d">\n'
+        '    <SystemStoragePoolData dynamic="true" greedy="true"'
+        ' potentialAdditionalSize="0" size="839267" usedSize="77719"'
+        ' isBackendPool="true"/>\n'
+        '</StoragePool>\n'),
+}
+
+
+def make_response(kind, count):
+    return RESPONSE % "".join(RECORDS[kind] % {'i': i}
+                              for i in range(count))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    for kind in sorted(RECORDS):
+        rsp = make_response(kind, count)
+        for label, func in (
+                ('minidom', lambda: parser.parse_xml_api(
+                    parser.dom_to_tupletree(minidom.parseString(rsp)))),
+                ('xml_to_tupletree', lambda: parser.parse_xml_api(
+                    parser.xml_to_tupletree(rsp))),
+                ('parse_xml_api_string',
+                 lambda: parser.parse_xml_api_string(rsp))):
+            best = min(timeit.repeat(func, number=1, repeat=repeats))
+            print("%-12s %-22s %6d records, %8d bytes: %8.2f ms" %
+                  (kind, label, count, len(rsp), best * 1000))
+
+
+if __name__ == '__main__':
+    main()